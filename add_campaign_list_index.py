@@ -0,0 +1,95 @@
+import boto3
+from datetime import datetime
+
+from campaign_summary import CAMPAIGN_LIST_INDEX_ATTRIBUTES
+
+INDEX_NAME = 'CampaignsByCreatedAt'
+LIST_PARTITION = 'campaigns'
+
+
+def add_campaign_list_index():
+    """Add the time-ordered CampaignsByCreatedAt index to an existing EmailCampaigns table"""
+
+    client = boto3.client('dynamodb', region_name='us-gov-west-1')
+
+    description = client.describe_table(TableName='EmailCampaigns')['Table']
+    existing = [index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])]
+    if INDEX_NAME in existing:
+        print(f"{INDEX_NAME} already exists on EmailCampaigns")
+        return
+
+    client.update_table(
+        TableName='EmailCampaigns',
+        AttributeDefinitions=[
+            {'AttributeName': 'list_pk', 'AttributeType': 'S'},
+            {'AttributeName': 'created_at', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexUpdates=[
+            {
+                'Create': {
+                    'IndexName': INDEX_NAME,
+                    'KeySchema': [
+                        {'AttributeName': 'list_pk', 'KeyType': 'HASH'},
+                        {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': CAMPAIGN_LIST_INDEX_ATTRIBUTES}
+                }
+            }
+        ]
+    )
+    print(f"{INDEX_NAME} is being created (it is usable once its status is ACTIVE)")
+
+
+def backfill_campaign_list_index():
+    """Tag existing non-preview campaigns with list_pk (and recipient counts) for the index"""
+
+    dynamodb = boto3.resource('dynamodb', region_name='us-gov-west-1')
+    table = dynamodb.Table('EmailCampaigns')
+
+    updated = 0
+    skipped = 0
+    scan_kwargs = {}
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if item.get('status') == 'preview' or item.get('type') == 'preview':
+                skipped += 1
+                continue
+            missing_counts = [
+                name for name in ('target_contacts', 'to', 'cc', 'bcc') if f'{name}_count' not in item
+            ]
+            if item.get('list_pk') == LIST_PARTITION and item.get('created_at') and not missing_counts:
+                continue
+
+            # The index sort key is created_at; fall back like the old listing sort did
+            created_at = item.get('created_at') or item.get('sent_at')
+            if not created_at:
+                try:
+                    created_at = datetime.fromtimestamp(int(item['campaign_id'].split('_')[-1])).isoformat()
+                except (KeyError, ValueError):
+                    created_at = '1970-01-01T00:00:00'
+
+            # The listing no longer returns recipient lists, so older campaigns need their counts
+            update_expression = 'SET list_pk = :pk, created_at = :created'
+            values = {':pk': LIST_PARTITION, ':created': created_at}
+            for name in missing_counts:
+                update_expression += f', {name}_count = :{name}_count'
+                values[f':{name}_count'] = len(item.get(name) or [])
+
+            table.update_item(
+                Key={'campaign_id': item['campaign_id']},
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=values
+            )
+            updated += 1
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f"Backfill complete: {updated} campaigns added to the listing, {skipped} previews left out")
+
+
+if __name__ == "__main__":
+    add_campaign_list_index()
+    backfill_campaign_list_index()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-message personalization cost in the email worker
+Compares the previous clean-up + str.replace chain with compiled templates
+"""
+
+import sys
+import os
+import logging
+import time
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_FIELDS = [
+    "first_name", "last_name", "email", "title", "entity_type", "state",
+    "agency_name", "sector", "subsection", "phone", "ms_isac_member", "soc_call",
+    "fusion_center", "k12", "water_wastewater", "weekly_rollup",
+    "alternate_email", "region", "group",
+]
+
+
+def legacy_personalize(content, contact):
+    """Per-message path before compiled templates: full clean-up, then one replace per field"""
+    from email_worker_lambda import clean_quill_html_for_email
+
+    content = clean_quill_html_for_email(content)
+    for field in LEGACY_FIELDS:
+        content = content.replace("{{" + field + "}}", contact.get(field, ""))
+    return content.replace("{{company}}", contact.get("agency_name", ""))
+
+
+def build_body(paragraphs=2000):
+    """Large Quill-style HTML body with placeholders sprinkled through it"""
+    parts = ['<div class="ql-editor" contenteditable="true"><style>.ql-align-center { text-align: center; }</style>']
+    for i in range(paragraphs):
+        parts.append(
+            f'<p data-row="{i}" spellcheck="false">  Dear {{{{first_name}}}} {{{{last_name}}}}, update {i} for {{{{agency_name}}}} in {{{{state}}}}.  </p>\n'
+        )
+        if i % 50 == 0:
+            parts.append("<p><br></p>\n")
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def timed(func, body, contacts):
+    start = time.perf_counter()
+    for contact in contacts:
+        func(body, contact)
+    return (time.perf_counter() - start) / len(contacts)
+
+
+def main():
+    import email_worker_lambda as worker
+
+    # The clean-up logs on every call; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    body = build_body()
+    contacts = [
+        {"first_name": f"User{i}", "last_name": "Test", "agency_name": "Agency", "state": "VA"}
+        for i in range(200)
+    ]
+
+    # Both paths must produce identical output
+    assert legacy_personalize(body, contacts[0]) == worker.personalize_content(body, contacts[0])
+
+    print("🚀 Personalization Benchmark")
+    print("=" * 50)
+    print(f"Body size: {len(body):,} characters, recipients: {len(contacts)}")
+
+    legacy = timed(legacy_personalize, body, contacts)
+    worker.template_cache.clear()
+    compiled = timed(worker.personalize_content, body, contacts)
+
+    print(f"  Legacy clean + replace: {legacy * 1000:.3f} ms/message")
+    print(f"  Compiled template:      {compiled * 1000:.3f} ms/message")
+    print(f"  Speedup:                {legacy / compiled:.1f}x")
+    print(f"  Template cache:         {worker.template_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of raw (attachment) message assembly in the email worker
+Compares the previous per-message MIME tree + as_bytes() with the streamed skeleton
+Each mode runs in a fresh subprocess so peak RSS (ru_maxrss) is measured independently
+"""
+
+import sys
+import os
+import logging
+import resource
+import subprocess
+import tempfile
+import time
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ATTACHMENT_MB = 8
+RECIPIENTS = 5
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class FileBackedS3:
+    """get_object/head_object stand-in that streams a local file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_object(self, Bucket, Key):
+        return {"Body": open(self.path, "rb"), "ContentType": "application/pdf", "ETag": '"bench"'}
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": '"bench"'}
+
+
+def run_legacy(path):
+    """Previous path: whole object in memory, MIME tree, encode_base64, as_bytes() per message"""
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    s3 = FileBackedS3(path)
+    for i in range(RECIPIENTS):
+        file_data = s3.get_object(Bucket="bench", Key="report.pdf")["Body"].read()
+        msg = MIMEMultipart("mixed")
+        msg["From"] = "sender@example.com"
+        msg["To"] = f"user{i}@example.com"
+        msg["Subject"] = "Report"
+        related = MIMEMultipart("related")
+        alternative = MIMEMultipart("alternative")
+        alternative.attach(MIMEText(f"<p>Hello user {i}</p>", "html", "utf-8"))
+        related.attach(alternative)
+        msg.attach(related)
+        part = MIMEBase("application", "pdf")
+        part.set_payload(file_data)
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition", 'attachment; filename="report.pdf"')
+        msg.attach(part)
+        raw_bytes = msg.as_bytes()
+    return len(raw_bytes)
+
+
+def run_streaming(path):
+    """Current path: /tmp cache + mmap, one streamed skeleton, render into a reused buffer"""
+    from unittest.mock import patch
+    import email_worker_lambda as worker
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with patch.dict(os.environ, {"ATTACHMENT_CACHE_DIR": cache_dir}):
+            cache = worker.AttachmentCache()
+        with patch.object(worker, "s3_client", FileBackedS3(path)), patch.object(
+            worker, "attachment_cache", cache
+        ):
+            attachments = [{"s3_key": "report.pdf", "filename": "report.pdf"}]
+            for i in range(RECIPIENTS):
+                skeleton = worker.mime_skeleton_cache.get({"campaign_id": "bench"}, attachments, [], [])
+                raw_bytes = skeleton.render(
+                    "sender@example.com", f"user{i}@example.com", "Report",
+                    f"<p>Hello user {i}</p>", out=worker.get_render_buffer(),
+                )
+            return len(raw_bytes)
+
+
+def run_mode(mode, path):
+    import email_worker_lambda  # noqa: F401 - import cost is the same for both modes
+
+    logging.getLogger().setLevel(logging.WARNING)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    size = run_legacy(path) if mode == "legacy" else run_streaming(path)
+    elapsed = time.perf_counter() - start
+    print(f"{mode},{peak_rss_mb() - baseline:.1f},{elapsed:.3f},{size}")
+
+
+def main():
+    if len(sys.argv) == 3:
+        run_mode(sys.argv[1], sys.argv[2])
+        return
+
+    print("🚀 Raw Message Memory Benchmark")
+    print("=" * 50)
+    print(f"Attachment: {ATTACHMENT_MB} MB, recipients: {RECIPIENTS}")
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as attachment:
+        attachment.write(os.urandom(ATTACHMENT_MB * 1024 * 1024))
+        attachment.flush()
+
+        results = {}
+        for mode in ("legacy", "streaming"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), mode, attachment.name],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            _, peak, elapsed, size = output.split(",")
+            results[mode] = float(peak)
+            print(f"  {mode:<9} peak RSS above baseline: {float(peak):7.1f} MB  time: {float(elapsed):.2f}s  message: {int(size) / 1048576:.1f} MB")
+
+    print(f"  Peak memory reduction: {results['legacy'] / max(results['streaming'], 0.1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
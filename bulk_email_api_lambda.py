@@ -5,23 +5,61 @@ import smtplib
 import ssl
 import time
 import os
+import re
+import threading
 import traceback
+import uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 import base64
+import gzip
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer
+
+from campaign_counters import CAMPAIGN_COUNTERS_TABLE, assign_counter_shard, get_counter_shard_key, sum_counter_shards
+from campaign_summary import CAMPAIGN_SUMMARY_ATTRIBUTES
 
 
 # Initialize clients
 dynamodb = boto3.resource('dynamodb', region_name='us-gov-west-1')
 contacts_table = dynamodb.Table('EmailContacts')
+# Parallel scan width used to resolve filter segments server-side
+CONTACT_SEGMENT_SCAN_SEGMENTS = int(os.environ.get('CONTACT_SEGMENT_SCAN_SEGMENTS', '8'))
 campaigns_table = dynamodb.Table('EmailCampaigns')
+# Time-ordered campaign listing: sparse GSI (list_pk, created_at). Only items written with
+# list_pk are indexed, so previews never enter it. Set CAMPAIGN_LIST_INDEX='' to list by scan.
+CAMPAIGN_LIST_INDEX = os.environ.get('CAMPAIGN_LIST_INDEX', 'CampaignsByCreatedAt')
+CAMPAIGN_LIST_PARTITION = 'campaigns'
+# Campaign search: inverted index of name/subject token prefixes -> campaigns, newest first.
+# Rows are (token prefix, '<created_at>#<campaign_id>'). Set CAMPAIGN_SEARCH_TABLE='' to search by scan.
+CAMPAIGN_SEARCH_TABLE = os.environ.get('CAMPAIGN_SEARCH_TABLE', 'EmailCampaignSearchTokens')
+SEARCH_PREFIX_MAX_LENGTH = int(os.environ.get('SEARCH_PREFIX_MAX_LENGTH', '20'))
+search_tokens_table = dynamodb.Table(CAMPAIGN_SEARCH_TABLE or 'EmailCampaignSearchTokens')
 email_config_table = dynamodb.Table('EmailConfig')
 secrets_client = boto3.client('secretsmanager', region_name='us-gov-west-1')
-sqs_client = boto3.client('sqs', region_name='us-gov-west-1')
+
+# Parallel batched enqueue: one connection per enqueue thread
+SQS_ENQUEUE_WORKERS = int(os.environ.get('SQS_ENQUEUE_WORKERS', '8'))
+SQS_ENQUEUE_MAX_ATTEMPTS = int(os.environ.get('SQS_ENQUEUE_MAX_ATTEMPTS', '4'))
+sqs_client = boto3.client(
+    'sqs',
+    region_name='us-gov-west-1',
+    config=Config(max_pool_connections=max(10, SQS_ENQUEUE_WORKERS), retries={'max_attempts': 3, 'mode': 'standard'})
+)
+queue_url_cache = {}  # queue name -> URL (persists across warm invocations)
+
+# Asynchronous fan-out: POST /campaign returns 202 and this function re-invokes itself
+# (InvocationType=Event) to enqueue recipients in checkpointed slices
+ASYNC_CAMPAIGN_FANOUT = os.environ.get('ASYNC_CAMPAIGN_FANOUT', 'false').lower() == 'true'
+FANOUT_SLICE_RECIPIENTS = int(os.environ.get('FANOUT_SLICE_RECIPIENTS', '2000'))
+FANOUT_TIME_MARGIN_MS = int(os.environ.get('FANOUT_TIME_MARGIN_MS', '60000'))
+FANOUT_CLAIM_SECONDS = int(os.environ.get('FANOUT_CLAIM_SECONDS', '300'))  # Slice claims older than this are taken over (crashed invocation)
+lambda_client = boto3.client('lambda', region_name='us-gov-west-1')
 
 # S3 client with Signature Version 4 (required for KMS-encrypted buckets)
 s3_config = Config(signature_version='s3v4', region_name='us-gov-west-1')
@@ -30,6 +68,14 @@ s3_client = boto3.client('s3', region_name='us-gov-west-1', config=s3_config)
 # S3 bucket for attachments
 ATTACHMENTS_BUCKET = 'jcdc-ses-contact-list'
 
+# Recipient manifests: recipient lists longer than RECIPIENT_INLINE_MAX are written to S3
+# as gzip'd, newline-delimited chunks; the campaign item keeps only the pointer and counts
+RECIPIENT_MANIFEST_BUCKET = os.environ.get('RECIPIENT_MANIFEST_BUCKET', ATTACHMENTS_BUCKET)
+RECIPIENT_MANIFEST_PREFIX = os.environ.get('RECIPIENT_MANIFEST_PREFIX', 'campaign-manifests')
+RECIPIENT_MANIFEST_CHUNK_SIZE = int(os.environ.get('RECIPIENT_MANIFEST_CHUNK_SIZE', '10000'))
+RECIPIENT_INLINE_MAX = int(os.environ.get('RECIPIENT_INLINE_MAX', '100'))
+RECIPIENT_LISTS = ('target_contacts', 'to', 'cc', 'bcc')
+
 # Custom API URL configuration
 # To use your own domain instead of the AWS API Gateway URL:
 # 1. Set Lambda environment variable: CUSTOM_API_URL = https://yourdomain.com
@@ -38,6 +84,17 @@ ATTACHMENTS_BUCKET = 'jcdc-ses-contact-list'
 # If not set, it will automatically use the API Gateway URL
 CUSTOM_API_URL = os.environ.get('CUSTOM_API_URL', None)
 
+# Sharded progress counters: new campaigns spread sent/failed increments across
+# COUNTER_SHARDS items in the counters table (0 keeps counts on the campaign item)
+COUNTER_SHARDS = int(os.environ.get('COUNTER_SHARDS', '0'))
+counters_table = dynamodb.Table(CAMPAIGN_COUNTERS_TABLE)
+COUNTER_CACHE_TTL_SECONDS = float(os.environ.get('COUNTER_CACHE_TTL_SECONDS', '5'))
+counter_totals_cache = {}
+
+# Recipients packed into each SQS message (1 keeps one message per recipient);
+# the worker fans packed messages out and re-enqueues failed recipients individually
+SQS_RECIPIENTS_PER_MESSAGE = max(1, min(200, int(os.environ.get('SQS_RECIPIENTS_PER_MESSAGE', '1'))))
+
 
 # Helper function to convert DynamoDB Decimal types to JSON-serializable types
 def convert_decimals(obj):
@@ -96,6 +153,11 @@ def lambda_handler(event, context):
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
     
+    # Campaign fan-out stage (async self-invocation). Errors propagate so Lambda
+    # retries the event, which resumes from the last checkpoint.
+    if event.get('action') == 'fanout_campaign':
+        return run_campaign_fanout(event['campaign_id'], context)
+    
     try:
         if event['httpMethod'] == 'OPTIONS':
             return {'statusCode': 200, 'headers': headers, 'body': ''}
@@ -131,6 +193,8 @@ def lambda_handler(event, context):
             return get_distinct_values(headers, event)
         elif path == '/contacts/filter' and method == 'POST':
             return filter_contacts(body, headers)
+        elif path == '/contacts/segment/count' and method == 'POST':
+            return count_contact_segment(body, headers)
         elif path == '/contacts' and method == 'POST':
             return add_contact(body, headers)
         elif path == '/contacts' and method == 'PUT':
@@ -151,7 +215,10 @@ def lambda_handler(event, context):
             return send_campaign(body, headers, event)
         elif path == '/campaign/{campaign_id}' and method == 'GET':
             campaign_id = event['pathParameters']['campaign_id']
-            return get_campaign_status(campaign_id, headers)
+            return get_campaign_status(campaign_id, headers, event)
+        elif path == '/campaign/{campaign_id}/recipients' and method == 'GET':
+            campaign_id = event['pathParameters']['campaign_id']
+            return get_campaign_recipients(campaign_id, headers, event)
         elif path == '/attachment-url' and method == 'GET':
             print("   → Calling get_attachment_url()")
             return get_attachment_url(event, headers)
@@ -3934,7 +4001,47 @@ def serve_web_ui(event):
         // Campaign Filter State
         let currentCampaignFilterType = null;
         let selectedCampaignFilterValues = {{}};  // {{filterType: [values]}}
-        let campaignFilteredContacts = null;  // null = no filter applied, [] = filter applied but no results, [...] = filtered contacts
+        let campaignSegment = null;  // null = no segment selected, {{ filters, count }} = recipients resolved server-side when sending
+        let campaignFilteredContacts = null;  // Preview of campaignSegment, loaded only when the Target Contacts modal is opened
+        
+        async function fetchSegmentCount(filters) {{
+            // Count matching contacts server-side without downloading them
+            const response = await fetch(`${{API_URL}}/contacts/segment/count`, {{
+                method: 'POST',
+                headers: {{
+                    'Content-Type': 'application/json'
+                }},
+                body: JSON.stringify({{ filters: filters }})
+            }});
+            
+            if (!response.ok) {{
+                throw new Error(`HTTP ${{response.status}}: ${{response.statusText}}`);
+            }}
+            
+            const data = await response.json();
+            return data.count || 0;
+        }}
+        
+        async function fetchSegmentContacts(filters) {{
+            // Only used to preview a segment; sending resolves it server-side
+            if (filters.length === 0) {{
+                return await fetchAllContactsPaginated();
+            }}
+            const response = await fetch(`${{API_URL}}/contacts/filter`, {{
+                method: 'POST',
+                headers: {{
+                    'Content-Type': 'application/json'
+                }},
+                body: JSON.stringify({{ filters: filters }})
+            }});
+            
+            if (!response.ok) {{
+                throw new Error(`HTTP ${{response.status}}: ${{response.statusText}}`);
+            }}
+            
+            const data = await response.json();
+            return data.contacts || [];
+        }}
         
         async function selectCampaignFilterType(filterType) {{
             console.log('Campaign filter type selected:', filterType, 'Current type:', currentCampaignFilterType);
@@ -3945,6 +4052,10 @@ def serve_web_ui(event):
             // Allow toggling off by clicking the same button (including "All")
             if (currentCampaignFilterType === filterType) {{
                 console.log('Toggling off current campaign filter type');
+                if (filterType === '' && campaignSegment !== null && campaignSegment.filters.length === 0) {{
+                    campaignSegment = null;
+                    campaignFilteredContacts = null;
+                }}
                 currentCampaignFilterType = null;
                 document.getElementById('campaignAvailableValuesArea').style.display = 'none';
                 countDisplay.style.display = 'none';
@@ -3960,22 +4071,12 @@ def serve_web_ui(event):
             if (filterType === '') {{
                 document.getElementById('campaignAvailableValuesArea').style.display = 'none';
                 
-                // Fetch all contacts count from DynamoDB
+                // Count all contacts server-side; the campaign resolves the list when it is sent
                 try {{
                     console.log('Fetching all contacts count from DynamoDB...');
-                    const response = await fetch(`${{API_URL}}/contacts?limit=1`);
-                    if (!response.ok) {{
-                        throw new Error(`HTTP ${{response.status}}: ${{response.statusText}}`);
-                    }}
-                    const data = await response.json();
-                    
-                    // Use the scan to get actual count
-                    const countResponse = await fetch(`${{API_URL}}/contacts?limit=10000`);
-                    if (!countResponse.ok) {{
-                        throw new Error(`HTTP ${{countResponse.status}}: ${{countResponse.statusText}}`);
-                    }}
-                    const countData = await countResponse.json();
-                    const totalContacts = (countData.contacts || []).length;
+                    const totalContacts = await fetchSegmentCount([]);
+                    campaignSegment = {{ filters: [], count: totalContacts }};
+                    campaignFilteredContacts = null;
                     
                     // Display the count
                     countNumber.textContent = totalContacts;
@@ -4088,7 +4189,8 @@ def serve_web_ui(event):
             
             // If no filters selected, reset to null (means fetch all contacts when sending)
             if (Object.keys(selectedCampaignFilterValues).length === 0) {{
-                campaignFilteredContacts = null;  // null means no filter, will fetch all contacts
+                campaignSegment = null;
+                campaignFilteredContacts = null;
                 countDisplay.style.display = 'none';
                 console.log('No filters selected. Campaign will send to all contacts in database.');
                 return;
@@ -4104,29 +4206,18 @@ def serve_web_ui(event):
             console.log('Campaign filter request:', filters);
             
             try {{
-                // Call the backend /contacts/filter endpoint
-                const response = await fetch(`${{API_URL}}/contacts/filter`, {{
-                    method: 'POST',
-                    headers: {{
-                        'Content-Type': 'application/json'
-                    }},
-                    body: JSON.stringify({{ filters: filters }})
-                }});
-                
-                if (!response.ok) {{
-                    throw new Error(`HTTP ${{response.status}}: ${{response.statusText}}`);
-                }}
+                // Only the audience size is fetched; the recipients are resolved server-side when sending
+                const count = await fetchSegmentCount(filters);
+                console.log('Campaign segment count received:', count);
                 
-                const data = await response.json();
-                console.log('Campaign filtered contacts received:', data);
-                
-                campaignFilteredContacts = data.contacts || [];
+                campaignSegment = {{ filters: filters, count: count }};
+                campaignFilteredContacts = null;
                 
                 // Display the count
-                countNumber.textContent = campaignFilteredContacts.length;
+                countNumber.textContent = count;
                 countDisplay.style.display = 'block';
                 
-                if (campaignFilteredContacts.length === 0) {{
+                if (count === 0) {{
                     console.warn('No contacts match the selected filters.');
                 }}
             }} catch (error) {{
@@ -4138,7 +4229,8 @@ def serve_web_ui(event):
         function clearAllCampaignFilters() {{
             selectedCampaignFilterValues = {{}};
             currentCampaignFilterType = null;
-            campaignFilteredContacts = null;  // null means no filter applied
+            campaignSegment = null;  // null means no filter applied
+            campaignFilteredContacts = null;
             document.getElementById('campaignAvailableValuesArea').style.display = 'none';
             document.getElementById('campaignContactCount').style.display = 'none';
             updateCampaignSelectedValuesTags();
@@ -4179,10 +4271,19 @@ def serve_web_ui(event):
             // Determine which contacts to show
             let contacts = [];
             
-            if (campaignFilteredContacts && Array.isArray(campaignFilteredContacts) && campaignFilteredContacts.length > 0) {{
-                // Use filtered contacts (already loaded)
+            if (campaignSegment !== null && campaignSegment.count > 0) {{
+                // Load the segment for preview (cached until the filter changes)
+                if (campaignFilteredContacts === null) {{
+                    Toast.info('Loading target contacts...', 2000);
+                    try {{
+                        campaignFilteredContacts = await fetchSegmentContacts(campaignSegment.filters);
+                    }} catch (error) {{
+                        Toast.error(`Failed to load contacts: ${{error.message}}`);
+                        return;
+                    }}
+                }}
                 contacts = campaignFilteredContacts;
-                console.log(`Using ${{contacts.length}} filtered contacts for modal`);
+                console.log(`Using ${{contacts.length}} segment contacts for modal`);
             }} else if (Object.keys(selectedCampaignFilterValues || {{}}).length > 0) {{
                 // User selected filters but didn't apply them
                 Toast.warning('Please click "Apply Filter" first to see target contacts.');
@@ -4472,6 +4573,32 @@ def serve_web_ui(event):
             return allContacts;
         }}
         
+        async function pollEnqueueProgress(campaignId, total) {{
+            // Enqueue phase runs after POST /campaign returns; refresh the counters until it finishes
+            const queuedEl = document.getElementById('campaignQueuedCount');
+            const failedEl = document.getElementById('campaignFailedToQueue');
+            const labelEl = document.getElementById('campaignEnqueueLabel');
+            for (let attempt = 0; attempt < 900; attempt++) {{
+                try {{
+                    const response = await fetch(`${{API_URL}}/campaign/${{encodeURIComponent(campaignId)}}?view=progress`);
+                    if (response.ok) {{
+                        const progress = await response.json();
+                        const queued = progress.enqueued_count || progress.queued_count || 0;
+                        if (queuedEl) queuedEl.textContent = queued;
+                        if (failedEl) failedEl.textContent = progress.enqueue_failed_count || 0;
+                        if (labelEl) labelEl.textContent = `Queued to SQS (${{queued}} of ${{progress.enqueue_total || total}})`;
+                        if (progress.enqueue_status === 'complete' || progress.enqueue_status === 'failed') {{
+                            if (labelEl) labelEl.textContent = 'Queued to SQS';
+                            return progress;
+                        }}
+                    }}
+                }} catch (error) {{
+                    console.warn('Enqueue progress poll failed:', error);
+                }}
+                await new Promise(resolve => setTimeout(resolve, 2000));
+            }}
+        }}
+        
         async function sendCampaign(event) {{
             // Check form availability first
             if (!checkFormAvailability()) {{
@@ -4507,12 +4634,12 @@ def serve_web_ui(event):
                 
             // Determine target contacts based on filter
             let targetContacts = [];
+            let targetFilters = null;  // Filter specification resolved to recipients by the backend
+            let segmentCount = 0;
             let filterDescription = 'All Contacts';
             
             console.log('Campaign filter debug:', {{
-                campaignFilteredContacts: campaignFilteredContacts === null ? 'null (no filter)' : 
-                                         Array.isArray(campaignFilteredContacts) ? `array with ${{campaignFilteredContacts.length}} items` : 
-                                         'invalid',
+                campaignSegment: campaignSegment === null ? 'null (no filter)' : campaignSegment,
                 selectedCampaignFilterValuesKeys: Object.keys(selectedCampaignFilterValues || {{}}).length,
                 selectedCampaignFilterValues: selectedCampaignFilterValues
             }});
@@ -4523,68 +4650,34 @@ def serve_web_ui(event):
             const bccValue = document.getElementById('campaignBcc')?.value || '';
             const hasToOrCcOrBcc = toValue.trim().length > 0 || ccValue.trim().length > 0 || bccValue.trim().length > 0;
             
-            // THREE STATES: null = no filter, [] = filter with no results, [...] = filtered contacts
-            if (campaignFilteredContacts === null) {{
+            // THREE STATES: null = no segment, count 0 = segment with no contacts, count > 0 = segment resolved server-side
+            if (campaignSegment === null) {{
                 // No filters applied - check if To/CC/BCC exist
                 if (!hasToOrCcOrBcc) {{
                     // No contacts selected and no To/CC/BCC
                     throw new Error('⚠️ Cannot send campaign: No targets selected.\\n\\nNo emails will be sent because you have not selected any targets.\\n\\nPlease select targets by:\\n• Clicking "All" to send to all contacts, OR\\n• Applying a filter to select specific contacts, OR\\n• Adding email addresses to To/CC/BCC fields\\n\\nThen click "Apply Filter" (if using contacts) before sending.');
                 }}
                 // To/CC/BCC exist, allow campaign with empty contact list
-                targetContacts = [];
                 filterDescription = 'To/CC/BCC Recipients Only';
                 console.log('Sending to To/CC/BCC recipients only (no contacts from database)');
-            }} else if (Array.isArray(campaignFilteredContacts) && campaignFilteredContacts.length > 0) {{
-                // User has applied a filter and has results
-                targetContacts = campaignFilteredContacts;
-                const filterTags = Object.entries(selectedCampaignFilterValues || {{}})
-                    .map(([field, values]) => `${{field}}: ${{values.join(', ')}}`)
+            }} else if (campaignSegment.count > 0) {{
+                // The backend resolves the segment from the same filter specification
+                targetFilters = campaignSegment.filters;
+                segmentCount = campaignSegment.count;
+                const filterTags = campaignSegment.filters
+                    .map(filter => `${{filter.field}}: ${{filter.values.join(', ')}}`)
                     .join('; ');
-                filterDescription = filterTags || 'Filtered Contacts';
-                console.log(`Using ${{targetContacts.length}} filtered contacts: ${{filterDescription}}`);
-            }} else if (Array.isArray(campaignFilteredContacts) && campaignFilteredContacts.length === 0) {{
+                filterDescription = filterTags || 'All Contacts';
+                console.log(`Using segment of ${{segmentCount}} contacts: ${{filterDescription}}`);
+            }} else {{
                 // Filter was applied but returned no results - check if To/CC/BCC exist
                 if (!hasToOrCcOrBcc) {{
                     // No contacts from filter and no To/CC/BCC
                     throw new Error('⚠️ Cannot send campaign: Your filter returned 0 contacts.\\n\\nNo emails will be sent because no targets are selected.\\n\\nPlease adjust your filter criteria, clear filters to send to all contacts, or add email addresses to To/CC/BCC fields.');
                 }}
                 // To/CC/BCC exist, allow campaign even with 0 filtered contacts
-                targetContacts = [];
                 filterDescription = 'To/CC/BCC Recipients Only (Filter returned 0 contacts)';
                 console.log('Filter returned 0 contacts, but sending to To/CC/BCC recipients');
-            }} else if (Object.keys(selectedCampaignFilterValues || {{}}).length > 0) {{
-                // User has selected filter values but hasn't clicked "Apply Filter"
-                console.log('Filters selected but not applied. Attempting to apply filter automatically...');
-                
-                try {{
-                    await applyCampaignFilter();
-                    
-                    // Check the result after applying
-                    if (campaignFilteredContacts && Array.isArray(campaignFilteredContacts) && campaignFilteredContacts.length > 0) {{
-                        targetContacts = campaignFilteredContacts;
-                        const filterTags = Object.entries(selectedCampaignFilterValues)
-                            .map(([field, values]) => `${{field}}: ${{values.join(', ')}}`)
-                            .join('; ');
-                        filterDescription = filterTags;
-                        console.log(`Auto-applied filter: ${{targetContacts.length}} contacts found`);
-                    }} else {{
-                        throw new Error('⚠️ Cannot send campaign: No contacts match the selected filter criteria.\\n\\nNo emails will be sent because no targets are selected.\\n\\nPlease adjust your filter or clear it to send to all contacts.');
-                    }}
-                }} catch (filterError) {{
-                    console.error('Auto-apply filter failed:', filterError);
-                    throw new Error('Please click "Apply Filter" button to see which contacts match your criteria, or clear the filter to send to all contacts.');
-                }}
-            }} else {{
-                // Fallback: shouldn't get here, but fetch all contacts as safety
-                console.warn('Unexpected state - falling back to fetch all contacts with pagination');
-                try {{
-                    targetContacts = await fetchAllContactsPaginated();
-                    filterDescription = 'All Contacts';
-                    console.log(`Fallback: Loaded ${{targetContacts.length}} contacts from database`);
-                }} catch (loadError) {{
-                    console.error('Failed to load contacts:', loadError);
-                    throw new Error(`Failed to load contacts: ${{loadError.message}}`);
-                }}
             }}
             
             // Note: Validation for targetContacts is done later after To/CC/BCC are parsed
@@ -5181,11 +5274,11 @@ def serve_web_ui(event):
             console.log('Total recipients including CC/BCC: ' + allTargetEmails.length + ' (CC: ' + ccList.length + ', BCC: ' + bccList.length + ')');
             console.log('Sample primary targets:', primaryTargetEmails.slice(0, 5));
             
-            if (allTargetEmails.length === 0) {{
+            if (allTargetEmails.length === 0 && segmentCount === 0) {{
                 throw new Error('No recipients specified. Please select contacts or add To/CC/BCC recipients.');
             }}
             
-            if (primaryTargetEmails.length === 0 && ccList.length === 0 && bccList.length === 0) {{
+            if (primaryTargetEmails.length === 0 && segmentCount === 0 && ccList.length === 0 && bccList.length === 0) {{
                 throw new Error('No recipients specified. Please select contacts or add To/CC/BCC recipients.');
             }}
 
@@ -5194,10 +5287,10 @@ def serve_web_ui(event):
 📧 Campaign Confirmation
 You are about to send this campaign to:
 
-📊 Total Recipients: ${{allTargetEmails.length}}
+📊 Total Recipients: ${{allTargetEmails.length + segmentCount}}
 
 Breakdown:
-• Contacts from database: ${{targetEmails.length}}
+• Contacts from database: ${{targetEmails.length + segmentCount}}
 • To recipients: ${{toList.length}}
 • CC recipients: ${{ccList.length}}
 • BCC recipients: ${{bccList.length}}
@@ -5280,6 +5373,7 @@ Click OK to proceed or Cancel to abort.
                 // Send only primary targets (contacts + To) - CC/BCC handled separately by backend
                 to: toList,
                 target_contacts: primaryTargetEmails,  // Send only contacts + To addresses (NOT CC/BCC)
+                target_filters: targetFilters,  // Segment resolved server-side and merged with target_contacts
                 cc: ccList,   // array of CC emails (backend will queue these separately)
                 bcc: bccList, // array of BCC emails (backend will queue these separately)
                 attachments: campaignAttachments  // Include attachments
@@ -5509,11 +5603,11 @@ Click OK to proceed or Cancel to abort.
                     </div>
                     <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin: 20px 0;">
                         <div style="background: var(--success-color); color: white; padding: 20px; border-radius: 8px; text-align: center;">
-                            <h4 style="margin: 0; font-size: 2rem;">${{result.queued_count || 0}}</h4>
-                            <p style="margin: 5px 0 0 0;">Queued to SQS</p>
+                            <h4 id="campaignQueuedCount" style="margin: 0; font-size: 2rem;">${{result.queued_count || 0}}</h4>
+                            <p id="campaignEnqueueLabel" style="margin: 5px 0 0 0;">Queued to SQS</p>
                         </div>
                         <div style="background: var(--warning-color); color: white; padding: 20px; border-radius: 8px; text-align: center;">
-                            <h4 style="margin: 0; font-size: 2rem;">${{result.failed_to_queue || 0}}</h4>
+                            <h4 id="campaignFailedToQueue" style="margin: 0; font-size: 2rem;">${{result.failed_to_queue || 0}}</h4>
                             <p style="margin: 5px 0 0 0;">Failed to Queue</p>
                         </div>
                         <div style="background: var(--info-color); color: white; padding: 20px; border-radius: 8px; text-align: center;">
@@ -5551,6 +5645,11 @@ Click OK to proceed or Cancel to abort.
                 `;
             resultDiv.classList.remove('hidden');
                 
+                // 202 Accepted: recipients are queued by the fan-out stage - poll its progress
+                if (result.enqueue_status === 'pending' || result.enqueue_status === 'enqueuing') {{
+                    pollEnqueueProgress(result.campaign_id, result.enqueue_total || 0);
+                }}
+                
                 button.textContent = 'Campaign Queued!';
                 button.style.background = 'linear-gradient(135deg, var(--success-color), #059669)';
                 setTimeout(() => {{
@@ -5900,6 +5999,39 @@ Click OK to proceed or Cancel to abort.
         
         let currentCampaignId = null;
         let allCampaigns = [];
+        
+        function campaignRecipientCount(campaign, listName) {{
+            // Long lists live in S3 manifests; the campaign item carries <list>_count instead
+            if (Array.isArray(campaign[listName])) {{
+                return campaign[listName].length;
+            }}
+            return Number(campaign[`${{listName}}_count`] || 0);
+        }}
+        
+        async function fetchCampaignRecipientList(campaign, listName) {{
+            // Inline lists are returned as-is; otherwise the list is streamed chunk by chunk
+            // (list summaries carry only counts, older campaigns not even those)
+            if (Array.isArray(campaign[listName])) {{
+                return campaign[listName];
+            }}
+            if (campaign[`${{listName}}_count`] !== undefined && campaignRecipientCount(campaign, listName) === 0) {{
+                return [];
+            }}
+            const emails = [];
+            let chunk = 0;
+            let chunks = 1;
+            while (chunk < chunks) {{
+                const response = await fetch(`${{API_URL}}/campaign/${{encodeURIComponent(campaign.campaign_id)}}/recipients?list=${{listName}}&chunk=${{chunk}}`);
+                if (!response.ok) {{
+                    throw new Error(`HTTP ${{response.status}}: ${{response.statusText}}`);
+                }}
+                const data = await response.json();
+                emails.push(...(data.emails || []));
+                chunks = data.chunks || 0;
+                chunk++;
+            }}
+            return emails;
+        }}
         window.__historyPrevTokens = [];
         window.__historyNextToken = null;
 
@@ -6032,9 +6164,9 @@ Click OK to proceed or Cancel to abort.
                     
                     // Calculate total recipients (target_contacts + To + CC + BCC)
                     const targetContactsCount = campaign.total_contacts || 0;
-                    const toCount = (campaign.to && Array.isArray(campaign.to)) ? campaign.to.length : 0;
-                    const ccCount = (campaign.cc && Array.isArray(campaign.cc)) ? campaign.cc.length : 0;
-                    const bccCount = (campaign.bcc && Array.isArray(campaign.bcc)) ? campaign.bcc.length : 0;
+                    const toCount = campaignRecipientCount(campaign, 'to');
+                    const ccCount = campaignRecipientCount(campaign, 'cc');
+                    const bccCount = campaignRecipientCount(campaign, 'bcc');
                     const recipients = targetContactsCount + toCount + ccCount + bccCount;
                     
                     const status = campaign.status || 'unknown';
@@ -6128,9 +6260,16 @@ Click OK to proceed or Cancel to abort.
                 console.warn('📜 Failed to send view log:', e);
             }}
             
-            const campaign = allCampaigns.find(c => c.campaign_id === campaignId);
-            if (!campaign) {{
-                Toast.error('Campaign not found');
+            // The history list only holds summaries; body, recipients and attachments come from the campaign item
+            let campaign;
+            try {{
+                const response = await fetch(`${{API_URL}}/campaign/${{encodeURIComponent(campaignId)}}`);
+                if (!response.ok) {{
+                    throw new Error(response.status === 404 ? 'Campaign not found' : `HTTP ${{response.status}}: ${{response.statusText}}`);
+                }}
+                campaign = await response.json();
+            }} catch (error) {{
+                Toast.error(`Failed to load campaign: ${{error.message}}`);
                 return;
             }}
             
@@ -6140,10 +6279,20 @@ Click OK to proceed or Cancel to abort.
             document.getElementById('detailDate').textContent = new Date(campaign.created_at || campaign.sent_at).toLocaleString();
             document.getElementById('detailLaunchedBy').textContent = campaign.launched_by || 'Unknown';
             
-            // Display To, CC, BCC recipients
-            const toRecipients = campaign.to || [];
-            const ccRecipients = campaign.cc || [];
-            const bccRecipients = campaign.bcc || [];
+            // Display To, CC, BCC recipients (streamed from the manifest for long lists)
+            let toRecipients = [];
+            let ccRecipients = [];
+            let bccRecipients = [];
+            try {{
+                [toRecipients, ccRecipients, bccRecipients] = await Promise.all([
+                    fetchCampaignRecipientList(campaign, 'to'),
+                    fetchCampaignRecipientList(campaign, 'cc'),
+                    fetchCampaignRecipientList(campaign, 'bcc')
+                ]);
+            }} catch (error) {{
+                console.error('Failed to load campaign recipients:', error);
+                Toast.error(`Failed to load recipients: ${{error.message}}`);
+            }}
             
             document.getElementById('detailToRecipients').innerHTML = toRecipients.length > 0 
                 ? toRecipients.map(email => `<span style="display: inline-block; padding: 4px 8px; margin: 2px; background: #dbeafe; border-radius: 4px; font-size: 12px;">${{email}}</span>`).join('')
@@ -6370,7 +6519,7 @@ Click OK to proceed or Cancel to abort.
             }}
         }}
         
-        function exportCampaignTargets() {{
+        async function exportCampaignTargets() {{
             if (!currentCampaignId) {{
                 Toast.error('No campaign selected');
                 return;
@@ -6382,11 +6531,16 @@ Click OK to proceed or Cancel to abort.
                 return;
             }}
             
-            // Get all target emails
-            const targetEmails = campaign.target_contacts || [];
-            const toEmails = campaign.to || [];
-            const ccEmails = campaign.cc || [];
-            const bccEmails = campaign.bcc || [];
+            // Get all target emails (streamed from the manifest for long lists)
+            let targetEmails, toEmails, ccEmails, bccEmails;
+            try {{
+                [targetEmails, toEmails, ccEmails, bccEmails] = await Promise.all(
+                    ['target_contacts', 'to', 'cc', 'bcc'].map(listName => fetchCampaignRecipientList(campaign, listName))
+                );
+            }} catch (error) {{
+                Toast.error(`Failed to load recipients: ${{error.message}}`);
+                return;
+            }}
             
             // Create CSV content
             let csvContent = 'Type,Email\\n';
@@ -6432,9 +6586,9 @@ Click OK to proceed or Cancel to abort.
             
             allCampaigns.forEach(campaign => {{
                 const date = new Date(campaign.created_at || campaign.sent_at).toLocaleString();
-                const toCount = (campaign.to || []).length;
-                const ccCount = (campaign.cc || []).length;
-                const bccCount = (campaign.bcc || []).length;
+                const toCount = campaignRecipientCount(campaign, 'to');
+                const ccCount = campaignRecipientCount(campaign, 'cc');
+                const bccCount = campaignRecipientCount(campaign, 'bcc');
                 
                 csvContent += `"${{campaign.campaign_name || ''}}","${{campaign.subject || ''}}","${{date}}",${{campaign.total_contacts || 0}},"${{campaign.status || ''}}","${{campaign.launched_by || ''}}",${{toCount}},${{ccCount}},${{bccCount}}\\n`;
             }});
@@ -6760,6 +6914,119 @@ def get_distinct_values(headers, event):
         traceback.print_exc()
         return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
 
+def build_contact_filter_expression(filters):
+    """Build a scan FilterExpression from [{'field', 'values'}] filters
+    
+    Values of one field are ORed together and the fields are ANDed. Returns
+    (expression, names, values); expression is None when no filter applies.
+    """
+    filter_expressions = []
+    expression_attribute_names = {}
+    expression_attribute_values = {}
+    name_counter = 0
+    value_counter = 0
+    
+    for filter_item in filters or []:
+        field = filter_item.get('field')
+        values = filter_item.get('values', [])
+        
+        if not field or not values:
+            continue
+        
+        print(f"Filter: {field} IN {values}")
+        
+        # Create placeholder for field name (to handle reserved words)
+        field_placeholder = f'#field{name_counter}'
+        expression_attribute_names[field_placeholder] = field
+        name_counter += 1
+        
+        # Create OR conditions for values in the same field
+        value_conditions = []
+        for value in values:
+            value_placeholder = f':val{value_counter}'
+            expression_attribute_values[value_placeholder] = value
+            value_conditions.append(f'{field_placeholder} = {value_placeholder}')
+            value_counter += 1
+        
+        # Join OR conditions for this field
+        if value_conditions:
+            filter_expressions.append(f'({" OR ".join(value_conditions)})')
+    
+    if not filter_expressions:
+        return None, {}, {}
+    
+    # Join all filter expressions with AND
+    return ' AND '.join(filter_expressions), expression_attribute_names, expression_attribute_values
+
+def scan_contact_segment(filters, count_only=False):
+    """Resolve a contact segment server-side with a parallel scan
+    
+    Each of CONTACT_SEGMENT_SCAN_SEGMENTS workers scans its own slice of
+    EmailContacts, projecting only the email (or counting with Select=COUNT),
+    so the browser never downloads the table. Empty filters select every contact.
+    Returns the sorted, de-duplicated lowercase emails, or the count.
+    """
+    filter_expression, names, values = build_contact_filter_expression(filters)
+    client = dynamodb.meta.client  # low-level clients are thread-safe; Table resources are not
+    serializer = TypeSerializer()
+    
+    base_params = {'TableName': contacts_table.name}
+    if filter_expression:
+        base_params['FilterExpression'] = filter_expression
+        base_params['ExpressionAttributeValues'] = {k: serializer.serialize(v) for k, v in values.items()}
+    if count_only:
+        base_params['Select'] = 'COUNT'
+    else:
+        names = dict(names, **{'#email': 'email'})
+        base_params['ProjectionExpression'] = '#email'
+    if names:
+        base_params['ExpressionAttributeNames'] = names
+    
+    total_segments = max(1, CONTACT_SEGMENT_SCAN_SEGMENTS)
+    
+    def scan_segment(segment):
+        params = dict(base_params, Segment=segment, TotalSegments=total_segments)
+        count = 0
+        emails = []
+        while True:
+            response = client.scan(**params)
+            count += response.get('Count', 0)
+            for item in response.get('Items', []):
+                email = item.get('email', {}).get('S', '').strip().lower()
+                if email:
+                    emails.append(email)
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                return count, emails
+            params['ExclusiveStartKey'] = last_evaluated_key
+    
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        results = list(executor.map(scan_segment, range(total_segments)))
+    
+    if count_only:
+        count = sum(count for count, _ in results)
+        print(f"Segment count: {count} contacts ({total_segments} scan segments)")
+        return count
+    
+    emails = sorted({email for _, segment_emails in results for email in segment_emails})
+    print(f"Segment resolved: {len(emails)} contacts ({total_segments} scan segments)")
+    return emails
+
+def count_contact_segment(body, headers):
+    """Return the number of contacts matching a filter specification without transferring them"""
+    try:
+        filters = body.get('filters', [])
+        count = scan_contact_segment(filters, count_only=True)
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps({'count': count, 'filters': filters})
+        }
+    except Exception as e:
+        print(f"Error in count_contact_segment: {str(e)}")
+        traceback.print_exc()
+        return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
+
 def filter_contacts(body, headers):
     """Filter contacts from DynamoDB based on multiple field filters"""
     try:
@@ -6771,46 +7038,12 @@ def filter_contacts(body, headers):
         
         print(f"Filtering contacts with {len(filters)} filter(s)")
         
-        # Build filter expression
-        filter_expressions = []
-        expression_attribute_names = {}
-        expression_attribute_values = {}
-        name_counter = 0
-        value_counter = 0
-        
-        for filter_item in filters:
-            field = filter_item.get('field')
-            values = filter_item.get('values', [])
-            
-            if not field or not values:
-                continue
-            
-            print(f"Filter: {field} IN {values}")
-            
-            # Create placeholder for field name (to handle reserved words)
-            field_placeholder = f'#field{name_counter}'
-            expression_attribute_names[field_placeholder] = field
-            name_counter += 1
-            
-            # Create OR conditions for values in the same field
-            value_conditions = []
-            for value in values:
-                value_placeholder = f':val{value_counter}'
-                expression_attribute_values[value_placeholder] = value
-                value_conditions.append(f'{field_placeholder} = {value_placeholder}')
-                value_counter += 1
-            
-            # Join OR conditions for this field
-            if value_conditions:
-                filter_expressions.append(f'({" OR ".join(value_conditions)})')
+        filter_expression, expression_attribute_names, expression_attribute_values = build_contact_filter_expression(filters)
         
-        if not filter_expressions:
+        if not filter_expression:
             # No valid filters, return all contacts
             return get_contacts(headers, None)
         
-        # Join all filter expressions with AND
-        filter_expression = ' AND '.join(filter_expressions)
-        
         print(f"Filter Expression: {filter_expression}")
         print(f"Expression Attribute Names: {expression_attribute_names}")
         
@@ -7266,6 +7499,506 @@ def delete_contact(event, headers):
         traceback.print_exc()
         return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
 
+def get_queue_url(queue_name):
+    """Resolve a queue URL once per container"""
+    if queue_name not in queue_url_cache:
+        queue_url_cache[queue_name] = sqs_client.get_queue_url(QueueName=queue_name)['QueueUrl']
+    return queue_url_cache[queue_name]
+
+
+def send_message_batch_with_retry(queue_url, batch):
+    """Send up to 10 (entry, recipient_count) pairs, retrying failed entries with backoff.
+
+    Returns (queued_recipients, failed_recipients).
+    """
+    pending = {str(i): (entry, count) for i, (entry, count) in enumerate(batch)}
+    queued = 0
+    for attempt in range(SQS_ENQUEUE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(min(2.0, 0.1 * (2 ** attempt)) + random.uniform(0, 0.1))
+        try:
+            response = sqs_client.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[dict(entry, Id=entry_id) for entry_id, (entry, _) in pending.items()]
+            )
+        except Exception as e:
+            print(f"SQS send_message_batch attempt {attempt + 1} failed: {str(e)}")
+            continue
+
+        for success in response.get('Successful', []):
+            queued += pending.pop(success['Id'])[1]
+        for failure in response.get('Failed', []):
+            if failure.get('SenderFault'):
+                # Malformed entry - retrying will not help
+                print(f"SQS rejected entry {failure['Id']}: {failure.get('Code')} {failure.get('Message', '')}")
+                pending.pop(failure['Id'], None)
+        if not pending:
+            break
+
+    # Anything not acknowledged as Successful counts as failed to queue
+    return queued, sum(count for _, count in batch) - queued
+
+
+def enqueue_messages(queue_url, messages):
+    """Queue (message_body, message_attributes, recipient_count) tuples with
+    send_message_batch (10 per call) spread across SQS_ENQUEUE_WORKERS threads.
+
+    Each batch call only carries messages for one counter shard, so the
+    recipients queued per shard are known exactly (workers count recipients,
+    and a packed message carries several).
+
+    Returns (queued_recipients, failed_recipients, queued_recipients_by_shard).
+    """
+    groups = {}
+    for body, attributes, count in messages:
+        groups.setdefault(body.get('counter_shard'), []).append(
+            ({'MessageBody': json.dumps(body), 'MessageAttributes': attributes}, count)
+        )
+    batches = [
+        (shard, entries[i:i + 10])
+        for shard, entries in groups.items()
+        for i in range(0, len(entries), 10)
+    ]
+    if not batches:
+        return 0, 0, {}
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(SQS_ENQUEUE_WORKERS, len(batches)))) as executor:
+        results = list(executor.map(lambda batch: send_message_batch_with_retry(queue_url, batch[1]), batches))
+
+    queued = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    queued_by_shard = {}
+    for (shard, _), result in zip(batches, results):
+        if shard is not None:
+            queued_by_shard[shard] = queued_by_shard.get(shard, 0) + result[0]
+    print(f"📤 Enqueued {len(messages)} message(s) in {len(batches)} batch call(s) in {time.time() - start:.2f}s: {queued} recipients queued, {failed} failed")
+    return queued, failed, queued_by_shard
+
+
+def record_shard_queued_counts(campaign_id, queued_by_shard):
+    """Add the recipients queued for each counter shard to the shard's queued_count.
+
+    Workers compare a shard's processed (sent + failed recipient) count against
+    this before summing all shards.
+    """
+    for shard, queued_recipients in sorted(queued_by_shard.items()):
+        if queued_recipients:
+            counters_table.update_item(
+                Key={'counter_id': get_counter_shard_key(campaign_id, shard)},
+                UpdateExpression="SET campaign_id = :campaign_id ADD queued_count :queued",
+                ExpressionAttributeValues={':campaign_id': campaign_id, ':queued': queued_recipients}
+            )
+
+
+def write_recipient_manifest(campaign_id, list_name, emails):
+    """Write one recipient list as gzip'd newline-delimited chunks; returns the manifest entry"""
+    chunks = []
+    for index, start in enumerate(range(0, len(emails), RECIPIENT_MANIFEST_CHUNK_SIZE)):
+        chunk = emails[start:start + RECIPIENT_MANIFEST_CHUNK_SIZE]
+        key = f"{RECIPIENT_MANIFEST_PREFIX}/{campaign_id}/{list_name}/{index:05d}.txt.gz"
+        s3_client.put_object(
+            Bucket=RECIPIENT_MANIFEST_BUCKET,
+            Key=key,
+            Body=gzip.compress(('\n'.join(chunk) + '\n').encode('utf-8')),
+            ContentType='text/plain'
+        )
+        chunks.append(key)
+    print(f"📄 Manifest for {campaign_id}/{list_name}: {len(emails)} recipients in {len(chunks)} chunk(s)")
+    return {'count': len(emails), 'chunks': chunks}
+
+
+def offload_recipient_lists(campaign_id, campaign_item):
+    """Move long recipient lists out of the campaign item into S3 manifests (in place).
+
+    Every list gets a <list>_count attribute. Lists longer than RECIPIENT_INLINE_MAX
+    are replaced by an entry under recipient_manifest so the item stays far below
+    DynamoDB's 400 KB limit and reads of it stay cheap.
+    """
+    lists = {}
+    for list_name in RECIPIENT_LISTS:
+        emails = [email for email in (campaign_item.get(list_name) or []) if email]
+        campaign_item[f'{list_name}_count'] = len(emails)
+        if len(emails) > RECIPIENT_INLINE_MAX:
+            lists[list_name] = write_recipient_manifest(campaign_id, list_name, emails)
+            del campaign_item[list_name]
+    if lists:
+        campaign_item['recipient_manifest'] = {'bucket': RECIPIENT_MANIFEST_BUCKET, 'lists': lists}
+
+
+def iter_manifest_chunk(bucket, key):
+    """Stream the addresses of one manifest chunk without buffering the whole object"""
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    with gzip.GzipFile(fileobj=body) as stream:
+        for line in stream:
+            email = line.decode('utf-8').strip()
+            if email:
+                yield email
+
+
+def iter_campaign_recipients(campaign, list_name):
+    """Yield a campaign's recipient list, from its manifest or inline (older campaigns)"""
+    manifest = campaign.get('recipient_manifest') or {}
+    entry = (manifest.get('lists') or {}).get(list_name)
+    if entry is None:
+        yield from campaign.get(list_name) or []
+        return
+    for key in entry['chunks']:
+        yield from iter_manifest_chunk(manifest['bucket'], key)
+
+
+def load_campaign_recipients(campaign, list_name):
+    """A campaign's recipient list as a Python list"""
+    return list(iter_campaign_recipients(campaign, list_name))
+
+
+def get_campaign_recipients(campaign_id, headers, event=None):
+    """Return one chunk of a campaign recipient list (GET /campaign/{id}/recipients?list=&chunk=)"""
+    try:
+        params = (event or {}).get('queryStringParameters') or {}
+        list_name = params.get('list', 'target_contacts')
+        if list_name not in RECIPIENT_LISTS:
+            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': f'Unknown recipient list: {list_name}'})}
+        try:
+            chunk_index = int(params.get('chunk', '0'))
+        except (TypeError, ValueError):
+            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': f"Invalid chunk: {params.get('chunk')}"})}
+
+        response = campaigns_table.get_item(
+            Key={'campaign_id': campaign_id},
+            ProjectionExpression='#list, recipient_manifest',
+            ExpressionAttributeNames={'#list': list_name}
+        )
+        if 'Item' not in response:
+            return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'Campaign not found'})}
+        campaign = response['Item']
+
+        manifest = campaign.get('recipient_manifest') or {}
+        entry = (manifest.get('lists') or {}).get(list_name)
+        if entry is None:
+            # Short (or pre-manifest) lists are stored inline as a single chunk
+            inline = list(campaign.get(list_name) or [])
+            chunks, count = 1, len(inline)
+        else:
+            chunks, count = len(entry['chunks']), int(entry['count'])
+        if not 0 <= chunk_index < chunks:
+            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': f'chunk must be between 0 and {chunks - 1}'})}
+        if entry is None:
+            emails = inline
+        else:
+            emails = list(iter_manifest_chunk(manifest['bucket'], entry['chunks'][chunk_index]))
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps({
+                'campaign_id': campaign_id,
+                'list': list_name,
+                'chunk': chunk_index,
+                'chunks': chunks,
+                'count': count,
+                'emails': emails
+            })
+        }
+    except Exception as e:
+        print(f"Error in get_campaign_recipients: {str(e)}")
+        traceback.print_exc()
+        return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
+
+
+def collect_campaign_recipients(target_contact_emails, cc_list, bcc_list, to_list):
+    """Unique, normalized recipients (targets plus To/CC/BCC) in a stable order"""
+    all_recipients = set()
+    for email in list(target_contact_emails or []) + list(cc_list or []) + list(bcc_list or []) + list(to_list or []):
+        if email:
+            all_recipients.add(email.lower().strip())
+
+    recipients = []
+    for recipient_email in sorted(all_recipients):
+        if '@' not in recipient_email:
+            print(f"Skipping invalid email: {recipient_email}")
+            continue
+        recipients.append(recipient_email)
+    return recipients
+
+
+def build_queue_messages(campaign_id, recipients, counter_shards=0, first_message_index=0):
+    """(message_body, message_attributes, recipient_count) tuples for enqueue_messages.
+
+    With counter_shards > 0 every message carries the counter shard its
+    outcomes are counted in (first_message_index continues the numbering
+    across fan-out slices).
+    """
+    messages = []
+    if SQS_RECIPIENTS_PER_MESSAGE > 1:
+        # Packed format: one message carries a chunk of recipients for the worker to fan out
+        for start in range(0, len(recipients), SQS_RECIPIENTS_PER_MESSAGE):
+            chunk = recipients[start:start + SQS_RECIPIENTS_PER_MESSAGE]
+            messages.append((
+                {
+                    'campaign_id': campaign_id,
+                    'recipients': [{'email': email} for email in chunk]
+                },
+                {
+                    'campaign_id': {'StringValue': campaign_id, 'DataType': 'String'},
+                    'recipient_count': {'StringValue': str(len(chunk)), 'DataType': 'Number'}
+                },
+                len(chunk)
+            ))
+    else:
+        for recipient_email in recipients:
+            messages.append((
+                {
+                    'campaign_id': campaign_id,
+                    'contact_email': recipient_email
+                },
+                {
+                    'campaign_id': {'StringValue': campaign_id, 'DataType': 'String'},
+                    'contact_email': {'StringValue': recipient_email, 'DataType': 'String'}
+                },
+                1
+            ))
+    if counter_shards > 0:
+        for index, (message_body, _, _) in enumerate(messages, first_message_index):
+            message_body['counter_shard'] = assign_counter_shard(index, counter_shards)
+    return messages
+
+
+def start_campaign_fanout(campaign_id):
+    """Invoke this function asynchronously to run (or resume) a campaign's fan-out"""
+    function_name = os.environ.get('FANOUT_FUNCTION_NAME') or os.environ['AWS_LAMBDA_FUNCTION_NAME']
+    lambda_client.invoke(
+        FunctionName=function_name,
+        InvocationType='Event',
+        Payload=json.dumps({'action': 'fanout_campaign', 'campaign_id': campaign_id})
+    )
+    print(f"🚀 Fan-out for campaign {campaign_id} handed to {function_name}")
+
+
+def resolve_campaign_segment(campaign_id, campaign):
+    """Add a campaign's deferred target_filters segment to its target_contacts.
+
+    Runs in the fan-out invocation when send_campaign left the scan to it. The
+    resolved list is written once (conditional on segment_status still being
+    pending) so every fan-out invocation checkpoints against the same
+    recipient list. Returns the campaign as stored.
+    """
+    segment_emails = scan_contact_segment(campaign.get('target_filters') or [])
+    target_contact_emails = list(dict.fromkeys(load_campaign_recipients(campaign, 'target_contacts') + segment_emails))
+    cc_list = load_campaign_recipients(campaign, 'cc')
+    bcc_list = load_campaign_recipients(campaign, 'bcc')
+    to_list = load_campaign_recipients(campaign, 'to')
+    print(f"Resolved {len(segment_emails)} contacts from target_filters {campaign.get('target_filters')} for campaign {campaign_id}")
+
+    excluded = {email.lower().strip() for email in cc_list + bcc_list + to_list if email and '@' in email}
+    total_contacts = sum(1 for email in target_contact_emails if email and '@' in email and email.lower().strip() not in excluded)
+
+    update_expression = "SET segment_status = :resolved, total_contacts = :total, enqueue_total = :enqueue_total, target_contacts_count = :count"
+    values = {
+        ':resolved': 'resolved',
+        ':pending': 'pending',
+        ':total': total_contacts,
+        ':enqueue_total': len(collect_campaign_recipients(target_contact_emails, cc_list, bcc_list, to_list)),
+        ':count': len(target_contact_emails)
+    }
+    if len(target_contact_emails) > RECIPIENT_INLINE_MAX:
+        entry = write_recipient_manifest(campaign_id, 'target_contacts', target_contact_emails)
+        if campaign.get('recipient_manifest'):
+            update_expression += ", recipient_manifest.lists.target_contacts = :manifest_entry REMOVE target_contacts"
+            values[':manifest_entry'] = entry
+        else:
+            update_expression += ", recipient_manifest = :manifest REMOVE target_contacts"
+            values[':manifest'] = {'bucket': RECIPIENT_MANIFEST_BUCKET, 'lists': {'target_contacts': entry}}
+    else:
+        update_expression += ", target_contacts = :targets"
+        values[':targets'] = target_contact_emails
+
+    try:
+        response = campaigns_table.update_item(
+            Key={'campaign_id': campaign_id},
+            UpdateExpression=update_expression,
+            ConditionExpression="segment_status = :pending",
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW'
+        )
+        return convert_decimals(response['Attributes'])
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        # Another fan-out invocation stored its resolution first; use that one
+        response = campaigns_table.get_item(Key={'campaign_id': campaign_id}, ConsistentRead=True)
+        return convert_decimals(response['Item'])
+
+
+def run_campaign_fanout(campaign_id, context=None, campaign=None):
+    """Enqueue a campaign's recipients in slices, checkpointing after each slice.
+
+    Before a slice is enqueued the invocation claims it with a conditional
+    update (checkpoint unchanged and no live claim by another invocation), and
+    the checkpoint (index into the sorted recipient list) is then advanced
+    under that claim. A duplicate invocation stops once the checkpoint has
+    moved past its position. If another invocation's claim on the slice is
+    still live, this one waits for it to expire (FANOUT_CLAIM_SECONDS) and
+    takes the slice over when it has the time, and otherwise raises so the
+    async retry picks the fan-out up again; a claim is therefore never left
+    behind by an invocation that died mid-slice. When the invocation is
+    close to its time limit the rest is handed to a fresh one. A slice is
+    only queued twice if the invocation holding its claim dies mid-slice.
+    """
+    if campaign is None:
+        response = campaigns_table.get_item(Key={'campaign_id': campaign_id}, ConsistentRead=True)
+        if 'Item' not in response:
+            print(f"❌ Fan-out: campaign {campaign_id} not found")
+            return {'campaign_id': campaign_id, 'enqueue_status': 'failed', 'enqueued_count': 0, 'enqueue_failed_count': 0}
+        campaign = convert_decimals(response['Item'])
+
+    if campaign.get('segment_status') == 'pending' and campaign.get('enqueue_status') != 'complete':
+        campaign = resolve_campaign_segment(campaign_id, campaign)
+
+    progress = {
+        'campaign_id': campaign_id,
+        'enqueue_status': campaign.get('enqueue_status', 'pending'),
+        'enqueued_count': int(campaign.get('enqueued_count', 0) or 0),
+        'enqueue_failed_count': int(campaign.get('enqueue_failed_count', 0) or 0),
+    }
+    if progress['enqueue_status'] == 'complete':
+        print(f"Fan-out for campaign {campaign_id} already complete")
+        return progress
+
+    recipients = collect_campaign_recipients(
+        load_campaign_recipients(campaign, 'target_contacts'),
+        load_campaign_recipients(campaign, 'cc'),
+        load_campaign_recipients(campaign, 'bcc'),
+        load_campaign_recipients(campaign, 'to')
+    )
+    position = int(campaign.get('enqueue_checkpoint', 0) or 0)
+    counter_shards = int(campaign.get('counter_shards', 0) or 0)
+    claim_id = str(uuid.uuid4())  # Identifies this invocation's slice claims
+    queue_url = get_queue_url('bulk-email-queue')
+    print(f"📤 Fan-out for campaign {campaign_id}: resuming at {position}/{len(recipients)}")
+
+    while position < len(recipients):
+        if context is not None and context.get_remaining_time_in_millis() < FANOUT_TIME_MARGIN_MS:
+            print(f"⏱️ Fan-out for campaign {campaign_id} continuing in a new invocation at {position}/{len(recipients)}")
+            start_campaign_fanout(campaign_id)
+            return progress
+
+        try:
+            now = int(time.time())
+            campaigns_table.update_item(
+                Key={'campaign_id': campaign_id},
+                UpdateExpression="SET enqueue_claim_id = :claim_id, enqueue_claim_expires = :expires",
+                ConditionExpression="enqueue_checkpoint = :position AND (attribute_not_exists(enqueue_claim_expires) OR enqueue_claim_expires < :now)",
+                ExpressionAttributeValues={
+                    ':claim_id': claim_id,
+                    ':expires': now + FANOUT_CLAIM_SECONDS,
+                    ':now': now,
+                    ':position': position
+                }
+            )
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            current = campaigns_table.get_item(
+                Key={'campaign_id': campaign_id},
+                ProjectionExpression='enqueue_checkpoint, enqueue_claim_expires',
+                ConsistentRead=True
+            ).get('Item', {})
+            if int(current.get('enqueue_checkpoint', 0) or 0) != position:
+                print(f"⚠️ Fan-out for campaign {campaign_id}: slice at {position} recorded by another invocation, stopping")
+                return progress
+            wait_seconds = max(0, int(current.get('enqueue_claim_expires', 0) or 0) - int(time.time())) + 1
+            if context is not None and context.get_remaining_time_in_millis() - wait_seconds * 1000 >= FANOUT_TIME_MARGIN_MS:
+                print(f"⏳ Fan-out for campaign {campaign_id}: slice at {position} claimed by another invocation, retrying in {wait_seconds}s")
+                time.sleep(wait_seconds)
+                continue
+            # Raising makes Lambda retry the async invocation, which resumes the fan-out if the claim holder died
+            raise RuntimeError(f"Fan-out for campaign {campaign_id}: slice at {position} is claimed by another invocation for {wait_seconds}s")
+
+        recipient_slice = recipients[position:position + FANOUT_SLICE_RECIPIENTS]
+        queued, failed, queued_by_shard = enqueue_messages(queue_url, build_queue_messages(
+            campaign_id, recipient_slice,
+            counter_shards=counter_shards,
+            first_message_index=position // max(1, SQS_RECIPIENTS_PER_MESSAGE)
+        ))
+        next_position = position + len(recipient_slice)
+
+        try:
+            campaigns_table.update_item(
+                Key={'campaign_id': campaign_id},
+                UpdateExpression="SET enqueue_checkpoint = :next, enqueued_count = :enqueued, enqueue_failed_count = :failed, enqueue_status = :enqueuing REMOVE enqueue_claim_id, enqueue_claim_expires",
+                ConditionExpression="enqueue_checkpoint = :position AND enqueue_claim_id = :claim_id",
+                ExpressionAttributeValues={
+                    ':next': next_position,
+                    ':position': position,
+                    ':claim_id': claim_id,
+                    ':enqueued': progress['enqueued_count'] + queued,
+                    ':failed': progress['enqueue_failed_count'] + failed,
+                    ':enqueuing': 'enqueuing'
+                }
+            )
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                print(f"⚠️ Fan-out for campaign {campaign_id}: claim on slice at {position} taken over by another invocation, stopping")
+                return progress
+            raise
+
+        # Shard quotas only grow once the slice is committed, so they never exceed what was queued
+        record_shard_queued_counts(campaign_id, queued_by_shard)
+        position = next_position
+        progress['enqueued_count'] += queued
+        progress['enqueue_failed_count'] += failed
+        progress['enqueue_status'] = 'enqueuing'
+
+    # Workers only consider a campaign complete against queued_count, so it is set once at the end
+    response = campaigns_table.update_item(
+        Key={'campaign_id': campaign_id},
+        UpdateExpression="SET queued_count = :queued, enqueue_status = :complete, enqueue_completed_at = :timestamp",
+        ExpressionAttributeValues={
+            ':queued': progress['enqueued_count'],
+            ':complete': 'complete',
+            ':timestamp': datetime.now().isoformat()
+        },
+        ReturnValues='ALL_NEW'
+    )
+    progress['enqueue_status'] = 'complete'
+    updated = response.get('Attributes', {})
+    print(f"✅ Fan-out for campaign {campaign_id} complete: {progress['enqueued_count']} queued, {progress['enqueue_failed_count']} failed")
+
+    try:
+        if updated.get('status') == 'queued':
+            campaigns_table.update_item(
+                Key={'campaign_id': campaign_id},
+                UpdateExpression="SET #status = :processing",
+                ConditionExpression="#status = :queued_status",
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':processing': 'processing', ':queued_status': 'queued'}
+            )
+        # Workers may have finished every message before queued_count was known
+        if counter_shards > 0:
+            totals = sum_counter_shards(dynamodb, campaign_id, counter_shards)
+            update_expression = "SET #status = :completed_status, completed_at = :timestamp, sent_count = :sent_count, failed_count = :failed_count"
+            values = {':sent_count': totals['sent_count'], ':failed_count': totals['failed_count']}
+        else:
+            totals = updated
+            update_expression = "SET #status = :completed_status, completed_at = :timestamp"
+            values = {}
+        sent_failed = int(totals.get('sent_count', 0) or 0) + int(totals.get('failed_count', 0) or 0)
+        if progress['enqueued_count'] > 0 and sent_failed >= progress['enqueued_count']:
+            values.update({':completed_status': 'completed', ':timestamp': datetime.now().isoformat()})
+            campaigns_table.update_item(
+                Key={'campaign_id': campaign_id},
+                UpdateExpression=update_expression,
+                ConditionExpression="#status <> :completed_status",
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=values
+            )
+    except Exception as e:
+        print(f"Fan-out status update for {campaign_id} skipped: {str(e)}")
+
+    return progress
+
+
 def send_campaign(body, headers, event=None):
     """Send email campaign by saving to DynamoDB and queuing contacts to SQS"""
     try:
@@ -7307,10 +8040,20 @@ def send_campaign(body, headers, event=None):
         target_contact_emails = body.get('target_contacts', [])
         filter_description = body.get('filter_description', 'All Contacts')
         
+        # A filter specification is resolved here instead of in the browser;
+        # an empty list targets every contact. With async fan-out the scan runs
+        # in the fan-out invocation so it stays out of the API request.
+        target_filters = body.get('target_filters')
+        segment_deferred = target_filters is not None and ASYNC_CAMPAIGN_FANOUT
+        if target_filters is not None and not segment_deferred:
+            segment_emails = scan_contact_segment(target_filters)
+            print(f"Resolved {len(segment_emails)} contacts from target_filters {target_filters}")
+            target_contact_emails = list(dict.fromkeys(list(target_contact_emails) + segment_emails))
+        
         print(f"Received campaign request with {len(target_contact_emails)} email addresses")
         print(f"Sample emails: {target_contact_emails[:5]}")
         
-        if not target_contact_emails:
+        if not target_contact_emails and not segment_deferred:
             return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': 'No target email addresses specified. Please select recipients in the Campaign tab.'})}
         
         # Get CC and BCC lists FIRST to exclude them from regular contacts
@@ -7364,7 +8107,7 @@ def send_campaign(body, headers, event=None):
         
         print(f"Campaign targeting {len(contacts)} regular contacts + {len(cc_list)} CC + {len(bcc_list)} BCC + {len(to_list)} To = {total_recipients} total recipients ({filter_description})")
         
-        if not contacts and not cc_list and not bcc_list and not to_list:
+        if not contacts and not cc_list and not bcc_list and not to_list and not segment_deferred:
             error_msg = f'No recipients specified. Please add target contacts, or specify To/CC/BCC recipients.'
             return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': error_msg})}
         
@@ -7423,7 +8166,9 @@ def send_campaign(body, headers, event=None):
                 'queued_count': 0,
                 'sent_count': 0,
                 'failed_count': 0,
+                'counter_shards': COUNTER_SHARDS,
             'created_at': datetime.now().isoformat(),
+            'list_pk': CAMPAIGN_LIST_PARTITION,  # Puts the campaign in the time-ordered listing index
             'start_time': None,  # Will be set when first email starts sending
             'sent_at': None,  # Will be updated when emails are actually sent
             'completed_at': None,  # Will be set when campaign completes
@@ -7433,6 +8178,8 @@ def send_campaign(body, headers, event=None):
         # Add filter values if present (keep for tracking which contacts were targeted)
         if body.get('filter_values'):
             campaign_item['filter_values'] = body.get('filter_values', [])
+        if target_filters is not None:
+            campaign_item['target_filters'] = target_filters
         
         # Add attachments if present
         if attachments:
@@ -7455,74 +8202,87 @@ def send_campaign(body, headers, event=None):
             font_list = list(body.get('font_usage').keys())
             print(f"🎨 CAMPAIGN FONTS STORED: {font_list}")
         
+        # Queue emails for all recipients (TO, CC, BCC) - unified approach
+        recipients = collect_campaign_recipients(target_contact_emails, cc_list, bcc_list, to_list)
+        
+        # Long lists go to S3 manifests; the item keeps the pointer and counts
+        offload_recipient_lists(campaign_id, campaign_item)
+        
+        if ASYNC_CAMPAIGN_FANOUT:
+            # Progress of the enqueue phase, checkpointed by the fan-out stage
+            campaign_item['enqueue_status'] = 'pending'
+            campaign_item['enqueue_total'] = len(recipients)
+            campaign_item['enqueue_checkpoint'] = 0
+            campaign_item['enqueued_count'] = 0
+            campaign_item['enqueue_failed_count'] = 0
+            if segment_deferred:
+                # run_campaign_fanout adds the segment to target_contacts before enqueueing
+                campaign_item['segment_status'] = 'pending'
+        
         campaigns_table.put_item(Item=campaign_item)
         print(f"Campaign {campaign_id} saved to DynamoDB")
         
-        # Get SQS queue URL
+        if CAMPAIGN_SEARCH_TABLE:
+            try:
+                index_campaign_for_search(campaign_item)
+            except Exception as e:
+                # Search falls short for this campaign until it is re-indexed; sending is unaffected
+                print(f"⚠️ Could not index campaign {campaign_id} for search: {str(e)}")
+        
+        if ASYNC_CAMPAIGN_FANOUT:
+            try:
+                start_campaign_fanout(campaign_id)
+                return {
+                    'statusCode': 202,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'success': True,
+                        'campaign_id': campaign_id,
+                        'message': 'Campaign accepted; recipients are being queued',
+                        'filter_description': filter_description,
+                        'total_contacts': len(contacts),
+                        'enqueue_status': 'pending',
+                        'enqueue_total': len(recipients),
+                        'segment_status': campaign_item.get('segment_status', 'resolved'),
+                        'queued_count': 0,
+                        'failed_to_queue': 0,
+                        'queue_name': 'bulk-email-queue',
+                        'note': 'Poll GET /campaign/{campaign_id}?view=progress for enqueue progress'
+                    })
+                }
+            except Exception as e:
+                # Still send the campaign: run the same checkpointed fan-out inline
+                print(f"⚠️ Could not start async fan-out for {campaign_id}, enqueuing inline: {str(e)}")
+                progress = run_campaign_fanout(campaign_id, campaign=campaign_item)
+                return {
+                    'statusCode': 200,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'success': True,
+                        'campaign_id': campaign_id,
+                        'message': 'Campaign queued successfully',
+                        'filter_description': filter_description,
+                        'total_contacts': len(contacts),
+                        'enqueue_status': progress['enqueue_status'],
+                        'queued_count': progress['enqueued_count'],
+                        'failed_to_queue': progress['enqueue_failed_count'],
+                        'queue_name': 'bulk-email-queue',
+                        'note': 'Emails will be processed asynchronously from the SQS queue'
+                    })
+                }
+        
+        # Get SQS queue URL (cached per container)
         queue_name = 'bulk-email-queue'
         try:
-            queue_url_response = sqs_client.get_queue_url(QueueName=queue_name)
-            queue_url = queue_url_response['QueueUrl']
+            queue_url = get_queue_url(queue_name)
         except sqs_client.exceptions.QueueDoesNotExist:
             return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': f'SQS queue "{queue_name}" does not exist. Please create it first.'})}
-        queued_count = 0
-        failed_to_queue = 0
         
-        # Queue emails for all recipients (TO, CC, BCC) - unified approach
-        # Collect all unique recipients to avoid duplicates
-        all_recipients = set()
-
-        # Add database contacts
-        for contact in contacts:
-            if contact.get('email'):
-                all_recipients.add(contact.get('email').lower().strip())
-
-        # Add CC recipients
-        for cc_email in cc_list:
-            if cc_email:
-                all_recipients.add(cc_email.lower().strip())
-
-        # Add BCC recipients
-        for bcc_email in bcc_list:
-            if bcc_email:
-                all_recipients.add(bcc_email.lower().strip())
-
-        # Add explicit TO recipients
-        for to_email in to_list:
-            if to_email:
-                all_recipients.add(to_email.lower().strip())
-
-        # Queue each unique recipient
-        for recipient_email in all_recipients:
-            if not recipient_email or '@' not in recipient_email:
-                print(f"Skipping invalid email: {recipient_email}")
-                continue
+        messages = build_queue_messages(campaign_id, recipients, counter_shards=COUNTER_SHARDS)
 
-            try:
-                message_body = {
-                    'campaign_id': campaign_id,
-                    'contact_email': recipient_email
-                }
-
-                sqs_client.send_message(
-                    QueueUrl=queue_url,
-                    MessageBody=json.dumps(message_body),
-                    MessageAttributes={
-                        'campaign_id': {
-                            'StringValue': campaign_id,
-                            'DataType': 'String'
-                        },
-                        'contact_email': {
-                            'StringValue': recipient_email,
-                            'DataType': 'String'
-                        }
-                    }
-                )
-                queued_count += 1
-                print(f"Queued email for {recipient_email}")
-            except Exception as e:
-                print(f"Failed to queue email for {recipient_email}: {str(e)}")
-                failed_to_queue += 1
+        # Batched, parallel enqueue keeps large campaigns inside the API Gateway timeout
+        queued_count, failed_to_queue, queued_by_shard = enqueue_messages(queue_url, messages)
+        record_shard_queued_counts(campaign_id, queued_by_shard)
         
         # Update campaign status
         campaigns_table.update_item(
@@ -7593,14 +8353,41 @@ def personalize_content(content, contact):
     
     return content
 
+# Tuned pool shared by every SES client the registry builds
+ses_client_config = Config(
+    max_pool_connections=int(os.environ.get('SES_MAX_POOL_CONNECTIONS', '10')),
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+
+class SESClientRegistry:
+    """Shared SES clients, one per region, built once per container.
+
+    The API sends with its Lambda role (ses:SendEmail in template.yaml); the
+    aws_secret_name credentials are only used by the email worker.
+    """
+
+    def __init__(self):
+        self._clients = {}  # region -> SES client
+        self._lock = threading.Lock()
+
+    def get_client(self, region):
+        with self._lock:
+            client = self._clients.get(region)
+            if client is None:
+                client = boto3.client('ses', region_name=region, config=ses_client_config)
+                self._clients[region] = client
+        return client
+
+
+ses_client_registry = SESClientRegistry()
+
+
 def send_ses_email(config, contact, subject, body):
     """Send email via AWS SES"""
     try:
-        
-        ses_client = boto3.client(
-            'ses',
-            region_name=config.get('aws_region', 'us-gov-west-1')
-        )
+        # Shared client per region; sends use the Lambda role, not the aws_secret_name credentials
+        ses_client = ses_client_registry.get_client(config.get('aws_region', 'us-gov-west-1'))
         
         personalized_subject = personalize_content(subject, contact)
         personalized_body = personalize_content(body, contact)
@@ -7726,9 +8513,60 @@ def get_attachment_url(event, headers):
         }
 
 
-def get_campaign_status(campaign_id, headers):
-    """Get campaign status"""
+def read_sharded_counters(campaign_id, shard_count):
+    """Sum sent/failed counts across a campaign's counter shards (cached for a few seconds)"""
+    cached = counter_totals_cache.get(campaign_id)
+    if cached and time.time() - cached[0] < COUNTER_CACHE_TTL_SECONDS:
+        return dict(cached[1])
+
+    totals = sum_counter_shards(dynamodb, campaign_id, shard_count)
+    counter_totals_cache[campaign_id] = (time.time(), totals)
+    return dict(totals)
+
+
+def apply_sharded_counters(campaign):
+    """Overlay live shard totals on a campaign whose counts are sharded and still in flight"""
+    shard_count = int(campaign.get('counter_shards') or 0)
+    if shard_count <= 0 or campaign.get('status') == 'completed':
+        # Completed campaigns carry their final totals on the campaign item
+        return campaign
+    try:
+        campaign.update(read_sharded_counters(campaign['campaign_id'], shard_count))
+    except Exception as e:
+        print(f"Could not read counter shards for {campaign.get('campaign_id')}: {str(e)}")
+    return campaign
+
+
+CAMPAIGN_PROGRESS_ATTRIBUTES = [
+    'campaign_id', 'status', 'total_contacts', 'queued_count', 'sent_count', 'failed_count', 'counter_shards',
+    'enqueue_status', 'enqueue_total', 'enqueued_count', 'enqueue_failed_count', 'enqueue_checkpoint'
+]
+
+
+def campaign_summary_projection():
+    """ProjectionExpression kwargs that read only CAMPAIGN_SUMMARY_ATTRIBUTES"""
+    return {
+        'ProjectionExpression': ', '.join(f'#s{i}' for i in range(len(CAMPAIGN_SUMMARY_ATTRIBUTES))),
+        'ExpressionAttributeNames': {f'#s{i}': name for i, name in enumerate(CAMPAIGN_SUMMARY_ATTRIBUTES)}
+    }
+
+
+def get_campaign_status(campaign_id, headers, event=None):
+    """Get campaign status (?view=progress returns only counters, for polling)"""
     try:
+        qs = (event or {}).get('queryStringParameters') or {}
+        if qs.get('view') == 'progress':
+            response = campaigns_table.get_item(
+                Key={'campaign_id': campaign_id},
+                ProjectionExpression=', '.join(f'#a{i}' for i in range(len(CAMPAIGN_PROGRESS_ATTRIBUTES))),
+                ExpressionAttributeNames={f'#a{i}': name for i, name in enumerate(CAMPAIGN_PROGRESS_ATTRIBUTES)}
+            )
+            if 'Item' not in response:
+                return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'Campaign not found'})}
+            campaign = apply_sharded_counters(convert_decimals(response['Item']))
+            return {'statusCode': 200, 'headers': headers, 'body': json.dumps(campaign, default=_json_default)}
+        
+
         # Log view event for CloudWatch when this endpoint is hit (used by UI View button)
         print(f"👁️ CAMPAIGN VIEWED: campaign_id={campaign_id}")
         response = campaigns_table.get_item(Key={'campaign_id': campaign_id})
@@ -7736,13 +8574,149 @@ def get_campaign_status(campaign_id, headers):
             return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'Campaign not found'})}
         
         # Convert Decimal types recursively
-        campaign = convert_decimals(response['Item'])
+        campaign = apply_sharded_counters(convert_decimals(response['Item']))
         
         return {'statusCode': 200, 'headers': headers, 'body': json.dumps(campaign, default=_json_default)}
     except Exception as e:
         return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
 
 
+def encode_list_cursor(last_evaluated_key):
+    """Opaque pagination cursor for a Query LastEvaluatedKey"""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=_json_default).encode('utf-8')).decode('ascii')
+
+
+def decode_list_cursor(token, key_attribute='campaign_id'):
+    """ExclusiveStartKey for a cursor from encode_list_cursor (None for a missing or stale token)"""
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except Exception as tok_err:
+        print(f"Invalid campaigns cursor provided: {tok_err}")
+        return None
+    return key if isinstance(key, dict) and key_attribute in key else None
+
+
+def query_campaign_page(next_token, limit):
+    """One page of campaigns, newest first, from the listing index"""
+    query_kwargs = {
+        'IndexName': CAMPAIGN_LIST_INDEX,
+        'KeyConditionExpression': 'list_pk = :pk',
+        'ExpressionAttributeValues': {':pk': CAMPAIGN_LIST_PARTITION},
+        'ScanIndexForward': False,
+        'Limit': limit,
+        **campaign_summary_projection()
+    }
+    exclusive_start_key = decode_list_cursor(next_token)
+    if exclusive_start_key:
+        query_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    response = campaigns_table.query(**query_kwargs)
+    items = convert_decimals(response.get('Items', []))
+    next_token_out = encode_list_cursor(response.get('LastEvaluatedKey'))
+    print(f"Listed {len(items)} campaigns from {CAMPAIGN_LIST_INDEX}, has_more={next_token_out is not None}")
+    return items, next_token_out
+
+
+def tokenize_search_text(text):
+    """Lowercase alphanumeric tokens, unique, in order of appearance"""
+    return list(dict.fromkeys(re.findall(r'[a-z0-9]+', str(text or '').lower())))
+
+
+def index_campaign_for_search(campaign):
+    """Write the campaign's name/subject token prefixes to the search index"""
+    tokens = tokenize_search_text(f"{campaign.get('campaign_name') or ''} {campaign.get('subject') or ''}")
+    prefixes = dict.fromkeys(
+        token[:length] for token in tokens for length in range(1, min(len(token), SEARCH_PREFIX_MAX_LENGTH) + 1)
+    )
+    sort_key = f"{campaign['created_at']}#{campaign['campaign_id']}"
+    with search_tokens_table.batch_writer() as batch:
+        for prefix in prefixes:
+            batch.put_item(Item={
+                'token': prefix,
+                'sort_key': sort_key,
+                'campaign_id': campaign['campaign_id'],
+                'tokens': tokens  # Lets multi-term queries check the other terms without a read
+            })
+    print(f"🔎 Indexed campaign {campaign['campaign_id']} for search: {len(tokens)} tokens, {len(prefixes)} prefixes")
+
+
+def get_campaign_summaries(campaign_ids):
+    """Summary items for campaign_ids (BatchGetItem), in the given order"""
+    found = {}
+    for start in range(0, len(campaign_ids), 100):
+        request = {
+            campaigns_table.name: {
+                'Keys': [{'campaign_id': campaign_id} for campaign_id in campaign_ids[start:start + 100]],
+                **campaign_summary_projection()
+            }
+        }
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(campaigns_table.name, []):
+                found[item['campaign_id']] = item
+            request = response.get('UnprocessedKeys') or None
+    return [convert_decimals(found[campaign_id]) for campaign_id in campaign_ids if campaign_id in found]
+
+
+def search_campaign_page(search_query, next_token, limit):
+    """One page of campaigns whose name/subject has a token starting with every query term.
+
+    The longest term drives a newest-first Query on the token index; the other
+    terms are checked against each row's token list. The cursor is the key of
+    the last row examined, so the next page resumes right after it.
+    """
+    terms = tokenize_search_text(search_query)
+    # A term that prefixes another term is implied by it
+    terms = [term for term in terms if not any(other != term and other.startswith(term) for other in terms)]
+    if not terms:
+        return [], None
+    driving = max(terms, key=len)[:SEARCH_PREFIX_MAX_LENGTH]
+
+    start_key = decode_list_cursor(next_token, 'sort_key')
+    if start_key and start_key.get('token') != driving:
+        start_key = None  # cursor from a different search
+
+    campaign_ids = []
+    exhausted = False
+    queried_pages = 0
+    while len(campaign_ids) < limit:
+        query_kwargs = {
+            'KeyConditionExpression': '#token = :token',
+            'ExpressionAttributeNames': {'#token': 'token'},
+            'ExpressionAttributeValues': {':token': driving},
+            'ScanIndexForward': False,
+            'Limit': max(limit * 2, 100)
+        }
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+        response = search_tokens_table.query(**query_kwargs)
+        queried_pages += 1
+
+        rows = response.get('Items', [])
+        for position, row in enumerate(rows):
+            start_key = {'token': row['token'], 'sort_key': row['sort_key']}
+            row_tokens = row.get('tokens') or []
+            if all(any(token.startswith(term) for token in row_tokens) for term in terms):
+                campaign_ids.append(row['campaign_id'])
+                if len(campaign_ids) == limit:
+                    exhausted = position == len(rows) - 1 and 'LastEvaluatedKey' not in response
+                    break
+        else:
+            if 'LastEvaluatedKey' not in response:
+                exhausted = True
+                break
+            start_key = response['LastEvaluatedKey']
+
+    items = get_campaign_summaries(campaign_ids)
+    next_token_out = None if exhausted else encode_list_cursor(start_key)
+    print(f"Search '{search_query}' (terms={terms}) returned {len(items)} campaigns from {queried_pages} index page(s), has_more={next_token_out is not None}")
+    return items, next_token_out
+
+
 def get_campaigns(headers, event=None):
     """Get campaigns page from DynamoDB with server-side pagination (limit=50) and optional search (q)."""
     try:
@@ -7752,17 +8726,24 @@ def get_campaigns(headers, event=None):
         search_query = (qs.get('q') or qs.get('query') or '').strip()
         print(f"Fetching campaigns page (limit={limit}) next_token={next_token} q='{search_query}'")
 
-        scan_kwargs = {
-            'Limit': limit if not search_query else 100,  # when searching, fetch larger pages to find matches
-        }
-        if next_token:
+        listed = False
+        if not search_query and CAMPAIGN_LIST_INDEX:
             try:
-                scan_kwargs['ExclusiveStartKey'] = json.loads(next_token)
-            except Exception as tok_err:
-                print(f"Invalid next token provided: {tok_err}")
+                items, next_token_out = query_campaign_page(next_token, limit)
+                listed = True
+            except Exception as e:
+                # e.g. the index has not been created yet: fall back to the full scan below
+                print(f"⚠️ Listing index {CAMPAIGN_LIST_INDEX} unavailable, scanning campaigns: {str(e)}")
+        elif search_query and CAMPAIGN_SEARCH_TABLE:
+            try:
+                items, next_token_out = search_campaign_page(search_query, next_token, limit)
+                listed = True
+            except Exception as e:
+                # e.g. the search table has not been created yet: fall back to the scan search below
+                print(f"⚠️ Search index {CAMPAIGN_SEARCH_TABLE} unavailable, scanning campaigns: {str(e)}")
 
-        # If no search, scan all campaigns, sort by created_at, then paginate
-        if not search_query:
+        # If no search (and no listing index), scan all campaigns, sort by created_at, then paginate
+        if not search_query and not listed:
             # Scan all campaigns from DynamoDB (excluding preview)
             all_campaigns = []
             last_evaluated_key = None
@@ -7770,7 +8751,7 @@ def get_campaigns(headers, event=None):
             
             while True:
                 scanned_pages += 1
-                scan_params = {'Limit': 100}  # Scan in larger chunks
+                scan_params = {'Limit': 100, **campaign_summary_projection()}  # Scan in larger chunks
                 if last_evaluated_key:
                     scan_params['ExclusiveStartKey'] = last_evaluated_key
                     
@@ -7818,7 +8799,7 @@ def get_campaigns(headers, event=None):
                 next_token_out = json.dumps({'offset': end_idx})
             
             print(f"Returning campaigns {start_idx}-{end_idx} of {len(all_campaigns)} total, has_more={next_token_out is not None}")
-        else:
+        elif search_query and not listed:
             # Case-insensitive search across campaign_name and subject
             ql = search_query.lower()
             all_results = []
@@ -7828,7 +8809,7 @@ def get_campaigns(headers, event=None):
             # Scan all campaigns and filter
             while True:
                 scanned_pages += 1
-                scan_params = {'Limit': 100}  # Scan in larger chunks
+                scan_params = {'Limit': 100, **campaign_summary_projection()}  # Scan in larger chunks
                 if last_evaluated_key:
                     scan_params['ExclusiveStartKey'] = last_evaluated_key
                     
@@ -7872,6 +8853,9 @@ def get_campaigns(headers, event=None):
             
             print(f"Returning search results {start_idx}-{end_idx} of {len(all_results)} total")
 
+        # Only the returned page needs live totals from sharded counters
+        items = [apply_sharded_counters(it) for it in items]
+
         response_headers = {
             **headers,
             'Content-Type': 'application/json'
@@ -7939,7 +8923,8 @@ def get_aws_credentials_from_secrets_manager(secret_name):
         
         credentials = {
             'aws_access_key_id': secret_data.get('aws_access_key_id'),
-            'aws_secret_access_key': secret_data.get('aws_secret_access_key')
+            'aws_secret_access_key': secret_data.get('aws_secret_access_key'),
+            'aws_session_token': secret_data.get('aws_session_token')  # optional
         }
         
         if not credentials['aws_access_key_id'] or not credentials['aws_secret_access_key']:
@@ -0,0 +1,56 @@
+"""
+Sharded campaign progress counters
+Shared by the API Lambda, the email worker and the campaign monitor (the deploy
+scripts package this file next to each function's code)
+
+Campaigns created with counter_shards > 0 keep their sent/failed counts in
+<campaign_id>#shard-<k> items of the counters table instead of on the campaign
+item. The API assigns every queued message to a shard (counter_shard in the
+message body) and records how many recipients each shard was given in the
+shard's queued_count (a packed message carries several), so a worker only needs
+to sum the shards once the shard it just updated has caught up with its own
+queued_count.
+"""
+
+import os
+
+CAMPAIGN_COUNTERS_TABLE = os.environ.get('CAMPAIGN_COUNTERS_TABLE', 'EmailCampaignCounters')
+
+# Consecutive messages share a shard (one send_message_batch call each), so a
+# worker batch usually touches a single shard
+MESSAGES_PER_SHARD_BLOCK = 10
+
+
+def get_counter_shard_key(campaign_id, shard):
+    return f"{campaign_id}#shard-{shard}"
+
+
+def assign_counter_shard(message_index, shard_count):
+    """Shard for the message_index-th queued message of a campaign"""
+    return (message_index // MESSAGES_PER_SHARD_BLOCK) % shard_count
+
+
+def sum_counter_shards(dynamodb, campaign_id, shard_count):
+    """Sum sent/failed counts across all of a campaign's counter shards.
+
+    dynamodb is the caller's boto3 DynamoDB resource.
+    """
+    keys = [{'counter_id': get_counter_shard_key(campaign_id, shard)} for shard in range(shard_count)]
+    totals = {'sent_count': 0, 'failed_count': 0}
+
+    # BatchGetItem takes at most 100 keys per request
+    for start in range(0, len(keys), 100):
+        request = {
+            CAMPAIGN_COUNTERS_TABLE: {
+                'Keys': keys[start:start + 100],
+                'ProjectionExpression': 'sent_count, failed_count'
+            }
+        }
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(CAMPAIGN_COUNTERS_TABLE, []):
+                totals['sent_count'] += int(item.get('sent_count', 0))
+                totals['failed_count'] += int(item.get('failed_count', 0))
+            request = response.get('UnprocessedKeys') or None
+
+    return totals
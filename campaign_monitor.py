@@ -11,6 +11,8 @@ import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from campaign_counters import sum_counter_shards
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -20,6 +22,21 @@ dynamodb = boto3.resource('dynamodb', region_name='us-gov-west-1')
 campaigns_table = dynamodb.Table('EmailCampaigns')
 cloudwatch = boto3.client('cloudwatch', region_name='us-gov-west-1')
 
+
+def apply_sharded_counters(campaign):
+    """Overlay summed shard counts on an in-flight campaign that uses sharded counters"""
+    shard_count = int(campaign.get('counter_shards') or 0)
+    if shard_count <= 0 or campaign.get('status') == 'completed':
+        return campaign
+
+    campaign_id = campaign.get('campaign_id')
+    try:
+        campaign.update(sum_counter_shards(dynamodb, campaign_id, shard_count))
+    except Exception as e:
+        logger.warning(f"Could not read counter shards for {campaign_id}: {str(e)}")
+    return campaign
+
+
 def check_stuck_campaigns():
     """Check for campaigns that appear to be stuck or incomplete"""
     
@@ -43,6 +60,7 @@ def check_stuck_campaigns():
         current_time = datetime.now()
         
         for campaign in campaigns:
+            campaign = apply_sharded_counters(campaign)
             campaign_id = campaign.get('campaign_id')
             campaign_name = campaign.get('campaign_name', 'Unnamed Campaign')
             
@@ -223,6 +241,7 @@ def send_summary_metrics():
         total_emails_failed = 0
         
         for campaign in campaigns:
+            campaign = apply_sharded_counters(campaign)
             status = campaign.get('status', 'unknown')
             
             if status in ['processing', 'sending']:
@@ -0,0 +1,26 @@
+"""
+Campaign summary fields
+Shared by the API Lambda and the EmailCampaigns table scripts (the API deploy
+scripts package this file next to the function's code)
+
+GET /campaigns and the campaign history read only these attributes; body,
+recipient lists and attachments are only returned by GET /campaign/{campaign_id}.
+The CampaignsByCreatedAt listing index stores the same fields (INCLUDE
+projection), so its NonKeyAttributes are derived from this list. template.yaml
+cannot import it; test_campaign_list_projection.py keeps the template in sync.
+"""
+
+CAMPAIGN_SUMMARY_ATTRIBUTES = [
+    'campaign_id', 'campaign_name', 'subject', 'status', 'type', 'launched_by', 'filter_description',
+    'created_at', 'start_time', 'sent_at', 'completed_at',
+    'total_contacts', 'queued_count', 'sent_count', 'failed_count', 'counter_shards',
+    'target_contacts_count', 'to_count', 'cc_count', 'bcc_count',
+    'enqueue_status', 'enqueue_total', 'enqueued_count', 'enqueue_failed_count'
+]
+
+# Table and index keys are always projected, so they are not listed as NonKeyAttributes
+CAMPAIGN_LIST_INDEX_KEYS = ('campaign_id', 'list_pk', 'created_at')
+
+CAMPAIGN_LIST_INDEX_ATTRIBUTES = [
+    name for name in CAMPAIGN_SUMMARY_ATTRIBUTES if name not in CAMPAIGN_LIST_INDEX_KEYS
+]
@@ -0,0 +1,41 @@
+import boto3
+
+def create_campaign_counters_table():
+    """Create EmailCampaignCounters DynamoDB table used for sharded campaign progress counters"""
+
+    dynamodb = boto3.client('dynamodb', region_name='us-gov-west-1')
+
+    try:
+        # Check if table exists
+        try:
+            dynamodb.describe_table(TableName='EmailCampaignCounters')
+            print("EmailCampaignCounters table already exists!")
+        except dynamodb.exceptions.ResourceNotFoundException:
+            # Create table (one item per campaign shard: <campaign_id>#shard-<k>)
+            dynamodb.create_table(
+                TableName='EmailCampaignCounters',
+                KeySchema=[
+                    {'AttributeName': 'counter_id', 'KeyType': 'HASH'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'counter_id', 'AttributeType': 'S'}
+                ],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            print("EmailCampaignCounters table created successfully!")
+
+            # Wait for table to be active
+            print("Waiting for table to be active...")
+            waiter = dynamodb.get_waiter('table_exists')
+            waiter.wait(TableName='EmailCampaignCounters')
+
+        print("\nEnable sharded counters for new campaigns on the API Lambda with:")
+        print("  COUNTER_SHARDS=16")
+        print("  CAMPAIGN_COUNTERS_TABLE=EmailCampaignCounters")
+        print("(set CAMPAIGN_COUNTERS_TABLE on the worker and monitor too if you change the name)")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    create_campaign_counters_table()
@@ -0,0 +1,89 @@
+import re
+import boto3
+
+PREFIX_MAX_LENGTH = 20  # SEARCH_PREFIX_MAX_LENGTH on the API Lambda
+
+
+def tokenize(text):
+    """Same tokens as tokenize_search_text in the API Lambda"""
+    return list(dict.fromkeys(re.findall(r'[a-z0-9]+', str(text or '').lower())))
+
+
+def create_campaign_search_table():
+    """Create EmailCampaignSearchTokens DynamoDB table used for campaign search"""
+
+    dynamodb = boto3.client('dynamodb', region_name='us-gov-west-1')
+
+    try:
+        # Check if table exists
+        try:
+            dynamodb.describe_table(TableName='EmailCampaignSearchTokens')
+            print("EmailCampaignSearchTokens table already exists!")
+        except dynamodb.exceptions.ResourceNotFoundException:
+            # One item per (token prefix, campaign): token -> '<created_at>#<campaign_id>'
+            dynamodb.create_table(
+                TableName='EmailCampaignSearchTokens',
+                KeySchema=[
+                    {'AttributeName': 'token', 'KeyType': 'HASH'},
+                    {'AttributeName': 'sort_key', 'KeyType': 'RANGE'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'token', 'AttributeType': 'S'},
+                    {'AttributeName': 'sort_key', 'AttributeType': 'S'}
+                ],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            print("EmailCampaignSearchTokens table created successfully!")
+
+            # Wait for table to be active
+            print("Waiting for table to be active...")
+            waiter = dynamodb.get_waiter('table_exists')
+            waiter.wait(TableName='EmailCampaignSearchTokens')
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def index_existing_campaigns():
+    """Add every non-preview campaign in EmailCampaigns to the search table"""
+
+    dynamodb = boto3.resource('dynamodb', region_name='us-gov-west-1')
+    campaigns = dynamodb.Table('EmailCampaigns')
+    search_tokens = dynamodb.Table('EmailCampaignSearchTokens')
+
+    indexed = 0
+    scan_kwargs = {
+        'ProjectionExpression': 'campaign_id, campaign_name, subject, created_at, sent_at, #status, #type',
+        'ExpressionAttributeNames': {'#status': 'status', '#type': 'type'}
+    }
+    with search_tokens.batch_writer() as batch:
+        while True:
+            response = campaigns.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                if item.get('status') == 'preview' or item.get('type') == 'preview':
+                    continue
+                tokens = tokenize(f"{item.get('campaign_name') or ''} {item.get('subject') or ''}")
+                prefixes = dict.fromkeys(
+                    token[:length] for token in tokens for length in range(1, min(len(token), PREFIX_MAX_LENGTH) + 1)
+                )
+                created_at = item.get('created_at') or item.get('sent_at') or ''
+                for prefix in prefixes:
+                    batch.put_item(Item={
+                        'token': prefix,
+                        'sort_key': f"{created_at}#{item['campaign_id']}",
+                        'campaign_id': item['campaign_id'],
+                        'tokens': tokens
+                    })
+                indexed += 1
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f"Indexed {indexed} campaigns for search")
+    print("\nThe API Lambda uses the table through CAMPAIGN_SEARCH_TABLE=EmailCampaignSearchTokens")
+
+
+if __name__ == "__main__":
+    create_campaign_search_table()
+    index_existing_campaigns()
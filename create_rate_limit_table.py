@@ -0,0 +1,42 @@
+import boto3
+
+def create_rate_limit_table():
+    """Create EmailRateLimits DynamoDB table used by the worker's fleet-wide token bucket"""
+
+    dynamodb = boto3.client('dynamodb', region_name='us-gov-west-1')
+
+    try:
+        # Check if table exists
+        try:
+            dynamodb.describe_table(TableName='EmailRateLimits')
+            print("EmailRateLimits table already exists!")
+        except dynamodb.exceptions.ResourceNotFoundException:
+            # Create table (one item per SES region/identity bucket)
+            dynamodb.create_table(
+                TableName='EmailRateLimits',
+                KeySchema=[
+                    {'AttributeName': 'bucket_id', 'KeyType': 'HASH'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'bucket_id', 'AttributeType': 'S'}
+                ],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            print("EmailRateLimits table created successfully!")
+
+            # Wait for table to be active
+            print("Waiting for table to be active...")
+            waiter = dynamodb.get_waiter('table_exists')
+            waiter.wait(TableName='EmailRateLimits')
+
+        print("\nEnable it on the worker with these environment variables:")
+        print("  RATE_LIMIT_BACKEND=dynamodb")
+        print("  RATE_LIMIT_TABLE=EmailRateLimits")
+        print("  SES_MAX_SEND_RATE=<account MaxSendRate>")
+        print('  SES_RATE_LIMITS={"us-gov-west-1#sender@domain.com": 5}  (optional per-identity rates)')
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    create_rate_limit_table()
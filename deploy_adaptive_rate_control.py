@@ -16,7 +16,8 @@ def create_lambda_package():
     
     # Files to include in the package
     files_to_include = [
-        'email_worker_lambda.py'
+        'email_worker_lambda.py',
+        'campaign_counters.py'
     ]
     
     # Create zip file
@@ -64,6 +64,8 @@ def deploy_bulk_email_api():
     
     with zipfile.ZipFile('bulk_email_api_lambda.zip', 'w') as zip_file:
         zip_file.write('bulk_email_api_lambda.py', 'lambda_function.py')
+        zip_file.write('campaign_counters.py', 'campaign_counters.py')
+        zip_file.write('campaign_summary.py', 'campaign_summary.py')
     
     with open('bulk_email_api_lambda.zip', 'rb') as zip_file:
         try:
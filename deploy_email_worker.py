@@ -126,6 +126,7 @@ def deploy_email_worker_lambda():
     
     with zipfile.ZipFile('email_worker_lambda.zip', 'w') as zip_file:
         zip_file.write('email_worker_lambda.py', 'lambda_function.py')
+        zip_file.write('campaign_counters.py', 'campaign_counters.py')
     print(f"✓ Package created")
     
     # Create or update Lambda function
@@ -165,17 +166,33 @@ def deploy_email_worker_lambda():
         print(f"\n⚙️  Configuring SQS trigger...")
         
         # Create event source mapping (SQS trigger)
+        # ReportBatchItemFailures lets the worker return only the failed/deferred
+        # message IDs, so messages already sent are never redelivered
         try:
             lambda_client.create_event_source_mapping(
                 EventSourceArn=queue_arn,
                 FunctionName=function_name,
                 BatchSize=10,  # Process up to 10 messages at once
                 MaximumBatchingWindowInSeconds=5,  # Wait up to 5 seconds to batch messages
+                FunctionResponseTypes=['ReportBatchItemFailures'],
                 Enabled=True
             )
             print(f"✓ Created SQS trigger for Lambda function")
         except lambda_client.exceptions.ResourceConflictException:
             print(f"✓ SQS trigger already exists")
+            
+            # Make sure the existing trigger reports partial batch failures
+            mappings = lambda_client.list_event_source_mappings(
+                EventSourceArn=queue_arn,
+                FunctionName=function_name
+            )['EventSourceMappings']
+            for mapping in mappings:
+                if 'ReportBatchItemFailures' not in mapping.get('FunctionResponseTypes', []):
+                    lambda_client.update_event_source_mapping(
+                        UUID=mapping['UUID'],
+                        FunctionResponseTypes=['ReportBatchItemFailures']
+                    )
+                    print(f"✓ Enabled ReportBatchItemFailures on SQS trigger {mapping['UUID']}")
         
     except sqs_client.exceptions.QueueDoesNotExist:
         print(f"⚠️  Warning: SQS queue 'bulk-email-queue' not found")
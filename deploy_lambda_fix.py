@@ -28,6 +28,8 @@ def create_deployment_package():
     with zipfile.ZipFile(ZIP_FILE, 'w', zipfile.ZIP_DEFLATED) as zipf:
         zipf.write(LAMBDA_FILE, 'lambda_function.py')
         print(f"  ✅ Added {LAMBDA_FILE} as lambda_function.py")
+        zipf.write('campaign_counters.py', 'campaign_counters.py')
+        zipf.write('campaign_summary.py', 'campaign_summary.py')
     
     file_size = os.path.getsize(ZIP_FILE)
     print(f"  ✅ Created {ZIP_FILE} ({file_size:,} bytes)")
@@ -37,7 +37,7 @@ def update_email_worker_lambda():
     # Create package
     zip_filename = create_lambda_package(
         'email_worker_with_monitoring',
-        ['email_worker_lambda.py']
+        ['email_worker_lambda.py', 'campaign_counters.py']
     )
     
     lambda_client = boto3.client('lambda', region_name='us-gov-west-1')
@@ -116,7 +116,7 @@ def deploy_campaign_monitor_lambda():
     # Create package
     zip_filename = create_lambda_package(
         'campaign_monitor',
-        ['campaign_monitor.py']
+        ['campaign_monitor.py', 'campaign_counters.py']
     )
     
     lambda_client = boto3.client('lambda', region_name='us-gov-west-1')
@@ -112,7 +112,7 @@ def update_email_worker_lambda_safe():
         # Create package
         zip_filename = create_lambda_package(
             'email_worker_with_monitoring',
-            ['email_worker_lambda.py']
+            ['email_worker_lambda.py', 'campaign_counters.py']
         )
         
         try:
@@ -1,5 +1,7 @@
 import boto3
 
+from campaign_summary import CAMPAIGN_LIST_INDEX_ATTRIBUTES
+
 def create_campaigns_table():
     """Create DynamoDB table for email campaigns tracking"""
     
@@ -31,6 +33,25 @@ def create_campaigns_table():
                 {
                     'AttributeName': 'campaign_id',
                     'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'list_pk',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'created_at',
+                    'AttributeType': 'S'
+                }
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    # Time-ordered campaign listing used by GET /campaigns
+                    'IndexName': 'CampaignsByCreatedAt',
+                    'KeySchema': [
+                        {'AttributeName': 'list_pk', 'KeyType': 'HASH'},
+                        {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': CAMPAIGN_LIST_INDEX_ATTRIBUTES}
                 }
             ],
             BillingMode='PAY_PER_REQUEST'
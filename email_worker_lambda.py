@@ -5,40 +5,138 @@ Retrieves campaign data and contact data from DynamoDB
 Sends emails via AWS SES with adaptive rate control
 """
 
+import gzip
+import hashlib
 import json
 import logging
+import math
+import mmap
 import os
+import random
+import re
+import smtplib
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from decimal import Decimal
 
 import boto3
 from boto3.dynamodb.conditions import Key
 from botocore.config import Config
-from botocore.exceptions import ClientError
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+)
+
+from campaign_counters import (
+    CAMPAIGN_COUNTERS_TABLE,
+    get_counter_shard_key,
+    sum_counter_shards,
+)
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)  # Verbose logging enabled
 
+# Concurrent sends per invocation (1 = process records sequentially)
+SEND_CONCURRENCY = int(os.environ.get("SEND_CONCURRENCY", "1"))
+
+# Connection pool sized for the send and contact lookup thread pools
+boto_config = Config(
+    max_pool_connections=max(
+        10,
+        SEND_CONCURRENCY + int(os.environ.get("CONTACT_LOOKUP_WORKERS", "8")),
+    ),
+    retries={"max_attempts": 3, "mode": "standard"},
+)
+
 # Initialize clients
-dynamodb = boto3.resource("dynamodb", region_name="us-gov-west-1")
+dynamodb = boto3.resource("dynamodb", region_name="us-gov-west-1", config=boto_config)
 campaigns_table = dynamodb.Table("EmailCampaigns")
 contacts_table = dynamodb.Table("EmailContacts")
+
+# Counter ADDs are not idempotent, so they go through a resource without
+# botocore retries (a retried timeout could apply the same counts twice)
+counter_dynamodb = boto3.resource(
+    "dynamodb",
+    region_name="us-gov-west-1",
+    config=boto_config.merge(Config(retries={"total_max_attempts": 1, "mode": "standard"})),
+)
+campaign_counts_table = counter_dynamodb.Table("EmailCampaigns")
+
+# Sharded progress counters (campaign_id#shard-k items) for campaigns created with counter_shards > 0
+counters_table = counter_dynamodb.Table(CAMPAIGN_COUNTERS_TABLE)
 secrets_client = boto3.client("secretsmanager", region_name="us-gov-west-1")
 
 # S3 client with Signature Version 4 (required for KMS-encrypted buckets)
-s3_config = Config(signature_version="s3v4", region_name="us-gov-west-1")
+s3_config = Config(signature_version="s3v4", region_name="us-gov-west-1").merge(
+    boto_config
+)
 s3_client = boto3.client("s3", region_name="us-gov-west-1", config=s3_config)
 
-cloudwatch = boto3.client("cloudwatch", region_name="us-gov-west-1")
+cloudwatch = boto3.client("cloudwatch", region_name="us-gov-west-1", config=boto_config)
+sqs_client = boto3.client("sqs", region_name="us-gov-west-1", config=boto_config)
 
 # S3 bucket for attachments
 ATTACHMENTS_BUCKET = "jcdc-ses-contact-list"
 
+# Parallel email-index queries used to resolve a batch's contacts up front
+CONTACT_LOOKUP_WORKERS = int(os.environ.get("CONTACT_LOOKUP_WORKERS", "8"))
+
+# Hand paced/throttled messages back to SQS instead of sleeping in Lambda.
+# Requires ReportBatchItemFailures on the SQS event source mapping.
+DEFER_WITH_SQS_VISIBILITY = (
+    os.environ.get("DEFER_WITH_SQS_VISIBILITY", "false").lower() == "true"
+)
+DEFER_THRESHOLD_SECONDS = float(
+    os.environ.get("DEFER_THRESHOLD_SECONDS", "1.0")
+)  # Pacing delays above this are deferred rather than slept
+DEFER_BASE_BACKOFF_SECONDS = int(os.environ.get("DEFER_BASE_BACKOFF_SECONDS", "30"))
+DEFER_MAX_BACKOFF_SECONDS = int(
+    os.environ.get("DEFER_MAX_BACKOFF_SECONDS", "900")
+)  # SQS DelaySeconds maximum
+RETRYABLE_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ServiceUnavailable",
+    "InternalFailure",
+    "InternalServerError",
+    "RequestTimeout",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+}
+COUNTER_UPDATE_MAX_ATTEMPTS = int(
+    os.environ.get("COUNTER_UPDATE_MAX_ATTEMPTS", "4")
+)  # Campaign counter writes retried with backoff before the counts are reported as unflushed
+COUNTER_WRITE_REJECTED_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+}  # DynamoDB rejected the request, so the counter update was not applied
+DEFER_MAX_RECEIVE_COUNT = int(
+    os.environ.get("DEFER_MAX_RECEIVE_COUNT", "2")
+)  # Keep below the queue's maxReceiveCount so deferrals never reach the DLQ
+DEFER_MAX_DEFERRALS = int(
+    os.environ.get("DEFER_MAX_DEFERRALS", "10")
+)  # Re-sent copies restart ApproximateReceiveCount; past this many the message counts as failed
+TIME_BUDGET_MARGIN_MS = int(
+    os.environ.get("TIME_BUDGET_MARGIN_MS", "30000")
+)  # No new records are started this close to the Lambda timeout (counter flush, re-enqueues, metrics)
+SECONDS_PER_RECIPIENT_ESTIMATE = float(
+    os.environ.get("SECONDS_PER_RECIPIENT_ESTIMATE", "0.2")
+)  # Caps the recipients an invocation takes on to what fits in its remaining time
+
 
 # Adaptive Rate Control Configuration
 class AdaptiveRateControl:
+    paces_attachments = True  # Delay grows with attachment size
+
     def __init__(self):
         # Base rate control settings
         self.base_delay = float(
@@ -72,6 +170,7 @@ class AdaptiveRateControl:
         self.recent_throttles = []  # Track recent throttle events
         self.last_throttle_time = None
         self.consecutive_throttles = 0
+        self._lock = threading.RLock()  # Shared by concurrent send threads
 
         logger.info(f"Adaptive Rate Control initialized:")
         logger.info(f"  Base delay: {self.base_delay}s")
@@ -151,56 +250,58 @@ class AdaptiveRateControl:
 
     def handle_throttle_detected(self):
         """Handle throttle detection by adjusting rate"""
-        current_time = time.time()
-        self.recent_throttles.append(current_time)
-        self.last_throttle_time = current_time
-        self.consecutive_throttles += 1
-
-        # Clean old throttle events
-        cutoff_time = current_time - self.throttle_detection_window
-        self.recent_throttles = [t for t in self.recent_throttles if t > cutoff_time]
-
-        # Apply backoff
-        if self.consecutive_throttles <= self.max_throttle_backoffs:
-            self.current_delay = min(
-                self.current_delay * self.throttle_backoff_factor, self.max_delay
-            )
-            logger.warning(
-                f"Throttle detected! Increasing delay to {self.current_delay:.3f}s (backoff #{self.consecutive_throttles})"
-            )
-        else:
-            logger.error(
-                f"Maximum throttle backoffs ({self.max_throttle_backoffs}) reached. Keeping delay at {self.current_delay:.3f}s"
-            )
+        with self._lock:
+            current_time = time.time()
+            self.recent_throttles.append(current_time)
+            self.last_throttle_time = current_time
+            self.consecutive_throttles += 1
+
+            # Clean old throttle events
+            cutoff_time = current_time - self.throttle_detection_window
+            self.recent_throttles = [t for t in self.recent_throttles if t > cutoff_time]
+
+            # Apply backoff
+            if self.consecutive_throttles <= self.max_throttle_backoffs:
+                self.current_delay = min(
+                    self.current_delay * self.throttle_backoff_factor, self.max_delay
+                )
+                logger.warning(
+                    f"Throttle detected! Increasing delay to {self.current_delay:.3f}s (backoff #{self.consecutive_throttles})"
+                )
+            else:
+                logger.error(
+                    f"Maximum throttle backoffs ({self.max_throttle_backoffs}) reached. Keeping delay at {self.current_delay:.3f}s"
+                )
 
-        return self.current_delay
+            return self.current_delay
 
     def recover_from_throttle(self):
         """Gradually recover from throttle by reducing delay"""
-        current_time = time.time()
+        with self._lock:
+            current_time = time.time()
 
-        # Only start recovery if enough time has passed since last throttle
-        if (
-            self.last_throttle_time
-            and current_time - self.last_throttle_time > self.throttle_recovery_time
-            and self.current_delay > self.base_delay
-        ):
-
-            # Gradually reduce delay
-            recovery_factor = 0.9  # Reduce delay by 10%
-            self.current_delay = max(
-                self.current_delay * recovery_factor, self.base_delay
-            )
+            # Only start recovery if enough time has passed since last throttle
+            if (
+                self.last_throttle_time
+                and current_time - self.last_throttle_time > self.throttle_recovery_time
+                and self.current_delay > self.base_delay
+            ):
 
-            if self.current_delay <= self.base_delay:
-                self.consecutive_throttles = 0
-                logger.info("Recovered from throttle - back to base delay")
-            else:
-                logger.info(
-                    f"Recovering from throttle - reducing delay to {self.current_delay:.3f}s"
+                # Gradually reduce delay
+                recovery_factor = 0.9  # Reduce delay by 10%
+                self.current_delay = max(
+                    self.current_delay * recovery_factor, self.base_delay
                 )
 
-        return self.current_delay
+                if self.current_delay <= self.base_delay:
+                    self.consecutive_throttles = 0
+                    logger.info("Recovered from throttle - back to base delay")
+                else:
+                    logger.info(
+                        f"Recovering from throttle - reducing delay to {self.current_delay:.3f}s"
+                    )
+
+            return self.current_delay
 
     def get_delay_for_email(self, attachments, exception=None):
         """Get the appropriate delay for the next email"""
@@ -222,9 +323,524 @@ class AdaptiveRateControl:
 
         return final_delay
 
+    def record_success(self, send_duration=0.0):
+        """Legacy controller only reacts to throttles - successes are not tracked"""
+        return self.current_delay
+
+    def stats(self):
+        """Controller state for results["rate_control_stats"]"""
+        return {"mode": "adaptive", "current_delay": round(self.current_delay, 4)}
+
+
+class AIMDPacingEngine(AdaptiveRateControl):
+    """Additive-increase / multiplicative-decrease send pacing.
+
+    Drop-in replacement for AdaptiveRateControl. Instead of sleeping a fixed
+    base_delay * factor before every send, it hands out send slots spaced at
+    1/rate seconds from the previous slot, so the time the previous send
+    took counts towards the gap. The rate starts from the account's SES
+    MaxSendRate (GetSendQuota), grows by PACING_INCREASE_PER_SUCCESS on
+    every success and is multiplied by PACING_DECREASE_FACTOR on a throttle.
+    """
+
+    paces_attachments = False
+
+    def __init__(self):
+        super().__init__()
+        self.ses_region = os.environ.get("SES_REGION", "us-gov-west-1")
+        self.fleet_size = max(1, int(os.environ.get("PACING_FLEET_SIZE", "1")))
+        self.start_fraction = float(os.environ.get("PACING_START_FRACTION", "0.5"))
+        self.increase_per_success = float(
+            os.environ.get("PACING_INCREASE_PER_SUCCESS", "0.2")
+        )  # emails/second added per successful send
+        self.decrease_factor = float(
+            os.environ.get("PACING_DECREASE_FACTOR", "0.5")
+        )  # multiplier applied on throttle
+        self.min_rate = float(os.environ.get("PACING_MIN_RATE", "0.2"))
+        self.max_rate = float(
+            os.environ.get("PACING_MAX_RATE", "14")
+        )  # replaced by GetSendQuota when available
+
+        self.current_rate = max(self.min_rate, self.max_rate * self.start_fraction)
+        self.seeded = False
+        self.next_slot_time = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.last_send_duration = 0.0
+
+    def seed_from_send_quota(self):
+        """Read MaxSendRate once per container and derive this container's share"""
+        if self.seeded:
+            return
+        self.seeded = True
+        try:
+            with client_creation_lock:
+                ses = boto3.client("ses", region_name=self.ses_region, config=boto_config)
+            quota = ses.get_send_quota()
+            max_send_rate = float(quota.get("MaxSendRate", self.max_rate))
+            with self._lock:
+                self.max_rate = max(self.min_rate, max_send_rate / self.fleet_size)
+                self.current_rate = max(
+                    self.min_rate, self.max_rate * self.start_fraction
+                )
+            logger.info(
+                f"AIMD pacing seeded from GetSendQuota: MaxSendRate={max_send_rate}/s, container max={self.max_rate:.2f}/s, start={self.current_rate:.2f}/s"
+            )
+        except Exception as e:
+            logger.warning(
+                f"Could not read SES send quota, using PACING_MAX_RATE={self.max_rate}: {str(e)}"
+            )
+
+    @property
+    def current_delay(self):
+        return 1.0 / self.current_rate if self.current_rate else self.max_delay
+
+    @current_delay.setter
+    def current_delay(self, value):
+        # Base class __init__ assigns current_delay; the rate is the source of truth here
+        pass
+
+    def detect_throttle_exception(self, exception):
+        """Detect SES throttling by error code first, then fall back to message heuristics"""
+        if isinstance(exception, ClientError):
+            error = exception.response.get("Error", {})
+            if error.get("Code") in [
+                "Throttling",
+                "ThrottlingException",
+                "TooManyRequestsException",
+                "MaxSendRateExceeded",
+                "ServiceUnavailable",
+                "SlowDown",
+            ]:
+                return True
+            if "maximum sending rate" in str(error.get("Message", "")).lower():
+                return True
+        return super().detect_throttle_exception(exception)
+
+    def handle_throttle_detected(self):
+        """Multiplicative decrease; the next slot is pushed out by the new interval"""
+        with self._lock:
+            self.current_rate = max(self.min_rate, self.current_rate * self.decrease_factor)
+            self.decreases += 1
+            self.consecutive_throttles += 1
+            self.last_throttle_time = time.time()
+            self.next_slot_time = max(self.next_slot_time, time.time()) + self.current_delay
+            logger.warning(
+                f"Throttle detected! AIMD rate decreased to {self.current_rate:.2f}/s (decrease #{self.decreases})"
+            )
+            return min(self.current_delay, self.max_delay)
+
+    def recover_from_throttle(self):
+        """Recovery is additive and driven by record_success"""
+        return self.current_delay
+
+    def record_success(self, send_duration=0.0):
+        """Additive increase after a successful send"""
+        with self._lock:
+            self.current_rate = min(
+                self.max_rate, self.current_rate + self.increase_per_success
+            )
+            self.increases += 1
+            self.consecutive_throttles = 0
+            self.last_send_duration = send_duration
+            return self.current_delay
+
+    def get_delay_for_email(self, attachments, exception=None):
+        """Reserve the next send slot and return how long to wait for it"""
+        if exception and self.detect_throttle_exception(exception):
+            return self.handle_throttle_detected()
+
+        self.seed_from_send_quota()
+
+        with self._lock:
+            now = time.time()
+            slot = max(now, self.next_slot_time)
+            self.next_slot_time = slot + self.current_delay
+            return min(slot - now, self.max_delay)
+
+    def stats(self):
+        """Controller state for results["rate_control_stats"]"""
+        with self._lock:
+            return {
+                "mode": "aimd",
+                "current_rate": round(self.current_rate, 3),
+                "max_rate": round(self.max_rate, 3),
+                "current_delay": round(self.current_delay, 4),
+                "rate_increases": self.increases,
+                "rate_decreases": self.decreases,
+                "last_send_duration": round(self.last_send_duration, 3),
+            }
+
+
+def create_rate_control():
+    """Pick the pacing engine (RATE_CONTROL_MODE=aimd|adaptive)"""
+    if os.environ.get("RATE_CONTROL_MODE", "aimd").lower() == "adaptive":
+        return AdaptiveRateControl()
+    return AIMDPacingEngine()
+
 
 # Global rate control instance
-rate_control = AdaptiveRateControl()
+rate_control = create_rate_control()
+
+# Guards the per-invocation results dict when records are sent concurrently
+results_lock = threading.Lock()
+client_creation_lock = threading.Lock()
+
+
+def hydrate_header_recipients(campaign):
+    """Copy of the campaign with the To/CC/BCC lists the API offloaded to S3 recipient manifests loaded.
+
+    Every message renders these lists (headers, CC footer), so they are read once
+    per cached campaign. target_contacts stays in S3: the worker never needs it.
+    The item passed in is left untouched.
+    """
+    campaign = dict(campaign)
+    manifest = campaign.get("recipient_manifest") or {}
+    for list_name, entry in (manifest.get("lists") or {}).items():
+        if list_name not in ("to", "cc", "bcc") or list_name in campaign:
+            continue
+        emails = []
+        for key in entry.get("chunks", []):
+            body = s3_client.get_object(Bucket=manifest["bucket"], Key=key)["Body"]
+            with gzip.GzipFile(fileobj=body) as stream:
+                emails.extend(
+                    line.decode("utf-8").strip() for line in stream if line.strip()
+                )
+        campaign[list_name] = emails
+        logger.info(
+            f"Loaded {len(emails)} {list_name} recipients for campaign {campaign.get('campaign_id')} from manifest"
+        )
+    return campaign
+
+
+# Warm-container campaign cache
+class CampaignCache:
+    """LRU + TTL cache of EmailCampaigns items that survives warm invocations.
+
+    Campaign items are large (body, target_contacts, attachments) but do not
+    change while a campaign is sending, so every SQS record for the same
+    campaign can share one read. The status is re-checked with a small
+    projection read so pause/cancel style changes drop the cached copy.
+    """
+
+    def __init__(self):
+        self.ttl_seconds = float(
+            os.environ.get("CAMPAIGN_CACHE_TTL_SECONDS", "300")
+        )  # Max age of a cached campaign item
+        self.max_entries = int(
+            os.environ.get("CAMPAIGN_CACHE_MAX_ENTRIES", "32")
+        )  # LRU bound
+        self.status_check_seconds = float(
+            os.environ.get("CAMPAIGN_STATUS_CHECK_SECONDS", "15")
+        )  # How often to re-read only the status attribute
+
+        self._entries = OrderedDict()  # campaign_id -> entry dict
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        logger.info(
+            f"Campaign cache initialized: ttl={self.ttl_seconds}s, max_entries={self.max_entries}, status_check={self.status_check_seconds}s"
+        )
+
+    def get(self, campaign_id):
+        """Return the campaign item (Decimals converted) or None if it does not exist"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(campaign_id)
+            if entry and now - entry["loaded_at"] > self.ttl_seconds:
+                del self._entries[campaign_id]
+                entry = None
+
+        if entry and now - entry["status_checked_at"] > self.status_check_seconds:
+            # Cheap revalidation: only fetch the status attribute
+            try:
+                response = campaigns_table.get_item(
+                    Key={"campaign_id": campaign_id},
+                    ProjectionExpression="#status",
+                    ExpressionAttributeNames={"#status": "status"},
+                )
+                current_status = response.get("Item", {}).get("status")
+                if "Item" not in response or current_status != entry["status"]:
+                    logger.info(
+                        f"Campaign {campaign_id} status changed ({entry['status']} -> {current_status}) - invalidating cache"
+                    )
+                    self.invalidate(campaign_id)
+                    entry = None
+                else:
+                    entry["status_checked_at"] = now
+            except Exception as e:
+                logger.warning(
+                    f"Could not revalidate cached campaign {campaign_id}: {str(e)}"
+                )
+
+        if entry:
+            with self._lock:
+                if campaign_id in self._entries:
+                    self._entries.move_to_end(campaign_id)
+                self.hits += 1
+            return entry["item"]
+
+        with self._lock:
+            self.misses += 1
+
+        response = campaigns_table.get_item(Key={"campaign_id": campaign_id})
+        if "Item" not in response:
+            return None
+
+        campaign = response["Item"]
+
+        # Convert Decimal types to appropriate Python types
+        for key, value in campaign.items():
+            if isinstance(value, Decimal):
+                campaign[key] = int(value) if value % 1 == 0 else float(value)
+
+        campaign = hydrate_header_recipients(campaign)
+
+        self.put(campaign_id, campaign)
+        return campaign
+
+    def put(self, campaign_id, campaign):
+        """Store a campaign item, evicting the least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._entries[campaign_id] = {
+                "item": campaign,
+                "status": campaign.get("status"),
+                "loaded_at": now,
+                "status_checked_at": now,
+            }
+            self._entries.move_to_end(campaign_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, campaign_id=None):
+        """Drop one campaign (or everything when campaign_id is None)"""
+        with self._lock:
+            if campaign_id is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(campaign_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        """Return hit/miss counters for logging and metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups * 100) if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+# Global campaign cache instance (persists across warm invocations)
+campaign_cache = CampaignCache()
+
+
+# Cluster-wide token bucket (shared by every worker container)
+class InMemoryTokenBucketBackend:
+    """Token bucket state held in process memory (tests and single-container runs)"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take_tokens(self, bucket_id, requested, rate, burst):
+        """Refill the bucket for elapsed time and take up to `requested` whole tokens"""
+        now = time.time()
+        with self._lock:
+            state = self._buckets.get(bucket_id, {"tokens": burst, "last_refill": now})
+            tokens = min(burst, state["tokens"] + (now - state["last_refill"]) * rate)
+            granted = min(requested, int(tokens))
+            self._buckets[bucket_id] = {"tokens": tokens - granted, "last_refill": now}
+            return granted
+
+
+class DynamoDBTokenBucketBackend:
+    """Token bucket state stored in one DynamoDB item per bucket.
+
+    Refill and take happen in a single conditional update keyed on the
+    previous refill timestamp, so concurrent workers never double-spend.
+    """
+
+    def __init__(self, table_name):
+        self.table = dynamodb.Table(table_name)
+        self.max_attempts = 5
+
+    def take_tokens(self, bucket_id, requested, rate, burst):
+        """Refill the bucket for elapsed time and take up to `requested` whole tokens"""
+        for _ in range(self.max_attempts):
+            now = time.time()
+            item = self.table.get_item(
+                Key={"bucket_id": bucket_id}, ConsistentRead=True
+            ).get("Item")
+
+            if item:
+                previous_refill = item["last_refill"]
+                tokens = min(
+                    burst,
+                    float(item["tokens"]) + (now - float(previous_refill)) * rate,
+                )
+            else:
+                previous_refill = None
+                tokens = float(burst)
+
+            granted = min(requested, int(tokens))
+            if granted == 0:
+                return 0
+
+            update_kwargs = {
+                "Key": {"bucket_id": bucket_id},
+                "UpdateExpression": "SET tokens = :tokens, last_refill = :now",
+                "ExpressionAttributeValues": {
+                    ":tokens": Decimal(str(round(tokens - granted, 6))),
+                    ":now": Decimal(str(round(now, 6))),
+                },
+            }
+            if previous_refill is None:
+                update_kwargs["ConditionExpression"] = "attribute_not_exists(bucket_id)"
+            else:
+                update_kwargs["ConditionExpression"] = "last_refill = :previous"
+                update_kwargs["ExpressionAttributeValues"][":previous"] = previous_refill
+
+            try:
+                self.table.update_item(**update_kwargs)
+                return granted
+            except ClientError as e:
+                if (
+                    e.response.get("Error", {}).get("Code")
+                    != "ConditionalCheckFailedException"
+                ):
+                    raise
+                # Another worker updated the bucket first - re-read and retry
+
+        return 0
+
+
+class DistributedRateLimiter:
+    """Keeps the whole worker fleet under the SES MaxSendRate.
+
+    Tokens are leased from the shared backend in small blocks and spent
+    locally, so a worker only touches the backend once per block. Unused
+    leased tokens expire quickly so idle containers do not hoard capacity.
+    Rates are configured per SES identity and region via SES_RATE_LIMITS,
+    e.g. {"us-gov-west-1": 14, "us-gov-west-1#news@agency.gov": 5}.
+    """
+
+    def __init__(self, backend=None):
+        backend_name = os.environ.get("RATE_LIMIT_BACKEND", "none").lower()
+        if backend is None and backend_name == "dynamodb":
+            backend = DynamoDBTokenBucketBackend(
+                os.environ.get("RATE_LIMIT_TABLE", "EmailRateLimits")
+            )
+        elif backend is None and backend_name == "memory":
+            backend = InMemoryTokenBucketBackend()
+        self.backend = backend  # None disables fleet-wide limiting
+
+        self.default_rate = float(os.environ.get("SES_MAX_SEND_RATE", "14"))
+        self.rate_overrides = json.loads(os.environ.get("SES_RATE_LIMITS", "{}"))
+        self.lease_block_size = int(os.environ.get("RATE_LIMIT_LEASE_BLOCK", "5"))
+        self.lease_ttl = float(os.environ.get("RATE_LIMIT_LEASE_TTL_SECONDS", "1.0"))
+        self.max_wait = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", "10"))
+
+        self._leases = {}  # bucket_id -> {"tokens": int, "expires_at": float}
+        self._lock = threading.Lock()
+
+        if self.backend is not None:
+            logger.info(
+                f"Distributed rate limiter enabled: backend={type(self.backend).__name__}, default_rate={self.default_rate}/s, lease_block={self.lease_block_size}"
+            )
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def get_rate(self, identity, region):
+        """Resolve the send rate for an identity: address, then domain, then region, then default"""
+        candidates = [f"{region}#{identity}"]
+        if identity and "@" in identity:
+            candidates.append(f"{region}#{identity.split('@', 1)[1]}")
+        candidates.append(region)
+        for candidate in candidates:
+            if candidate in self.rate_overrides:
+                return float(self.rate_overrides[candidate])
+        return self.default_rate
+
+    def get_bucket_id(self, identity, region):
+        """Buckets are per identity only when that identity has its own rate"""
+        if identity and f"{region}#{identity}" in self.rate_overrides:
+            return f"{region}#{identity}"
+        if identity and "@" in identity:
+            domain = identity.split("@", 1)[1]
+            if f"{region}#{domain}" in self.rate_overrides:
+                return f"{region}#{domain}"
+        return region
+
+    def try_acquire(self, identity, region):
+        """Take one token without waiting; returns True if a token was available"""
+        if not self.enabled:
+            return True
+
+        bucket_id = self.get_bucket_id(identity, region)
+        now = time.time()
+
+        with self._lock:
+            lease = self._leases.get(bucket_id)
+            if lease and lease["tokens"] > 0 and lease["expires_at"] > now:
+                lease["tokens"] -= 1
+                return True
+
+        rate = self.get_rate(identity, region)
+        granted = self.backend.take_tokens(
+            bucket_id, self.lease_block_size, rate, max(rate, self.lease_block_size)
+        )
+        if granted == 0:
+            return False
+
+        with self._lock:
+            self._leases[bucket_id] = {
+                "tokens": granted - 1,
+                "expires_at": now + self.lease_ttl,
+            }
+        return True
+
+    def acquire(self, identity, region, max_wait=None):
+        """Block until a token is available or max_wait seconds pass"""
+        if not self.enabled:
+            return True
+
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.time() + max_wait
+        while True:
+            try:
+                if self.try_acquire(identity, region):
+                    return True
+            except Exception as e:
+                # Never stop sending because the limiter backend is unavailable
+                logger.warning(f"Rate limiter backend error (allowing send): {str(e)}")
+                return True
+
+            if time.time() >= deadline:
+                return False
+            rate = self.get_rate(identity, region)
+            time.sleep(min(max(1.0 / rate, 0.05), 1.0))
+
+
+class RateLimitWaitTimeout(Exception):
+    """No fleet-wide token within max_wait - a local wait, not an SES throttle"""
+
+
+# Global fleet-wide rate limiter (disabled unless RATE_LIMIT_BACKEND is set)
+send_rate_limiter = DistributedRateLimiter()
 
 
 def send_cloudwatch_metric(metric_name, value, unit="Count", dimensions=None):
@@ -251,13 +867,22 @@ def send_cloudwatch_metric(metric_name, value, unit="Count", dimensions=None):
         logger.warning(f"Failed to send CloudWatch metric {metric_name}: {str(e)}")
 
 
-def check_campaign_completion_status(campaign_id, expected_total):
-    """Check if campaign is completed and send metric if incomplete (only after 30 minutes)"""
+def check_campaign_completion_status(campaign_id, expected_total, campaign=None):
+    """Check if campaign is completed and send metric if incomplete (only after 30 minutes).
+
+    campaign is an item the caller already read (with shard totals applied).
+    """
     try:
-        # Get current campaign status
-        campaign_response = campaigns_table.get_item(Key={"campaign_id": campaign_id})
-        if "Item" in campaign_response:
-            campaign = campaign_response["Item"]
+        if campaign is None:
+            # Get current campaign status
+            campaign_response = campaigns_table.get_item(
+                Key={"campaign_id": campaign_id},
+                ProjectionExpression="sent_count, failed_count, start_time, sent_at, counter_shards",
+            )
+            if "Item" in campaign_response:
+                campaign = apply_sharded_counters(campaign_id, campaign_response["Item"])
+
+        if campaign is not None:
 
             sent_count = campaign.get("sent_count", 0)
             failed_count = campaign.get("failed_count", 0)
@@ -332,472 +957,1716 @@ def check_campaign_completion_status(campaign_id, expected_total):
         return True
 
 
-def lambda_handler(event, context):
-    """Process SQS messages and send emails with adaptive rate control"""
+def lookup_contact(contact_email):
+    """Query the email-index GSI for one contact (returns None if not found)"""
+    response = contacts_table.query(
+        IndexName="email-index",
+        KeyConditionExpression=Key("email").eq(contact_email),
+        Limit=1,
+    )
+    items = response.get("Items")
+    return items[0] if items else None
 
-    start_time = datetime.now()
-    logger.info(f"Lambda invocation started at {start_time.isoformat()}")
-    
-    # Check if event has Records key to prevent KeyError
-    if 'Records' not in event:
-        # Check if this is a non-SQS event (health check, scheduled event, etc.)
-        event_source = event.get('source', 'unknown')
-        event_detail_type = event.get('detail-type', 'unknown')
-        
-        # Ignore known non-SQS event sources to prevent false alarms
-        if event_source in ['aws.events', 'aws.health', 'aws.apigateway']:
-            logger.info(f"⚠️ Ignoring non-SQS event from {event_source} (detail-type: {event_detail_type})")
-            logger.info(f"Event keys: {list(event.keys())}")
-            return {
-                "statusCode": 200,
-                "body": json.dumps({"message": f"Ignored non-SQS event from {event_source}"})
-            }
-        
-        # Only log error for truly invalid events
-        logger.error("❌ FATAL ERROR: Event does not contain 'Records' key")
-        logger.error(f"Event source: {event_source}")
-        logger.error(f"Event structure: {list(event.keys())}")
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Invalid event structure - missing Records key"})
-        }
-    
-    # Check for empty SQS batch (no messages to process)
-    if len(event['Records']) == 0:
-        logger.info("✅ Empty SQS batch received (0 messages) - no processing needed")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "message": "Empty batch processed",
-                "successful": 0,
-                "failed": 0
-            })
-        }
-    
-    logger.info(f"Processing {len(event['Records'])} messages from SQS queue")
-    logger.info(f"Request ID: {context.aws_request_id}")
-    logger.info(f"Function Name: {context.function_name}")
-    logger.info(f"Memory Limit: {context.memory_limit_in_mb} MB")
 
-    results = {
-        "successful": 0,
-        "failed": 0,
-        "errors": [],
-        "rate_control_stats": {
-            "total_delay_applied": 0,
-            "throttles_detected": 0,
-            "attachment_delays_applied": 0,
-        },
-        "campaigns_processed": set(),
-        "total_expected_emails": 0,
-    }
+def prefetch_contacts(records):
+    """Resolve every contact_email in an SQS batch with parallel GSI queries.
 
-    # Wrap main processing in try-catch to prevent fatal errors from causing message re-delivery
-    try:
-        for idx, record in enumerate(event["Records"], 1):
-            message_id = record.get("messageId", "unknown")
-            logger.info(
-                f"[Message {idx}/{len(event['Records'])}] Processing message ID: {message_id}"
-            )
+    Returns a map of email -> contact item (or None when the email is not in
+    the Contacts table). Emails whose lookup failed are left out of the map so
+    the caller can retry them individually.
+    """
+    emails = set()
+    for record in records:
+        try:
+            contact_email = json.loads(record["body"]).get("contact_email")
+            if contact_email:
+                emails.add(contact_email)
+        except Exception:
+            continue  # Malformed records are reported by the main loop
+
+    contacts = {}
+    if not emails:
+        return contacts
 
+    max_workers = min(CONTACT_LOOKUP_WORKERS, len(emails))
+    lookup_start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(lookup_contact, email): email for email in emails
+        }
+        for future in as_completed(futures):
+            email = futures[future]
             try:
-                # Parse message body (contains only campaign_id and contact_email)
-                message = json.loads(record["body"])
-                logger.debug(f"[Message {idx}] Raw message body: {record['body']}")
+                contacts[email] = future.result()
+            except Exception as e:
+                logger.warning(f"Contact prefetch failed for {email}: {str(e)}")
 
-                campaign_id = message.get("campaign_id")
-                contact_email = message.get("contact_email")
-                
-                # Print SQS data retrieved
-                print(f"📨📥🔍 SQS Data: MessageID={message_id}, CampaignID={campaign_id}, Contact={contact_email}, Role={message.get('role', 'N/A')}")
+    found = sum(1 for contact in contacts.values() if contact)
+    logger.info(
+        f"Prefetched {len(emails)} contact(s) with {max_workers} thread(s) in {time.time() - lookup_start:.3f}s ({found} found in Contacts table)"
+    )
+    return contacts
 
-                if not campaign_id or not contact_email:
-                    raise ValueError("Missing campaign_id or contact_email in message")
 
-                logger.info(
-                    f"[Message {idx}] Campaign ID: {campaign_id}, Contact: {contact_email}"
-                )
+# Queue URLs resolved from eventSourceARN (persists across warm invocations)
+queue_url_cache = {}
 
-                # Track campaigns being processed
-                results["campaigns_processed"].add(campaign_id)
 
-                # Retrieve campaign data from DynamoDB
-                logger.info(f"[Message {idx}] Retrieving campaign data from DynamoDB")
-                campaign_response = campaigns_table.get_item(
-                    Key={"campaign_id": campaign_id}
-                )
-                if "Item" not in campaign_response:
-                    logger.error(
-                        f"[Message {idx}] Campaign {campaign_id} not found in DynamoDB"
-                    )
-                    raise ValueError(f"Campaign {campaign_id} not found in DynamoDB")
+def get_queue_url_for_record(record):
+    """Resolve the SQS queue URL a record came from"""
+    source_arn = record.get("eventSourceARN")
+    if not source_arn:
+        raise ValueError("Record has no eventSourceARN")
+    if source_arn not in queue_url_cache:
+        # arn:<partition>:sqs:<region>:<account>:<queue-name>
+        arn_parts = source_arn.split(":")
+        queue_url_cache[source_arn] = sqs_client.get_queue_url(
+            QueueName=arn_parts[5], QueueOwnerAWSAccountId=arn_parts[4]
+        )["QueueUrl"]
+    return queue_url_cache[source_arn]
 
-                campaign = campaign_response["Item"]
-                logger.info(
-                    f"[Message {idx}] Campaign retrieved: {campaign.get('campaign_name', 'Unnamed')}"
-                )
 
-                # Convert Decimal types to appropriate Python types
-                for key, value in campaign.items():
-                    if isinstance(value, Decimal):
-                        campaign[key] = int(value) if value % 1 == 0 else float(value)
+def compute_defer_backoff(record, min_delay=0):
+    """Exponential backoff (with jitter) based on how often SQS has delivered the record"""
+    receive_count = int(
+        record.get("attributes", {}).get("ApproximateReceiveCount", "1")
+    )
+    backoff = DEFER_BASE_BACKOFF_SECONDS * (2 ** max(0, receive_count - 1))
+    backoff = max(backoff, int(math.ceil(min_delay)))
+    backoff += random.randint(0, max(1, backoff // 4))
+    return min(backoff, DEFER_MAX_BACKOFF_SECONDS)
 
-                # Try to retrieve contact data from DynamoDB (optional - campaigns are independent)
-                logger.info(
-                    f"[Message {idx}] Attempting to retrieve contact data from DynamoDB"
-                )
-                contact = None
 
-                try:
-                    # Query using email-index GSI (email is not the primary key)
-                    response = contacts_table.query(
-                        IndexName="email-index",
-                        KeyConditionExpression=Key("email").eq(contact_email),
-                        Limit=1,
-                    )
+class DeferralLimitExceeded(Exception):
+    """The message has already been re-sent DEFER_MAX_DEFERRALS times"""
 
-                    if response.get("Items"):
-                        contact = response["Items"][0]
-                        logger.info(
-                            f"[Message {idx}] Contact found: {contact.get('first_name', '')} {contact.get('last_name', '')}"
-                        )
-                    else:
-                        logger.info(
-                            f"[Message {idx}] Contact {contact_email} not in Contacts table (using email-only mode)"
-                        )
-                except Exception as contact_error:
-                    logger.warning(
-                        f"[Message {idx}] Could not query contact: {str(contact_error)}"
-                    )
 
-                # If contact not found, create minimal contact object with just email
-                if not contact:
-                    logger.info(
-                        f"[Message {idx}] Using email-only contact for {contact_email}"
-                    )
-                    contact = {
-                        "email": contact_email,
-                        "first_name": "",
-                        "last_name": "",
-                        "company": "",
-                        "title": "",
-                        "agency_name": "",
-                    }
+def deferral_limit_reached(record):
+    """True once a message has used up its DEFER_MAX_DEFERRALS re-sends"""
+    try:
+        deferrals = int(json.loads(record["body"]).get("deferrals", 0))
+    except Exception:
+        return False
+    return deferrals >= DEFER_MAX_DEFERRALS
 
-                # Extract campaign details
-                subject = campaign.get("subject", "")
-                body = campaign.get("body", "")
-                from_email = campaign.get("from_email", "")
-                email_service = campaign.get("email_service", "ses")
 
-                logger.info(f"[Message {idx}] Email service: {email_service}")
-                logger.info(f"[Message {idx}] From: {from_email}")
-                logger.info(f"[Message {idx}] To: {contact_email}")
-                logger.info(
-                    f"[Message {idx}] Campaign body length: {len(body)} characters"
+def defer_message(record, backoff_seconds, reason, msg_idx=0):
+    """Hand a record back to SQS so it is retried after backoff_seconds.
+
+    Early deliveries get their visibility timeout extended and must be
+    reported as batch item failures (returns True). Records that are close
+    to the queue's maxReceiveCount, and recipients fanned out of a packed
+    message, are re-sent as a fresh delayed copy instead, so the original
+    can be deleted (returns False). A copy restarts the receive count, so
+    re-sends are capped by the deferrals count carried in the body:
+    DeferralLimitExceeded is raised once it reaches DEFER_MAX_DEFERRALS.
+    """
+    queue_url = get_queue_url_for_record(record)
+    receive_count = int(
+        record.get("attributes", {}).get("ApproximateReceiveCount", "1")
+    )
+
+    if receive_count < DEFER_MAX_RECEIVE_COUNT and not record.get("packedFrom"):
+        sqs_client.change_message_visibility(
+            QueueUrl=queue_url,
+            ReceiptHandle=record["receiptHandle"],
+            VisibilityTimeout=backoff_seconds,
+        )
+        logger.info(
+            f"[Message {msg_idx}] Deferred via visibility timeout for {backoff_seconds}s ({reason})"
+        )
+        return True
+
+    message = json.loads(record["body"])
+    deferrals = int(message.get("deferrals", 0))
+    if deferrals >= DEFER_MAX_DEFERRALS:
+        raise DeferralLimitExceeded(
+            f"Message already deferred {deferrals} time(s) (DEFER_MAX_DEFERRALS={DEFER_MAX_DEFERRALS})"
+        )
+    message["deferrals"] = deferrals + 1
+    sqs_client.send_message(
+        QueueUrl=queue_url,
+        MessageBody=json.dumps(message),
+        DelaySeconds=min(backoff_seconds, 900),
+    )
+    logger.info(
+        f"[Message {msg_idx}] Deferred by re-sending with DelaySeconds={min(backoff_seconds, 900)} ({reason}, receive count {receive_count})"
+    )
+    return False
+
+
+def is_retryable_error(exception):
+    """Transient failures worth another SQS delivery (throttles, timeouts, 5xx).
+
+    Permanent failures such as MessageRejected or a malformed message are
+    not retried - redelivery would only burn SES quota.
+    """
+    if isinstance(exception, RateLimitWaitTimeout):
+        return True
+
+    if rate_control.detect_throttle_exception(exception):
+        return True
+
+    if isinstance(exception, ClientError):
+        error_code = exception.response.get("Error", {}).get("Code", "")
+        http_status = exception.response.get("ResponseMetadata", {}).get(
+            "HTTPStatusCode", 0
+        )
+        return error_code in RETRYABLE_ERROR_CODES or (
+            isinstance(http_status, int) and http_status >= 500
+        )
+
+    if isinstance(
+        exception, (BotoCoreError, ConnectionError, TimeoutError, smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+    ):
+        return True
+
+    # SMTP 4xx replies are temporary by definition
+    if isinstance(exception, smtplib.SMTPResponseException):
+        return 400 <= exception.smtp_code < 500
+
+    return False
+
+
+def expand_packed_records(records):
+    """Fan packed multi-recipient messages out into one record per recipient.
+
+    A packed message body is {"campaign_id": ..., "recipients": [...]} where
+    each recipient is an email or {"email": ..., "merge_fields": {...}}. Each
+    recipient becomes a copy of the SQS record with a single-recipient body,
+    messageId "<parent id>#<n>" and packedFrom set to the parent messageId,
+    so the rest of the pipeline tracks outcomes per recipient.
+    """
+    expanded = []
+    for record in records:
+        try:
+            message = json.loads(record["body"])
+            recipients = message.get("recipients")
+        except Exception:
+            recipients = None  # Malformed records are reported by the main loop
+        if not isinstance(recipients, list):
+            expanded.append(record)
+            continue
+
+        parent_id = record.get("messageId")
+        shared = {key: value for key, value in message.items() if key != "recipients"}
+        for n, recipient in enumerate(recipients):
+            body = dict(shared)
+            if isinstance(recipient, dict):
+                body["contact_email"] = recipient.get("email")
+                if recipient.get("merge_fields"):
+                    body["merge_fields"] = recipient["merge_fields"]
+            else:
+                body["contact_email"] = recipient
+            virtual = dict(record)
+            virtual["messageId"] = f"{parent_id}#{n}"
+            virtual["body"] = json.dumps(body)
+            virtual["packedFrom"] = parent_id
+            expanded.append(virtual)
+
+        logger.info(
+            f"Expanded packed message {parent_id} into {len(recipients)} recipient(s)"
+        )
+    return expanded
+
+
+def settle_packed_records(records, results):
+    """Turn per-recipient failures of packed messages into individual re-enqueues.
+
+    Failed recipients are sent back to the queue as single-recipient messages
+    so the packed message itself can be deleted. If that fails, the whole
+    packed message is reported instead. Returns the batch item failures to
+    hand to SQS.
+    """
+    packed = {
+        record["messageId"]: record for record in records if record.get("packedFrom")
+    }
+    failures = []
+    retry = OrderedDict()  # parent messageId -> failed recipient records
+    for message_id in results["batch_item_failures"]:
+        record = packed.get(message_id)
+        if record is None:
+            if message_id not in failures:
+                failures.append(message_id)
+        else:
+            retry.setdefault(record["packedFrom"], []).append(record)
+
+    for parent_id, failed in retry.items():
+        try:
+            queue_url = get_queue_url_for_record(failed[0])
+            for start in range(0, len(failed), 10):
+                entries = [
+                    {
+                        "Id": str(i),
+                        "MessageBody": record["body"],
+                        "DelaySeconds": min(compute_defer_backoff(record), 900),
+                    }
+                    for i, record in enumerate(failed[start:start + 10])
+                ]
+                response = sqs_client.send_message_batch(
+                    QueueUrl=queue_url, Entries=entries
                 )
-                logger.info(
-                    f"[Message {idx}] Campaign body sample (first 300 chars): {body[:300]}..."
+                if response.get("Failed"):
+                    raise RuntimeError(
+                        f"{len(response['Failed'])} re-enqueue(s) rejected: {response['Failed'][0].get('Message', '')}"
+                    )
+            results["requeued"] += len(failed)
+            logger.info(
+                f"Re-enqueued {len(failed)} failed recipient(s) of packed message {parent_id}"
+            )
+        except Exception as e:
+            logger.error(
+                f"Could not re-enqueue recipients of packed message {parent_id}, redelivering it whole: {str(e)}"
+            )
+            failures.append(parent_id)
+    return failures
+
+
+def get_invocation_deadline(context):
+    """time.time() after which no new records are started (None without a Lambda time limit)"""
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    remaining_ms = get_remaining() if callable(get_remaining) else None
+    if not isinstance(remaining_ms, (int, float)):
+        return None
+    return time.time() + (remaining_ms - TIME_BUDGET_MARGIN_MS) / 1000.0
+
+
+def cap_records_to_time_budget(records, deadline):
+    """Split records into (to_process, unprocessed) so the batch fits before the deadline"""
+    if deadline is None:
+        return records, []
+    budget_seconds = max(0.0, deadline - time.time())
+    max_records = int(budget_seconds / SECONDS_PER_RECIPIENT_ESTIMATE)
+    if len(records) <= max_records:
+        return records, []
+    logger.warning(
+        f"⏱️  {len(records)} recipient(s) do not fit in {budget_seconds:.0f}s; taking {max_records}, re-enqueuing the rest"
+    )
+    return records[:max_records], records[max_records:]
+
+
+def requeue_unprocessed_records(records, results):
+    """Hand records this invocation never started back to the queue.
+
+    Recipients of packed messages are reported as batch item failures, which
+    settle_packed_records turns into single-recipient re-enqueues. Other
+    records are re-sent as new messages (so the redelivery does not count
+    towards the queue's maxReceiveCount) and only reported if that fails.
+    """
+    if not records:
+        return
+    with results_lock:
+        results["unprocessed"] += len(records)
+
+    by_queue = OrderedDict()
+    for record in records:
+        if record.get("packedFrom"):
+            with results_lock:
+                results["batch_item_failures"].append(record.get("messageId"))
+            continue
+        try:
+            by_queue.setdefault(get_queue_url_for_record(record), []).append(record)
+        except Exception as e:
+            logger.error(f"Could not resolve the queue of {record.get('messageId')}: {str(e)}")
+            with results_lock:
+                results["batch_item_failures"].append(record.get("messageId"))
+
+    for queue_url, queued in by_queue.items():
+        for start in range(0, len(queued), 10):
+            chunk = queued[start:start + 10]
+            rejected = {str(i) for i in range(len(chunk))}
+            try:
+                response = sqs_client.send_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[
+                        {"Id": str(i), "MessageBody": record["body"]}
+                        for i, record in enumerate(chunk)
+                    ],
                 )
+                rejected = {failure["Id"] for failure in response.get("Failed", [])}
+            except Exception as e:
+                logger.error(f"Could not re-enqueue unprocessed records: {str(e)}")
+            with results_lock:
+                for i, record in enumerate(chunk):
+                    if str(i) in rejected:
+                        results["batch_item_failures"].append(record.get("messageId"))
+                    else:
+                        results["completed_message_ids"].add(record.get("messageId"))
+                        results["requeued"] += 1
 
-                # Check for img tags in campaign body
-                import re
+    logger.warning(
+        f"⏱️  Time budget reached: {len(records)} recipient(s) handed back to the queue unsent"
+    )
 
-                img_tags_in_campaign = re.findall(r"<img[^>]+>", body, re.IGNORECASE)
-                if img_tags_in_campaign:
-                    logger.info(
-                        f"[Message {idx}] 🖼️ Found {len(img_tags_in_campaign)} <img> tag(s) in campaign body:"
+
+def record_deferral(record, results, reported_as_failure):
+    """Count a deferred record and, if needed, report it back to SQS as a batch item failure"""
+    with results_lock:
+        results["deferred"] += 1
+        if reported_as_failure:
+            results["batch_item_failures"].append(record.get("messageId"))
+
+
+def record_campaign_delta(
+    results, campaign_id, sent=0, failed=0, counter_shards=0, counter_shard=None
+):
+    """Accumulate per-campaign sent/failed counts for this invocation.
+
+    counter_shard is the shard the API assigned to the counted records
+    (sharded campaigns only).
+    """
+    with results_lock:
+        delta = results["campaign_deltas"].setdefault(
+            campaign_id,
+            {"sent": 0, "failed": 0, "counter_shards": 0, "shards": {}},
+        )
+        delta["sent"] += sent
+        delta["failed"] += failed
+        delta["counter_shards"] = int(counter_shards or 0)
+        if delta["counter_shards"] > 0:
+            shard_delta = delta["shards"].setdefault(
+                counter_shard, {"sent": 0, "failed": 0}
+            )
+            shard_delta["sent"] += sent
+            shard_delta["failed"] += failed
+
+
+def get_counter_shard(message):
+    """Shard assigned by the API to a queued message (None for messages queued without one)"""
+    try:
+        return int(message["counter_shard"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def counter_write_not_applied(exception):
+    """True for errors that guarantee an update_item was not applied.
+
+    Throttles are rejected before the write and connection errors happen
+    before the request is sent. Timeouts and 5xx responses are ambiguous -
+    the ADD may already have been applied - so they are not included.
+    """
+    if isinstance(exception, (EndpointConnectionError, ConnectTimeoutError)):
+        return True
+    if isinstance(exception, ClientError):
+        error_code = exception.response.get("Error", {}).get("Code", "")
+        return error_code in COUNTER_WRITE_REJECTED_CODES
+    return False
+
+
+def update_item_with_retry(table, **kwargs):
+    """update_item with exponential backoff (and jitter) on errors that mean it was not applied.
+
+    Counter updates are not idempotent, so ambiguous failures are raised
+    rather than retried (the counter tables are also built without botocore
+    retries for the same reason).
+    """
+    for attempt in range(COUNTER_UPDATE_MAX_ATTEMPTS):
+        try:
+            return table.update_item(**kwargs)
+        except Exception as e:
+            if attempt == COUNTER_UPDATE_MAX_ATTEMPTS - 1 or not counter_write_not_applied(e):
+                raise
+            backoff = min(2.0, 0.1 * (2 ** attempt))
+            logger.warning(
+                f"Counter update failed (attempt {attempt + 1}/{COUNTER_UPDATE_MAX_ATTEMPTS}), retrying in {backoff:.1f}s: {str(e)}"
+            )
+            time.sleep(backoff + random.uniform(0, backoff / 2))
+
+
+def report_unflushed_counters(unflushed):
+    """Log and publish campaign counts that could not be written.
+
+    The messages behind them were already sent (or permanently failed), so
+    they are never redelivered; the lost counts surface as the
+    UnflushedCampaignCounts metric and campaigns left short of completion
+    are flagged by the campaign monitor.
+    """
+    if not unflushed:
+        return
+    total = 0
+    for entry in unflushed:
+        total += entry["sent"] + entry["failed"]
+        logger.error(
+            f"⚠️  UNFLUSHED CAMPAIGN COUNTS: campaign={entry['campaign_id']} shard={entry['shard']} sent=+{entry['sent']} failed=+{entry['failed']}"
+        )
+        send_cloudwatch_metric(
+            "UnflushedCampaignCounts",
+            entry["sent"] + entry["failed"],
+            dimensions=[{"Name": "CampaignId", "Value": entry["campaign_id"]}],
+        )
+    logger.error(
+        f"⚠️  {total} campaign count(s) could not be written and were not redelivered"
+    )
+
+
+# Campaigns this container has already moved to "sending" (sharded counter mode)
+campaigns_marked_sending = set()
+
+
+def apply_sharded_counters(campaign_id, campaign):
+    """Overlay summed shard counts on a campaign item read from the campaigns table"""
+    shard_count = int(campaign.get("counter_shards") or 0)
+    if shard_count > 0:
+        campaign.update(sum_counter_shards(dynamodb, campaign_id, shard_count))
+    return campaign
+
+
+def flush_sharded_campaign_counters(campaign_id, delta, shard_count):
+    """Add this batch's counts to the shards the API assigned, then check completion.
+
+    Each shard update returns the shard's totals and the queued_count the API
+    recorded for it. The shards are only summed (and queued_count read from the
+    campaign) when an updated shard has caught up with its queued_count, since
+    the campaign cannot be complete before then. Messages queued without a
+    shard go to a random one, which always triggers the check.
+
+    Returns the shard deltas that could not be written.
+    """
+    shard_deltas = delta.get("shards") or {
+        None: {"sent": delta["sent"], "failed": delta["failed"]}
+    }
+    unflushed = []
+    completion_possible = False
+    for assigned_shard, shard_delta in shard_deltas.items():
+        if not shard_delta["sent"] and not shard_delta["failed"]:
+            continue
+        if assigned_shard is not None and 0 <= assigned_shard < shard_count:
+            shard = assigned_shard
+        else:
+            shard = random.randrange(shard_count)
+        try:
+            response = update_item_with_retry(
+                counters_table,
+                Key={"counter_id": get_counter_shard_key(campaign_id, shard)},
+                UpdateExpression=(
+                    "SET campaign_id = :campaign_id, "
+                    "sent_count = if_not_exists(sent_count, :zero) + :sent, "
+                    "failed_count = if_not_exists(failed_count, :zero) + :failed, "
+                    "updated_at = :timestamp"
+                ),
+                ExpressionAttributeValues={
+                    ":campaign_id": campaign_id,
+                    ":zero": 0,
+                    ":sent": shard_delta["sent"],
+                    ":failed": shard_delta["failed"],
+                    ":timestamp": datetime.now().isoformat(),
+                },
+                ReturnValues="ALL_NEW",
+            )
+        except Exception as e:
+            logger.error(
+                f"Could not write campaign counts to {get_counter_shard_key(campaign_id, shard)}: {str(e)}"
+            )
+            unflushed.append(
+                {
+                    "campaign_id": campaign_id,
+                    "shard": shard,
+                    "sent": shard_delta["sent"],
+                    "failed": shard_delta["failed"],
+                }
+            )
+            continue
+
+        shard_item = response.get("Attributes") or {}
+        shard_processed = int(shard_item.get("sent_count", 0)) + int(
+            shard_item.get("failed_count", 0)
+        )
+        shard_queued = shard_item.get("queued_count")
+        logger.info(
+            f"Campaign {campaign_id} shard {shard} flushed (+{shard_delta['sent']} sent, +{shard_delta['failed']} failed) -> {shard_processed}/{shard_queued if shard_queued is not None else '?'}"
+        )
+        if assigned_shard is None or shard_queued is None or shard_processed >= int(shard_queued):
+            completion_possible = True
+
+    try:
+        # Timestamps/status on the campaign item only need setting once per container
+        if delta["sent"] and campaign_id not in campaigns_marked_sending:
+            current_timestamp = datetime.now().isoformat()
+            campaigns_table.update_item(
+                Key={"campaign_id": campaign_id},
+                UpdateExpression="SET sent_at = if_not_exists(sent_at, :timestamp), start_time = if_not_exists(start_time, :timestamp), #status = :status",
+                ConditionExpression="#status <> :completed_status",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={
+                    ":timestamp": current_timestamp,
+                    ":status": "sending",
+                    ":completed_status": "completed",
+                },
+            )
+            campaigns_marked_sending.add(campaign_id)
+
+        if not completion_possible:
+            return unflushed
+
+        totals = sum_counter_shards(dynamodb, campaign_id, shard_count)
+        progress = campaigns_table.get_item(
+            Key={"campaign_id": campaign_id},
+            ProjectionExpression="queued_count",
+        ).get("Item", {})
+        queued_count = int(progress.get("queued_count", 0))
+        sent_count = totals["sent_count"]
+        failed_count = totals["failed_count"]
+        logger.info(
+            f"Campaign {campaign_id} shard totals: {sent_count + failed_count}/{queued_count}"
+        )
+
+        if queued_count > 0 and sent_count + failed_count >= queued_count:
+            # Final totals are copied onto the campaign item at completion
+            campaigns_table.update_item(
+                Key={"campaign_id": campaign_id},
+                UpdateExpression="SET #status = :completed_status, completed_at = :completed_timestamp, sent_count = :sent_count, failed_count = :failed_count",
+                ConditionExpression="#status <> :completed_status",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={
+                    ":completed_status": "completed",
+                    ":completed_timestamp": datetime.now().isoformat(),
+                    ":sent_count": sent_count,
+                    ":failed_count": failed_count,
+                },
+            )
+            logger.info(
+                f"🎉 Campaign {campaign_id} COMPLETED! Sent: {sent_count}, Failed: {failed_count}, Total: {queued_count}"
+            )
+            campaign_cache.invalidate(campaign_id)
+
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            # Campaign already completed by another worker
+            campaign_cache.invalidate(campaign_id)
+        else:
+            logger.warning(
+                f"Could not update sharded campaign stats for {campaign_id}: {str(e)}"
+            )
+    except Exception as e:
+        logger.warning(
+            f"Could not update sharded campaign stats for {campaign_id}: {str(e)}"
+        )
+    return unflushed
+
+
+def flush_campaign_counters(campaign_deltas):
+    """Write each campaign's batch totals in one update and detect completion.
+
+    The update returns the new counters (UPDATED_NEW - queued_count is
+    touched with if_not_exists so it is included without pulling the whole
+    item), so completion is decided without a follow-up read. Counter
+    writes are retried with backoff only when they were definitely not
+    applied; returns the deltas that could not be written.
+    """
+    unflushed = []
+    for campaign_id, delta in campaign_deltas.items():
+        if not delta["sent"] and not delta["failed"]:
+            continue
+
+        # Campaigns created with sharded counters never write counts to the hot campaign item
+        shard_count = delta.get("counter_shards", 0)
+        if shard_count > 0:
+            unflushed.extend(
+                flush_sharded_campaign_counters(campaign_id, delta, shard_count)
+            )
+            continue
+
+        try:
+            current_timestamp = datetime.now().isoformat()
+            update_expression = (
+                "SET sent_count = if_not_exists(sent_count, :zero) + :sent, "
+                "failed_count = if_not_exists(failed_count, :zero) + :failed, "
+                "queued_count = if_not_exists(queued_count, :zero)"
+            )
+            expression_values = {
+                ":zero": 0,
+                ":sent": delta["sent"],
+                ":failed": delta["failed"],
+            }
+            expression_names = {}
+            if delta["sent"]:
+                update_expression += (
+                    ", sent_at = if_not_exists(sent_at, :timestamp), "
+                    "start_time = if_not_exists(start_time, :timestamp), #status = :status"
+                )
+                expression_values[":timestamp"] = current_timestamp
+                expression_values[":status"] = "sending"
+                expression_names["#status"] = "status"
+
+            update_kwargs = {
+                "Key": {"campaign_id": campaign_id},
+                "UpdateExpression": update_expression,
+                "ExpressionAttributeValues": expression_values,
+                "ReturnValues": "UPDATED_NEW",
+            }
+            if expression_names:
+                update_kwargs["ExpressionAttributeNames"] = expression_names
+
+            response = update_item_with_retry(campaign_counts_table, **update_kwargs)
+        except Exception as e:
+            logger.error(
+                f"Could not write campaign counts for {campaign_id}: {str(e)}"
+            )
+            unflushed.append(
+                {
+                    "campaign_id": campaign_id,
+                    "shard": None,
+                    "sent": delta["sent"],
+                    "failed": delta["failed"],
+                }
+            )
+            continue
+
+        try:
+            progress = response.get("Attributes", {})
+            sent_count = int(progress.get("sent_count", 0))
+            failed_count = int(progress.get("failed_count", 0))
+            queued_count = int(progress.get("queued_count", 0))
+            logger.info(
+                f"Campaign {campaign_id} counters flushed (+{delta['sent']} sent, +{delta['failed']} failed) -> {sent_count + failed_count}/{queued_count}"
+            )
+
+            # Check if all messages have been processed
+            if queued_count > 0 and sent_count + failed_count >= queued_count:
+                try:
+                    update_item_with_retry(
+                        campaigns_table,
+                        Key={"campaign_id": campaign_id},
+                        UpdateExpression="SET #status = :completed_status, completed_at = :completed_timestamp",
+                        ConditionExpression="#status <> :completed_status",
+                        ExpressionAttributeNames={"#status": "status"},
+                        ExpressionAttributeValues={
+                            ":completed_status": "completed",
+                            ":completed_timestamp": datetime.now().isoformat(),
+                        },
                     )
-                    for i, tag in enumerate(img_tags_in_campaign):
-                        logger.info(f"[Message {idx}]    {i+1}. {tag[:150]}...")
-                else:
-                    logger.warning(
-                        f"[Message {idx}] ⚠️ No <img> tags found in campaign body!"
+                    logger.info(
+                        f"🎉 Campaign {campaign_id} COMPLETED! Sent: {sent_count}, Failed: {failed_count}, Total: {queued_count}"
                     )
+                except ClientError as e:
+                    if (
+                        e.response.get("Error", {}).get("Code")
+                        != "ConditionalCheckFailedException"
+                    ):
+                        raise
+                    # Another worker already marked it completed
+                campaign_cache.invalidate(campaign_id)
+
+        except Exception as e:
+            logger.warning(
+                f"Could not update campaign stats for {campaign_id}: {str(e)}"
+            )
+    return unflushed
+
+
+def process_message(idx, record, total_records, contact_lookup, results):
+    """Process a single SQS record: personalize, pace and send one email.
+
+    Safe to run on several threads at once; every update to the shared
+    results dict is made under results_lock.
+    """
+    message_id = record.get("messageId", "unknown")
+    logger.info(
+        f"[Message {idx}/{total_records}] Processing message ID: {message_id}"
+    )
+    campaign = None  # Known once the campaign is loaded; failures before that are not counted
+
+    try:
+        # Parse message body (contains only campaign_id and contact_email)
+        message = json.loads(record["body"])
+        logger.debug(f"[Message {idx}] Raw message body: {record['body']}")
+
+        campaign_id = message.get("campaign_id")
+        contact_email = message.get("contact_email")
 
-                # Personalize content
-                personalized_subject = personalize_content(subject, contact)
-                personalized_body = personalize_content(body, contact)
+        # Print SQS data retrieved
+        print(f"📨📥🔍 SQS Data: MessageID={message_id}, CampaignID={campaign_id}, Contact={contact_email}, Role={message.get('role', 'N/A')}")
 
-                logger.info(f"[Message {idx}] Subject: {personalized_subject}")
+        if not campaign_id or not contact_email:
+            raise ValueError("Missing campaign_id or contact_email in message")
+
+        logger.info(
+            f"[Message {idx}] Campaign ID: {campaign_id}, Contact: {contact_email}"
+        )
+
+        # Track campaigns being processed
+        with results_lock:
+            results["campaigns_processed"].add(campaign_id)
+
+        # Retrieve campaign data (warm-container cache, falls back to DynamoDB)
+        logger.info(f"[Message {idx}] Retrieving campaign data")
+        campaign = campaign_cache.get(campaign_id)
+        if campaign is None:
+            logger.error(
+                f"[Message {idx}] Campaign {campaign_id} not found in DynamoDB"
+            )
+            raise ValueError(f"Campaign {campaign_id} not found in DynamoDB")
+
+        logger.info(
+            f"[Message {idx}] Campaign retrieved: {campaign.get('campaign_name', 'Unnamed')}"
+        )
+
+        # Try to retrieve contact data from DynamoDB (optional - campaigns are independent)
+        logger.info(
+            f"[Message {idx}] Attempting to retrieve contact data from DynamoDB"
+        )
+        contact = None
+
+        try:
+            if contact_email in contact_lookup:
+                contact = contact_lookup[contact_email]
+            else:
+                # Prefetch failed for this email - fall back to a direct query
+                contact = lookup_contact(contact_email)
+
+            if contact:
                 logger.info(
-                    f"[Message {idx}] Personalized body length: {len(personalized_body)} characters"
+                    f"[Message {idx}] Contact found: {contact.get('first_name', '')} {contact.get('last_name', '')}"
                 )
+            else:
                 logger.info(
-                    f"[Message {idx}] Personalized body sample (first 300 chars): {personalized_body[:300]}..."
+                    f"[Message {idx}] Contact {contact_email} not in Contacts table (using email-only mode)"
                 )
+        except Exception as contact_error:
+            logger.warning(
+                f"[Message {idx}] Could not query contact: {str(contact_error)}"
+            )
 
-                # Get complete recipient lists from campaign for body visibility
-                # All recipients get individual emails with full recipient visibility in body
-                cc_list = campaign.get("cc", []) or []
-                bcc_list = campaign.get("bcc", []) or []
-                to_list = campaign.get("to", []) or []
-
-                logger.info(f"[Message {idx}] 📧 RECIPIENT LISTS:")
-                logger.info(f"[Message {idx}]   To: {to_list}")
-                logger.info(f"[Message {idx}]   CC: {cc_list}")
-                logger.info(f"[Message {idx}]   BCC: {bcc_list} (hidden from body)")
-                logger.info(f"[Message {idx}]   Individual recipient: {contact_email}")
-
-                # Append recipient visibility information to email body AFTER HTML cleaning
-                # Format: "The following were cc'd on this email: [list]" and "The following were in the to line on this email: [list]"
-                # Use HTML <br> tags for proper line breaks in email clients
-                recipient_info = "<br><br>"
-
-                # Add CC list information
-                if cc_list:
-                    recipient_info += f"Emails CC'd: {', '.join(cc_list)}<br><br>"
-                else:
-                    recipient_info += "Emails CC'd: NONE<br><br>"
+        # If contact not found, create minimal contact object with just email
+        merge_fields = message.get("merge_fields")
+        if not contact:
+            logger.info(
+                f"[Message {idx}] Using email-only contact for {contact_email}"
+            )
+            contact = {
+                "email": contact_email,
+                "first_name": "",
+                "last_name": "",
+                "company": "",
+                "title": "",
+                "agency_name": "",
+            }
 
-                # BCC recipients are completely hidden from body text for privacy
-                # Append recipient info to personalized body
-                personalized_body += recipient_info
+        # Merge fields carried in a packed message override the Contacts table
+        if merge_fields:
+            contact = {**contact, **merge_fields}
 
-                logger.info(f"[Message {idx}] ✅ Added recipient visibility info to email body")
-                logger.info(f"[Message {idx}]   Body length increased by {len(recipient_info)} characters")
+        # Extract campaign details
+        subject = campaign.get("subject", "")
+        body = campaign.get("body", "")
+        from_email = campaign.get("from_email", "")
+        email_service = campaign.get("email_service", "ses")
 
-                # Apply adaptive rate control delay before sending
-                attachments = campaign.get("attachments", [])
+        logger.info(f"[Message {idx}] Email service: {email_service}")
+        logger.info(f"[Message {idx}] From: {from_email}")
+        logger.info(f"[Message {idx}] To: {contact_email}")
+        logger.info(
+            f"[Message {idx}] Campaign body length: {len(body)} characters"
+        )
+        logger.info(
+            f"[Message {idx}] Campaign body sample (first 300 chars): {body[:300]}..."
+        )
 
-                # DEBUG: Show attachments details
+        # Check for img tags in campaign body
+        import re
+
+        img_tags_in_campaign = re.findall(r"<img[^>]+>", body, re.IGNORECASE)
+        if img_tags_in_campaign:
+            logger.info(
+                f"[Message {idx}] 🖼️ Found {len(img_tags_in_campaign)} <img> tag(s) in campaign body:"
+            )
+            for i, tag in enumerate(img_tags_in_campaign):
+                logger.info(f"[Message {idx}]    {i+1}. {tag[:150]}...")
+        else:
+            logger.warning(
+                f"[Message {idx}] ⚠️ No <img> tags found in campaign body!"
+            )
+
+        # Personalize content
+        personalized_subject = personalize_content(subject, contact)
+        personalized_body = personalize_content(body, contact)
+
+        logger.info(f"[Message {idx}] Subject: {personalized_subject}")
+        logger.info(
+            f"[Message {idx}] Personalized body length: {len(personalized_body)} characters"
+        )
+        logger.info(
+            f"[Message {idx}] Personalized body sample (first 300 chars): {personalized_body[:300]}..."
+        )
+
+        # Get complete recipient lists from campaign for body visibility
+        # All recipients get individual emails with full recipient visibility in body
+        cc_list = campaign.get("cc", []) or []
+        bcc_list = campaign.get("bcc", []) or []
+        to_list = campaign.get("to", []) or []
+
+        logger.info(f"[Message {idx}] 📧 RECIPIENT LISTS:")
+        logger.info(f"[Message {idx}]   To: {to_list}")
+        logger.info(f"[Message {idx}]   CC: {cc_list}")
+        logger.info(f"[Message {idx}]   BCC: {bcc_list} (hidden from body)")
+        logger.info(f"[Message {idx}]   Individual recipient: {contact_email}")
+
+        # Append recipient visibility information to email body AFTER HTML cleaning
+        # Format: "The following were cc'd on this email: [list]" and "The following were in the to line on this email: [list]"
+        # Use HTML <br> tags for proper line breaks in email clients
+        recipient_info = "<br><br>"
+
+        # Add CC list information
+        if cc_list:
+            recipient_info += f"Emails CC'd: {', '.join(cc_list)}<br><br>"
+        else:
+            recipient_info += "Emails CC'd: NONE<br><br>"
+
+        # BCC recipients are completely hidden from body text for privacy
+        # Append recipient info to personalized body
+        personalized_body += recipient_info
+
+        logger.info(f"[Message {idx}] ✅ Added recipient visibility info to email body")
+        logger.info(f"[Message {idx}]   Body length increased by {len(recipient_info)} characters")
+
+        # Apply adaptive rate control delay before sending
+        attachments = campaign.get("attachments", [])
+
+        # DEBUG: Show attachments details
+        logger.info(
+            f"[Message {idx}] Campaign has {len(attachments)} attachment(s)"
+        )
+        if attachments:
+            for i, att in enumerate(attachments):
                 logger.info(
-                    f"[Message {idx}] Campaign has {len(attachments)} attachment(s)"
+                    f"[Message {idx}]    {i+1}. {att.get('filename')} - s3_key: {att.get('s3_key')}, inline: {att.get('inline')}"
                 )
-                if attachments:
-                    for i, att in enumerate(attachments):
-                        logger.info(
-                            f"[Message {idx}]    {i+1}. {att.get('filename')} - s3_key: {att.get('s3_key')}, inline: {att.get('inline')}"
-                        )
 
-                delay = rate_control.get_delay_for_email(attachments)
+        delay = rate_control.get_delay_for_email(attachments)
 
-                if delay > 0:
-                    logger.info(
-                        f"[Message {idx}] Applying adaptive rate control delay: {delay:.3f}s"
-                    )
-                    time.sleep(delay)
-                    results["rate_control_stats"]["total_delay_applied"] += delay
-
-                    # Track if delay was due to attachments
-                    if attachments:
-                        results["rate_control_stats"]["attachment_delays_applied"] += 1
-
-                        # Send metric for attachment delays
-                        total_attachment_size = 0
-                        for attachment in attachments:
-                            try:
-                                s3_key = attachment.get("s3_key")
-                                if s3_key:
-                                    response = s3_client.head_object(
-                                        Bucket=ATTACHMENTS_BUCKET, Key=s3_key
-                                    )
-                                    total_attachment_size += response.get(
-                                        "ContentLength", 0
-                                    )
-                            except:
-                                total_attachment_size += (
-                                    1024 * 1024
-                                )  # Estimate 1MB if unknown
+        if DEFER_WITH_SQS_VISIBILITY and delay > DEFER_THRESHOLD_SECONDS:
+            # Don't pay for Lambda time spent waiting - let SQS hold the message
+            try:
+                reported = defer_message(
+                    record,
+                    compute_defer_backoff(record, delay),
+                    f"pacing delay {delay:.2f}s",
+                    idx,
+                )
+                record_deferral(record, results, reported)
+                return
+            except Exception as defer_error:
+                logger.warning(
+                    f"[Message {idx}] Could not defer message, sleeping instead: {str(defer_error)}"
+                )
 
-                        send_cloudwatch_metric(
-                            "AttachmentDelays",
-                            len(attachments),
-                            "Count",
-                            [
-                                {"Name": "CampaignId", "Value": campaign_id},
-                                {
-                                    "Name": "TotalSizeMB",
-                                    "Value": f"{total_attachment_size // 1024 // 1024}",
-                                },
-                            ],
-                        )
+        if delay > 0:
+            logger.info(
+                f"[Message {idx}] Applying adaptive rate control delay: {delay:.3f}s"
+            )
+            time.sleep(delay)
+            with results_lock:
+                results["rate_control_stats"]["total_delay_applied"] += delay
+
+            # Track if delay was due to attachments
+            if attachments and rate_control.paces_attachments:
+                with results_lock:
+                    results["rate_control_stats"]["attachment_delays_applied"] += 1
+
+                # Send metric for attachment delays
+                total_attachment_size = 0
+                for attachment in attachments:
+                    try:
+                        s3_key = attachment.get("s3_key")
+                        if s3_key:
+                            response = s3_client.head_object(
+                                Bucket=ATTACHMENTS_BUCKET, Key=s3_key
+                            )
+                            total_attachment_size += response.get(
+                                "ContentLength", 0
+                            )
+                    except:
+                        total_attachment_size += (
+                            1024 * 1024
+                        )  # Estimate 1MB if unknown
 
-                # Update contact email for sending based on role
-                contact_for_sending = contact.copy()
-                contact_for_sending["email"] = contact_email
+                send_cloudwatch_metric(
+                    "AttachmentDelays",
+                    len(attachments),
+                    "Count",
+                    [
+                        {"Name": "CampaignId", "Value": campaign_id},
+                        {
+                            "Name": "TotalSizeMB",
+                            "Value": f"{total_attachment_size // 1024 // 1024}",
+                        },
+                    ],
+                )
 
-                # Send email via AWS SES or SMTP
-                logger.info(
-                    f"[Message {idx}] Sending email via {email_service.upper()}"
+        # Update contact email for sending based on role
+        contact_for_sending = contact.copy()
+        contact_for_sending["email"] = contact_email
+
+        # Send email via AWS SES or SMTP
+        logger.info(
+            f"[Message {idx}] Sending email via {email_service.upper()}"
+        )
+        logger.info(
+            f"[Message {idx}] To: {contact_email}, CC: {cc_list}, BCC: {bcc_list}"
+        )
+        send_start = datetime.now()
+
+        try:
+            if email_service == "ses":
+                # Draw a token from the fleet-wide bucket for this SES identity/region
+                aws_region = campaign.get("aws_region", "us-gov-west-1")
+                if not send_rate_limiter.acquire(from_email, aws_region):
+                    raise RateLimitWaitTimeout(
+                        f"Rate limit token wait exceeded {send_rate_limiter.max_wait}s for {from_email} in {aws_region}"
+                    )
+
+                success = send_ses_email(
+                    campaign,
+                    contact_for_sending,
+                    from_email,
+                    personalized_subject,
+                    personalized_body,
+                    idx,
+                    cc_list=cc_list,
+                    bcc_list=bcc_list,
                 )
-                logger.info(
-                    f"[Message {idx}] To: {contact_email}, CC: {cc_list}, BCC: {bcc_list}"
+            else:
+                success = send_smtp_email(
+                    campaign,
+                    contact_for_sending,
+                    from_email,
+                    personalized_subject,
+                    personalized_body,
+                    idx,
+                    cc_list=cc_list,
+                    bcc_list=bcc_list,
                 )
-                send_start = datetime.now()
 
+            send_duration = (datetime.now() - send_start).total_seconds()
+            logger.info(
+                f"[Message {idx}] Email send attempt completed in {send_duration:.2f} seconds"
+            )
+
+        except RateLimitWaitTimeout as wait_timeout:
+            # SES never saw this send, so the pacing engine and throttle metrics are left alone
+            logger.warning(f"[Message {idx}] {str(wait_timeout)}")
+            if DEFER_WITH_SQS_VISIBILITY:
                 try:
-                    if email_service == "ses":
-                        success = send_ses_email(
-                            campaign,
-                            contact_for_sending,
-                            from_email,
-                            personalized_subject,
-                            personalized_body,
+                    reported = defer_message(
+                        record,
+                        compute_defer_backoff(record),
+                        "no rate limit token",
+                        idx,
+                    )
+                    record_deferral(record, results, reported)
+                    return
+                except Exception as defer_error:
+                    logger.warning(
+                        f"[Message {idx}] Could not defer message: {str(defer_error)}"
+                    )
+            raise
+
+        except Exception as send_exception:
+            # Check if this is a throttle exception and handle it
+            if rate_control.detect_throttle_exception(send_exception):
+                with results_lock:
+                    results["rate_control_stats"]["throttles_detected"] += 1
+                logger.warning(
+                    f"[Message {idx}] Throttle exception detected: {str(send_exception)}"
+                )
+
+                # Send CloudWatch metric for throttle exception
+                print(
+                    f"📊 ERROR METRIC → CloudWatch: ThrottleExceptions (Campaign: {campaign_id}, Type: SES_Throttle)"
+                )
+                logger.error(
+                    f"📊 Sending ERROR metric to CloudWatch: ThrottleExceptions - Campaign {campaign_id} hit SES throttle limit"
+                )
+                send_cloudwatch_metric(
+                    "ThrottleExceptions",
+                    1,
+                    "Count",
+                    [
+                        {"Name": "CampaignId", "Value": campaign_id},
+                        {"Name": "ErrorType", "Value": "SES_Throttle"},
+                    ],
+                )
+
+                # Update rate control for future emails
+                rate_control.handle_throttle_detected()
+
+                if DEFER_WITH_SQS_VISIBILITY:
+                    # Retry later via SQS instead of counting a failure
+                    try:
+                        reported = defer_message(
+                            record,
+                            compute_defer_backoff(record),
+                            "throttled",
                             idx,
-                            cc_list=cc_list,
-                            bcc_list=bcc_list,
                         )
-                    else:
-                        success = send_smtp_email(
-                            campaign,
-                            contact_for_sending,
-                            from_email,
-                            personalized_subject,
-                            personalized_body,
-                            idx,
-                            cc_list=cc_list,
-                            bcc_list=bcc_list,
+                        record_deferral(record, results, reported)
+                        return
+                    except Exception as defer_error:
+                        logger.warning(
+                            f"[Message {idx}] Could not defer throttled message: {str(defer_error)}"
                         )
 
-                    send_duration = (datetime.now() - send_start).total_seconds()
-                    logger.info(
-                        f"[Message {idx}] Email send attempt completed in {send_duration:.2f} seconds"
+            # Re-raise the exception to be handled by the outer try-catch
+            raise send_exception
+
+        if success:
+            rate_control.record_success(send_duration)
+            with results_lock:
+                results["successful"] += 1
+            logger.info(
+                f"[Message {idx}] SUCCESS: Email sent to {contact_email}"
+            )
+
+            # Counted now, written once per campaign when the batch is flushed
+            record_campaign_delta(
+                results,
+                campaign_id,
+                sent=1,
+                counter_shards=campaign.get("counter_shards"),
+                counter_shard=get_counter_shard(message),
+            )
+        else:
+            error_msg = f"Failed to send email to {contact_email}"
+            with results_lock:
+                results["failed"] += 1
+                results["errors"].append(error_msg)
+            logger.error(f"[Message {idx}] FAILED: {error_msg}")
+
+            # Counted now, written once per campaign when the batch is flushed
+            record_campaign_delta(
+                results,
+                campaign_id,
+                failed=1,
+                counter_shards=campaign.get("counter_shards"),
+                counter_shard=get_counter_shard(message),
+            )
+
+    except Exception as e:
+        retryable = is_retryable_error(e)
+        if retryable and deferral_limit_reached(record):
+            # Out of deferrals - stop cycling through the queue and count it as failed
+            logger.error(
+                f"[Message {idx}] Giving up after {DEFER_MAX_DEFERRALS} deferral(s)"
+            )
+            retryable = False
+
+        if retryable:
+            # Report the record back to SQS so only this message is redelivered
+            error_msg = f"Retryable error processing message (will retry): {str(e)}"
+            with results_lock:
+                results["retrying"] += 1
+                results["errors"].append(error_msg)
+                results["batch_item_failures"].append(message_id)
+        else:
+            error_msg = f"Error processing message: {str(e)}"
+            with results_lock:
+                results["failed"] += 1
+                results["errors"].append(error_msg)
+
+            # Permanent failures count towards completion like any other failed send
+            if campaign is not None:
+                record_campaign_delta(
+                    results,
+                    campaign_id,
+                    failed=1,
+                    counter_shards=campaign.get("counter_shards"),
+                    counter_shard=get_counter_shard(message),
+                )
+        logger.error(f"[Message {idx}] EXCEPTION: {error_msg}")
+        logger.exception(f"[Message {idx}] Stack trace:")
+
+    finally:
+        with results_lock:
+            results["completed_message_ids"].add(message_id)
+
+
+# Per-destination SendBulkTemplatedEmail statuses worth another SQS delivery
+# ("Failed" and the other rejections are permanent and counted as failed)
+RETRYABLE_BULK_STATUSES = {
+    "TransientFailure",
+    "AccountThrottled",
+    "AccountDailyQuotaExceeded",
+    "TemplateDoesNotExist",
+}
+
+
+class SESBulkTemplateRegistry:
+    """SES templates for campaigns sent with SendBulkTemplatedEmail.
+
+    A campaign qualifies when it is sent through SES with no attachments and
+    no <img> tags (those need the raw MIME path). Its compiled subject and
+    body become one SES template whose {{{field}}} placeholders are filled
+    from per-destination replacement data, so up to 50 recipients share a
+    single API call. Template names include a hash of the content, so an
+    edited campaign registers a new template instead of reusing a stale one.
+    """
+
+    def __init__(self):
+        self.enabled = (
+            os.environ.get("SES_BULK_TEMPLATED_SEND", "false").lower() == "true"
+        )  # Opt-in: group eligible records into bulk templated sends
+        self.batch_size = max(
+            1, min(50, int(os.environ.get("SES_BULK_BATCH_SIZE", "50")))
+        )  # SES accepts at most 50 destinations per call
+        self.min_destinations = int(
+            os.environ.get("SES_BULK_MIN_DESTINATIONS", "2")
+        )  # Smaller groups use the per-message path
+
+        self._registered = set()  # (region, secret_name, template_name)
+        self._unsupported = set()  # template names SES refused to create
+        self._lock = threading.Lock()
+
+        self.templates_created = 0
+        self.bulk_calls = 0
+
+        if self.enabled:
+            logger.info(
+                f"SES bulk templated send enabled: batch_size={self.batch_size}, min_destinations={self.min_destinations}"
+            )
+
+    def build(self, campaign):
+        """Return the SES template for a campaign, or None if it must be sent per message"""
+        if campaign.get("email_service", "ses") != "ses":
+            return None
+        if campaign.get("attachments"):
+            return None
+
+        subject = campaign.get("subject", "")
+        body = campaign.get("body", "")
+        if not subject or not body or INLINE_IMG_SRC_PATTERN.search(body):
+            return None
+
+        cc_list = campaign.get("cc", []) or []
+        # Same recipient visibility footer process_message appends to every body
+        if cc_list:
+            recipient_info = f"<br><br>Emails CC'd: {', '.join(cc_list)}<br><br>"
+        else:
+            recipient_info = "<br><br>Emails CC'd: NONE<br><br>"
+
+        subject_part = self._to_handlebars(template_cache.get(subject), "")
+        html_part = self._to_handlebars(template_cache.get(body), recipient_info)
+        if subject_part is None or html_part is None:
+            return None
+
+        digest = hashlib.sha256(
+            f"{subject_part}\0{html_part}".encode("utf-8")
+        ).hexdigest()[:12]
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "-", str(campaign.get("campaign_id", "")))
+        name = f"bulk-{safe_id[:45]}-{digest}"
+        if name in self._unsupported:
+            return None
+
+        fields = sorted(
+            set(template_cache.get(subject).fields) | set(template_cache.get(body).fields)
+        )
+        return {
+            "name": name,
+            "subject": subject_part,
+            "html": html_part,
+            "fields": fields,
+        }
+
+    @staticmethod
+    def _to_handlebars(compiled, suffix):
+        """Literal segments plus triple-stache placeholders (values are not HTML-escaped,
+        matching personalize_content). None if literal text would be read as Handlebars."""
+        literals = compiled.segments[0::2] + [suffix]
+        if any("{{" in literal or literal.endswith("\\") for literal in literals):
+            return None
+
+        parts = list(compiled.segments)
+        for i, field in enumerate(compiled.fields):
+            parts[2 * i + 1] = f"{{{{{{{field}}}}}}}"
+        return "".join(parts) + suffix
+
+    def ensure(self, ses_client, region, secret_name, template):
+        """Create the template once per SES account and container"""
+        key = (region, secret_name, template["name"])
+        with self._lock:
+            if key in self._registered:
+                return
+
+        try:
+            ses_client.create_template(
+                Template={
+                    "TemplateName": template["name"],
+                    "SubjectPart": template["subject"],
+                    "HtmlPart": template["html"],
+                }
+            )
+            with self._lock:
+                self.templates_created += 1
+            logger.info(f"Registered SES template {template['name']}")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "AlreadyExists":
+                if not is_retryable_error(e):
+                    with self._lock:
+                        self._unsupported.add(template["name"])
+                raise
+
+        with self._lock:
+            self._registered.add(key)
+
+    def record_call(self):
+        with self._lock:
+            self.bulk_calls += 1
+
+    def forget(self, region, secret_name, template_name):
+        """Drop a template SES reported as missing so the next batch recreates it"""
+        with self._lock:
+            self._registered.discard((region, secret_name, template_name))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "registered": len(self._registered),
+                "unsupported": len(self._unsupported),
+                "templates_created": self.templates_created,
+                "bulk_calls": self.bulk_calls,
+            }
+
+
+ses_bulk_templates = SESBulkTemplateRegistry()
+
+
+def resolve_contact_for_sending(contact_email, contact_lookup, msg_idx=0, merge_fields=None):
+    """Prefetched contact (or a direct lookup) plus any packed-message merge fields"""
+    contact = None
+    try:
+        if contact_email in contact_lookup:
+            contact = contact_lookup[contact_email]
+        else:
+            contact = lookup_contact(contact_email)
+    except Exception as contact_error:
+        logger.warning(
+            f"[Message {msg_idx}] Could not query contact: {str(contact_error)}"
+        )
+
+    contact = dict(contact) if contact else {}
+    if merge_fields:
+        contact.update(merge_fields)
+    contact["email"] = contact_email
+    return contact
+
+
+def send_bulk_templated_chunk(campaign, template, chunk, contact_lookup, results):
+    """Send one SendBulkTemplatedEmail call and map each destination back to its SQS record.
+
+    Returns the records that must go through the per-message path instead.
+    """
+    campaign_id = campaign["campaign_id"]
+    from_email = campaign.get("from_email", "")
+    aws_region = campaign.get("aws_region", "us-gov-west-1")
+    secret_name = campaign.get("aws_secret_name")
+    cc_list = campaign.get("cc", []) or []
+    bcc_list = campaign.get("bcc", []) or []
+    counter_shards = campaign.get("counter_shards")
+
+    # Every destination is one SES send: reserve a pacing slot and a fleet token for each
+    delay = max(rate_control.get_delay_for_email([]) for _ in chunk)
+    if DEFER_WITH_SQS_VISIBILITY and delay > DEFER_THRESHOLD_SECONDS:
+        # Don't pay for Lambda time spent waiting - let SQS hold the messages
+        remaining = []
+        for idx, record, contact_email in chunk:
+            try:
+                reported = defer_message(
+                    record,
+                    compute_defer_backoff(record, delay),
+                    f"pacing delay {delay:.2f}s",
+                    idx,
+                )
+            except Exception as defer_error:
+                logger.warning(
+                    f"[Message {idx}] Could not defer message, sleeping instead: {str(defer_error)}"
+                )
+                remaining.append((idx, record, contact_email))
+                continue
+            record_deferral(record, results, reported)
+            with results_lock:
+                results["completed_message_ids"].add(record.get("messageId"))
+        chunk = remaining
+        if not chunk:
+            return []
+
+    if delay > 0:
+        time.sleep(delay)
+        with results_lock:
+            results["rate_control_stats"]["total_delay_applied"] += delay
+
+    fallback = []
+    for position in range(len(chunk)):
+        if not send_rate_limiter.acquire(from_email, aws_region):
+            logger.warning(
+                f"Rate limit token wait exceeded for {from_email}; {len(chunk) - position} record(s) use the per-message path"
+            )
+            fallback = [record for _, record, _ in chunk[position:]]
+            chunk = chunk[:position]
+            break
+    if not chunk:
+        return fallback
+
+    destinations = []
+    for idx, record, contact_email in chunk:
+        contact = resolve_contact_for_sending(
+            contact_email,
+            contact_lookup,
+            idx,
+            json.loads(record["body"]).get("merge_fields"),
+        )
+        replacement = {}
+        for field in template["fields"]:
+            value = contact.get(field)
+            replacement[field] = "" if value is None else str(value)
+        destination = {"ToAddresses": [contact_email]}
+        if cc_list:
+            destination["CcAddresses"] = cc_list
+        if bcc_list:
+            destination["BccAddresses"] = bcc_list
+        destinations.append(
+            {
+                "Destination": destination,
+                "ReplacementTemplateData": json.dumps(replacement),
+            }
+        )
+
+    send_start = datetime.now()
+    try:
+        ses_client = ses_client_registry.get_client(aws_region, secret_name)
+        ses_bulk_templates.ensure(ses_client, aws_region, secret_name, template)
+        response = ses_client.send_bulk_templated_email(
+            Source=from_email,
+            Template=template["name"],
+            DefaultTemplateData=json.dumps({field: "" for field in template["fields"]}),
+            Destinations=destinations,
+        )
+    except Exception as send_exception:
+        if isinstance(send_exception, ClientError):
+            error_code = send_exception.response.get("Error", {}).get("Code", "")
+            if error_code in CREDENTIAL_ERROR_CODES:
+                ses_client_registry.invalidate(aws_region, secret_name)
+
+        if not is_retryable_error(send_exception):
+            # e.g. template too large or rejected - the per-message path still works
+            logger.warning(
+                f"Bulk templated send failed for campaign {campaign_id}, falling back to per-message sends: {str(send_exception)}"
+            )
+            return fallback + [record for _, record, _ in chunk]
+
+        throttled = rate_control.detect_throttle_exception(send_exception)
+        if throttled:
+            with results_lock:
+                results["rate_control_stats"]["throttles_detected"] += 1
+            send_cloudwatch_metric(
+                "ThrottleExceptions",
+                1,
+                "Count",
+                [
+                    {"Name": "CampaignId", "Value": campaign_id},
+                    {"Name": "ErrorType", "Value": "SES_Throttle"},
+                ],
+            )
+            rate_control.handle_throttle_detected()
+
+        gave_up = []
+        for idx, record, contact_email in chunk:
+            message_id = record.get("messageId")
+            if throttled and DEFER_WITH_SQS_VISIBILITY:
+                try:
+                    reported = defer_message(
+                        record, compute_defer_backoff(record), "throttled", idx
                     )
+                    record_deferral(record, results, reported)
+                    with results_lock:
+                        results["completed_message_ids"].add(message_id)
+                    continue
+                except Exception as defer_error:
+                    logger.warning(
+                        f"[Message {idx}] Could not defer throttled message: {str(defer_error)}"
+                    )
+            if deferral_limit_reached(record):
+                # Out of deferrals - count it as failed instead of cycling through the queue
+                gave_up.append(record)
+                with results_lock:
+                    results["failed"] += 1
+                    results["errors"].append(
+                        f"Failed to send email to {contact_email} after {DEFER_MAX_DEFERRALS} deferral(s): {str(send_exception)}"
+                    )
+                    results["completed_message_ids"].add(message_id)
+                continue
+            with results_lock:
+                results["retrying"] += 1
+                results["errors"].append(
+                    f"Retryable error processing message (will retry): {str(send_exception)}"
+                )
+                results["batch_item_failures"].append(message_id)
+                results["completed_message_ids"].add(message_id)
+        for record in gave_up:
+            record_campaign_delta(
+                results,
+                campaign_id,
+                failed=1,
+                counter_shards=counter_shards,
+                counter_shard=get_counter_shard(json.loads(record["body"])),
+            )
+        return fallback
 
-                except Exception as send_exception:
-                    # Check if this is a throttle exception and handle it
-                    if rate_control.detect_throttle_exception(send_exception):
-                        results["rate_control_stats"]["throttles_detected"] += 1
-                        logger.warning(
-                            f"[Message {idx}] Throttle exception detected: {str(send_exception)}"
-                        )
+    send_duration = (datetime.now() - send_start).total_seconds()
+    ses_bulk_templates.record_call()
+    logger.info(
+        f"SendBulkTemplatedEmail for campaign {campaign_id}: {len(chunk)} destination(s) in {send_duration:.2f}s"
+    )
 
-                        # Send CloudWatch metric for throttle exception
-                        print(
-                            f"📊 ERROR METRIC → CloudWatch: ThrottleExceptions (Campaign: {campaign_id}, Type: SES_Throttle)"
-                        )
-                        logger.error(
-                            f"📊 Sending ERROR metric to CloudWatch: ThrottleExceptions - Campaign {campaign_id} hit SES throttle limit"
-                        )
-                        send_cloudwatch_metric(
-                            "ThrottleExceptions",
-                            1,
-                            "Count",
-                            [
-                                {"Name": "CampaignId", "Value": campaign_id},
-                                {"Name": "ErrorType", "Value": "SES_Throttle"},
-                            ],
-                        )
+    statuses = response.get("Status", [])
+    throttle_recorded = False
+    for position, (idx, record, contact_email) in enumerate(chunk):
+        message_id = record.get("messageId")
+        status = statuses[position] if position < len(statuses) else {}
+        code = status.get("Status")
+
+        counter_shard = get_counter_shard(json.loads(record["body"]))
+        if code is None:
+            # SES may have delivered it - counted as failed rather than risking a duplicate send
+            logger.error(
+                f"[Message {idx}] ⚠️  No SendBulkTemplatedEmail status for {contact_email} (got {len(statuses)} for {len(chunk)} destinations); not resending"
+            )
+            send_cloudwatch_metric(
+                "BulkSendStatusUnknown",
+                1,
+                dimensions=[{"Name": "CampaignId", "Value": campaign_id}],
+            )
+            with results_lock:
+                results["failed"] += 1
+                results["errors"].append(
+                    f"Unknown send status for {contact_email}: no status returned by SES, not resent"
+                )
+                results["completed_message_ids"].add(message_id)
+            record_campaign_delta(
+                results,
+                campaign_id,
+                failed=1,
+                counter_shards=counter_shards,
+                counter_shard=counter_shard,
+            )
+            continue
+
+        if code == "Success":
+            rate_control.record_success(send_duration / len(chunk))
+            with results_lock:
+                results["successful"] += 1
+                results["completed_message_ids"].add(message_id)
+            # Counted now, written once per campaign when the batch is flushed
+            record_campaign_delta(
+                results,
+                campaign_id,
+                sent=1,
+                counter_shards=counter_shards,
+                counter_shard=counter_shard,
+            )
+            continue
+
+        error_msg = f"{code} sending to {contact_email}: {status.get('Error', '')}"
+        if code == "TemplateDoesNotExist":
+            ses_bulk_templates.forget(aws_region, secret_name, template["name"])
+        if code == "AccountThrottled" and not throttle_recorded:
+            throttle_recorded = True
+            rate_control.handle_throttle_detected()
+            with results_lock:
+                results["rate_control_stats"]["throttles_detected"] += 1
+
+        retryable = code in RETRYABLE_BULK_STATUSES and not deferral_limit_reached(record)
+        with results_lock:
+            if retryable:
+                results["retrying"] += 1
+                results["batch_item_failures"].append(message_id)
+                results["errors"].append(f"Retryable error processing message (will retry): {error_msg}")
+            else:
+                results["failed"] += 1
+                results["errors"].append(f"Failed to send email to {contact_email}: {error_msg}")
+            results["completed_message_ids"].add(message_id)
+        if not retryable:
+            record_campaign_delta(
+                results,
+                campaign_id,
+                failed=1,
+                counter_shards=counter_shards,
+                counter_shard=counter_shard,
+            )
+        logger.error(f"[Message {idx}] {error_msg}")
+
+    return fallback
+
+
+def process_bulk_templated_records(records, contact_lookup, results):
+    """Send eligible SES records with SendBulkTemplatedEmail, grouped by campaign.
+
+    Returns the records that still need process_message, in their original order.
+    """
+    groups = OrderedDict()  # campaign_id -> [(idx, record, contact_email)]
+    for idx, record in enumerate(records, 1):
+        try:
+            message = json.loads(record["body"])
+        except Exception:
+            continue
+        campaign_id = message.get("campaign_id")
+        contact_email = message.get("contact_email")
+        if campaign_id and contact_email:
+            groups.setdefault(campaign_id, []).append((idx, record, contact_email))
+
+    handled = set()
+    fallback_ids = set()
+    for campaign_id, items in groups.items():
+        if len(items) < ses_bulk_templates.min_destinations:
+            continue
+        campaign = campaign_cache.get(campaign_id)
+        if campaign is None:
+            continue
+        template = ses_bulk_templates.build(campaign)
+        if template is None:
+            continue
+
+        with results_lock:
+            results["campaigns_processed"].add(campaign_id)
+        for start in range(0, len(items), ses_bulk_templates.batch_size):
+            chunk = items[start:start + ses_bulk_templates.batch_size]
+            fallback = send_bulk_templated_chunk(
+                campaign, template, chunk, contact_lookup, results
+            )
+            handled.update(id(record) for _, record, _ in chunk)
+            fallback_ids.update(id(record) for record in fallback)
+
+    return [
+        record
+        for record in records
+        if id(record) not in handled or id(record) in fallback_ids
+    ]
+
+
+def lambda_handler(event, context):
+    """Process SQS messages and send emails with adaptive rate control"""
+
+    start_time = datetime.now()
+    logger.info(f"Lambda invocation started at {start_time.isoformat()}")
+    
+    # Check if event has Records key to prevent KeyError
+    if 'Records' not in event:
+        # Check if this is a non-SQS event (health check, scheduled event, etc.)
+        event_source = event.get('source', 'unknown')
+        event_detail_type = event.get('detail-type', 'unknown')
+        
+        # Ignore known non-SQS event sources to prevent false alarms
+        if event_source in ['aws.events', 'aws.health', 'aws.apigateway']:
+            logger.info(f"⚠️ Ignoring non-SQS event from {event_source} (detail-type: {event_detail_type})")
+            logger.info(f"Event keys: {list(event.keys())}")
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"message": f"Ignored non-SQS event from {event_source}"})
+            }
+        
+        # Only log error for truly invalid events
+        logger.error("❌ FATAL ERROR: Event does not contain 'Records' key")
+        logger.error(f"Event source: {event_source}")
+        logger.error(f"Event structure: {list(event.keys())}")
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Invalid event structure - missing Records key"})
+        }
+    
+    # Check for empty SQS batch (no messages to process)
+    if len(event['Records']) == 0:
+        logger.info("✅ Empty SQS batch received (0 messages) - no processing needed")
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "message": "Empty batch processed",
+                "successful": 0,
+                "failed": 0
+            })
+        }
+    
+    logger.info(f"Processing {len(event['Records'])} messages from SQS queue")
+    logger.info(f"Request ID: {context.aws_request_id}")
+    logger.info(f"Function Name: {context.function_name}")
+    logger.info(f"Memory Limit: {context.memory_limit_in_mb} MB")
 
-                        # Update rate control for future emails
-                        rate_control.handle_throttle_detected()
+    results = {
+        "successful": 0,
+        "failed": 0,
+        "errors": [],
+        "rate_control_stats": {
+            "total_delay_applied": 0,
+            "throttles_detected": 0,
+            "attachment_delays_applied": 0,
+        },
+        "campaigns_processed": set(),
+        "total_expected_emails": 0,
+        "deferred": 0,
+        "retrying": 0,
+        "batch_item_failures": [],
+        "completed_message_ids": set(),
+        "campaign_deltas": {},
+        "requeued": 0,
+        "unprocessed": 0,
+    }
+    cache_stats_start = campaign_cache.stats()
+    attachment_stats_start = attachment_cache.stats()
+
+    # Packed multi-recipient messages are processed (and tracked) per recipient
+    records = expand_packed_records(event["Records"])
+
+    # Redelivering a timed-out batch would duplicate sends and lose the counter flush,
+    # so the batch is capped to the time available and new records stop near the deadline
+    deadline = get_invocation_deadline(context)
+    batch_records, unprocessed = cap_records_to_time_budget(records, deadline)
+
+    def process_within_budget(idx, record, total_records, contact_lookup, results):
+        if deadline is not None and time.time() >= deadline:
+            with results_lock:
+                unprocessed.append(record)
+            return
+        process_message(idx, record, total_records, contact_lookup, results)
+
+    # Wrap main processing in try-catch so a fatal error only redelivers unfinished messages
+    counters_flushed = False
+    try:
+        # Resolve all contacts for the batch before sending (keeps DynamoDB out of the per-message path)
+        contact_lookup = prefetch_contacts(batch_records)
 
-                    # Re-raise the exception to be handled by the outer try-catch
-                    raise send_exception
+        pending_records = batch_records
+        if ses_bulk_templates.enabled:
+            # Up to 50 recipients per SendBulkTemplatedEmail call; the rest are sent one by one
+            pending_records = process_bulk_templated_records(batch_records, contact_lookup, results)
 
-                if success:
-                    results["successful"] += 1
-                    logger.info(
-                        f"[Message {idx}] SUCCESS: Email sent to {contact_email}"
-                    )
+        send_concurrency = max(1, min(SEND_CONCURRENCY, len(pending_records)))
 
-                    # Update campaign sent count and timestamp
-                    try:
-                        # Update sent_count, set timestamps, and check for completion
-                        current_timestamp = datetime.now().isoformat()
-                        campaigns_table.update_item(
-                            Key={"campaign_id": campaign_id},
-                            UpdateExpression="SET sent_count = sent_count + :inc, sent_at = if_not_exists(sent_at, :timestamp), start_time = if_not_exists(start_time, :timestamp), #status = :status",
-                            ExpressionAttributeNames={"#status": "status"},
-                            ExpressionAttributeValues={
-                                ":inc": 1,
-                                ":timestamp": current_timestamp,
-                                ":status": "sending",
-                            },
-                        )
-                        logger.debug(
-                            f"[Message {idx}] Campaign stats updated (sent_count incremented, start_time/sent_at set)"
-                        )
-                        
-                        # Check if campaign is complete (all emails sent or failed)
-                        try:
-                            campaign_response = campaigns_table.get_item(Key={"campaign_id": campaign_id})
-                            if 'Item' in campaign_response:
-                                campaign = campaign_response['Item']
-                                sent_count = int(campaign.get('sent_count', 0))
-                                failed_count = int(campaign.get('failed_count', 0))
-                                queued_count = int(campaign.get('queued_count', 0))
-                                
-                                # Check if all messages have been processed
-                                total_processed = sent_count + failed_count
-                                if queued_count > 0 and total_processed >= queued_count:
-                                    # Campaign is complete!
-                                    campaigns_table.update_item(
-                                        Key={"campaign_id": campaign_id},
-                                        UpdateExpression="SET #status = :completed_status, completed_at = :completed_timestamp",
-                                        ExpressionAttributeNames={"#status": "status"},
-                                        ExpressionAttributeValues={
-                                            ":completed_status": "completed",
-                                            ":completed_timestamp": datetime.now().isoformat(),
-                                        },
-                                    )
-                                    logger.info(
-                                        f"🎉 Campaign {campaign_id} COMPLETED! Sent: {sent_count}, Failed: {failed_count}, Total: {queued_count}"
-                                    )
-                        except Exception as completion_err:
-                            logger.warning(f"[Message {idx}] Could not check campaign completion: {str(completion_err)}")
-                        
-                    except Exception as e:
-                        logger.warning(
-                            f"[Message {idx}] Could not update campaign stats: {str(e)}"
-                        )
-                else:
-                    results["failed"] += 1
-                    error_msg = f"Failed to send email to {contact_email}"
-                    results["errors"].append(error_msg)
-                    logger.error(f"[Message {idx}] FAILED: {error_msg}")
+        if send_concurrency == 1:
+            for idx, record in enumerate(pending_records, 1):
+                process_within_budget(idx, record, len(pending_records), contact_lookup, results)
+        else:
+            logger.info(
+                f"Sending {len(pending_records)} messages with {send_concurrency} concurrent threads"
+            )
+            with ThreadPoolExecutor(max_workers=send_concurrency) as executor:
+                futures = [
+                    executor.submit(
+                        process_within_budget,
+                        idx,
+                        record,
+                        len(pending_records),
+                        contact_lookup,
+                        results,
+                    )
+                    for idx, record in enumerate(pending_records, 1)
+                ]
+                for future in futures:
+                    # process_message handles its own errors; surface anything unexpected
+                    future.result()
 
-                    # Update campaign failed count and check for completion
-                    try:
-                        campaigns_table.update_item(
-                            Key={"campaign_id": campaign_id},
-                            UpdateExpression="SET failed_count = failed_count + :inc",
-                            ExpressionAttributeValues={":inc": 1},
-                        )
-                        logger.debug(
-                            f"[Message {idx}] Campaign stats updated (failed_count incremented)"
-                        )
-                        
-                        # Check if campaign is complete (all emails sent or failed)
-                        try:
-                            campaign_response = campaigns_table.get_item(Key={"campaign_id": campaign_id})
-                            if 'Item' in campaign_response:
-                                campaign = campaign_response['Item']
-                                sent_count = int(campaign.get('sent_count', 0))
-                                failed_count = int(campaign.get('failed_count', 0))
-                                queued_count = int(campaign.get('queued_count', 0))
-                                
-                                # Check if all messages have been processed
-                                total_processed = sent_count + failed_count
-                                if queued_count > 0 and total_processed >= queued_count:
-                                    # Campaign is complete!
-                                    campaigns_table.update_item(
-                                        Key={"campaign_id": campaign_id},
-                                        UpdateExpression="SET #status = :completed_status, completed_at = :completed_timestamp",
-                                        ExpressionAttributeNames={"#status": "status"},
-                                        ExpressionAttributeValues={
-                                            ":completed_status": "completed",
-                                            ":completed_timestamp": datetime.now().isoformat(),
-                                        },
-                                    )
-                                    logger.info(
-                                        f"🎉 Campaign {campaign_id} COMPLETED! Sent: {sent_count}, Failed: {failed_count}, Total: {queued_count}"
-                                    )
-                        except Exception as completion_err:
-                            logger.warning(f"[Message {idx}] Could not check campaign completion: {str(completion_err)}")
-                        
-                    except Exception as e:
-                        logger.warning(
-                            f"[Message {idx}] Could not update campaign stats: {str(e)}"
-                        )
+        requeue_unprocessed_records(unprocessed, results)
 
-            except Exception as e:
-                results["failed"] += 1
-                error_msg = f"Error processing message: {str(e)}"
-                results["errors"].append(error_msg)
-                logger.error(f"[Message {idx}] EXCEPTION: {error_msg}")
-                logger.exception(f"[Message {idx}] Stack trace:")
+        # One counter write per campaign for the whole batch
+        counters_flushed = True
+        report_unflushed_counters(flush_campaign_counters(results["campaign_deltas"]))
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -807,17 +2676,18 @@ def lambda_handler(event, context):
             try:
                 # Get campaign details to check completion
                 campaign_response = campaigns_table.get_item(
-                    Key={"campaign_id": campaign_id}
+                    Key={"campaign_id": campaign_id},
+                    ProjectionExpression="total_contacts, sent_count, failed_count, counter_shards, start_time, sent_at",
                 )
                 if "Item" in campaign_response:
-                    campaign = campaign_response["Item"]
+                    campaign = apply_sharded_counters(campaign_id, campaign_response["Item"])
                     total_contacts = campaign.get("total_contacts", 0)
                     sent_count = campaign.get("sent_count", 0)
                     failed_count = campaign.get("failed_count", 0)
 
                     # Check if campaign appears to be stuck or incomplete
                     if total_contacts > 0:
-                        check_campaign_completion_status(campaign_id, total_contacts)
+                        check_campaign_completion_status(campaign_id, total_contacts, campaign)
 
                         # Calculate campaign-specific send rate
                         campaign_total_processed = sent_count + failed_count
@@ -922,6 +2792,10 @@ def lambda_handler(event, context):
         logger.info(f"Total messages: {len(event['Records'])}")
         logger.info(f"✅ Successful: {results['successful']}")
         logger.info(f"❌ Failed: {results['failed']}")
+        logger.info(f"⏳ Deferred to SQS: {results['deferred']}")
+        logger.info(f"🔁 Retryable failures (redelivered): {results['retrying']}")
+        logger.info(f"⏱️  Left unsent at the time budget: {results['unprocessed']}")
+        logger.info(f"📦 Recipients fanned out of packed messages: {sum(1 for r in records if r.get('packedFrom'))}")
         logger.info(f"⏱️  Duration: {duration:.2f} seconds")
         logger.info(
             f"📈 Average: {duration/len(event['Records']):.2f} seconds per message"
@@ -946,13 +2820,69 @@ def lambda_handler(event, context):
         logger.info(
             f"  Current adaptive delay: {rate_control.current_delay:.3f} seconds"
         )
+        rate_stats.update(rate_control.stats())
+        logger.info(f"  Pacing engine state: {rate_control.stats()}")
+
+        # Campaign cache statistics (cumulative for this warm container)
+        cache_stats = campaign_cache.stats()
+        results["campaign_cache_stats"] = cache_stats
+        logger.info("Campaign Cache Statistics:")
+        logger.info(
+            f"  Hits: {cache_stats['hits']}, Misses: {cache_stats['misses']}, Hit rate: {cache_stats['hit_rate']:.1f}%"
+        )
+        logger.info(
+            f"  Entries: {cache_stats['entries']}, Evictions: {cache_stats['evictions']}, Invalidations: {cache_stats['invalidations']}"
+        )
+        send_cloudwatch_metric(
+            "CampaignCacheHits", cache_stats["hits"] - cache_stats_start["hits"], "Count"
+        )
+        send_cloudwatch_metric(
+            "CampaignCacheMisses",
+            cache_stats["misses"] - cache_stats_start["misses"],
+            "Count",
+        )
+
+        # Compiled personalization templates (cumulative for this warm container)
+        results["template_cache_stats"] = template_cache.stats()
+        logger.info(f"  Template cache: {results['template_cache_stats']}")
+        results["inline_image_cache_stats"] = inline_image_cache.stats()
+        logger.info(f"  Inline image cache: {results['inline_image_cache_stats']}")
+        results["mime_skeleton_cache_stats"] = mime_skeleton_cache.stats()
+        results["ses_client_stats"] = ses_client_registry.stats()
+        results["ses_bulk_template_stats"] = ses_bulk_templates.stats()
+        results["smtp_pool_stats"] = smtp_pool.stats()
+        logger.info(f"  SMTP connection pool: {results['smtp_pool_stats']}")
+        logger.info(f"  SES bulk templates: {results['ses_bulk_template_stats']}")
+        logger.info(f"  SES client registry: {results['ses_client_stats']}")
+        logger.info(f"  MIME skeleton cache: {results['mime_skeleton_cache_stats']}")
+
+        # /tmp attachment cache: per-invocation hit rate and S3 bytes avoided
+        attachment_stats = attachment_cache.stats()
+        results["attachment_cache_stats"] = attachment_stats
+        logger.info(f"  Attachment cache: {attachment_stats}")
+        attachment_hits = attachment_stats["hits"] - attachment_stats_start["hits"]
+        attachment_lookups = attachment_hits + (
+            attachment_stats["misses"] - attachment_stats_start["misses"]
+        )
+        if attachment_lookups:
+            send_cloudwatch_metric(
+                "AttachmentCacheHitRate",
+                attachment_hits / attachment_lookups * 100,
+                "Percent",
+            )
+            send_cloudwatch_metric(
+                "AttachmentCacheBytesSaved",
+                attachment_stats["bytes_saved"] - attachment_stats_start["bytes_saved"],
+                "Bytes",
+            )
+
         if results["errors"]:
             logger.error(f"Errors encountered: {len(results['errors'])}")
             for error in results["errors"]:
                 logger.error(f"  - {error}")
 
     except Exception as fatal_error:
-        # Critical: Catch any unhandled exceptions to prevent SQS message re-delivery
+        # Critical: Catch any unhandled exceptions so messages already sent are not redelivered
         logger.error(f"=" * 80)
         logger.error(f"❌ FATAL ERROR IN LAMBDA HANDLER")
         logger.error(f"=" * 80)
@@ -960,54 +2890,1021 @@ def lambda_handler(event, context):
         logger.error(f"Exception Message: {str(fatal_error)}")
         logger.exception(f"Full Stack Trace:")
         logger.error(f"=" * 80)
-        logger.error(f"⚠️  RETURNING SUCCESS TO PREVENT MESSAGE RE-DELIVERY")
         logger.error(f"=" * 80)
 
-    logger.info(f"=" * 80)
+        # Messages that finished are not redelivered, so their counts must still be written
+        if not counters_flushed:
+            report_unflushed_counters(flush_campaign_counters(results["campaign_deltas"]))
+
+        # Only messages that never finished processing are redelivered
+        for record in records:
+            message_id = record.get("messageId")
+            if (
+                message_id not in results["completed_message_ids"]
+                and message_id not in results["batch_item_failures"]
+            ):
+                results["batch_item_failures"].append(message_id)
+        logger.error(
+            f"⚠️  Reporting {len(results['batch_item_failures'])} unfinished/failed message(s) for redelivery"
+        )
+        logger.error(f"=" * 80)
+
+    logger.info(f"=" * 80)
+
+    if len(records) != len(event["Records"]):
+        results["batch_item_failures"] = settle_packed_records(records, results)
+
+    # Convert set to list for JSON serialization (sets are not JSON serializable)
+    results["campaigns_processed"] = list(results["campaigns_processed"])
+    del results["completed_message_ids"]
+
+    # Partial batch response (ReportBatchItemFailures): SQS deletes every message
+    # except the deferred and retryable failures listed in batchItemFailures.
+    # Permanent failures are logged and counted, not retried.
+    return {
+        "statusCode": 200,
+        "body": json.dumps(results),
+        "batchItemFailures": [
+            {"itemIdentifier": message_id}
+            for message_id in results["batch_item_failures"]
+        ],
+    }
+
+
+def get_aws_credentials_from_secrets_manager(secret_name, msg_idx=0):
+    """Retrieve AWS credentials from Secrets Manager"""
+    try:
+        logger.info(f"[Message {msg_idx}] Retrieving credentials from Secrets Manager")
+        logger.debug(f"[Message {msg_idx}] Secret name: {secret_name}")
+
+        response = secrets_client.get_secret_value(SecretId=secret_name)
+
+        # Parse the secret (assuming it's stored as JSON)
+        secret_data = json.loads(response["SecretString"])
+
+        credentials = {
+            "aws_access_key_id": secret_data.get("aws_access_key_id"),
+            "aws_secret_access_key": secret_data.get("aws_secret_access_key"),
+            "aws_session_token": secret_data.get("aws_session_token"),  # optional
+        }
+
+        if (
+            not credentials["aws_access_key_id"]
+            or not credentials["aws_secret_access_key"]
+        ):
+            logger.error(f"[Message {msg_idx}] Missing credentials in secret")
+            raise ValueError(
+                "Missing aws_access_key_id or aws_secret_access_key in secret"
+            )
+
+        logger.info(
+            f"[Message {msg_idx}] Successfully retrieved AWS credentials from Secrets Manager"
+        )
+        return credentials
+
+    except Exception as e:
+        logger.error(
+            f"[Message {msg_idx}] Error retrieving credentials from Secrets Manager: {str(e)}"
+        )
+        raise
+
+
+class SESClientRegistry:
+    """Shared SES clients keyed by (region, secret name).
+
+    boto3 clients are thread-safe and keep their own connection pool, so one
+    client per key is reused by every send in the container instead of being
+    rebuilt per message. Clients built from Secrets Manager credentials are
+    refreshed in the background once they are older than the TTL minus the
+    refresh margin, and synchronously once the TTL has fully passed.
+    """
+
+    def __init__(self):
+        self.credential_ttl_seconds = float(
+            os.environ.get("SES_CREDENTIAL_TTL_SECONDS", "900")
+        )  # Max age of credentials read from Secrets Manager
+        self.refresh_margin_seconds = float(
+            os.environ.get("SES_CREDENTIAL_REFRESH_MARGIN_SECONDS", "120")
+        )  # Start a background refresh this long before the TTL
+
+        self._clients = {}  # (region, secret_name) -> entry dict
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.reused = 0
+        self.refreshes = 0
+
+        logger.info(
+            f"SES client registry initialized: credential_ttl={self.credential_ttl_seconds}s, refresh_margin={self.refresh_margin_seconds}s"
+        )
+
+    def _build_client(self, region, secret_name, msg_idx=0):
+        if secret_name:
+            # Use credentials from Secrets Manager (for cross-account or specific credentials)
+            credentials = get_aws_credentials_from_secrets_manager(secret_name, msg_idx)
+            # boto3's default session is not thread-safe - serialize client creation
+            with client_creation_lock:
+                client = boto3.client(
+                    "ses",
+                    region_name=region,
+                    aws_access_key_id=credentials["aws_access_key_id"],
+                    aws_secret_access_key=credentials["aws_secret_access_key"],
+                    aws_session_token=credentials.get("aws_session_token"),
+                    config=boto_config,
+                )
+        else:
+            # Use Lambda's IAM role (boto3 refreshes role credentials itself)
+            with client_creation_lock:
+                client = boto3.client("ses", region_name=region, config=boto_config)
+        return {"client": client, "created_at": time.time(), "refreshing": False}
+
+    def _refresh_in_background(self, key):
+        def refresh():
+            try:
+                entry = self._build_client(key[0], key[1])
+                with self._lock:
+                    self._clients[key] = entry
+                    self.refreshes += 1
+                logger.info(f"Refreshed SES client credentials for {key}")
+            except Exception as e:
+                # Keep serving the current client; the hard TTL forces a retry later
+                logger.warning(f"Background SES credential refresh failed for {key}: {str(e)}")
+                with self._lock:
+                    if key in self._clients:
+                        self._clients[key]["refreshing"] = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_client(self, region, secret_name=None, msg_idx=0):
+        key = (region, secret_name or None)
+        now = time.time()
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                age = now - entry["created_at"]
+                if not secret_name or age < self.credential_ttl_seconds:
+                    if (
+                        secret_name
+                        and not entry["refreshing"]
+                        and age >= self.credential_ttl_seconds - self.refresh_margin_seconds
+                    ):
+                        entry["refreshing"] = True
+                        self._refresh_in_background(key)
+                    self.reused += 1
+                    return entry["client"]
+
+        # First use or hard-expired credentials: build synchronously
+        logger.info(
+            f"[Message {msg_idx}] Creating SES client for region {region} ({'Secrets Manager credentials' if secret_name else 'Lambda IAM role'})"
+        )
+        entry = self._build_client(region, secret_name, msg_idx)
+        with self._lock:
+            self._clients[key] = entry
+            self.created += 1
+        return entry["client"]
+
+    def invalidate(self, region, secret_name=None):
+        """Drop a client whose credentials were rejected so the next send re-reads the secret"""
+        with self._lock:
+            self._clients.pop((region, secret_name or None), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "refreshes": self.refreshes,
+            }
+
+
+ses_client_registry = SESClientRegistry()
+
+# SES errors that mean the cached client's credentials are no longer valid
+CREDENTIAL_ERROR_CODES = {
+    "ExpiredToken",
+    "ExpiredTokenException",
+    "InvalidClientTokenId",
+    "UnrecognizedClientException",
+    "SignatureDoesNotMatch",
+}
+
+
+# Attachments are copied and base64-encoded in slices of this size (a multiple of
+# 57 bytes, so each slice encodes to whole 76-character base64 lines)
+STREAM_CHUNK_BYTES = 57 * 1024
+
+
+class AttachmentCache:
+    """Content-addressed, size-bounded cache of S3 attachment bytes in /tmp.
+
+    Files are named by a hash of (S3 key, ETag), so a re-uploaded object is
+    never served stale, and are read back through mmap. The key -> ETag
+    mapping is re-checked with a HEAD request at most every
+    ATTACHMENT_CACHE_REVALIDATE_SECONDS; until then a hit costs no S3 call.
+    """
+
+    def __init__(self):
+        self.cache_dir = os.environ.get(
+            "ATTACHMENT_CACHE_DIR", "/tmp/attachment-cache"
+        )  # Lambda's only writable storage
+        self.max_bytes = int(
+            os.environ.get("ATTACHMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+        )  # Byte cap for cached files (default /tmp is 512 MB)
+        self.revalidate_seconds = float(
+            os.environ.get("ATTACHMENT_CACHE_REVALIDATE_SECONDS", "300")
+        )  # How often a cached key's ETag is re-checked
+
+        self._entries = OrderedDict()  # (bucket, key) -> entry dict
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+
+        # /tmp and this index share a lifetime, so anything left over is unreferenced
+        try:
+            if os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    os.remove(os.path.join(self.cache_dir, name))
+            else:
+                os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not prepare attachment cache dir {self.cache_dir}: {str(e)}")
+
+        logger.info(
+            f"Attachment cache initialized: dir={self.cache_dir}, max_bytes={self.max_bytes}, revalidate={self.revalidate_seconds}s"
+        )
+
+    def _path_for(self, cache_key, etag):
+        bucket, key = cache_key
+        digest = hashlib.sha256(f"{bucket}/{key}\0{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def _key_lock(self, cache_key):
+        with self._lock:
+            return self._key_locks.setdefault(cache_key, threading.Lock())
+
+    def _lookup(self, cache_key):
+        """Return the entry if it is still current, otherwise None"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+
+        if time.time() - entry["validated_at"] > self.revalidate_seconds:
+            head = s3_client.head_object(Bucket=cache_key[0], Key=cache_key[1])
+            if head.get("ETag") != entry["etag"]:
+                self._remove(cache_key)
+                return None
+            entry["validated_at"] = time.time()
+        return entry
+
+    def _remove(self, cache_key):
+        with self._lock:
+            entry = self._entries.pop(cache_key, None)
+            if entry:
+                self.total_bytes -= entry["size"]
+        if entry:
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
+
+    def _evict_over_budget(self):
+        evicted = []
+        with self._lock:
+            while self.total_bytes > self.max_bytes and self._entries:
+                evicted_key, entry = self._entries.popitem(last=False)
+                self.total_bytes -= entry["size"]
+                self.evictions += 1
+                evicted.append(entry["path"])
+
+        for evicted_path in evicted:
+            try:
+                os.remove(evicted_path)
+            except OSError:
+                pass
+
+    def _download(self, cache_key):
+        """Stream an object from S3 into /tmp in chunks.
+
+        Returns (entry, None, content_type) once cached, or (None, bytes,
+        content_type) when the object cannot be cached (no ETag, larger than
+        the cap, or /tmp is full).
+        """
+        bucket, key = cache_key
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        content_type = response.get("ContentType")
+        etag = response.get("ETag")
+        with self._lock:
+            self.misses += 1
+        if not etag:
+            return None, response["Body"].read(), content_type
+
+        path = self._path_for(cache_key, etag)
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    chunk = response["Body"].read(STREAM_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    size += len(chunk)
+        except OSError as e:
+            # A full /tmp only costs us the cache, never the send
+            logger.warning(f"Could not cache attachment {key}: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            return None, response["Body"].read(), content_type
+
+        if size > self.max_bytes:
+            with open(tmp_path, "rb") as f:
+                data = f.read()
+            os.remove(tmp_path)
+            return None, data, content_type
+
+        os.replace(tmp_path, path)
+        entry = {
+            "etag": etag,
+            "path": path,
+            "size": size,
+            "content_type": content_type,
+            "validated_at": time.time(),
+        }
+        with self._lock:
+            self._entries[cache_key] = entry
+            self.total_bytes += size
+        self._evict_over_budget()
+        return entry, None, content_type
+
+    def _load(self, cache_key):
+        """Return (entry, data, content_type); data is only set for uncacheable objects"""
+        with self._key_lock(cache_key):
+            try:
+                entry = self._lookup(cache_key)
+                if entry is not None:
+                    with self._lock:
+                        if cache_key in self._entries:
+                            self._entries.move_to_end(cache_key)
+                        self.hits += 1
+                        self.bytes_saved += entry["size"]
+                    return entry, None, entry["content_type"]
+            except Exception as e:
+                logger.warning(f"Attachment cache read failed for {cache_key[1]}: {str(e)}")
+                self._remove(cache_key)
+
+            return self._download(cache_key)
+
+    def fetch(self, bucket, key):
+        """Return (bytes, ContentType) for an S3 object, reading from /tmp when cached"""
+        with self.mapped(bucket, key) as (buffer, content_type):
+            return bytes(buffer), content_type
+
+    @contextmanager
+    def mapped(self, bucket, key):
+        """Yield (buffer, ContentType) where buffer is an mmap of the cached file.
+
+        Streaming encoders read slices of the mapping, so the attachment is
+        never copied into a single in-memory bytes object.
+        """
+        cache_key = (bucket, key)
+        entry, data, content_type = self._load(cache_key)
+
+        if entry is not None:
+            try:
+                f = open(entry["path"], "rb")
+            except OSError:
+                # Evicted between lookup and open - fall back to a direct read
+                self._remove(cache_key)
+                response = s3_client.get_object(Bucket=bucket, Key=key)
+                entry, data = None, response["Body"].read()
+
+        if entry is None:
+            yield memoryview(data), content_type
+            return
+
+        with f:
+            if entry["size"] == 0:
+                yield memoryview(b""), content_type
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield buffer, content_type
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups * 100) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+            }
+
+
+attachment_cache = AttachmentCache()
+
+
+INLINE_IMG_SRC_PATTERN = re.compile(
+    r"<img[^>]+src=[\"\']([^\"\']+)[\"\']", flags=re.IGNORECASE
+)
+
+
+def build_inline_image_part(data_bytes, content_type):
+    """Wrap image bytes in a MIME part, or return None for non-image content"""
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.image import MIMEImage
+
+    maintype, subtype = (
+        content_type.split("/", 1)
+        if "/" in content_type
+        else ("application", "octet-stream")
+    )
+    if maintype.lower() != "image":
+        return None
+    try:
+        return MIMEImage(data_bytes, _subtype=subtype)
+    except Exception:
+        img_part = MIMEBase(maintype, subtype)
+        img_part.set_payload(data_bytes)
+        encoders.encode_base64(img_part)
+        return img_part
+
+
+def resolve_inline_image(src, i_src, msg_idx=0):
+    """Fetch one <img src> (data:, http(s) or S3 reference) as an inline MIME part.
+
+    Returns (part, meta, size_in_bytes), or None when the src is not inlined.
+    """
+    import base64
+    import mimetypes
+    import urllib.request
+
+    if not src or src.lower().startswith("cid:"):
+        return None
+
+    # Data URI
+    if src.startswith("data:"):
+        header, b64 = src.split(",", 1)
+        if ";base64" not in header:
+            return None
+        mime_type = (
+            header.split(":", 1)[1].split(";", 1)[0] if ":" in header else "image/png"
+        )
+        if "/" not in mime_type:
+            mime_type = "image/octet-stream"
+        data_bytes = base64.b64decode(b64)
+        img_part = build_inline_image_part(data_bytes, mime_type)
+        if img_part is None:
+            return None
+        cid = f"inline-data-{i_src}-{int(time.time())}@inline"
+        img_part.add_header("Content-ID", f"<{cid}>")
+        img_part.add_header("Content-Disposition", "inline")
+        logger.info(f"[Message {msg_idx}] Inlined data URI as CID <{cid}>")
+        return img_part, {"cid": cid, "filename": None, "s3_key": None}, len(data_bytes)
+
+    # HTTP/HTTPS URL
+    if src.lower().startswith("http://") or src.lower().startswith("https://"):
+        req = urllib.request.Request(
+            src, headers={"User-Agent": "aws-ses-inline-agent/1.0"}
+        )
+        with urllib.request.urlopen(req, timeout=8) as resp:
+            data_bytes = resp.read()
+            content_type = (
+                resp.headers.get("Content-Type")
+                or mimetypes.guess_type(src)[0]
+                or "application/octet-stream"
+            )
+        img_part = build_inline_image_part(data_bytes, content_type)
+        if img_part is None:
+            return None
+        filename = os.path.basename(src)
+        cid = f"inline-http-{i_src}-{int(time.time())}@inline"
+        img_part.add_header("Content-ID", f"<{cid}>")
+        img_part.add_header("Content-Disposition", "inline", filename=filename)
+        logger.info(
+            f"[Message {msg_idx}] Downloaded and inlined HTTP image as CID <{cid}>"
+        )
+        return img_part, {"cid": cid, "filename": filename, "s3_key": None}, len(data_bytes)
+
+    # S3-like references - includes simple S3 key paths from the frontend
+    if (
+        src.startswith("s3://")
+        or (
+            ATTACHMENTS_BUCKET in src
+            and ("s3.amazonaws.com" in src or src.startswith("/"))
+        )
+        or src.startswith("campaign-attachments/")
+        or src.startswith("email-previews/")
+    ):
+        if src.startswith("s3://") or "s3.amazonaws.com" in src:
+            parts = src.split("/", 3)
+            s3_key = parts[3] if len(parts) > 3 else None
+        elif src.startswith("campaign-attachments/") or src.startswith(
+            "email-previews/"
+        ):
+            s3_key = src
+            logger.info(f"[Message {msg_idx}] Detected inline S3 key: {s3_key}")
+        else:
+            s3_key = src.lstrip("/")
+        if not s3_key:
+            return None
+
+        data_bytes, s3_content_type = attachment_cache.fetch(ATTACHMENTS_BUCKET, s3_key)
+        content_type = (
+            s3_content_type
+            or mimetypes.guess_type(s3_key)[0]
+            or "application/octet-stream"
+        )
+        img_part = build_inline_image_part(data_bytes, content_type)
+        if img_part is None:
+            return None
+        filename = os.path.basename(s3_key)
+        cid = f"inline-s3-{i_src}-{int(time.time())}@inline"
+        img_part.add_header("Content-ID", f"<{cid}>")
+        img_part.add_header("Content-Disposition", "inline", filename=filename)
+        logger.info(f"[Message {msg_idx}] Inlined S3 image {s3_key} as CID <{cid}>")
+        return img_part, {"cid": cid, "filename": filename, "s3_key": s3_key}, len(data_bytes)
+
+    logger.debug(
+        f"[Message {msg_idx}] Found image src that may be matched to attachments later: {src}"
+    )
+    return None
+
+
+class InlineImageCache:
+    """Per-campaign cache of resolved inline images, bounded by a byte budget.
+
+    Every recipient of a campaign references the same <img> sources, so the
+    data: decoding, HTTP downloads and S3 reads are done once per campaign
+    content hash and the prepared MIME parts are reused for each send. Sources
+    that fail to resolve are remembered for a short while so a slow or broken
+    image host is not retried for every recipient.
+    """
+
+    def __init__(self):
+        self.max_bytes = int(
+            os.environ.get("INLINE_IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+        )  # Budget for cached image bytes across all campaigns
+        self.failure_retry_seconds = float(
+            os.environ.get("INLINE_IMAGE_FAILURE_RETRY_SECONDS", "60")
+        )  # How long a failed source is skipped before being retried
+
+        self._entries = OrderedDict()  # content hash -> entry dict
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        logger.info(
+            f"Inline image cache initialized: max_bytes={self.max_bytes}, failure_retry={self.failure_retry_seconds}s"
+        )
+
+    def get_cache_key(self, campaign, body):
+        content = (campaign or {}).get("body") or body or ""
+        campaign_id = (campaign or {}).get("campaign_id", "")
+        return hashlib.sha256(f"{campaign_id}\0{content}".encode("utf-8")).hexdigest()
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"images": {}, "bytes": 0, "lock": threading.Lock()}
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            return entry
+
+    def _account(self, key, entry, size):
+        with self._lock:
+            entry["bytes"] += size
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self._entries:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted["bytes"]
+                self.evictions += 1
+                if evicted_key == key:
+                    break
+
+    def resolve(self, campaign, body, msg_idx=0):
+        """Return [(src, part, meta)] for every inlinable <img src> in body"""
+        srcs = INLINE_IMG_SRC_PATTERN.findall(body or "")
+        if not srcs:
+            return []
+
+        key = self.get_cache_key(campaign, body)
+        entry = self._get_entry(key)
+        resolved = []
+
+        # One thread resolves a campaign's images; the others wait and reuse them
+        with entry["lock"]:
+            for i_src, src in enumerate(srcs, 1):
+                cached = entry["images"].get(src)
+                if cached is not None and (
+                    cached["result"] is not None
+                    or time.time() - cached["resolved_at"] < self.failure_retry_seconds
+                ):
+                    with self._lock:
+                        self.hits += 1
+                    if cached["result"] is not None:
+                        resolved.append((src,) + cached["result"])
+                    continue
+
+                with self._lock:
+                    self.misses += 1
+                result = None
+                size = 0
+                try:
+                    inline = resolve_inline_image(src, i_src, msg_idx)
+                    if inline is not None:
+                        img_part, meta, size = inline
+                        result = (img_part, meta)
+                except Exception as single_err:
+                    logger.warning(
+                        f"[Message {msg_idx}] Error inlining image {src[:200]}: {str(single_err)}"
+                    )
+
+                entry["images"][src] = {"result": result, "resolved_at": time.time()}
+                if result is not None:
+                    resolved.append((src,) + result)
+                    self._account(key, entry, size)
+
+        return resolved
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+inline_image_cache = InlineImageCache()
+
+
+def serialize_mime_headers(headers):
+    """Serialize [(name, value, params)] as a MIME header block ending in a blank line"""
+    from email.message import Message
+
+    message = Message()
+    for name, value, params in headers:
+        if params:
+            message.add_header(name, value, **params)
+        else:
+            message[name] = value
+    # Fold each header the way the generator would (RFC 2047/2231 encoding included)
+    folded = b"".join(
+        message.policy.fold_binary(name, value) for name, value in message.items()
+    )
+    return folded + b"\n"
+
+
+class MIMEStreamWriter:
+    """Appends a multipart MIME message to a single bytearray.
+
+    Parts are written as they are produced - no email.mime object tree and
+    no second serialization pass - and base64 bodies are encoded slice by
+    slice straight from an mmap/memoryview source.
+    """
+
+    def __init__(self, buffer=None):
+        self.buffer = buffer if buffer is not None else bytearray()
+        self._open = []  # stack of [boundary, parts_written]
+
+    def begin_multipart(self, subtype):
+        from email.generator import _make_boundary
+
+        boundary = _make_boundary()
+        self.buffer += serialize_mime_headers(
+            [
+                ("Content-Type", f"multipart/{subtype}", {"boundary": boundary}),
+                ("MIME-Version", "1.0", None),
+            ]
+        )
+        self._open.append([boundary, 0])
+        return boundary
+
+    def next_part(self):
+        """Write the delimiter that opens the next part of the innermost multipart"""
+        current = self._open[-1]
+        prefix = b"--" if current[1] == 0 else b"\n--"
+        self.buffer += prefix + current[0].encode("ascii") + b"\n"
+        current[1] += 1
+
+    def end_multipart(self):
+        boundary, _ = self._open.pop()
+        self.buffer += b"\n--" + boundary.encode("ascii") + b"--\n"
+
+    def write_base64_part(self, headers, source):
+        self.buffer += serialize_mime_headers(
+            headers + [("Content-Transfer-Encoding", "base64", None)]
+        )
+        self.write_base64(source)
+
+    def write_base64(self, source):
+        import binascii
+
+        view = memoryview(source)
+        for offset in range(0, len(view), STREAM_CHUNK_BYTES):
+            chunk = view[offset : offset + STREAM_CHUNK_BYTES]
+            # 57-byte input lines -> 76-character base64 lines
+            for line_start in range(0, len(chunk), 57):
+                self.buffer += binascii.b2a_base64(chunk[line_start : line_start + 57])
+        if self.buffer.endswith(b"\n"):
+            del self.buffer[-1]
+
+
+# Per-thread output buffer reused for every rendered message
+render_buffers = threading.local()
+
+
+def get_render_buffer():
+    buffer = getattr(render_buffers, "buffer", None)
+    if buffer is None:
+        buffer = render_buffers.buffer = bytearray()
+    return buffer
+
+
+class MIMESkeleton:
+    """Pre-serialized multipart/mixed message with a slot for the HTML part.
+
+    Layout: mixed -> related -> (alternative -> html, inline images...),
+    attachments... Everything except the top-level headers and the HTML
+    part is encoded once into one bytearray, so rendering a recipient writes
+    a header block, the prefix, one encoded HTML part and the suffix into a
+    reusable output buffer.
+    """
+
+    def __init__(self, buffer, slot, inline_cids, complete=True):
+        self.buffer = buffer  # whole skeleton, HTML slot at offset `slot`
+        self.prefix = memoryview(buffer)[:slot]  # root MIME headers through the alternative boundary
+        self.suffix = memoryview(buffer)[slot:]  # closing boundaries, inline images and attachments
+        self.inline_cids = inline_cids  # attachment images referenced via cid:
+        self.complete = complete  # False if an attachment failed to load
+        self.size = len(buffer)
+
+    def render_headers(self, from_email, to_email, subject, cc_list=None):
+        from email.utils import make_msgid
+
+        domain = from_email.rsplit("@", 1)[-1].strip(" >") if "@" in from_email else None
+        headers = [
+            ("From", from_email, None),
+            ("To", to_email, None),
+            ("Subject", subject, None),
+        ]
+        if cc_list:
+            headers.append(("Cc", ", ".join(cc_list), None))
+        headers.append(("Message-ID", make_msgid(domain=domain), None))
+        return serialize_mime_headers(headers)[:-1]
+
+    def render(self, from_email, to_email, subject, html_body, cc_list=None, out=None):
+        """Write the complete message for one recipient into `out` (a bytearray) and return it"""
+        writer = MIMEStreamWriter(out if out is not None else bytearray())
+        writer.buffer.clear()
+        writer.buffer += self.render_headers(from_email, to_email, subject, cc_list)
+        writer.buffer += self.prefix
+        # Base64 (not quoted-printable) avoids soft-wrapping that shows up as
+        # visible newlines in some mail clients (notably Outlook)
+        writer.write_base64_part(
+            [
+                ("Content-Type", "text/html", {"charset": "utf-8"}),
+                ("MIME-Version", "1.0", None),
+                ("Content-Disposition", "inline", None),
+            ],
+            (html_body or "").encode("utf-8"),
+        )
+        writer.buffer += self.suffix
+        return writer.buffer
+
+
+def build_mime_skeleton(attachments, pre_inline_parts, pre_inline_cids, msg_idx=0):
+    """Stream a campaign's inline images and attachments into one encoded skeleton"""
+    writer = MIMEStreamWriter()
+    complete = True
+
+    writer.begin_multipart("mixed")
+    writer.next_part()
+    writer.begin_multipart("related")
+    writer.next_part()
+    writer.begin_multipart("alternative")
+    writer.next_part()
+    slot = len(writer.buffer)  # the per-recipient HTML part goes here
+    writer.end_multipart()
+
+    # Attach any pre-inlined parts (downloaded data:, http(s), s3 images from HTML scanning)
+    already_inlined_s3_keys = set()
+    already_inlined_filenames = set()
+    for part_meta, ppart in zip(pre_inline_cids, pre_inline_parts):
+        try:
+            serialized = ppart.as_bytes()
+            writer.next_part()
+            writer.buffer += serialized
+        except Exception as p_attach_err:
+            logger.warning(
+                f"[Message {msg_idx}] Failed to attach pre-inlined part: {str(p_attach_err)}"
+            )
+        s3_k = part_meta.get("s3_key")
+        fname = part_meta.get("filename")
+        if s3_k:
+            already_inlined_s3_keys.add(s3_k)
+        if fname:
+            already_inlined_filenames.add(fname)
+
+    inline_cids = []
+    other_attachments = []
+
+    # Inline images from S3 go in the related container, everything else after it
+    for a_idx, attachment in enumerate(attachments, 1):
+        s3_key = attachment.get("s3_key")
+        filename = attachment.get("filename")
+        is_inline = attachment.get("inline", False)  # Check if this is an inline image
+
+        if not s3_key or not filename:
+            logger.warning(
+                f"[Message {msg_idx}] Attachment {a_idx}: Missing s3_key or filename, skipping"
+            )
+            continue
+
+        # Skip attachments that were already inlined via HTML scanning
+        if s3_key in already_inlined_s3_keys or filename in already_inlined_filenames:
+            logger.info(
+                f"[Message {msg_idx}] Skipping attachment {filename} because it was already inlined from HTML"
+            )
+            continue
+
+        try:
+            logger.info(
+                f"[Message {msg_idx}] Streaming attachment {a_idx}/{len(attachments)}: {filename} from S3 (inline={is_inline})"
+            )
+            with attachment_cache.mapped(ATTACHMENTS_BUCKET, s3_key) as (
+                file_data,
+                s3_content_type,
+            ):
+                content_type = (
+                    attachment.get("type") or s3_content_type or "application/octet-stream"
+                )
+                maintype, subtype = (
+                    content_type.split("/", 1)
+                    if "/" in content_type
+                    else ("application", "octet-stream")
+                )
+
+                # Treat images as inline if flagged or detected by content type
+                if maintype.lower() == "image" or is_inline:
+                    cid = f"{filename.replace(' ', '_')}-{a_idx}-{int(time.time())}@inline"
+                    mark = len(writer.buffer)
+                    try:
+                        writer.next_part()
+                        writer.write_base64_part(
+                            [
+                                ("Content-Type", f"image/{subtype}", None),
+                                ("MIME-Version", "1.0", None),
+                                ("Content-ID", f"<{cid}>", None),
+                                ("Content-Disposition", "inline", {"filename": filename}),
+                            ],
+                            file_data,
+                        )
+                    except Exception:
+                        # Drop the half-written part so the skeleton stays well formed
+                        del writer.buffer[mark:]
+                        writer._open[-1][1] -= 1
+                        raise
+                    inline_cids.append({"cid": cid, "filename": filename, "s3_key": s3_key})
+                    logger.info(
+                        f"[Message {msg_idx}] Attached image {filename} as inline CID <{cid}> (from S3)"
+                    )
+                else:
+                    other_attachments.append((attachment, maintype, subtype))
+                    logger.info(
+                        f"[Message {msg_idx}] Prepared non-image attachment {filename}"
+                    )
 
-    # Convert set to list for JSON serialization (sets are not JSON serializable)
-    results["campaigns_processed"] = list(results["campaigns_processed"])
+        except Exception as attachment_error:
+            complete = False
+            logger.error(
+                f"[Message {msg_idx}] Error downloading/processing attachment {filename}: {str(attachment_error)}"
+            )
+            # Continue with other attachments even if one fails
 
-    # Always return success (200) to ensure SQS deletes the messages
-    # Even if there were errors, we've logged them and handled them gracefully
-    return {"statusCode": 200, "body": json.dumps(results)}
+    writer.end_multipart()  # related
 
+    for attachment, maintype, subtype in other_attachments:
+        filename = attachment.get("filename")
+        mark = len(writer.buffer)
+        try:
+            with attachment_cache.mapped(ATTACHMENTS_BUCKET, attachment.get("s3_key")) as (
+                file_data,
+                _,
+            ):
+                writer.next_part()
+                writer.write_base64_part(
+                    [
+                        ("Content-Type", f"{maintype}/{subtype}", None),
+                        ("MIME-Version", "1.0", None),
+                        ("Content-Disposition", "attachment", {"filename": filename}),
+                    ],
+                    file_data,
+                )
+        except Exception as attachment_error:
+            complete = False
+            del writer.buffer[mark:]
+            logger.error(
+                f"[Message {msg_idx}] Error downloading/processing attachment {filename}: {str(attachment_error)}"
+            )
 
-def get_aws_credentials_from_secrets_manager(secret_name, msg_idx=0):
-    """Retrieve AWS credentials from Secrets Manager"""
-    try:
-        logger.info(f"[Message {msg_idx}] Retrieving credentials from Secrets Manager")
-        logger.debug(f"[Message {msg_idx}] Secret name: {secret_name}")
+    writer.end_multipart()  # mixed
 
-        response = secrets_client.get_secret_value(SecretId=secret_name)
+    return MIMESkeleton(writer.buffer, slot, inline_cids, complete)
 
-        # Parse the secret (assuming it's stored as JSON)
-        secret_data = json.loads(response["SecretString"])
 
-        credentials = {
-            "aws_access_key_id": secret_data.get("aws_access_key_id"),
-            "aws_secret_access_key": secret_data.get("aws_secret_access_key"),
-        }
+class MIMESkeletonCache:
+    """LRU of per-campaign MIME skeletons bounded by their serialized size"""
 
-        if (
-            not credentials["aws_access_key_id"]
-            or not credentials["aws_secret_access_key"]
-        ):
-            logger.error(f"[Message {msg_idx}] Missing credentials in secret")
-            raise ValueError(
-                "Missing aws_access_key_id or aws_secret_access_key in secret"
+    def __init__(self):
+        self.max_bytes = int(
+            os.environ.get("MIME_SKELETON_CACHE_MAX_BYTES", str(128 * 1024 * 1024))
+        )  # Budget for cached skeleton bytes across all campaigns
+
+        self._entries = OrderedDict()  # content hash -> MIMESkeleton
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_cache_key(self, campaign, attachments, pre_inline_cids):
+        identity = json.dumps(
+            {
+                "campaign_id": (campaign or {}).get("campaign_id"),
+                "attachments": attachments,
+                "inline": [meta.get("cid") for meta in pre_inline_cids],
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, campaign, attachments, pre_inline_parts, pre_inline_cids, msg_idx=0):
+        key = self.get_cache_key(campaign, attachments, pre_inline_cids)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One thread builds a campaign's skeleton; the others wait and reuse it
+        with key_lock:
+            with self._lock:
+                skeleton = self._entries.get(key)
+                if skeleton is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return skeleton
+                self.misses += 1
+
+            skeleton = build_mime_skeleton(
+                attachments, pre_inline_parts, pre_inline_cids, msg_idx
             )
+            # Partial skeletons (an attachment failed) are rebuilt on the next send
+            if skeleton.complete and skeleton.size <= self.max_bytes:
+                with self._lock:
+                    self._entries[key] = skeleton
+                    self.total_bytes += skeleton.size
+                    while self.total_bytes > self.max_bytes:
+                        evicted_key, evicted = self._entries.popitem(last=False)
+                        self.total_bytes -= evicted.size
+                        self._key_locks.pop(evicted_key, None)
+                        self.evictions += 1
+            return skeleton
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
 
-        logger.info(
-            f"[Message {msg_idx}] Successfully retrieved AWS credentials from Secrets Manager"
-        )
-        return credentials
 
-    except Exception as e:
-        logger.error(
-            f"[Message {msg_idx}] Error retrieving credentials from Secrets Manager: {str(e)}"
-        )
-        raise
+mime_skeleton_cache = MIMESkeletonCache()
 
 
 def send_ses_email(
@@ -1015,15 +3912,7 @@ def send_ses_email(
 ):
     """Send email via AWS SES using IAM role or Secrets Manager credentials with attachment support"""
     try:
-        import base64
-        import mimetypes
         import re
-        import urllib.request
-        from email import encoders
-        from email.mime.base import MIMEBase
-        from email.mime.image import MIMEImage
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.text import MIMEText
 
         aws_region = campaign.get("aws_region", "us-gov-west-1")
         secret_name = campaign.get("aws_secret_name")
@@ -1035,26 +3924,11 @@ def send_ses_email(
         if bcc_list is None:
             bcc_list = campaign.get("bcc") or []
 
-        # Check if we should use IAM role or explicit credentials
-        if secret_name:
-            # Use credentials from Secrets Manager (for cross-account or specific credentials)
-            logger.info(f"[Message {msg_idx}] Using credentials from Secrets Manager")
-            credentials = get_aws_credentials_from_secrets_manager(secret_name, msg_idx)
-
-            ses_client = boto3.client(
-                "ses",
-                region_name=aws_region,
-                aws_access_key_id=credentials["aws_access_key_id"],
-                aws_secret_access_key=credentials["aws_secret_access_key"],
-            )
-        else:
-            # Use Lambda's IAM role (recommended for same-account SES)
-            logger.info(
-                f"[Message {msg_idx}] Using Lambda IAM role for SES authentication"
-            )
-            ses_client = boto3.client("ses", region_name=aws_region)
-
-        logger.info(f"[Message {msg_idx}] Creating SES client for region: {aws_region}")
+        # Shared client per (region, secret); credentials are cached and refreshed by the registry
+        ses_client = ses_client_registry.get_client(aws_region, secret_name, msg_idx)
+        logger.info(
+            f"[Message {msg_idx}] Using pooled SES client for region: {aws_region} ({'Secrets Manager credentials' if secret_name else 'Lambda IAM role'})"
+        )
         logger.info(f"[Message {msg_idx}] Attachments in campaign: {len(attachments)}")
         # Diagnostic: log any <img src=> occurrences in the HTML body to help debug Outlook image prompts
         try:
@@ -1073,197 +3947,17 @@ def send_ses_email(
             )
 
         # Prepare body and inline images found in the HTML body (data:, http(s) and s3 references)
-        # Note: Tracking pixel hiding CSS removed - not needed
-
+        # Images are resolved once per campaign and reused for every recipient
         pre_inline_parts = []
         pre_inline_cids = []
 
         try:
-            img_srcs = re.findall(
-                r"<img[^>]+src=[\"\']([^\"\']+)[\"\']", body or "", flags=re.IGNORECASE
-            )
-            for i_src, src in enumerate(img_srcs, 1):
-                try:
-                    if not src or src.lower().startswith("cid:"):
-                        continue
-
-                    # Data URI
-                    if src.startswith("data:"):
-                        header, b64 = src.split(",", 1)
-                        if ";base64" in header:
-                            mime_type = (
-                                header.split(":", 1)[1].split(";", 1)[0]
-                                if ":" in header
-                                else "image/png"
-                            )
-                            data_bytes = base64.b64decode(b64)
-                            maintype, subtype = (
-                                mime_type.split("/", 1)
-                                if "/" in mime_type
-                                else ("image", "octet-stream")
-                            )
-                            if maintype.lower() == "image":
-                                try:
-                                    img_part = MIMEImage(data_bytes, _subtype=subtype)
-                                except Exception:
-                                    img_part = MIMEBase(maintype, subtype)
-                                    img_part.set_payload(data_bytes)
-                                    encoders.encode_base64(img_part)
-                                cid = f"inline-data-{i_src}-{int(time.time())}@inline"
-                                img_part.add_header("Content-ID", f"<{cid}>")
-                                img_part.add_header("Content-Disposition", "inline")
-                                pre_inline_parts.append(img_part)
-                                pre_inline_cids.append(
-                                    {"cid": cid, "filename": None, "s3_key": None}
-                                )
-                                body = body.replace(src, f"cid:{cid}")
-                                logger.info(
-                                    f"[Message {msg_idx}] Inlined data URI as CID <{cid}>"
-                                )
-
-                    # HTTP/HTTPS URL
-                    elif src.lower().startswith("http://") or src.lower().startswith(
-                        "https://"
-                    ):
-                        try:
-                            req = urllib.request.Request(
-                                src, headers={"User-Agent": "aws-ses-inline-agent/1.0"}
-                            )
-                            with urllib.request.urlopen(req, timeout=8) as resp:
-                                data_bytes = resp.read()
-                                content_type = (
-                                    resp.headers.get("Content-Type")
-                                    or mimetypes.guess_type(src)[0]
-                                    or "application/octet-stream"
-                                )
-                            maintype, subtype = (
-                                content_type.split("/", 1)
-                                if "/" in content_type
-                                else ("application", "octet-stream")
-                            )
-                            if maintype.lower() == "image":
-                                try:
-                                    img_part = MIMEImage(data_bytes, _subtype=subtype)
-                                except Exception:
-                                    img_part = MIMEBase(maintype, subtype)
-                                    img_part.set_payload(data_bytes)
-                                    encoders.encode_base64(img_part)
-                                cid = f"inline-http-{i_src}-{int(time.time())}@inline"
-                                img_part.add_header("Content-ID", f"<{cid}>")
-                                img_part.add_header(
-                                    "Content-Disposition",
-                                    "inline",
-                                    filename=os.path.basename(src),
-                                )
-                                pre_inline_parts.append(img_part)
-                                pre_inline_cids.append(
-                                    {
-                                        "cid": cid,
-                                        "filename": os.path.basename(src),
-                                        "s3_key": None,
-                                    }
-                                )
-                                body = body.replace(src, f"cid:{cid}")
-                                logger.info(
-                                    f"[Message {msg_idx}] Downloaded and inlined HTTP image as CID <{cid}>"
-                                )
-                        except Exception as http_err:
-                            logger.warning(
-                                f"[Message {msg_idx}] Failed to download image {src}: {str(http_err)}"
-                            )
-
-                    # S3-like references - now includes simple S3 key paths
-                    elif (
-                        src.startswith("s3://")
-                        or (
-                            ATTACHMENTS_BUCKET in src
-                            and ("s3.amazonaws.com" in src or src.startswith("/"))
-                        )
-                        or src.startswith("campaign-attachments/")
-                        or src.startswith("email-previews/")
-                    ):
-                        s3_key_candidate = None
-                        try:
-                            if src.startswith("s3://"):
-                                parts = src.split("/", 3)
-                                s3_key_candidate = parts[3] if len(parts) > 3 else None
-                            elif "s3.amazonaws.com" in src:
-                                parts = src.split("/", 3)
-                                s3_key_candidate = parts[3] if len(parts) > 3 else None
-                            elif src.startswith(
-                                "campaign-attachments/"
-                            ) or src.startswith("email-previews/"):
-                                # Direct S3 key path from frontend
-                                s3_key_candidate = src
-                                logger.info(
-                                    f"[Message {msg_idx}] Detected inline S3 key: {s3_key_candidate}"
-                                )
-                            else:
-                                s3_key_candidate = src.lstrip("/")
-
-                            if s3_key_candidate:
-                                try:
-                                    s3_resp = s3_client.get_object(
-                                        Bucket=ATTACHMENTS_BUCKET, Key=s3_key_candidate
-                                    )
-                                    data_bytes = s3_resp["Body"].read()
-                                    content_type = (
-                                        s3_resp.get("ContentType")
-                                        or mimetypes.guess_type(s3_key_candidate)[0]
-                                        or "application/octet-stream"
-                                    )
-                                    maintype, subtype = (
-                                        content_type.split("/", 1)
-                                        if "/" in content_type
-                                        else ("application", "octet-stream")
-                                    )
-                                    if maintype.lower() == "image":
-                                        try:
-                                            img_part = MIMEImage(
-                                                data_bytes, _subtype=subtype
-                                            )
-                                        except Exception:
-                                            img_part = MIMEBase(maintype, subtype)
-                                            img_part.set_payload(data_bytes)
-                                            encoders.encode_base64(img_part)
-                                        cid = f"inline-s3-{i_src}-{int(time.time())}@inline"
-                                        img_part.add_header("Content-ID", f"<{cid}>")
-                                        img_part.add_header(
-                                            "Content-Disposition",
-                                            "inline",
-                                            filename=os.path.basename(s3_key_candidate),
-                                        )
-                                        pre_inline_parts.append(img_part)
-                                        pre_inline_cids.append(
-                                            {
-                                                "cid": cid,
-                                                "filename": os.path.basename(
-                                                    s3_key_candidate
-                                                ),
-                                                "s3_key": s3_key_candidate,
-                                            }
-                                        )
-                                        body = body.replace(src, f"cid:{cid}")
-                                        logger.info(
-                                            f"[Message {msg_idx}] Inlined S3 image {s3_key_candidate} as CID <{cid}>"
-                                        )
-                                except Exception as s3_err:
-                                    logger.warning(
-                                        f"[Message {msg_idx}] Could not retrieve S3 object {s3_key_candidate}: {str(s3_err)}"
-                                    )
-                        except Exception:
-                            continue
-
-                    else:
-                        logger.debug(
-                            f"[Message {msg_idx}] Found image src that may be matched to attachments later: {src}"
-                        )
-
-                except Exception as single_err:
-                    logger.warning(
-                        f"[Message {msg_idx}] Error inlining image {src}: {str(single_err)}"
-                    )
-                    continue
+            for src, img_part, part_meta in inline_image_cache.resolve(
+                campaign, body, msg_idx
+            ):
+                pre_inline_parts.append(img_part)
+                pre_inline_cids.append(part_meta)
+                body = body.replace(src, f"cid:{part_meta['cid']}")
         except Exception as inline_err:
             logger.warning(
                 f"[Message {msg_idx}] Failed to scan/inline images: {str(inline_err)}"
@@ -1341,11 +4035,6 @@ def send_ses_email(
             f"[Message {msg_idx}] Building MIME message with {len(attachments)} attachment(s) and {len(pre_inline_parts)} pre-inlined HTML image(s)"
         )
 
-        msg = MIMEMultipart("mixed")
-        msg["From"] = from_email
-        msg["To"] = contact["email"]
-        msg["Subject"] = subject
-        
         # 🚨 VALIDATION: Check if To field is valid
         to_email = contact.get("email", "").strip()
         if not to_email or "@" not in to_email:
@@ -1375,153 +4064,20 @@ def send_ses_email(
             
             return False  # Don't send the email
 
-        # Add Cc header for recipients (BCC must not appear in headers)
-        if cc_list:
-            msg["Cc"] = ", ".join(cc_list)
-        
         # DEBUG: Print To, CC, BCC for raw email (with attachments)
         logger.info(f"[Message {msg_idx}] 📧 EMAIL HEADERS (Raw Email with Attachments):")
         logger.info(f"[Message {msg_idx}]   To: {contact['email']}")
         logger.info(f"[Message {msg_idx}]   CC: {cc_list}")
         logger.info(f"[Message {msg_idx}]   BCC: {bcc_list}")
-        logger.info(f"[Message {msg_idx}]   MIME CC Header: {msg.get('Cc', 'None')}")
-
-        # multipart/related container for HTML body and inline images
-        related = MIMEMultipart("related")
-
-        # HTML part (attach first to related) - use an alternative container for future extensibility
-        # IMPORTANT: use a binary/base64-encoded MIME part for HTML to avoid
-        # quoted-printable soft-wrapping which can introduce visible newlines
-        # in some mail clients (notably Outlook). We create a MIMEBase('text','html')
-        # payload and base64-encode it explicitly.
-        alternative = MIMEMultipart("alternative")
-        try:
-            html_part = MIMEBase("text", "html")
-            html_bytes = (body or "").encode("utf-8")
-            html_part.set_payload(html_bytes)
-            encoders.encode_base64(html_part)
-            # Ensure the charset is visible in the Content-Type header
-            html_part.add_header("Content-Type", 'text/html; charset="utf-8"')
-            # Mark as inline (it's the main HTML body)
-            html_part.add_header("Content-Disposition", "inline")
-        except Exception:
-            # Fallback: if anything goes wrong, use MIMEText
-            html_part = MIMEText(body, "html", "utf-8")
-
-        alternative.attach(html_part)
-        related.attach(alternative)
-
-        # Attach any pre-inlined parts (downloaded data:, http(s), s3 images from HTML scanning)
-        already_inlined_s3_keys = set()
-        already_inlined_filenames = set()
-        for part_meta, ppart in zip(pre_inline_cids, pre_inline_parts):
-            try:
-                related.attach(ppart)
-            except Exception as p_attach_err:
-                logger.warning(
-                    f"[Message {msg_idx}] Failed to attach pre-inlined part: {str(p_attach_err)}"
-                )
-            s3_k = part_meta.get("s3_key")
-            fname = part_meta.get("filename")
-            if s3_k:
-                already_inlined_s3_keys.add(s3_k)
-            if fname:
-                already_inlined_filenames.add(fname)
-
-        inline_cids = []
-        other_parts = []
-
-        # Download and classify attachments from S3
-        for a_idx, attachment in enumerate(attachments, 1):
-            s3_key = attachment.get("s3_key")
-            filename = attachment.get("filename")
-            is_inline = attachment.get(
-                "inline", False
-            )  # Check if this is an inline image
-
-            if not s3_key or not filename:
-                logger.warning(
-                    f"[Message {msg_idx}] Attachment {a_idx}: Missing s3_key or filename, skipping"
-                )
-                continue
-
-            # Skip attachments that were already inlined via HTML scanning
-            if (
-                s3_key in already_inlined_s3_keys
-                or filename in already_inlined_filenames
-            ):
-                logger.info(
-                    f"[Message {msg_idx}] Skipping attachment {filename} because it was already inlined from HTML"
-                )
-                continue
-
-            try:
-                logger.info(
-                    f"[Message {msg_idx}] Downloading attachment {a_idx}/{len(attachments)}: {filename} from S3 (inline={is_inline})"
-                )
-                logger.debug(
-                    f"[Message {msg_idx}] S3 bucket: {ATTACHMENTS_BUCKET}, key: {s3_key}"
-                )
-
-                s3_response = s3_client.get_object(
-                    Bucket=ATTACHMENTS_BUCKET, Key=s3_key
-                )
-                file_data = s3_response["Body"].read()
-                logger.info(
-                    f"[Message {msg_idx}] Downloaded {len(file_data)} bytes for {filename}"
-                )
-
-                content_type = (
-                    attachment.get("type")
-                    or s3_response.get("ContentType")
-                    or "application/octet-stream"
-                )
-                maintype, subtype = (
-                    content_type.split("/", 1)
-                    if "/" in content_type
-                    else ("application", "octet-stream")
-                )
-
-                # Treat images as inline if flagged or detected by content type
-                if maintype.lower() == "image" or is_inline:
-                    cid = f"{filename.replace(' ', '_')}-{a_idx}-{int(time.time())}@inline"
-                    try:
-                        img_part = MIMEImage(file_data, _subtype=subtype)
-                    except Exception:
-                        img_part = MIMEImage(file_data)
-                    img_part.add_header("Content-ID", f"<{cid}>")
-                    img_part.add_header(
-                        "Content-Disposition", "inline", filename=filename
-                    )
-                    related.attach(img_part)
-                    inline_cids.append(
-                        {"cid": cid, "filename": filename, "s3_key": s3_key}
-                    )
-                    logger.info(
-                        f"[Message {msg_idx}] Attached image {filename} as inline CID <{cid}> (from S3)"
-                    )
-                else:
-                    part = MIMEBase(maintype, subtype)
-                    part.set_payload(file_data)
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        "Content-Disposition", f'attachment; filename="{filename}"'
-                    )
-                    other_parts.append(part)
-                    logger.info(
-                        f"[Message {msg_idx}] Prepared non-image attachment {filename}"
-                    )
-
-            except Exception as attachment_error:
-                logger.error(
-                    f"[Message {msg_idx}] Error downloading/processing attachment {filename}: {str(attachment_error)}"
-                )
-                # Continue with other attachments even if one fails
+        # Cc header for recipients is added by the skeleton (BCC must not appear in headers)
+        logger.info(f"[Message {msg_idx}]   MIME CC Header: {', '.join(cc_list) if cc_list else 'None'}")
 
-        # Attach related (HTML + inline images) to root, then any other attachments
-        msg.attach(related)
-        for p in other_parts:
-            msg.attach(p)
+        # Attachment and inline image parts are encoded once per campaign; only the
+        # headers and the personalized HTML part are built for this recipient
+        skeleton = mime_skeleton_cache.get(
+            campaign, attachments, pre_inline_parts, pre_inline_cids, msg_idx
+        )
+        inline_cids = skeleton.inline_cids
 
         logger.info(
             f"[Message {msg_idx}] Calling SES send_raw_email API with {len(attachments)} attachment(s)"
@@ -1542,6 +4098,7 @@ def send_ses_email(
         logger.info(f"[Message {msg_idx}]   Note: CC/BCC recipients shown in email body only")
 
         # Attempt to rewrite HTML body references to S3 keys or filenames to cid: references
+        html_body = body
         try:
             new_body = body  # Use email body directly
             replacements_made = 0
@@ -1717,32 +4274,14 @@ def send_ses_email(
                         )
 
             if new_body != body:
-                # Replace the HTML part inside the alternative container explicitly
-                try:
-                    try:
-                        new_html_part = MIMEBase("text", "html")
-                        new_html_bytes = (new_body or "").encode("utf-8")
-                        new_html_part.set_payload(new_html_bytes)
-                        encoders.encode_base64(new_html_part)
-                        new_html_part.add_header(
-                            "Content-Type", 'text/html; charset="utf-8"'
-                        )
-                        new_html_part.add_header("Content-Disposition", "inline")
-                    except Exception:
-                        new_html_part = MIMEText(new_body, "html", "utf-8")
-
-                    # alternative._payload[0] is the HTML part we originally attached
-                    alternative._payload[0] = new_html_part
-                    print(
-                        f"✅ [Message {msg_idx}] Successfully updated HTML body with CID references ({replacements_made} replacements)"
-                    )
-                    logger.info(
-                        f"[Message {msg_idx}] ✅ Successfully updated HTML body with CID references ({replacements_made} replacements)"
-                    )
-                except Exception as replace_error:
-                    logger.warning(
-                        f"[Message {msg_idx}] Could not replace alternative payload directly: {str(replace_error)}"
-                    )
+                # The HTML part is encoded from html_body when the message is rendered
+                html_body = new_body
+                print(
+                    f"✅ [Message {msg_idx}] Successfully updated HTML body with CID references ({replacements_made} replacements)"
+                )
+                logger.info(
+                    f"[Message {msg_idx}] ✅ Successfully updated HTML body with CID references ({replacements_made} replacements)"
+                )
             else:
                 print(
                     f"⚠️ [Message {msg_idx}] No replacements made - body unchanged. Images will appear as attachments!"
@@ -1758,13 +4297,18 @@ def send_ses_email(
 
             traceback.print_exc()
 
+        # Rendered into this thread's reusable buffer (no per-message MIME tree or copies)
+        raw_bytes = skeleton.render(
+            from_email, contact["email"], subject, html_body, cc_list,
+            out=get_render_buffer(),
+        )
+
         # Diagnostic: if this is the campaign the user reported, log a trimmed version of the raw MIME
         try:
             campaign_id = (
                 campaign.get("campaign_id") if isinstance(campaign, dict) else None
             )
             if campaign_id == "campaign_1759948233":
-                raw_bytes = msg.as_bytes()
                 try:
                     raw = raw_bytes.decode("utf-8")
                 except Exception:
@@ -1855,8 +4399,7 @@ def send_ses_email(
         # Print recipient addresses before calling SES
         print(f"📧✉️ *** To: [{contact['email']}], CC: {cc_list if cc_list else []}, BCC: {bcc_list if bcc_list else []}")
         
-        # Use as_bytes() to produce the raw MIME bytes for SES to avoid newline/line-ending surprises
-        raw_bytes = msg.as_bytes()
+        # raw_bytes is the streamed skeleton render above
         response = ses_client.send_raw_email(
             Source=from_email, Destinations=destinations, RawMessage={"Data": raw_bytes}
         )
@@ -1914,6 +4457,14 @@ def send_ses_email(
             logger.warning(
                 f"[Message {msg_idx}] ⚠️  SES throttling detected - rate limiting in effect"
             )
+        elif error_code in CREDENTIAL_ERROR_CODES:
+            # Rejected credentials: rebuild the pooled client on the next send
+            logger.warning(
+                f"[Message {msg_idx}] ⚠️  SES rejected client credentials ({error_code}) - dropping pooled client"
+            )
+            ses_client_registry.invalidate(
+                campaign.get("aws_region", "us-gov-west-1"), campaign.get("aws_secret_name")
+            )
 
         raise e
 
@@ -1924,12 +4475,185 @@ def send_ses_email(
         raise e
 
 
+class SMTPConnectionPool:
+    """Persistent SMTP connections per (host, port), reused across messages and warm invocations.
+
+    Each send checks a connection out, so concurrent sender threads use
+    separate connections, up to max_connections per relay. Connections idle
+    for longer than noop_after_idle_seconds are health-checked with NOOP
+    before reuse, and a connection is retired with QUIT after
+    max_messages_per_connection sends. A reused connection the relay has
+    already dropped is replaced once and the send retried.
+    """
+
+    def __init__(self):
+        self.max_connections = int(
+            os.environ.get("SMTP_POOL_MAX_CONNECTIONS", "4")
+        )  # Parallel connections per relay
+        self.max_messages_per_connection = int(
+            os.environ.get("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")
+        )  # Many relays cap messages per session
+        self.noop_after_idle_seconds = float(
+            os.environ.get("SMTP_NOOP_AFTER_IDLE_SECONDS", "10")
+        )  # Health-check connections idle longer than this
+        self.timeout = float(os.environ.get("SMTP_TIMEOUT_SECONDS", "30"))
+        self.checkout_timeout = float(
+            os.environ.get("SMTP_POOL_CHECKOUT_TIMEOUT_SECONDS", "30")
+        )
+
+        self._idle = {}  # (host, port) -> [entry, ...] most recently used last
+        self._open = {}  # (host, port) -> number of open connections
+        self._cond = threading.Condition()
+
+        self.connections_opened = 0
+        self.reuses = 0
+        self.reconnects = 0
+        self.retired = 0
+        self.noop_failures = 0
+
+        logger.info(
+            f"SMTP connection pool initialized: max_connections={self.max_connections}, max_messages_per_connection={self.max_messages_per_connection}, noop_after_idle={self.noop_after_idle_seconds}s"
+        )
+
+    def _connect(self, host, port):
+        server = smtplib.SMTP(host, port, timeout=self.timeout)
+        server.ehlo_or_helo_if_needed()
+        with self._cond:
+            self.connections_opened += 1
+        return {"server": server, "messages": 0, "last_used": time.time()}
+
+    def _close(self, key, entry, quit=False):
+        try:
+            if quit:
+                entry["server"].quit()
+            else:
+                entry["server"].close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open[key] = self._open.get(key, 1) - 1
+            self._cond.notify()
+
+    def _is_healthy(self, entry):
+        if time.time() - entry["last_used"] < self.noop_after_idle_seconds:
+            return True
+        try:
+            code, _ = entry["server"].noop()
+            if code == 250:
+                return True
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        with self._cond:
+            self.noop_failures += 1
+        return False
+
+    def _checkout(self, key):
+        deadline = time.time() + self.checkout_timeout
+        while True:
+            with self._cond:
+                idle = self._idle.get(key)
+                if idle:
+                    entry = idle.pop()
+                elif self._open.get(key, 0) < self.max_connections:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    entry = None
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise smtplib.SMTPConnectError(
+                            421, f"No SMTP connection to {key[0]}:{key[1]} free after {self.checkout_timeout}s"
+                        )
+                    self._cond.wait(remaining)
+                    continue
+
+            if entry is None:
+                try:
+                    return self._connect(*key)
+                except Exception:
+                    with self._cond:
+                        self._open[key] -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(entry):
+                with self._cond:
+                    self.reuses += 1
+                return entry
+            self._close(key, entry)
+
+    def _checkin(self, key, entry):
+        entry["last_used"] = time.time()
+        if entry["messages"] >= self.max_messages_per_connection:
+            with self._cond:
+                self.retired += 1
+            self._close(key, entry, quit=True)
+            return
+        with self._cond:
+            self._idle.setdefault(key, []).append(entry)
+            self._cond.notify()
+
+    def send(self, host, port, send):
+        """Call send(server) on a pooled connection and return its result"""
+        key = (host, int(port))
+        for attempt in range(2):
+            entry = self._checkout(key)
+            try:
+                result = send(entry["server"])
+            except smtplib.SMTPServerDisconnected:
+                self._close(key, entry)
+                if attempt == 0 and entry["messages"] > 0:
+                    # The relay dropped a connection we had used before - retry once on a fresh one
+                    with self._cond:
+                        self.reconnects += 1
+                    continue
+                raise
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # smtplib resets the session after these (or closes it on a 421)
+                entry["messages"] += 1
+                if getattr(entry["server"], "sock", None) is None:
+                    self._close(key, entry)
+                else:
+                    self._checkin(key, entry)
+                raise
+            except Exception:
+                self._close(key, entry)
+                raise
+
+            entry["messages"] += 1
+            self._checkin(key, entry)
+            return result
+
+    def close_all(self):
+        with self._cond:
+            idle = [(key, entry) for key, entries in self._idle.items() for entry in entries]
+            self._idle = {}
+        for key, entry in idle:
+            self._close(key, entry, quit=True)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "open": sum(self._open.values()),
+                "idle": sum(len(entries) for entries in self._idle.values()),
+                "connections_opened": self.connections_opened,
+                "reuses": self.reuses,
+                "reconnects": self.reconnects,
+                "retired": self.retired,
+                "noop_failures": self.noop_failures,
+            }
+
+
+# Global SMTP connection pool (persists across warm invocations)
+smtp_pool = SMTPConnectionPool()
+
+
 def send_smtp_email(
     campaign, contact, from_email, subject, body, msg_idx=0, cc_list=None, bcc_list=None
 ):
     """Send email via SMTP"""
     try:
-        import smtplib
         from email.mime.multipart import MIMEMultipart
         from email.mime.text import MIMEText
 
@@ -1937,7 +4661,7 @@ def send_smtp_email(
         smtp_port = int(campaign.get("smtp_port", 25))
 
         logger.info(
-            f"[Message {msg_idx}] Connecting to SMTP server: {smtp_server}:{smtp_port}"
+            f"[Message {msg_idx}] Using pooled SMTP connection to: {smtp_server}:{smtp_port}"
         )
 
         msg = MIMEMultipart()
@@ -1982,7 +4706,23 @@ def send_smtp_email(
         if cc_list:
             msg["Cc"] = ", ".join(cc_list)
 
-        msg.attach(MIMEText(body, "html"))
+        # Attachment campaigns reuse the same streamed MIME skeleton as the SES raw path
+        attachments = campaign.get("attachments") or []
+        raw_message = None
+        if attachments:
+            skeleton = mime_skeleton_cache.get(campaign, attachments, [], [], msg_idx)
+            html_body = body
+            for entry in skeleton.inline_cids:
+                for reference in (entry.get("s3_key"), entry.get("filename")):
+                    if reference and reference in html_body:
+                        html_body = html_body.replace(reference, f"cid:{entry['cid']}")
+                        break
+            raw_message = skeleton.render(
+                from_email, contact["email"], subject, html_body, cc_list,
+                out=get_render_buffer(),
+            )
+        else:
+            msg.attach(MIMEText(body, "html"))
 
         logger.debug(f"[Message {msg_idx}] SMTP message prepared")
 
@@ -1994,11 +4734,16 @@ def send_smtp_email(
         # Print recipient addresses before calling SMTP
         print(f"📧✉️ *** To: [{contact['email']}], CC: {cc_list if cc_list else []}, BCC: {bcc_list if bcc_list else []}")
 
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
+        def deliver(server):
             logger.info(
                 f"[Message {msg_idx}] Sending via SMTP to envelope recipients: {len(envelope_recipients)}"
             )
-            server.send_message(msg, from_addr=from_email, to_addrs=envelope_recipients)
+            if raw_message is not None:
+                return server.sendmail(from_email, envelope_recipients, raw_message)
+            return server.send_message(msg, from_addr=from_email, to_addrs=envelope_recipients)
+
+        # Pooled connection: no TCP connect/EHLO/QUIT per message
+        smtp_pool.send(smtp_server, smtp_port, deliver)
 
         logger.info(f"[Message {msg_idx}] SMTP send successful")
         return True
@@ -2124,42 +4869,96 @@ def clean_quill_html_for_email(html_content):
     return html_content
 
 
+# Placeholders that read a different contact attribute than their name
+PLACEHOLDER_ALIASES = {
+    "company": "agency_name",  # Legacy support
+}
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{([A-Za-z_][A-Za-z0-9_]*)\}\}")
+
+
+class CompiledTemplate:
+    """Campaign subject/body cleaned once and split into literal and placeholder segments.
+
+    Segments alternate literal text (even indexes) and contact attribute names
+    (odd indexes), so rendering a recipient is a single join instead of a
+    regex clean-up plus one str.replace per supported field.
+    """
+
+    __slots__ = ("segments", "fields")
+
+    def __init__(self, content):
+        cleaned = clean_quill_html_for_email(content)
+        self.segments = PLACEHOLDER_PATTERN.split(cleaned)
+        self.fields = [
+            PLACEHOLDER_ALIASES.get(name, name) for name in self.segments[1::2]
+        ]
+
+    def render(self, contact):
+        if not self.fields:
+            return self.segments[0]
+
+        parts = list(self.segments)
+        for i, field in enumerate(self.fields):
+            value = contact.get(field)
+            parts[2 * i + 1] = "" if value is None else str(value)
+        return "".join(parts)
+
+
+class TemplateCache:
+    """LRU of compiled templates keyed by a hash of the campaign content"""
+
+    def __init__(self):
+        self.max_entries = int(
+            os.environ.get("TEMPLATE_CACHE_MAX_ENTRIES", "64")
+        )  # LRU bound (subject + body per campaign)
+
+        self._entries = OrderedDict()  # sha256 of content -> CompiledTemplate
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content):
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        # Compile outside the lock; a concurrent duplicate compile is harmless
+        template = CompiledTemplate(content)
+        with self._lock:
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+template_cache = TemplateCache()
+
+
 def personalize_content(content, contact):
-    """Replace placeholders with contact data - supports all CISA fields"""
+    """Replace {{field}} placeholders with contact data - supports any contact attribute"""
     if not content:
         return content
 
-    # Clean Quill HTML first to remove graphics
-    content = clean_quill_html_for_email(content)
-
-    # Basic contact info
-    content = content.replace("{{first_name}}", contact.get("first_name", ""))
-    content = content.replace("{{last_name}}", contact.get("last_name", ""))
-    content = content.replace("{{email}}", contact.get("email", ""))
-    content = content.replace("{{title}}", contact.get("title", ""))
-
-    # Organization info
-    content = content.replace("{{entity_type}}", contact.get("entity_type", ""))
-    content = content.replace("{{state}}", contact.get("state", ""))
-    content = content.replace("{{agency_name}}", contact.get("agency_name", ""))
-    content = content.replace("{{sector}}", contact.get("sector", ""))
-    content = content.replace("{{subsection}}", contact.get("subsection", ""))
-    content = content.replace("{{phone}}", contact.get("phone", ""))
-
-    # CISA-specific fields
-    content = content.replace("{{ms_isac_member}}", contact.get("ms_isac_member", ""))
-    content = content.replace("{{soc_call}}", contact.get("soc_call", ""))
-    content = content.replace("{{fusion_center}}", contact.get("fusion_center", ""))
-    content = content.replace("{{k12}}", contact.get("k12", ""))
-    content = content.replace(
-        "{{water_wastewater}}", contact.get("water_wastewater", "")
-    )
-    content = content.replace("{{weekly_rollup}}", contact.get("weekly_rollup", ""))
-    content = content.replace("{{alternate_email}}", contact.get("alternate_email", ""))
-    content = content.replace("{{region}}", contact.get("region", ""))
-    content = content.replace("{{group}}", contact.get("group", ""))
-
-    # Legacy support
-    content = content.replace("{{company}}", contact.get("agency_name", ""))
-
-    return content
\ No newline at end of file
+    # Quill clean-up and placeholder parsing happen once per distinct template
+    return template_cache.get(content).render(contact)
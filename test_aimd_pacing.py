@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the AIMD pacing engine in the email worker
+Tests quota seeding, additive increase, multiplicative decrease and slot spacing
+"""
+
+import sys
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _engine(max_send_rate=10.0):
+    from email_worker_lambda import AIMDPacingEngine
+
+    ses = MagicMock()
+    ses.get_send_quota.return_value = {"MaxSendRate": max_send_rate, "Max24HourSend": 50000.0}
+    engine = AIMDPacingEngine()
+    with patch("email_worker_lambda.boto3.client", return_value=ses):
+        engine.seed_from_send_quota()
+    return engine
+
+
+def test_seeded_from_send_quota():
+    """Starting rate is a fraction of the account MaxSendRate"""
+    print("🧪 Testing GetSendQuota Seeding...")
+
+    engine = _engine(max_send_rate=10.0)
+    print(f"  State: {engine.stats()}")
+    assert engine.max_rate == 10.0
+    assert engine.current_rate == 10.0 * engine.start_fraction
+    print("    ✅ PASS")
+
+
+def test_additive_increase_and_multiplicative_decrease():
+    """Successes add a constant; throttles halve the rate"""
+    print("🧪 Testing AIMD Rate Changes...")
+
+    from botocore.exceptions import ClientError
+
+    engine = _engine(max_send_rate=10.0)
+    start = engine.current_rate
+
+    for _ in range(5):
+        engine.record_success(0.15)
+    increased = engine.current_rate
+    assert abs(increased - (start + 5 * engine.increase_per_success)) < 1e-9
+
+    throttle = ClientError(
+        {"Error": {"Code": "Throttling", "Message": "Maximum sending rate exceeded."}},
+        "SendEmail",
+    )
+    assert engine.detect_throttle_exception(throttle)
+    engine.get_delay_for_email([], throttle)
+    assert abs(engine.current_rate - increased * engine.decrease_factor) < 1e-9
+
+    for _ in range(1000):
+        engine.record_success()
+    assert engine.current_rate == engine.max_rate
+    print("    ✅ PASS")
+
+
+def test_send_time_counts_towards_gap():
+    """No sleep is needed when the previous send already took longer than 1/rate"""
+    print("🧪 Testing Send Duration Accounting...")
+
+    engine = _engine(max_send_rate=10.0)  # starts at 5/s -> 0.2s spacing
+    now = time.time()
+
+    with patch("time.time", return_value=now):
+        first = engine.get_delay_for_email([])
+        second = engine.get_delay_for_email([])
+    with patch("time.time", return_value=now + 0.5):  # previous send took 0.5s
+        third = engine.get_delay_for_email([])
+
+    print(f"  Delays: {first:.3f}s, {second:.3f}s, {third:.3f}s")
+    assert first == 0
+    assert abs(second - 0.2) < 1e-6
+    assert third == 0
+    print("    ✅ PASS")
+
+
+def test_rate_control_mode_selection():
+    """RATE_CONTROL_MODE=adaptive keeps the legacy controller"""
+    print("🧪 Testing Rate Control Mode Selection...")
+
+    from email_worker_lambda import create_rate_control, AdaptiveRateControl, AIMDPacingEngine
+
+    with patch.dict(os.environ, {"RATE_CONTROL_MODE": "adaptive"}):
+        assert type(create_rate_control()) is AdaptiveRateControl
+    with patch.dict(os.environ, {"RATE_CONTROL_MODE": "aimd"}):
+        assert isinstance(create_rate_control(), AIMDPacingEngine)
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 AIMD Pacing Engine Test Suite")
+    print("=" * 50)
+
+    test_seeded_from_send_quota()
+    test_additive_increase_and_multiplicative_decrease()
+    test_send_time_counts_towards_gap()
+    test_rate_control_mode_selection()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Test script for asynchronous campaign fan-out in the API Lambda
+Tests the 202 response, checkpointed slices, resumption in a new invocation
+and the progress view used by the UI
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the API Lambda
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from botocore.exceptions import ClientError
+
+
+class FakeCampaignsTable:
+    """Just enough of the EmailCampaigns table for the fan-out updates"""
+
+    def __init__(self, item):
+        self.item = dict(item)
+        self.checkpoints = []
+
+    def get_item(self, Key, **kwargs):
+        return {"Item": dict(self.item)}
+
+    def put_item(self, Item):
+        self.item = dict(Item)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        values = ExpressionAttributeValues
+        conflict = ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+        if ":expires" in values:
+            if self.item.get("enqueue_checkpoint") != values[":position"]:
+                raise conflict
+            if self.item.get("enqueue_claim_expires", 0) >= values[":now"]:
+                raise conflict
+            self.item.update(enqueue_claim_id=values[":claim_id"], enqueue_claim_expires=values[":expires"])
+        elif ":next" in values:
+            if self.item.get("enqueue_checkpoint") != values[":position"]:
+                raise conflict
+            if self.item.get("enqueue_claim_id") != values[":claim_id"]:
+                raise conflict
+            self.item.pop("enqueue_claim_id")
+            self.item.pop("enqueue_claim_expires")
+            self.checkpoints.append(values[":next"])
+            self.item.update(
+                enqueue_checkpoint=values[":next"],
+                enqueued_count=values[":enqueued"],
+                enqueue_failed_count=values[":failed"],
+                enqueue_status=values[":enqueuing"],
+            )
+        elif ":complete" in values:
+            self.item.update(queued_count=values[":queued"], enqueue_status=values[":complete"])
+        elif ":processing" in values:
+            self.item["status"] = values[":processing"]
+        elif ":completed_status" in values:
+            self.item["status"] = values[":completed_status"]
+            self.item.update(
+                {key[1:]: value for key, value in values.items() if key in (":sent_count", ":failed_count")}
+            )
+        return {"Attributes": dict(self.item)}
+
+
+def _ok_sqs():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    return sqs
+
+
+def _campaign(count):
+    return {
+        "campaign_id": "campaign_1",
+        "status": "queued",
+        "target_contacts": [f"u{i}@example.com" for i in range(count)],
+        "cc": ["boss@example.com"],
+        "enqueue_status": "pending",
+        "enqueue_checkpoint": 0,
+        "enqueued_count": 0,
+        "enqueue_failed_count": 0,
+    }
+
+
+def test_post_campaign_returns_202():
+    """The campaign is stored and the fan-out is handed to an async invocation"""
+    print("🧪 Testing 202 Accepted...")
+
+    import bulk_email_api_lambda as api
+
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    table = FakeCampaignsTable({})
+    lambda_client = MagicMock()
+    sqs = _ok_sqs()
+    body = {"subject": "Hi", "body": "<p>Hi</p>", "target_contacts": ["a@example.com", "b@example.com"]}
+
+    with patch.object(api, "ASYNC_CAMPAIGN_FANOUT", True), patch.object(
+        api, "email_config_table", config_table
+    ), patch.object(api, "campaigns_table", table), patch.object(
+        api, "lambda_client", lambda_client
+    ), patch.object(api, "sqs_client", sqs), patch.dict(
+        os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "BulkEmailAPI"}
+    ):
+        response = api.send_campaign(body, {}, {})
+
+    result = json.loads(response["body"])
+    assert response["statusCode"] == 202
+    assert result["enqueue_status"] == "pending" and result["enqueue_total"] == 2
+    payload = json.loads(lambda_client.invoke.call_args.kwargs["Payload"])
+    assert payload == {"action": "fanout_campaign", "campaign_id": result["campaign_id"]}
+    assert lambda_client.invoke.call_args.kwargs["InvocationType"] == "Event"
+    assert table.item["enqueue_checkpoint"] == 0
+    sqs.send_message_batch.assert_not_called()
+    print("    ✅ PASS")
+
+
+def test_fanout_checkpoints_and_resumes():
+    """Slices are checkpointed; a low time budget hands the rest to a new invocation"""
+    print("🧪 Testing Checkpointed Fan-Out...")
+
+    import bulk_email_api_lambda as api
+
+    table = FakeCampaignsTable(_campaign(5))  # 5 targets + 1 CC = 6 recipients
+    lambda_client = MagicMock()
+    sqs = _ok_sqs()
+    context = MagicMock()
+    context.get_remaining_time_in_millis.side_effect = [900000, 1000]
+
+    with patch.object(api, "campaigns_table", table), patch.object(
+        api, "lambda_client", lambda_client
+    ), patch.object(api, "sqs_client", sqs), patch.object(
+        api, "FANOUT_SLICE_RECIPIENTS", 4
+    ), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ), patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "BulkEmailAPI"}):
+        first = api.lambda_handler({"action": "fanout_campaign", "campaign_id": "campaign_1"}, context)
+        assert first["enqueue_status"] == "enqueuing" and table.checkpoints == [4]
+        lambda_client.invoke.assert_called_once()
+
+        # The follow-up invocation resumes from the stored checkpoint
+        second = api.run_campaign_fanout("campaign_1", context=None)
+
+    print(f"  Checkpoints: {table.checkpoints}")
+    assert table.checkpoints == [4, 6]
+    assert second["enqueue_status"] == "complete"
+    assert table.item["queued_count"] == 6 and table.item["status"] == "processing"
+    queued = [json.loads(e["MessageBody"])["contact_email"] for c in sqs.send_message_batch.call_args_list for e in c.kwargs["Entries"]]
+    assert len(queued) == len(set(queued)) == 6
+    print("    ✅ PASS")
+
+
+def test_duplicate_invocation_stops_on_moved_checkpoint():
+    """An invocation whose checkpoint was already advanced does not record progress twice"""
+    print("🧪 Testing Duplicate Invocation Guard...")
+
+    import bulk_email_api_lambda as api
+
+    stale = _campaign(3)
+    table = FakeCampaignsTable(dict(stale, enqueue_checkpoint=2, enqueued_count=2))
+
+    with patch.object(api, "campaigns_table", table), patch.object(api, "sqs_client", _ok_sqs()), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ):
+        progress = api.run_campaign_fanout("campaign_1", campaign=stale)
+
+    assert progress["enqueue_status"] == "pending"
+    assert table.item["enqueued_count"] == 2 and "queued_count" not in table.item
+    print("    ✅ PASS")
+
+
+def test_live_claim_stops_duplicate_before_enqueue():
+    """A duplicate invocation does not enqueue a slice another invocation has claimed"""
+    print("🧪 Testing Slice Claim...")
+
+    import time
+    import bulk_email_api_lambda as api
+
+    claimed = dict(_campaign(3), enqueue_claim_id="other", enqueue_claim_expires=int(time.time()) + 60)
+    table = FakeCampaignsTable(claimed)
+    sqs = _ok_sqs()
+
+    # Without time to outlast the claim the invocation fails, so Lambda retries it later
+    with patch.object(api, "campaigns_table", table), patch.object(api, "sqs_client", sqs), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ):
+        try:
+            api.run_campaign_fanout("campaign_1", campaign=claimed)
+            assert False, "expected the live claim to raise"
+        except RuntimeError as e:
+            assert "claimed by another invocation" in str(e)
+
+    sqs.send_message_batch.assert_not_called()
+    assert table.item["enqueue_claim_id"] == "other"
+
+    # With time left it waits for the claim to expire (its holder died mid-slice) and takes over
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 900000
+
+    def expire_claim(seconds):
+        assert 0 < seconds <= 61
+        table.item["enqueue_claim_expires"] = int(time.time()) - 1
+
+    with patch.object(api, "campaigns_table", table), patch.object(api, "sqs_client", sqs), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ), patch("bulk_email_api_lambda.time.sleep", side_effect=expire_claim) as sleep:
+        progress = api.run_campaign_fanout("campaign_1", context)
+
+    sleep.assert_called_once()
+    assert progress["enqueue_status"] == "complete" and table.checkpoints == [4]
+    assert "enqueue_claim_id" not in table.item
+
+    # An expired claim is taken over straight away
+    table = FakeCampaignsTable(dict(claimed, enqueue_claim_expires=int(time.time()) - 1))
+    with patch.object(api, "campaigns_table", table), patch.object(api, "sqs_client", _ok_sqs()), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ):
+        progress = api.run_campaign_fanout("campaign_1")
+
+    assert progress["enqueue_status"] == "complete" and table.checkpoints == [4]
+    print("    ✅ PASS")
+
+
+def test_sharded_campaign_completed_from_shard_sums():
+    """Workers that finished before queued_count was set are caught by summing the shards"""
+    print("🧪 Testing Sharded Fan-Out Completion...")
+
+    from decimal import Decimal
+    import bulk_email_api_lambda as api
+
+    table = FakeCampaignsTable(dict(_campaign(3), counter_shards=2))
+    dynamodb = MagicMock()
+    dynamodb.batch_get_item.return_value = {
+        "Responses": {
+            api.CAMPAIGN_COUNTERS_TABLE: [
+                {"sent_count": Decimal("3"), "failed_count": Decimal("0")},
+                {"sent_count": Decimal("0"), "failed_count": Decimal("1")},
+            ]
+        }
+    }
+
+    with patch.object(api, "campaigns_table", table), patch.object(api, "sqs_client", _ok_sqs()), patch.object(
+        api, "counters_table", MagicMock()
+    ), patch.object(api, "dynamodb", dynamodb), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ):
+        api.run_campaign_fanout("campaign_1")
+
+    assert table.item["status"] == "completed"
+    assert table.item["sent_count"] == 3 and table.item["failed_count"] == 1
+    print("    ✅ PASS")
+
+
+def test_progress_view_projects_counters():
+    """?view=progress reads only the counter attributes"""
+    print("🧪 Testing Progress View...")
+
+    import bulk_email_api_lambda as api
+
+    table = MagicMock()
+    table.get_item.return_value = {"Item": {"campaign_id": "campaign_1", "enqueue_status": "enqueuing", "enqueued_count": 40}}
+    event = {"queryStringParameters": {"view": "progress"}}
+
+    with patch.object(api, "campaigns_table", table):
+        response = api.get_campaign_status("campaign_1", {}, event)
+
+    assert json.loads(response["body"])["enqueued_count"] == 40
+    names = table.get_item.call_args.kwargs["ExpressionAttributeNames"].values()
+    assert "target_contacts" not in names and "enqueue_status" in names
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Async Campaign Fan-Out Test Suite")
+    print("=" * 50)
+
+    test_post_campaign_returns_202()
+    test_fanout_checkpoints_and_resumes()
+    test_duplicate_invocation_stops_on_moved_checkpoint()
+    test_live_claim_stops_duplicate_before_enqueue()
+    test_sharded_campaign_completed_from_shard_sums()
+    test_progress_view_projects_counters()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
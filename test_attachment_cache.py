@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for the /tmp attachment cache in the email worker
+Uses a local in-memory S3 stand-in to check cached reads, ETag changes and eviction
+"""
+
+import sys
+import os
+import io
+import hashlib
+import tempfile
+from unittest.mock import patch
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class LocalS3:
+    """Minimal get_object/head_object stand-in backed by a dict"""
+
+    def __init__(self):
+        self.objects = {}
+        self.get_calls = 0
+        self.head_calls = 0
+
+    def put(self, bucket, key, data, content_type="application/pdf"):
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+        self.objects[(bucket, key)] = (data, content_type, etag)
+
+    def get_object(self, Bucket, Key):
+        self.get_calls += 1
+        data, content_type, etag = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(data), "ContentType": content_type, "ETag": etag}
+
+    def head_object(self, Bucket, Key):
+        self.head_calls += 1
+        data, content_type, etag = self.objects[(Bucket, Key)]
+        return {"ContentType": content_type, "ETag": etag, "ContentLength": len(data)}
+
+
+def _cache(tmp_dir, **env):
+    from email_worker_lambda import AttachmentCache
+
+    settings = {"ATTACHMENT_CACHE_DIR": tmp_dir}
+    settings.update(env)
+    with patch.dict(os.environ, settings):
+        return AttachmentCache()
+
+
+def test_repeat_reads_served_from_tmp():
+    """Only the first recipient downloads the attachment"""
+    print("🧪 Testing Cached Reads...")
+
+    import email_worker_lambda as worker
+
+    s3 = LocalS3()
+    payload = os.urandom(256 * 1024)
+    s3.put("bucket", "campaign-attachments/report.pdf", payload)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, patch.object(worker, "s3_client", s3):
+        cache = _cache(tmp_dir)
+        results = [cache.fetch("bucket", "campaign-attachments/report.pdf") for _ in range(5)]
+        stats = cache.stats()
+
+    assert all(data == payload and ctype == "application/pdf" for data, ctype in results)
+    assert s3.get_calls == 1
+    assert stats["hits"] == 4 and stats["bytes_saved"] == 4 * len(payload)
+    print(f"  Stats: {stats}")
+    print("    ✅ PASS")
+
+
+def test_changed_etag_is_refetched():
+    """A re-uploaded object is detected on revalidation and not served stale"""
+    print("🧪 Testing ETag Revalidation...")
+
+    import email_worker_lambda as worker
+
+    s3 = LocalS3()
+    s3.put("bucket", "logo.png", b"old", "image/png")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, patch.object(worker, "s3_client", s3):
+        cache = _cache(tmp_dir, ATTACHMENT_CACHE_REVALIDATE_SECONDS="0")
+        assert cache.fetch("bucket", "logo.png")[0] == b"old"
+        s3.put("bucket", "logo.png", b"new", "image/png")
+        assert cache.fetch("bucket", "logo.png")[0] == b"new"
+        assert cache.fetch("bucket", "logo.png")[0] == b"new"
+
+    assert s3.get_calls == 2 and s3.head_calls == 2
+    print("    ✅ PASS")
+
+
+def test_lru_eviction_respects_byte_cap():
+    """Least recently used files are deleted to stay under the byte cap"""
+    print("🧪 Testing LRU Eviction...")
+
+    import email_worker_lambda as worker
+
+    s3 = LocalS3()
+    for name in ("a", "b", "c"):
+        s3.put("bucket", name, name.encode() * 400)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, patch.object(worker, "s3_client", s3):
+        cache = _cache(tmp_dir, ATTACHMENT_CACHE_MAX_BYTES="1000")
+        cache.fetch("bucket", "a")
+        cache.fetch("bucket", "b")
+        cache.fetch("bucket", "a")  # a is now most recently used
+        cache.fetch("bucket", "c")  # evicts b
+        files_on_disk = len(os.listdir(tmp_dir))
+        stats = cache.stats()
+        cache.fetch("bucket", "a")
+
+    print(f"  Stats: {stats}")
+    assert stats["bytes"] <= 1000 and stats["evictions"] == 1
+    assert files_on_disk == 2
+    assert s3.get_calls == 3
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Attachment Cache Test Suite")
+    print("=" * 50)
+
+    test_repeat_reads_served_from_tmp()
+    test_changed_etag_is_refetched()
+    test_lru_eviction_respects_byte_cap()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for batched, parallel SQS enqueue in send_campaign
+Tests batch sizing, retry of failed entries, accurate counts and queue URL caching
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the API Lambda
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _campaign_body(count):
+    return {
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "target_contacts": [f"u{i}@example.com" for i in range(count)],
+    }
+
+
+def _send_campaign(body, sqs):
+    import bulk_email_api_lambda as api
+
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    campaigns = MagicMock()
+
+    with patch.object(api, "email_config_table", config_table), patch.object(
+        api, "campaigns_table", campaigns
+    ), patch.object(api, "sqs_client", sqs), patch(
+        "bulk_email_api_lambda.time.sleep"
+    ):
+        response = api.send_campaign(body, {}, {})
+    return json.loads(response["body"]), campaigns
+
+
+def test_batches_of_ten_and_cached_queue_url():
+    """25 recipients take 3 batch calls; the queue URL is looked up once per container"""
+    print("🧪 Testing Batched Enqueue...")
+
+    import bulk_email_api_lambda as api
+
+    sqs = MagicMock()
+    sqs.get_queue_url.return_value = {"QueueUrl": "https://queue"}
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+
+    with patch.dict(api.queue_url_cache, clear=True):
+        first, _ = _send_campaign(_campaign_body(25), sqs)
+        second, campaigns = _send_campaign(_campaign_body(3), sqs)
+
+    sizes = sorted(len(c.kwargs["Entries"]) for c in sqs.send_message_batch.call_args_list)
+    print(f"  Batch sizes: {sizes}")
+    assert sizes == [3, 5, 10, 10]
+    assert first["queued_count"] == 25 and first["failed_to_queue"] == 0
+    assert second["queued_count"] == 3
+    sqs.get_queue_url.assert_called_once()
+    sqs.send_message.assert_not_called()
+    status_update = campaigns.update_item.call_args.kwargs["ExpressionAttributeValues"]
+    assert status_update[":queued"] == 3
+    print("    ✅ PASS")
+
+
+def test_failed_entries_retried_and_counted():
+    """Transient entry failures are retried; sender faults and exhausted retries are counted as failed"""
+    print("🧪 Testing Enqueue Retries...")
+
+    import bulk_email_api_lambda as api
+
+    calls = []
+
+    def flaky(QueueUrl, Entries):
+        calls.append([e["Id"] for e in Entries])
+        if len(calls) == 1:
+            # First attempt: entry 0 is malformed, entries 1 and 2 are throttled
+            return {
+                "Successful": [{"Id": e["Id"]} for e in Entries[3:]],
+                "Failed": [
+                    {"Id": "0", "SenderFault": True, "Code": "InvalidMessageContents"},
+                    {"Id": "1", "SenderFault": False, "Code": "InternalError"},
+                    {"Id": "2", "SenderFault": False, "Code": "InternalError"},
+                ],
+            }
+        if len(calls) == 2:
+            return {"Successful": [{"Id": "1"}], "Failed": [{"Id": "2", "SenderFault": False}]}
+        raise RuntimeError("network down")
+
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = flaky
+
+    with patch.dict(api.queue_url_cache, {"bulk-email-queue": "https://queue"}), patch.object(
+        api, "SQS_ENQUEUE_WORKERS", 1
+    ):
+        result, _ = _send_campaign(_campaign_body(6), sqs)
+
+    print(f"  Attempts: {calls}")
+    assert calls[1] == ["1", "2"] and calls[2] == ["2"]
+    assert len(calls) == api.SQS_ENQUEUE_MAX_ATTEMPTS
+    assert result["queued_count"] == 4 and result["failed_to_queue"] == 2
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Batched Enqueue Test Suite")
+    print("=" * 50)
+
+    test_batches_of_ten_and_cached_queue_url()
+    test_failed_entries_retried_and_counted()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test script for the SES bulk templated send path in the email worker
+Tests template eligibility, per-destination status mapping and per-message fallback
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _campaign(**overrides):
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hello {{first_name}}",
+        "body": "<p>Dear {{first_name}} at {{company}}</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    campaign.update(overrides)
+    return campaign
+
+
+def _event(*emails):
+    return {
+        "Records": [
+            {
+                "messageId": f"m-{email}",
+                "body": json.dumps({"campaign_id": "c1", "contact_email": email}),
+            }
+            for email in emails
+        ]
+    }
+
+
+def _run(event, ses, campaign=None, send=None):
+    import email_worker_lambda as worker
+
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    contacts = {
+        "a@example.com": {"email": "a@example.com", "first_name": "Ann", "agency_name": "DOT"},
+        "b@example.com": {"email": "b@example.com", "first_name": "Bob"},
+    }
+    table = MagicMock()
+    table.update_item.return_value = {}
+
+    with patch.object(worker, "ses_bulk_templates", worker.SESBulkTemplateRegistry()), patch.object(
+        worker.ses_bulk_templates, "enabled", True
+    ), patch.object(
+        worker.campaign_cache, "get", return_value=campaign or _campaign()
+    ), patch.object(
+        worker, "prefetch_contacts", return_value=contacts
+    ), patch.object(
+        worker, "lookup_contact", return_value=None
+    ), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker.ses_client_registry, "get_client", return_value=ses
+    ), patch.object(
+        worker, "send_ses_email", send or MagicMock(return_value=True)
+    ), patch.object(
+        worker, "campaigns_table", table
+    ), patch.object(
+        worker, "campaign_counts_table", table
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        return worker.lambda_handler(event, context), table
+
+
+def test_template_uses_triple_stache_placeholders():
+    """Placeholders become unescaped Handlebars fields; the CC footer is literal"""
+    print("🧪 Testing Template Compilation...")
+
+    from email_worker_lambda import SESBulkTemplateRegistry
+
+    registry = SESBulkTemplateRegistry()
+    template = registry.build(_campaign(cc=["boss@example.com"]))
+
+    print(f"  Template: {template}")
+    assert template["subject"] == "Hello {{{first_name}}}"
+    assert "{{{agency_name}}}" in template["html"]
+    assert template["html"].endswith("Emails CC'd: boss@example.com<br><br>")
+    assert template["fields"] == ["agency_name", "first_name"]
+    assert template["name"].startswith("bulk-c1-") and len(template["name"]) <= 64
+    print("    ✅ PASS")
+
+
+def test_ineligible_campaigns_use_per_message_path():
+    """Attachments, images, SMTP and stray braces keep the existing send path"""
+    print("🧪 Testing Bulk Eligibility...")
+
+    from email_worker_lambda import SESBulkTemplateRegistry
+
+    registry = SESBulkTemplateRegistry()
+    assert registry.build(_campaign(attachments=[{"s3_key": "a.pdf"}])) is None
+    assert registry.build(_campaign(body='<img src="https://x/y.png">')) is None
+    assert registry.build(_campaign(email_service="smtp")) is None
+    assert registry.build(_campaign(body="<p>{{ not a field }}</p>")) is None
+    print("    ✅ PASS")
+
+
+def test_destination_statuses_map_to_records():
+    """One API call; transient statuses are redelivered, rejections are counted as failed"""
+    print("🧪 Testing Per-Destination Status Mapping...")
+
+    ses = MagicMock()
+    ses.send_bulk_templated_email.return_value = {
+        "Status": [
+            {"Status": "Success", "MessageId": "1"},
+            {"Status": "TransientFailure", "Error": "try again"},
+            {"Status": "MessageRejected", "Error": "bad address"},
+        ]
+    }
+
+    response, table = _run(_event("a@example.com", "b@example.com", "c@example.com"), ses)
+    body = json.loads(response["body"])
+
+    assert ses.send_bulk_templated_email.call_count == 1
+    ses.create_template.assert_called_once()
+    call = ses.send_bulk_templated_email.call_args.kwargs
+    data = [json.loads(d["ReplacementTemplateData"]) for d in call["Destinations"]]
+    assert data[0] == {"agency_name": "DOT", "first_name": "Ann"}
+    assert data[2] == {"agency_name": "", "first_name": ""}
+
+    print(f"  batchItemFailures: {response['batchItemFailures']}")
+    assert response["batchItemFailures"] == [{"itemIdentifier": "m-b@example.com"}]
+    assert body["successful"] == 1 and body["failed"] == 1 and body["retrying"] == 1
+    values = table.update_item.call_args_list[0].kwargs["ExpressionAttributeValues"]
+    assert values[":sent"] == 1 and values[":failed"] == 1
+    print("    ✅ PASS")
+
+
+def test_failed_and_missing_statuses_not_resent():
+    """"Failed" is permanent and a destination with no status is not resent blindly"""
+    print("🧪 Testing Failed And Missing Statuses...")
+
+    ses = MagicMock()
+    ses.send_bulk_templated_email.return_value = {
+        "Status": [
+            {"Status": "Success", "MessageId": "1"},
+            {"Status": "Failed", "Error": "unknown error"},
+        ]
+    }
+
+    response, table = _run(_event("a@example.com", "b@example.com", "c@example.com"), ses)
+    body = json.loads(response["body"])
+
+    assert response["batchItemFailures"] == []
+    assert body["successful"] == 1 and body["failed"] == 2 and body["retrying"] == 0
+    assert any("Unknown send status for c@example.com" in error for error in body["errors"])
+    values = table.update_item.call_args_list[0].kwargs["ExpressionAttributeValues"]
+    assert values[":sent"] == 1 and values[":failed"] == 2
+    print("    ✅ PASS")
+
+
+def test_rejected_template_falls_back_to_per_message_sends():
+    """A non-retryable bulk call error sends every record through process_message"""
+    print("🧪 Testing Per-Message Fallback...")
+
+    from botocore.exceptions import ClientError
+
+    ses = MagicMock()
+    ses.create_template.side_effect = ClientError(
+        {"Error": {"Code": "InvalidTemplate", "Message": "too large"}}, "CreateTemplate"
+    )
+    send = MagicMock(return_value=True)
+
+    response, _ = _run(_event("a@example.com", "b@example.com"), ses, send=send)
+    body = json.loads(response["body"])
+
+    ses.send_bulk_templated_email.assert_not_called()
+    assert send.call_count == 2
+    assert body["successful"] == 2 and response["batchItemFailures"] == []
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 SES Bulk Templated Send Test Suite")
+    print("=" * 50)
+
+    test_template_uses_triple_stache_placeholders()
+    test_ineligible_campaigns_use_per_message_path()
+    test_destination_statuses_map_to_records()
+    test_failed_and_missing_statuses_not_resent()
+    test_rejected_template_falls_back_to_per_message_sends()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the email worker's warm-container campaign cache
+Tests cache hits, TTL expiry, LRU eviction and status-change invalidation
+"""
+
+import sys
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _fake_table(items):
+    """Build a mock campaigns table backed by a dict of campaign items"""
+    table = MagicMock()
+
+    def get_item(Key, **kwargs):
+        item = items.get(Key["campaign_id"])
+        if item is None:
+            return {}
+        if "ProjectionExpression" in kwargs:
+            return {"Item": {"status": item.get("status")}}
+        return {"Item": dict(item)}
+
+    table.get_item.side_effect = get_item
+    return table
+
+
+def test_cache_hits_and_misses():
+    """Repeated lookups for one campaign should hit DynamoDB once"""
+    print("🧪 Testing Campaign Cache Hits...")
+
+    from email_worker_lambda import CampaignCache
+    from decimal import Decimal
+
+    items = {"c1": {"campaign_id": "c1", "status": "sending", "queued_count": Decimal("10")}}
+    table = _fake_table(items)
+
+    with patch("email_worker_lambda.campaigns_table", table):
+        cache = CampaignCache()
+        for _ in range(10):
+            campaign = cache.get("c1")
+
+    assert campaign["queued_count"] == 10 and isinstance(campaign["queued_count"], int)
+    assert table.get_item.call_count == 1
+    stats = cache.stats()
+    print(f"  Stats: {stats}")
+    assert stats["hits"] == 9 and stats["misses"] == 1
+    print("    ✅ PASS")
+
+
+def test_missing_campaign_not_cached():
+    """Unknown campaigns return None and are not stored"""
+    print("🧪 Testing Missing Campaign...")
+
+    from email_worker_lambda import CampaignCache
+
+    with patch("email_worker_lambda.campaigns_table", _fake_table({})):
+        cache = CampaignCache()
+        assert cache.get("missing") is None
+        assert cache.stats()["entries"] == 0
+    print("    ✅ PASS")
+
+
+def test_ttl_expiry():
+    """Entries older than the TTL are re-read"""
+    print("🧪 Testing TTL Expiry...")
+
+    from email_worker_lambda import CampaignCache
+
+    table = _fake_table({"c1": {"campaign_id": "c1", "status": "sending"}})
+    with patch("email_worker_lambda.campaigns_table", table):
+        cache = CampaignCache()
+        cache.get("c1")
+        with patch("time.time", return_value=time.time() + cache.ttl_seconds + 1):
+            cache.get("c1")
+
+    assert cache.stats()["misses"] == 2
+    print("    ✅ PASS")
+
+
+def test_lru_eviction():
+    """The least recently used campaign is evicted first"""
+    print("🧪 Testing LRU Eviction...")
+
+    from email_worker_lambda import CampaignCache
+
+    items = {f"c{i}": {"campaign_id": f"c{i}", "status": "sending"} for i in range(3)}
+    with patch("email_worker_lambda.campaigns_table", _fake_table(items)):
+        cache = CampaignCache()
+        cache.max_entries = 2
+        cache.get("c0")
+        cache.get("c1")
+        cache.get("c0")  # c1 is now least recently used
+        cache.get("c2")
+
+    assert "c1" not in cache._entries
+    assert "c0" in cache._entries and "c2" in cache._entries
+    assert cache.stats()["evictions"] == 1
+    print("    ✅ PASS")
+
+
+def test_status_change_invalidates():
+    """A status change seen by the projection read drops the cached item"""
+    print("🧪 Testing Status Change Invalidation...")
+
+    from email_worker_lambda import CampaignCache
+
+    items = {"c1": {"campaign_id": "c1", "status": "sending"}}
+    table = _fake_table(items)
+    with patch("email_worker_lambda.campaigns_table", table):
+        cache = CampaignCache()
+        cache.get("c1")
+        items["c1"]["status"] = "paused"
+        with patch("time.time", return_value=time.time() + cache.status_check_seconds + 1):
+            campaign = cache.get("c1")
+
+    assert campaign["status"] == "paused"
+    assert cache.stats()["invalidations"] == 1
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Campaign Cache Test Suite")
+    print("=" * 50)
+
+    test_cache_hits_and_misses()
+    test_missing_campaign_not_cached()
+    test_ttl_expiry()
+    test_lru_eviction()
+    test_status_change_invalidates()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
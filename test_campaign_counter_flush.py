@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Test script for per-invocation campaign counter aggregation in the email worker
+Tests one update per campaign, completion detection from the update response
+and that unwritten counts never cause a resend
+"""
+
+import sys
+import os
+import json
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_batch_makes_one_update_per_campaign():
+    """Ten messages for one campaign produce a single counter update and no reads"""
+    print("🧪 Testing Counter Aggregation...")
+
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    event = {
+        "Records": [
+            {"messageId": f"m{i}", "body": json.dumps({"campaign_id": "c1", "contact_email": f"u{i}@example.com"})}
+            for i in range(10)
+        ]
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    table = MagicMock()
+    table.update_item.return_value = {
+        "Attributes": {"sent_count": Decimal("9"), "failed_count": Decimal("1"), "queued_count": Decimal("50")}
+    }
+
+    def fake_send(campaign, contact, *args, **kwargs):
+        return contact["email"] != "u3@example.com"
+
+    with patch.object(worker.campaign_cache, "get", return_value=campaign), patch.object(
+        worker, "prefetch_contacts", return_value={}
+    ), patch.object(worker, "lookup_contact", return_value=None), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker, "send_ses_email", side_effect=fake_send
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", table
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        worker.lambda_handler(event, context)
+
+    assert table.update_item.call_count == 1
+    values = table.update_item.call_args.kwargs["ExpressionAttributeValues"]
+    assert values[":sent"] == 9 and values[":failed"] == 1
+    assert table.update_item.call_args.kwargs["ReturnValues"] == "UPDATED_NEW"
+    print("    ✅ PASS")
+
+
+def test_completion_detected_from_update_response():
+    """When the returned counters reach queued_count the campaign is marked completed"""
+    print("🧪 Testing Completion Detection...")
+
+    import email_worker_lambda as worker
+
+    counts = MagicMock()
+    counts.update_item.return_value = {
+        "Attributes": {"sent_count": Decimal("48"), "failed_count": Decimal("2"), "queued_count": Decimal("50")}
+    }
+    table = MagicMock()
+
+    with patch.object(worker, "campaigns_table", table), patch.object(
+        worker, "campaign_counts_table", counts
+    ), patch.object(
+        worker.campaign_cache, "invalidate"
+    ) as invalidate:
+        worker.flush_campaign_counters({"c1": {"sent": 3, "failed": 0}})
+
+    completion = table.update_item.call_args.kwargs
+    assert completion["ExpressionAttributeValues"][":completed_status"] == "completed"
+    assert "ConditionExpression" in completion
+    table.get_item.assert_not_called()
+    counts.get_item.assert_not_called()
+    invalidate.assert_called_once_with("c1")
+    print("    ✅ PASS")
+
+
+def _throttle():
+    from botocore.exceptions import ClientError
+
+    return ClientError(
+        {"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "slow down"}}, "UpdateItem"
+    )
+
+
+def test_counter_write_retried_then_reported():
+    """Throttled counter writes are retried; if they keep failing the counts are reported, not the messages"""
+    print("🧪 Testing Counter Write Retry...")
+
+    import email_worker_lambda as worker
+
+    table = MagicMock()
+    table.update_item.side_effect = [
+        _throttle(),
+        {"Attributes": {"sent_count": Decimal("1"), "failed_count": Decimal("0"), "queued_count": Decimal("50")}},
+    ]
+    with patch.object(worker, "campaign_counts_table", table), patch("email_worker_lambda.time.sleep"):
+        assert worker.flush_campaign_counters({"c1": {"sent": 1, "failed": 0}}) == []
+    assert table.update_item.call_count == 2
+
+    campaign = {"campaign_id": "c1", "subject": "Hi", "body": "<p>Hi</p>", "from_email": "sender@example.com"}
+    event = {
+        "Records": [
+            {"messageId": f"m{i}", "body": json.dumps({"campaign_id": "c1", "contact_email": f"u{i}@example.com"})}
+            for i in range(3)
+        ]
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    table = MagicMock()
+    table.update_item.side_effect = _throttle()
+
+    with patch.object(worker.campaign_cache, "get", return_value=campaign), patch.object(
+        worker, "prefetch_contacts", return_value={}
+    ), patch.object(worker.rate_control, "get_delay_for_email", return_value=0), patch.object(
+        worker, "send_ses_email", return_value=True
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", table
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ) as metric, patch(
+        "email_worker_lambda.time.sleep"
+    ):
+        response = worker.lambda_handler(event, context)
+
+    print(f"  Update attempts: {table.update_item.call_count}")
+    assert table.update_item.call_count == worker.COUNTER_UPDATE_MAX_ATTEMPTS
+    # The emails went out, so they must not be sent again
+    assert response["batchItemFailures"] == []
+    assert any(
+        c.args[:2] == ("UnflushedCampaignCounts", 3) for c in metric.call_args_list
+    )
+    print("    ✅ PASS")
+
+
+def test_ambiguous_counter_error_not_retried():
+    """A timeout or 5xx may have applied the ADD, so the write is not repeated"""
+    print("🧪 Testing Ambiguous Counter Error...")
+
+    import email_worker_lambda as worker
+    from botocore.exceptions import ClientError, ReadTimeoutError
+
+    for error in (
+        ReadTimeoutError(endpoint_url="https://dynamodb"),
+        ClientError({"Error": {"Code": "InternalServerError", "Message": "oops"}}, "UpdateItem"),
+    ):
+        table = MagicMock()
+        table.update_item.side_effect = error
+        with patch.object(worker, "campaign_counts_table", table), patch(
+            "email_worker_lambda.time.sleep"
+        ):
+            unflushed = worker.flush_campaign_counters({"c1": {"sent": 2, "failed": 1}})
+        assert table.update_item.call_count == 1
+        assert unflushed == [{"campaign_id": "c1", "shard": None, "sent": 2, "failed": 1}]
+
+    assert worker.counter_dynamodb.meta.client.meta.config.retries["total_max_attempts"] == 1
+    print("    ✅ PASS")
+
+
+def test_permanent_error_counts_as_failed():
+    """A non-retryable exception is counted in the campaign's failed total"""
+    print("🧪 Testing Permanent Failure Count...")
+
+    import email_worker_lambda as worker
+
+    campaign = {"campaign_id": "c1", "subject": "Hi", "body": "<p>Hi</p>", "from_email": "sender@example.com"}
+    event = {"Records": [{"messageId": "m1", "body": json.dumps({"campaign_id": "c1", "contact_email": "a@example.com"})}]}
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    table = MagicMock()
+    table.update_item.return_value = {"Attributes": {}}
+
+    with patch.object(worker.campaign_cache, "get", return_value=campaign), patch.object(
+        worker, "prefetch_contacts", return_value={}
+    ), patch.object(worker.rate_control, "get_delay_for_email", return_value=0), patch.object(
+        worker, "send_ses_email", side_effect=ValueError("Invalid recipient")
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", table
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        response = worker.lambda_handler(event, context)
+
+    values = table.update_item.call_args.kwargs["ExpressionAttributeValues"]
+    assert values[":failed"] == 1 and values[":sent"] == 0
+    assert response["batchItemFailures"] == []
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Campaign Counter Flush Test Suite")
+    print("=" * 50)
+
+    test_batch_makes_one_update_per_campaign()
+    test_completion_detected_from_update_response()
+    test_counter_write_retried_then_reported()
+    test_ambiguous_counter_error_not_retried()
+    test_permanent_error_counts_as_failed()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the summary projection used by GET /campaigns
+Tests that list reads project only summary fields, that the listing index
+stores the same fields, and that GET /campaign/{id} still returns the full item
+"""
+
+import sys
+import os
+import re
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the API Lambda
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_FIELDS = {"body", "target_contacts", "to", "cc", "bcc", "attachments", "recipient_manifest", "font_usage"}
+
+
+def _projected_names(kwargs):
+    names = kwargs["ExpressionAttributeNames"]
+    return {names[token.strip()] for token in kwargs["ProjectionExpression"].split(",")}
+
+
+def test_list_reads_project_summary_fields():
+    """Index query and scan fallback both read only summary attributes"""
+    print("🧪 Testing List Projection...")
+
+    import bulk_email_api_lambda as api
+
+    table = MagicMock()
+    table.query.return_value = {"Items": [{"campaign_id": "c1", "campaign_name": "Hi"}]}
+    with patch.object(api, "campaigns_table", table):
+        response = api.get_campaigns({}, {})
+
+    projected = _projected_names(table.query.call_args.kwargs)
+    print(f"  Projected: {sorted(projected)}")
+    assert {"campaign_name", "subject", "status", "created_at", "sent_count", "cc_count"} <= projected
+    assert not projected & HEAVY_FIELDS
+    assert json.loads(response["body"])["campaigns"] == [{"campaign_id": "c1", "campaign_name": "Hi"}]
+
+    # Scan fallback (index unavailable) and search use the same projection
+    table = MagicMock()
+    table.query.side_effect = RuntimeError("no index")
+    table.scan.return_value = {"Items": []}
+    with patch.object(api, "campaigns_table", table), patch.object(api, "CAMPAIGN_SEARCH_TABLE", ""):
+        api.get_campaigns({}, {})
+        api.get_campaigns({}, {"queryStringParameters": {"q": "hello"}})
+    for call in table.scan.call_args_list:
+        assert _projected_names(call.kwargs) == set(api.CAMPAIGN_SUMMARY_ATTRIBUTES)
+    print("    ✅ PASS")
+
+
+def test_index_projection_matches_summary_fields():
+    """template.yaml and the table scripts project the summary fields from campaign_summary.py"""
+    print("🧪 Testing Index Projection...")
+
+    import add_campaign_list_index
+    import bulk_email_api_lambda as api
+    import campaign_summary
+    import dynamodb_campaigns_table
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.yaml")) as f:
+        template = f.read()
+    section = template.split("IndexName: CampaignsByCreatedAt", 1)[1].split("StreamSpecification", 1)[0]
+    assert re.search(r"^\s+ProjectionType: INCLUDE$", section, re.M)
+    included = re.findall(r"^\s+- (\w+)$", section.split("NonKeyAttributes:", 1)[1], re.M)
+
+    assert included == campaign_summary.CAMPAIGN_LIST_INDEX_ATTRIBUTES
+    keys = set(campaign_summary.CAMPAIGN_LIST_INDEX_KEYS)
+    assert set(included) | keys == set(api.CAMPAIGN_SUMMARY_ATTRIBUTES) | keys
+
+    # The table scripts build the same index from the shared list rather than a copy
+    for module in (add_campaign_list_index, dynamodb_campaigns_table):
+        assert module.CAMPAIGN_LIST_INDEX_ATTRIBUTES is campaign_summary.CAMPAIGN_LIST_INDEX_ATTRIBUTES
+    print("    ✅ PASS")
+
+
+def test_campaign_detail_returns_full_item():
+    """GET /campaign/{id} is where the heavy fields are read"""
+    print("🧪 Testing Campaign Detail...")
+
+    import bulk_email_api_lambda as api
+
+    table = MagicMock()
+    table.get_item.return_value = {"Item": {"campaign_id": "c1", "body": "<p>Hi</p>", "cc": ["boss@example.com"]}}
+    with patch.object(api, "campaigns_table", table):
+        response = api.get_campaign_status("c1", {}, {})
+
+    assert json.loads(response["body"])["body"] == "<p>Hi</p>"
+    assert "ProjectionExpression" not in table.get_item.call_args.kwargs
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Campaign List Projection Test Suite")
+    print("=" * 50)
+
+    test_list_reads_project_summary_fields()
+    test_index_projection_matches_summary_fields()
+    test_campaign_detail_returns_full_item()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for the time-ordered campaign listing behind GET /campaigns
+Tests the index query, opaque cursor pagination, the listing key written by
+send_campaign and the scan fallback when the index is missing
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the API Lambda
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from botocore.exceptions import ClientError
+
+
+class FakeListingIndex:
+    """Query over (list_pk, created_at) with Limit and ExclusiveStartKey"""
+
+    def __init__(self, count):
+        self.items = [
+            {"campaign_id": f"campaign_{i}", "list_pk": "campaigns", "created_at": f"2026-01-01T{i // 60:02d}:{i % 60:02d}:00"}
+            for i in range(count)
+        ]
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        ordered = sorted(self.items, key=lambda it: it["created_at"], reverse=not kwargs["ScanIndexForward"])
+        start = 0
+        if "ExclusiveStartKey" in kwargs:
+            start = [it["campaign_id"] for it in ordered].index(kwargs["ExclusiveStartKey"]["campaign_id"]) + 1
+        page = ordered[start : start + kwargs["Limit"]]
+        response = {"Items": page}
+        if start + kwargs["Limit"] < len(ordered):
+            last = page[-1]
+            response["LastEvaluatedKey"] = {k: last[k] for k in ("campaign_id", "list_pk", "created_at")}
+        return response
+
+    def scan(self, **kwargs):
+        raise AssertionError("listing must not scan the table")
+
+
+def _page(api, table, token=None):
+    event = {"queryStringParameters": {"next": token} if token else None}
+    with patch.object(api, "campaigns_table", table):
+        return json.loads(api.get_campaigns({}, event)["body"])
+
+
+def test_pages_follow_cursor_newest_first():
+    """Each page is one Query; the cursor resumes exactly where the last page ended"""
+    print("🧪 Testing Cursor Pagination...")
+
+    import bulk_email_api_lambda as api
+
+    table = FakeListingIndex(120)
+    first = _page(api, table)
+    second = _page(api, table, first["next"])
+    third = _page(api, table, second["next"])
+
+    ids = [c["campaign_id"] for page in (first, second, third) for c in page["campaigns"]]
+    assert ids == [f"campaign_{i}" for i in range(119, -1, -1)]
+    assert [first["count"], second["count"], third["count"]] == [50, 50, 20]
+    assert third["next"] is None
+    assert all(c["IndexName"] == "CampaignsByCreatedAt" and c["Limit"] == 50 for c in table.calls)
+    assert not first["next"].startswith("{")  # opaque, not raw JSON
+    print("    ✅ PASS")
+
+
+def test_stale_offset_token_restarts_listing():
+    """A token from the old offset pagination starts again from the newest campaign"""
+    print("🧪 Testing Stale Token...")
+
+    import bulk_email_api_lambda as api
+
+    table = FakeListingIndex(3)
+    page = _page(api, table, json.dumps({"offset": 50}))
+    assert page["campaigns"][0]["campaign_id"] == "campaign_2"
+    assert "ExclusiveStartKey" not in table.calls[0]
+    print("    ✅ PASS")
+
+
+def test_missing_index_falls_back_to_scan():
+    """Without the index the listing still works from a scan"""
+    print("🧪 Testing Scan Fallback...")
+
+    import bulk_email_api_lambda as api
+
+    table = MagicMock()
+    table.query.side_effect = ClientError(
+        {"Error": {"Code": "ValidationException", "Message": "no such index"}}, "Query"
+    )
+    table.scan.return_value = {
+        "Items": [
+            {"campaign_id": "old", "created_at": "2025-01-01T00:00:00"},
+            {"campaign_id": "preview_1", "status": "preview", "created_at": "2026-01-01T00:00:00"},
+            {"campaign_id": "new", "created_at": "2026-01-01T00:00:00"},
+        ]
+    }
+    page = _page(api, table)
+    assert [c["campaign_id"] for c in page["campaigns"]] == ["new", "old"]
+    print("    ✅ PASS")
+
+
+def test_send_campaign_writes_listing_key():
+    """New campaigns carry list_pk so they appear in the sparse index"""
+    print("🧪 Testing Listing Key...")
+
+    import bulk_email_api_lambda as api
+
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    campaigns_table = MagicMock()
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    body = {"subject": "Hi", "body": "<p>Hi</p>", "target_contacts": ["a@example.com"]}
+
+    with patch.object(api, "email_config_table", config_table), patch.object(
+        api, "campaigns_table", campaigns_table
+    ), patch.object(api, "sqs_client", sqs), patch.dict(api.queue_url_cache, {"bulk-email-queue": "https://queue"}):
+        api.send_campaign(body, {}, {})
+
+    item = campaigns_table.put_item.call_args.kwargs["Item"]
+    assert item["list_pk"] == "campaigns" and item["created_at"]
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Campaign Listing Test Suite")
+    print("=" * 50)
+
+    test_pages_follow_cursor_newest_first()
+    test_stale_offset_token_restarts_listing()
+    test_missing_index_falls_back_to_scan()
+    test_send_campaign_writes_listing_key()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
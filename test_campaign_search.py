@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test script for campaign search through the inverted token index
+Tests prefix matching, multi-term AND, recency order, cursor pagination and
+indexing on campaign creation
+"""
+
+import sys
+import os
+import json
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the API Lambda
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeSearchTokensTable:
+    """EmailCampaignSearchTokens: batch_writer puts and newest-first queries on one token"""
+
+    def __init__(self):
+        self.rows = {}
+        self.queries = []
+
+    @contextmanager
+    def batch_writer(self):
+        yield self
+
+    def put_item(self, Item):
+        self.rows[(Item["token"], Item["sort_key"])] = Item
+
+    def query(self, ExpressionAttributeValues, ScanIndexForward, Limit, ExclusiveStartKey=None, **kwargs):
+        self.queries.append(ExpressionAttributeValues[":token"])
+        rows = sorted(
+            (row for (token, _), row in self.rows.items() if token == ExpressionAttributeValues[":token"]),
+            key=lambda row: row["sort_key"],
+            reverse=not ScanIndexForward,
+        )
+        if ExclusiveStartKey:
+            rows = [row for row in rows if row["sort_key"] < ExclusiveStartKey["sort_key"]]
+        response = {"Items": rows[:Limit]}
+        if len(rows) > Limit:
+            last = rows[Limit - 1]
+            response["LastEvaluatedKey"] = {"token": last["token"], "sort_key": last["sort_key"]}
+        return response
+
+
+class FakeDynamoDB:
+    """batch_get_item over a dict of campaign summaries"""
+
+    def __init__(self, campaigns):
+        self.campaigns = campaigns
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        items = [self.campaigns[key["campaign_id"]] for key in request["Keys"] if key["campaign_id"] in self.campaigns]
+        return {"Responses": {table_name: items}, "UnprocessedKeys": {}}
+
+
+CAMPAIGNS = [
+    ("Quarterly Report", "Q1 results are in"),
+    ("Weekly rollup", "Quarterly planning"),
+    ("Holiday notice", "Office closed"),
+    ("Quarterly Report", "Q2 results"),
+    ("Security advisory", "Patch now: report issues"),
+]
+
+
+def _indexed(api, campaigns=CAMPAIGNS):
+    table = FakeSearchTokensTable()
+    summaries = {}
+    with patch.object(api, "search_tokens_table", table):
+        for i, (name, subject) in enumerate(campaigns):
+            campaign = {
+                "campaign_id": f"campaign_{i}",
+                "campaign_name": name,
+                "subject": subject,
+                "created_at": f"2026-01-01T{i // 60:02d}:{i % 60:02d}:00",
+            }
+            api.index_campaign_for_search(campaign)
+            summaries[campaign["campaign_id"]] = campaign
+    return table, FakeDynamoDB(summaries)
+
+
+def _search(api, table, fake_dynamodb, q, token=None):
+    params = {"q": q}
+    if token:
+        params["next"] = token
+    campaigns_table = MagicMock()
+    campaigns_table.name = "EmailCampaigns"
+    campaigns_table.scan.side_effect = AssertionError("search must not scan the campaigns table")
+    with patch.object(api, "search_tokens_table", table), patch.object(api, "dynamodb", fake_dynamodb), patch.object(
+        api, "campaigns_table", campaigns_table
+    ):
+        return json.loads(api.get_campaigns({}, {"queryStringParameters": params})["body"])
+
+
+def test_prefix_and_multi_term_queries():
+    """Terms match token prefixes; every term must match; newest campaigns first"""
+    print("🧪 Testing Prefix / AND Queries...")
+
+    import bulk_email_api_lambda as api
+
+    table, fake_dynamodb = _indexed(api)
+
+    def ids(q):
+        return [c["campaign_id"] for c in _search(api, table, fake_dynamodb, q)["campaigns"]]
+
+    print(f"  'quart': {ids('quart')}")
+    assert ids("quart") == ["campaign_3", "campaign_1", "campaign_0"]
+    assert ids("Quarterly report") == ["campaign_3", "campaign_0"]
+    assert ids("rep") == ["campaign_4", "campaign_3", "campaign_0"]
+    assert ids("report holiday") == []
+    assert ids("port") == []  # prefix matching, not substring
+    assert ids("q2 quarterly") == ["campaign_3"]
+    assert table.queries[-1] == "quarterly"  # the longest term drives the index query
+    print("    ✅ PASS")
+
+
+def test_cursor_pagination():
+    """Pages of 50 follow an opaque cursor without repeats or gaps"""
+    print("🧪 Testing Search Cursor...")
+
+    import bulk_email_api_lambda as api
+
+    campaigns = [(f"Newsletter {i}", "Monthly update" if i % 3 else "Annual update") for i in range(130)]
+    table, fake_dynamodb = _indexed(api, campaigns)
+
+    seen = []
+    token = None
+    pages = 0
+    while True:
+        page = _search(api, table, fake_dynamodb, "newsletter monthly", token)
+        seen.extend(c["campaign_id"] for c in page["campaigns"])
+        pages += 1
+        token = page["next"]
+        if not token:
+            break
+
+    expected = [f"campaign_{i}" for i in range(129, -1, -1) if i % 3]
+    print(f"  {len(seen)} results in {pages} pages")
+    assert seen == expected
+    assert pages == 2
+    print("    ✅ PASS")
+
+
+def test_send_campaign_indexes_new_campaign():
+    """POST /campaign writes the search rows for the new campaign"""
+    print("🧪 Testing Index on Creation...")
+
+    import bulk_email_api_lambda as api
+
+    table = FakeSearchTokensTable()
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    body = {
+        "campaign_name": "Spring Bulletin",
+        "subject": "News",
+        "body": "<p>Hi</p>",
+        "target_contacts": ["a@example.com"],
+    }
+
+    with patch.object(api, "search_tokens_table", table), patch.object(
+        api, "email_config_table", config_table
+    ), patch.object(api, "campaigns_table", MagicMock()), patch.object(api, "sqs_client", sqs), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ):
+        response = api.send_campaign(body, {}, {})
+
+    campaign_id = json.loads(response["body"])["campaign_id"]
+    tokens = {token for token, _ in table.rows}
+    assert {"s", "spr", "spring", "bulletin", "news"} <= tokens
+    assert all(row["campaign_id"] == campaign_id for row in table.rows.values())
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Campaign Search Test Suite")
+    print("=" * 50)
+
+    test_prefix_and_multi_term_queries()
+    test_cursor_pagination()
+    test_send_campaign_indexes_new_campaign()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
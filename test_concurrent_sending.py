@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent sending inside one email worker invocation
+Tests that SEND_CONCURRENCY fans records out to threads and results are counted correctly
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _event(count):
+    return {
+        "Records": [
+            {
+                "messageId": f"m{i}",
+                "body": json.dumps(
+                    {"campaign_id": "c1", "contact_email": f"user{i}@example.com"}
+                ),
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def _run_handler(concurrency, count, send_side_effect):
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hello {{first_name}}",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "email_service": "ses",
+        "status": "sending",
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+
+    with patch.object(worker, "SEND_CONCURRENCY", concurrency), patch.object(
+        worker.campaign_cache, "get", return_value=campaign
+    ), patch.object(worker, "prefetch_contacts", return_value={}), patch.object(
+        worker, "lookup_contact", return_value=None
+    ), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker, "send_ses_email", side_effect=send_side_effect
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", MagicMock()
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        response = worker.lambda_handler(_event(count), context)
+
+    return json.loads(response["body"])
+
+
+def test_concurrent_sends_counted():
+    """All records are sent and counted when running on a thread pool"""
+    print("🧪 Testing Concurrent Sending...")
+
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_send(*args, **kwargs):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return True
+
+    results = _run_handler(4, 8, fake_send)
+
+    print(f"  Successful: {results['successful']}, peak concurrency: {active['peak']}")
+    assert results["successful"] == 8 and results["failed"] == 0
+    assert active["peak"] > 1
+    print("    ✅ PASS")
+
+
+def test_concurrent_failures_recorded():
+    """Send exceptions on worker threads are recorded as failures"""
+    print("🧪 Testing Concurrent Failures...")
+
+    def fake_send(campaign, contact, *args, **kwargs):
+        if contact["email"].startswith("user1"):
+            raise Exception("MessageRejected")
+        return True
+
+    results = _run_handler(3, 6, fake_send)
+
+    assert results["successful"] == 5 and results["failed"] == 1
+    assert len(results["errors"]) == 1
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Concurrent Sending Test Suite")
+    print("=" * 50)
+
+    test_concurrent_sends_counted()
+    test_concurrent_failures_recorded()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
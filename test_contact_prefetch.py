@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for batched contact lookup in the email worker
+Tests de-duplication, not-found handling and failed lookups
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _records(*emails):
+    return [
+        {"messageId": f"m{i}", "body": json.dumps({"campaign_id": "c1", "contact_email": e})}
+        for i, e in enumerate(emails)
+    ]
+
+
+def test_prefetch_resolves_unique_emails():
+    """Each distinct email in the batch is queried exactly once"""
+    print("🧪 Testing Contact Prefetch...")
+
+    from email_worker_lambda import prefetch_contacts
+
+    known = {"a@example.com": {"email": "a@example.com", "first_name": "Ann"}}
+    table = MagicMock()
+
+    def query(IndexName, KeyConditionExpression, Limit):
+        email = KeyConditionExpression.get_expression()["values"][1]
+        return {"Items": [known[email]] if email in known else []}
+
+    table.query.side_effect = query
+
+    records = _records("a@example.com", "b@example.com", "a@example.com")
+    records.append({"messageId": "bad", "body": "not json"})
+
+    with patch("email_worker_lambda.contacts_table", table):
+        contacts = prefetch_contacts(records)
+
+    print(f"  Resolved: {contacts}")
+    assert table.query.call_count == 2
+    assert contacts["a@example.com"]["first_name"] == "Ann"
+    assert contacts["b@example.com"] is None
+    print("    ✅ PASS")
+
+
+def test_prefetch_leaves_out_failed_lookups():
+    """Emails whose query raised are omitted so the worker can retry them"""
+    print("🧪 Testing Contact Prefetch Failure...")
+
+    from email_worker_lambda import prefetch_contacts
+
+    table = MagicMock()
+    table.query.side_effect = Exception("ProvisionedThroughputExceededException")
+
+    with patch("email_worker_lambda.contacts_table", table):
+        contacts = prefetch_contacts(_records("a@example.com"))
+
+    assert "a@example.com" not in contacts
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Contact Prefetch Test Suite")
+    print("=" * 50)
+
+    test_prefetch_resolves_unique_emails()
+    test_prefetch_leaves_out_failed_lookups()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test script for server-side contact segments in the API Lambda
+Tests the parallel segment scan, the /contacts/segment/count endpoint and
+POST /campaign resolving target_filters instead of a browser-built email list
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the API Lambda
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CONTACTS = [
+    {"email": "Ann@Example.com", "agency_name": "DOT", "state": "VA"},
+    {"email": "bob@example.com", "agency_name": "DOT", "state": "MD"},
+    {"email": "cat@example.com", "agency_name": "EPA", "state": "VA"},
+    {"email": "dan@example.com", "agency_name": "EPA", "state": "MD"},
+    {"email": "eve@example.com", "agency_name": "DHS", "state": "VA"},
+]
+
+
+def _matches(contact, filters):
+    return all(contact.get(f["field"]) in f["values"] for f in filters if f.get("field") and f.get("values"))
+
+
+class FakeContactsClient:
+    """Low-level DynamoDB scan over CONTACTS, split into segments and 2-item pages"""
+
+    def __init__(self, filters):
+        self.filters = filters
+        self.calls = []
+
+    def scan(self, **params):
+        self.calls.append(params)
+        segment_items = CONTACTS[params["Segment"] :: params["TotalSegments"]]
+        start = params.get("ExclusiveStartKey", {}).get("n", 0)
+        page = segment_items[start : start + 2]
+        matched = [c for c in page if _matches(c, self.filters)]
+        response = {"Count": len(matched)}
+        if params.get("Select") != "COUNT":
+            response["Items"] = [{"email": {"S": c["email"]}} for c in matched]
+        if start + 2 < len(segment_items):
+            response["LastEvaluatedKey"] = {"n": start + 2}
+        return response
+
+
+def _patched(api, client):
+    dynamodb = MagicMock()
+    dynamodb.meta.client = client
+    return patch.object(api, "dynamodb", dynamodb)
+
+
+def test_parallel_scan_resolves_segment():
+    """Every scan segment is read to the end and the emails are merged"""
+    print("🧪 Testing Parallel Segment Scan...")
+
+    import bulk_email_api_lambda as api
+
+    filters = [{"field": "state", "values": ["VA"]}, {"field": "agency_name", "values": ["DOT", "EPA"]}]
+    client = FakeContactsClient(filters)
+
+    with _patched(api, client), patch.object(api, "CONTACT_SEGMENT_SCAN_SEGMENTS", 2):
+        emails = api.scan_contact_segment(filters)
+
+    print(f"  Emails: {emails}")
+    assert emails == ["ann@example.com", "cat@example.com"]
+    assert sorted({(c["Segment"], c["TotalSegments"]) for c in client.calls}) == [(0, 2), (1, 2)]
+    assert len(client.calls) == 3  # segment 0 holds three contacts: two pages
+    first = client.calls[0]
+    assert first["ProjectionExpression"] == "#email"
+    assert first["FilterExpression"] == "(#field0 = :val0) AND (#field1 = :val1 OR #field1 = :val2)"
+    assert first["ExpressionAttributeValues"][":val0"] == {"S": "VA"}
+    print("    ✅ PASS")
+
+
+def test_segment_count_endpoint():
+    """POST /contacts/segment/count returns only the number of matching contacts"""
+    print("🧪 Testing Segment Count Endpoint...")
+
+    import bulk_email_api_lambda as api
+
+    filters = [{"field": "state", "values": ["MD"]}]
+    client = FakeContactsClient(filters)
+    event = {"path": "/contacts/segment/count", "httpMethod": "POST", "body": json.dumps({"filters": filters})}
+
+    with _patched(api, client):
+        response = api.lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["count"] == 2
+    assert all(c["Select"] == "COUNT" and "ProjectionExpression" not in c for c in client.calls)
+
+    # No filters counts every contact
+    client = FakeContactsClient([])
+    with _patched(api, client):
+        response = api.count_contact_segment({"filters": []}, {})
+    assert json.loads(response["body"])["count"] == len(CONTACTS)
+    assert "FilterExpression" not in client.calls[0]
+    print("    ✅ PASS")
+
+
+def test_send_campaign_resolves_target_filters():
+    """target_filters is resolved server-side and merged with the To list before CC exclusion"""
+    print("🧪 Testing Campaign Target Filters...")
+
+    import bulk_email_api_lambda as api
+
+    filters = [{"field": "agency_name", "values": ["EPA"]}]
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    campaigns_table = MagicMock()
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    body = {
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "to": ["boss@example.com"],
+        "target_contacts": ["boss@example.com"],
+        "target_filters": filters,
+        "cc": ["dan@example.com"],
+    }
+
+    with _patched(api, FakeContactsClient(filters)), patch.object(
+        api, "email_config_table", config_table
+    ), patch.object(api, "campaigns_table", campaigns_table), patch.object(api, "sqs_client", sqs), patch.dict(
+        api.queue_url_cache, {"bulk-email-queue": "https://queue"}
+    ):
+        response = api.send_campaign(body, {}, {})
+
+    assert response["statusCode"] == 200
+    item = campaigns_table.put_item.call_args.kwargs["Item"]
+    assert item["target_contacts"] == ["boss@example.com", "cat@example.com", "dan@example.com"]
+    assert item["target_filters"] == filters
+    queued = [
+        json.loads(e["MessageBody"])["contact_email"]
+        for c in sqs.send_message_batch.call_args_list
+        for e in c.kwargs["Entries"]
+    ]
+    print(f"  Queued: {queued}")
+    assert sorted(queued) == ["boss@example.com", "cat@example.com", "dan@example.com"]
+    print("    ✅ PASS")
+
+
+def test_async_campaign_resolves_segment_in_fanout():
+    """With async fan-out the segment scan runs in the fan-out invocation, not the API request"""
+    print("🧪 Testing Deferred Segment Resolution...")
+
+    import bulk_email_api_lambda as api
+
+    filters = [{"field": "agency_name", "values": ["EPA"]}]
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    campaigns_table = MagicMock()
+    lambda_client = MagicMock()
+    contacts_client = FakeContactsClient(filters)
+    body = {"subject": "Hi", "body": "<p>Hi</p>", "target_filters": filters, "cc": ["dan@example.com"]}
+
+    with _patched(api, contacts_client), patch.object(api, "ASYNC_CAMPAIGN_FANOUT", True), patch.object(
+        api, "email_config_table", config_table
+    ), patch.object(api, "campaigns_table", campaigns_table), patch.object(
+        api, "lambda_client", lambda_client
+    ), patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "BulkEmailAPI"}):
+        response = api.send_campaign(body, {}, {})
+
+    assert response["statusCode"] == 202
+    assert contacts_client.calls == []
+    item = campaigns_table.put_item.call_args.kwargs["Item"]
+    assert item["segment_status"] == "pending" and item["target_filters"] == filters
+
+    # The fan-out resolves the segment once, then enqueues from the stored list
+    resolved = dict(item, segment_status="resolved", target_contacts=["cat@example.com", "dan@example.com"])
+    campaigns_table.update_item.return_value = {"Attributes": resolved}
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    with _patched(api, contacts_client), patch.object(api, "campaigns_table", campaigns_table), patch.object(
+        api, "sqs_client", sqs
+    ), patch.dict(api.queue_url_cache, {"bulk-email-queue": "https://queue"}):
+        api.run_campaign_fanout(item["campaign_id"], campaign=item)
+
+    resolution = campaigns_table.update_item.call_args_list[0].kwargs
+    assert resolution["ConditionExpression"] == "segment_status = :pending"
+    values = resolution["ExpressionAttributeValues"]
+    assert values[":targets"] == ["cat@example.com", "dan@example.com"]
+    assert values[":total"] == 1 and values[":enqueue_total"] == 2
+    queued = [
+        json.loads(e["MessageBody"])["contact_email"]
+        for c in sqs.send_message_batch.call_args_list
+        for e in c.kwargs["Entries"]
+    ]
+    assert sorted(queued) == ["cat@example.com", "dan@example.com"]
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Contact Segment Test Suite")
+    print("=" * 50)
+
+    test_parallel_scan_resolves_segment()
+    test_segment_count_endpoint()
+    test_send_campaign_resolves_target_filters()
+    test_async_campaign_resolves_segment_in_fanout()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
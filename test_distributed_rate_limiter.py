@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for the worker's cluster-wide token-bucket rate limiter
+Uses the in-memory backend to simulate several worker containers sharing one bucket
+"""
+
+import sys
+import os
+import time
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _limiter(backend, rate, overrides=None):
+    from email_worker_lambda import DistributedRateLimiter
+
+    limiter = DistributedRateLimiter(backend=backend)
+    limiter.default_rate = rate
+    limiter.rate_overrides = overrides or {}
+    limiter.lease_block_size = 2
+    return limiter
+
+
+def test_fleet_shares_one_bucket():
+    """Three workers drawing from one bucket cannot exceed its burst"""
+    print("🧪 Testing Shared Token Bucket...")
+
+    from email_worker_lambda import InMemoryTokenBucketBackend
+
+    backend = InMemoryTokenBucketBackend()
+    workers = [_limiter(backend, rate=6) for _ in range(3)]
+
+    now = time.time()
+    with patch("time.time", return_value=now):
+        granted = sum(
+            1 for _ in range(10) for w in workers if w.try_acquire("a@x.gov", "us-gov-west-1")
+        )
+
+    print(f"  Tokens granted at one instant: {granted}")
+    assert granted == 6
+    print("    ✅ PASS")
+
+
+def test_bucket_refills_over_time():
+    """Tokens come back at the configured rate"""
+    print("🧪 Testing Token Refill...")
+
+    from email_worker_lambda import InMemoryTokenBucketBackend
+
+    backend = InMemoryTokenBucketBackend()
+    now = time.time()
+    with patch("time.time", return_value=now):
+        assert backend.take_tokens("r", 10, rate=5, burst=5) == 5
+        assert backend.take_tokens("r", 10, rate=5, burst=5) == 0
+    with patch("time.time", return_value=now + 0.5):
+        assert backend.take_tokens("r", 10, rate=5, burst=5) == 2
+    print("    ✅ PASS")
+
+
+def test_identity_override_uses_own_bucket():
+    """An identity with its own rate does not consume the region bucket"""
+    print("🧪 Testing Per-Identity Rates...")
+
+    from email_worker_lambda import InMemoryTokenBucketBackend
+
+    limiter = _limiter(
+        InMemoryTokenBucketBackend(), rate=10, overrides={"us-gov-west-1#news.gov": 2}
+    )
+
+    assert limiter.get_bucket_id("alerts@news.gov", "us-gov-west-1") == "us-gov-west-1#news.gov"
+    assert limiter.get_rate("alerts@news.gov", "us-gov-west-1") == 2
+    assert limiter.get_bucket_id("ops@other.gov", "us-gov-west-1") == "us-gov-west-1"
+    print("    ✅ PASS")
+
+
+def test_acquire_times_out_when_empty():
+    """acquire() gives up after max_wait when the fleet is out of tokens"""
+    print("🧪 Testing Acquire Timeout...")
+
+    backend = MagicMock()
+    backend.take_tokens.return_value = 0
+    limiter = _limiter(backend, rate=20)
+
+    assert limiter.acquire("a@x.gov", "us-gov-west-1", max_wait=0) is False
+    print("    ✅ PASS")
+
+
+def test_token_wait_timeout_is_not_an_ses_throttle():
+    """A local token wait timeout is retried without cutting the pacing rate or emitting throttle metrics"""
+    print("🧪 Testing Token Wait Timeout...")
+
+    import json
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    record = {
+        "messageId": "m1",
+        "body": json.dumps({"campaign_id": "c1", "contact_email": "a@example.com"}),
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    send = MagicMock(return_value=True)
+
+    with patch.object(worker.send_rate_limiter, "acquire", return_value=False), patch.object(
+        worker.campaign_cache, "get", return_value=campaign
+    ), patch.object(worker, "prefetch_contacts", return_value={}), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker.rate_control, "handle_throttle_detected"
+    ) as throttled, patch.object(
+        worker, "send_ses_email", send
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", MagicMock()
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ) as metric:
+        response = worker.lambda_handler({"Records": [record]}, context)
+
+    body = json.loads(response["body"])
+    assert response["batchItemFailures"] == [{"itemIdentifier": "m1"}]
+    assert body["retrying"] == 1 and body["rate_control_stats"]["throttles_detected"] == 0
+    throttled.assert_not_called()
+    assert "ThrottleExceptions" not in [c.args[0] for c in metric.call_args_list]
+    send.assert_not_called()
+    print("    ✅ PASS")
+
+
+def test_dynamodb_backend_retries_on_conflict():
+    """A conditional-check failure means another worker won; re-read and retry"""
+    print("🧪 Testing DynamoDB Backend Conflict Retry...")
+
+    from botocore.exceptions import ClientError
+    from email_worker_lambda import DynamoDBTokenBucketBackend
+
+    table = MagicMock()
+    table.get_item.return_value = {
+        "Item": {"bucket_id": "r", "tokens": Decimal("3"), "last_refill": Decimal(str(time.time()))}
+    }
+    conflict = ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": "x"}}, "UpdateItem"
+    )
+    table.update_item.side_effect = [conflict, {}]
+
+    with patch("email_worker_lambda.dynamodb") as dynamodb:
+        dynamodb.Table.return_value = table
+        backend = DynamoDBTokenBucketBackend("EmailRateLimits")
+
+    granted = backend.take_tokens("r", 2, rate=1, burst=5)
+    assert granted == 2
+    assert table.update_item.call_count == 2
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Distributed Rate Limiter Test Suite")
+    print("=" * 50)
+
+    test_fleet_shares_one_bucket()
+    test_bucket_refills_over_time()
+    test_identity_override_uses_own_bucket()
+    test_acquire_times_out_when_empty()
+    test_token_wait_timeout_is_not_an_ses_throttle()
+    test_dynamodb_backend_retries_on_conflict()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
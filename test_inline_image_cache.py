@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-campaign inline image cache in the email worker
+Tests reuse across recipients, failure caching and the byte budget
+"""
+
+import sys
+import os
+import base64
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PNG_BYTES = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+def _fake_urlopen(payload):
+    response = MagicMock()
+    response.read.return_value = payload
+    response.headers = {"Content-Type": "image/png"}
+    opened = MagicMock()
+    opened.__enter__.return_value = response
+    return MagicMock(return_value=opened)
+
+
+def test_images_resolved_once_per_campaign():
+    """Different recipients of one campaign share one download"""
+    print("🧪 Testing Inline Image Reuse...")
+
+    from email_worker_lambda import InlineImageCache
+
+    cache = InlineImageCache()
+    campaign = {"campaign_id": "c1", "body": '<p>Hi {{first_name}}</p><img src="https://img.example.com/logo.png">'}
+    urlopen = _fake_urlopen(PNG_BYTES)
+
+    with patch("urllib.request.urlopen", urlopen):
+        first = cache.resolve(campaign, '<p>Hi Ada</p><img src="https://img.example.com/logo.png">')
+        second = cache.resolve(campaign, '<p>Hi Bob</p><img src="https://img.example.com/logo.png">')
+
+    assert urlopen.call_count == 1
+    assert len(first) == 1 and first[0][2]["cid"] == second[0][2]["cid"]
+    assert first[0][1] is second[0][1]
+    print(f"  Stats: {cache.stats()}")
+    print("    ✅ PASS")
+
+
+def test_failed_source_not_retried_per_recipient():
+    """A broken image host is only tried once within the retry window"""
+    print("🧪 Testing Failure Caching...")
+
+    from email_worker_lambda import InlineImageCache
+
+    cache = InlineImageCache()
+    campaign = {"campaign_id": "c2", "body": '<img src="https://slow.example.com/a.png">'}
+    urlopen = MagicMock(side_effect=TimeoutError("timed out"))
+
+    with patch("urllib.request.urlopen", urlopen):
+        for _ in range(5):
+            assert cache.resolve(campaign, campaign["body"]) == []
+
+    assert urlopen.call_count == 1
+    print("    ✅ PASS")
+
+
+def test_byte_budget_evicts_oldest_campaign():
+    """Cached image bytes stay within the configured budget"""
+    print("🧪 Testing Byte Budget...")
+
+    from email_worker_lambda import InlineImageCache
+
+    data_uri = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+    with patch.dict(os.environ, {"INLINE_IMAGE_CACHE_MAX_BYTES": str(len(PNG_BYTES) * 2)}):
+        cache = InlineImageCache()
+
+    for i in range(3):
+        body = f'<img src="{data_uri}"><p>campaign {i}</p>'
+        cache.resolve({"campaign_id": f"c{i}", "body": body}, body)
+
+    stats = cache.stats()
+    print(f"  Stats: {stats}")
+    assert stats["bytes"] <= cache.max_bytes
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Inline Image Cache Test Suite")
+    print("=" * 50)
+
+    test_images_resolved_once_per_campaign()
+    test_failed_source_not_retried_per_recipient()
+    test_byte_budget_evicts_oldest_campaign()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
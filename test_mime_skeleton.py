@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-campaign pre-encoded MIME skeleton in the email worker
+Tests rendered message structure, reuse across recipients and partial builds
+"""
+
+import sys
+import os
+import io
+import email
+import tempfile
+from contextlib import contextmanager
+from unittest.mock import patch
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PDF_BYTES = b"%PDF-1.4 report " * 512
+ATTACHMENTS = [{"s3_key": "campaign-attachments/report.pdf", "filename": "report.pdf"}]
+
+
+class LocalS3:
+    """get_object/head_object stand-in; an Exception in `failures` is raised once"""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.get_calls = 0
+
+    def get_object(self, Bucket, Key):
+        self.get_calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return {"Body": io.BytesIO(PDF_BYTES), "ContentType": "application/pdf", "ETag": '"etag"'}
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": '"etag"'}
+
+
+@contextmanager
+def _local_attachments(s3):
+    """Route worker attachment reads through a fresh /tmp cache backed by `s3`"""
+    import email_worker_lambda as worker
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with patch.dict(os.environ, {"ATTACHMENT_CACHE_DIR": tmp_dir}):
+            cache = worker.AttachmentCache()
+        with patch.object(worker, "s3_client", s3), patch.object(worker, "attachment_cache", cache):
+            yield
+
+
+def test_rendered_message_structure():
+    """Recipient headers and HTML are spliced into the pre-encoded tree"""
+    print("🧪 Testing Skeleton Rendering...")
+
+    import email_worker_lambda as worker
+
+    with _local_attachments(LocalS3()):
+        skeleton = worker.build_mime_skeleton(ATTACHMENTS, [], [])
+
+    raw = skeleton.render(
+        "sender@example.com", "ada@example.com", "Résumé", "<p>Hi Ada ✓</p>", ["cc@example.com"]
+    )
+    message = email.message_from_bytes(raw)
+    parts = {part.get_content_type(): part for part in message.walk()}
+
+    assert message["To"] == "ada@example.com" and message["Cc"] == "cc@example.com"
+    assert message["Message-ID"].endswith("@example.com>")
+    assert list(parts) == [
+        "multipart/mixed", "multipart/related", "multipart/alternative", "text/html", "application/pdf",
+    ]
+    assert parts["text/html"].get_payload(decode=True).decode("utf-8") == "<p>Hi Ada ✓</p>"
+    assert parts["application/pdf"].get_payload(decode=True) == PDF_BYTES
+    assert parts["application/pdf"].get_filename() == "report.pdf"
+    print("    ✅ PASS")
+
+
+def test_skeleton_built_once_per_campaign():
+    """Recipients of the same campaign reuse one skeleton and one attachment read"""
+    print("🧪 Testing Skeleton Reuse...")
+
+    import email_worker_lambda as worker
+
+    cache = worker.MIMESkeletonCache()
+    campaign = {"campaign_id": "c1"}
+    s3 = LocalS3()
+
+    with _local_attachments(s3):
+        first = cache.get(campaign, ATTACHMENTS, [], [])
+        second = cache.get(campaign, ATTACHMENTS, [], [])
+
+    assert first is second
+    assert s3.get_calls == 1
+    assert cache.stats()["hits"] == 1
+
+    a = first.render("s@example.com", "a@example.com", "Hi", "<p>A</p>")
+    b = first.render("s@example.com", "b@example.com", "Hi", "<p>B</p>")
+    assert a != b and a.endswith(first.suffix) and b.endswith(first.suffix)
+
+    # Rendering into a reused buffer replaces its previous contents
+    buffer = bytearray(b"stale")
+    assert first.render("s@example.com", "a@example.com", "Hi", "<p>A</p>", out=buffer) is buffer
+    assert buffer.startswith(b"From: s@example.com")
+    print("    ✅ PASS")
+
+
+def test_failed_attachment_not_cached():
+    """A skeleton missing an attachment is rebuilt for the next recipient"""
+    print("🧪 Testing Partial Skeletons...")
+
+    import email_worker_lambda as worker
+
+    cache = worker.MIMESkeletonCache()
+    s3 = LocalS3(failures=[Exception("S3 unavailable")])
+
+    with _local_attachments(s3):
+        partial = cache.get({"campaign_id": "c2"}, ATTACHMENTS, [], [])
+        rebuilt = cache.get({"campaign_id": "c2"}, ATTACHMENTS, [], [])
+
+    assert not partial.complete and rebuilt.complete
+    assert cache.stats()["entries"] == 1
+    print("    ✅ PASS")
+
+
+def test_smtp_uses_streamed_skeleton():
+    """SMTP attachment campaigns send the same pre-encoded message bytes"""
+    print("🧪 Testing SMTP Raw Send...")
+
+    from unittest.mock import MagicMock
+    import email_worker_lambda as worker
+
+    campaign = {"campaign_id": "c3", "smtp_server": "localhost", "attachments": ATTACHMENTS}
+    server = MagicMock()
+
+    with _local_attachments(LocalS3()), patch("smtplib.SMTP", return_value=server), patch.object(
+        worker, "smtp_pool", worker.SMTPConnectionPool()
+    ):
+        assert worker.send_smtp_email(
+            campaign, {"email": "ada@example.com"}, "s@example.com", "Hi", "<p>Hi</p>"
+        )
+
+    from_addr, to_addrs, raw = server.sendmail.call_args.args
+    message = email.message_from_bytes(bytes(raw))
+    assert to_addrs == ["ada@example.com"]
+    assert [p.get_content_type() for p in message.walk()][-1] == "application/pdf"
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 MIME Skeleton Test Suite")
+    print("=" * 50)
+
+    test_rendered_message_structure()
+    test_skeleton_built_once_per_campaign()
+    test_failed_attachment_not_cached()
+    test_smtp_uses_streamed_skeleton()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
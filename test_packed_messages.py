@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test script for packed multi-recipient SQS messages
+Tests API packing, worker fan-out and per-recipient re-enqueue of failures
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the Lambda functions
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUEUE_ARN = "arn:aws-us-gov:sqs:us-gov-west-1:123456789012:bulk-email-queue"
+
+
+def _packed_record(*recipients):
+    return {
+        "messageId": "p1",
+        "receiptHandle": "handle-p1",
+        "eventSourceARN": QUEUE_ARN,
+        "attributes": {"ApproximateReceiveCount": "1"},
+        "body": json.dumps({"campaign_id": "c1", "recipients": list(recipients)}),
+    }
+
+
+def _run(event, send_side_effect, sqs):
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi {{first_name}}",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+
+    with patch.object(worker.campaign_cache, "get", return_value=campaign), patch.object(
+        worker, "prefetch_contacts", return_value={}
+    ), patch.object(worker, "lookup_contact", return_value=None), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker, "send_ses_email", side_effect=send_side_effect
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", MagicMock()
+    ), patch.object(
+        worker, "sqs_client", sqs
+    ), patch.dict(
+        worker.queue_url_cache, {QUEUE_ARN: "https://queue"}
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        return worker.lambda_handler(event, context)
+
+
+def test_expand_packed_records():
+    """Each recipient becomes its own record; single-recipient messages pass through"""
+    print("🧪 Testing Packed Message Fan-Out...")
+
+    from email_worker_lambda import expand_packed_records
+
+    single = {"messageId": "s1", "body": json.dumps({"campaign_id": "c1", "contact_email": "x@example.com"})}
+    packed = _packed_record("a@example.com", {"email": "b@example.com", "merge_fields": {"first_name": "Bea"}})
+    records = expand_packed_records([single, packed])
+
+    assert [r["messageId"] for r in records] == ["s1", "p1#0", "p1#1"]
+    assert records[1]["packedFrom"] == "p1" and records[1]["receiptHandle"] == "handle-p1"
+    assert json.loads(records[2]["body"]) == {
+        "campaign_id": "c1",
+        "contact_email": "b@example.com",
+        "merge_fields": {"first_name": "Bea"},
+    }
+    print("    ✅ PASS")
+
+
+def test_failed_recipients_reenqueued_individually():
+    """A throttled recipient is re-sent alone and the packed message is deleted"""
+    print("🧪 Testing Per-Recipient Re-Enqueue...")
+
+    from botocore.exceptions import ClientError
+
+    subjects = {}
+
+    def fake_send(campaign, contact, from_email, subject, *args, **kwargs):
+        subjects[contact["email"]] = subject
+        if contact["email"] == "b@example.com":
+            raise ClientError({"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}, "SendEmail")
+        if contact["email"] == "c@example.com":
+            raise ClientError({"Error": {"Code": "MessageRejected", "Message": "Not verified"}}, "SendEmail")
+        return True
+
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {"Successful": [{"Id": "0"}], "Failed": []}
+    event = {
+        "Records": [
+            _packed_record(
+                {"email": "a@example.com", "merge_fields": {"first_name": "Ann"}},
+                "b@example.com",
+                "c@example.com",
+            )
+        ]
+    }
+    response = _run(event, fake_send, sqs)
+    body = json.loads(response["body"])
+
+    assert response["batchItemFailures"] == []
+    assert body["successful"] == 1 and body["failed"] == 1 and body["requeued"] == 1
+    assert subjects["a@example.com"] == "Hi Ann"
+    entries = sqs.send_message_batch.call_args.kwargs["Entries"]
+    assert [json.loads(e["MessageBody"])["contact_email"] for e in entries] == ["b@example.com"]
+    print("    ✅ PASS")
+
+
+def test_reenqueue_failure_redelivers_packed_message():
+    """If failed recipients cannot be re-sent, the packed message is redelivered whole"""
+    print("🧪 Testing Re-Enqueue Failure...")
+
+    from botocore.exceptions import ClientError
+
+    def fake_send(campaign, contact, *args, **kwargs):
+        raise ClientError({"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}, "SendEmail")
+
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = RuntimeError("sqs down")
+    response = _run({"Records": [_packed_record("a@example.com", "b@example.com")]}, fake_send, sqs)
+
+    assert response["batchItemFailures"] == [{"itemIdentifier": "p1"}]
+    print("    ✅ PASS")
+
+
+def test_api_packs_recipients():
+    """send_campaign queues one message per chunk of recipients"""
+    print("🧪 Testing API Recipient Packing...")
+
+    import bulk_email_api_lambda as api
+
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    sqs = MagicMock()
+    sqs.get_queue_url.return_value = {"QueueUrl": "https://queue"}
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    body = {
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "target_contacts": [f"u{i}@example.com" for i in range(5)],
+    }
+
+    with patch.object(api, "SQS_RECIPIENTS_PER_MESSAGE", 2), patch.object(
+        api, "email_config_table", config_table
+    ), patch.object(api, "campaigns_table", MagicMock()), patch.object(api, "sqs_client", sqs), patch.dict(
+        api.queue_url_cache, clear=True
+    ):
+        response = api.send_campaign(body, {}, {})
+
+    result = json.loads(response["body"])
+    entries = sqs.send_message_batch.call_args.kwargs["Entries"]
+    sizes = [len(json.loads(e["MessageBody"])["recipients"]) for e in entries]
+    print(f"  Message sizes: {sizes}")
+    assert sizes == [2, 2, 1]
+    assert result["queued_count"] == 5 and result["failed_to_queue"] == 0
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Packed SQS Message Test Suite")
+    print("=" * 50)
+
+    test_expand_packed_records()
+    test_failed_recipients_reenqueued_individually()
+    test_reenqueue_failure_redelivers_packed_message()
+    test_api_packs_recipients()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for SQS partial batch responses (ReportBatchItemFailures) in the email worker
+Tests that only retryable failures and unfinished messages are reported back to SQS
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _event(*emails):
+    return {
+        "Records": [
+            {
+                "messageId": f"m-{email}",
+                "body": json.dumps({"campaign_id": "c1", "contact_email": email}),
+            }
+            for email in emails
+        ]
+    }
+
+
+def _run(event, send_side_effect, prefetch=None):
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+
+    with patch.object(worker.campaign_cache, "get", return_value=campaign), patch.object(
+        worker, "prefetch_contacts", prefetch or MagicMock(return_value={})
+    ), patch.object(worker, "lookup_contact", return_value=None), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker, "send_ses_email", side_effect=send_side_effect
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", MagicMock()
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        return worker.lambda_handler(event, context)
+
+
+def test_only_retryable_failures_reported():
+    """Throttles are redelivered; rejected and successful messages are not"""
+    print("🧪 Testing Partial Batch Response...")
+
+    from botocore.exceptions import ClientError
+
+    def fake_send(campaign, contact, *args, **kwargs):
+        if contact["email"] == "throttled@example.com":
+            raise ClientError({"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}, "SendEmail")
+        if contact["email"] == "rejected@example.com":
+            raise ClientError({"Error": {"Code": "MessageRejected", "Message": "Not verified"}}, "SendEmail")
+        return True
+
+    response = _run(
+        _event("ok@example.com", "throttled@example.com", "rejected@example.com"), fake_send
+    )
+    body = json.loads(response["body"])
+
+    print(f"  batchItemFailures: {response['batchItemFailures']}")
+    assert response["batchItemFailures"] == [{"itemIdentifier": "m-throttled@example.com"}]
+    assert body["successful"] == 1 and body["failed"] == 1 and body["retrying"] == 1
+    print("    ✅ PASS")
+
+
+def test_fatal_error_reports_unfinished_messages():
+    """If processing aborts, every message that did not finish is redelivered"""
+    print("🧪 Testing Fatal Error Redelivery...")
+
+    prefetch = MagicMock(side_effect=RuntimeError("boom"))
+    response = _run(_event("a@example.com", "b@example.com"), lambda *a, **k: True, prefetch)
+
+    ids = [failure["itemIdentifier"] for failure in response["batchItemFailures"]]
+    assert ids == ["m-a@example.com", "m-b@example.com"]
+    print("    ✅ PASS")
+
+
+def test_error_classification():
+    """Transient errors are retryable; validation errors are not"""
+    print("🧪 Testing Retryable Error Classification...")
+
+    import smtplib
+    from botocore.exceptions import ClientError
+    from email_worker_lambda import is_retryable_error
+
+    assert is_retryable_error(ClientError({"Error": {"Code": "ServiceUnavailable"}}, "SendEmail"))
+    assert is_retryable_error(smtplib.SMTPServerDisconnected("gone"))
+    assert is_retryable_error(smtplib.SMTPResponseException(451, b"try later"))
+    assert not is_retryable_error(smtplib.SMTPResponseException(550, b"no such user"))
+    assert not is_retryable_error(ValueError("Missing campaign_id or contact_email in message"))
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Partial Batch Response Test Suite")
+    print("=" * 50)
+
+    test_only_retryable_failures_reported()
+    test_fatal_error_reports_unfinished_messages()
+    test_error_classification()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
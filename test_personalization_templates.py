@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for compiled personalization templates in the email worker
+Tests placeholder rendering, arbitrary contact attributes and template caching
+"""
+
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import patch
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_known_fields_and_legacy_alias():
+    """Standard CISA fields render as before; {{company}} still maps to agency_name"""
+    print("🧪 Testing Placeholder Rendering...")
+
+    from email_worker_lambda import personalize_content
+
+    contact = {
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "agency_name": "Analytical Engines",
+        "state": "VA",
+    }
+    body = '<div class="ql-editor"><p>Hello {{first_name}} {{last_name}},</p>\n\n<p>{{company}} / {{state}} / {{sector}}</p></div>'
+    rendered = personalize_content(body, contact)
+
+    print(f"  Rendered: {rendered}")
+    assert rendered == "<p>Hello Ada Lovelace,</p> <p>Analytical Engines / VA / </p>"
+    assert personalize_content("Hi {{first_name}}", contact) == "Hi Ada"
+    print("    ✅ PASS")
+
+
+def test_any_contact_attribute():
+    """Custom attributes and non-string DynamoDB values are rendered"""
+    print("🧪 Testing Arbitrary Attributes...")
+
+    from email_worker_lambda import personalize_content
+
+    contact = {"badge_id": "B-42", "seat_count": Decimal("3"), "first_name": None}
+    rendered = personalize_content("{{badge_id}} has {{seat_count}} seats {{first_name}}", contact)
+
+    assert rendered == "B-42 has 3 seats "
+    print("    ✅ PASS")
+
+
+def test_template_compiled_once():
+    """The Quill clean-up runs once per distinct template, not per recipient"""
+    print("🧪 Testing Template Cache...")
+
+    import email_worker_lambda as worker
+
+    worker.template_cache.clear()
+    body = "<p>Dear {{first_name}}</p>"
+
+    with patch.object(
+        worker, "clean_quill_html_for_email", wraps=worker.clean_quill_html_for_email
+    ) as clean:
+        outputs = [
+            worker.personalize_content(body, {"first_name": name})
+            for name in ("A", "B", "C")
+        ]
+
+    assert outputs == ["<p>Dear A</p>", "<p>Dear B</p>", "<p>Dear C</p>"]
+    assert clean.call_count == 1
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Personalization Template Test Suite")
+    print("=" * 50)
+
+    test_known_fields_and_legacy_alias()
+    test_any_contact_attribute()
+    test_template_compiled_once()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test script for S3 recipient manifests
+Tests offloading long recipient lists from the campaign item, the chunked
+recipients endpoint, fan-out from manifests and worker hydration of To/CC/BCC
+"""
+
+import sys
+import os
+import io
+import json
+import gzip
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the Lambda functions
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeS3:
+    """In-memory put_object/get_object"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+def _ok_sqs():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []
+    }
+    return sqs
+
+
+def test_long_lists_offloaded_to_chunks():
+    """Long lists become gzip'd newline-delimited chunks; short lists stay inline"""
+    print("🧪 Testing Manifest Offload...")
+
+    import bulk_email_api_lambda as api
+
+    s3 = FakeS3()
+    targets = [f"u{i}@example.com" for i in range(7)]
+    item = {"campaign_id": "c1", "target_contacts": list(targets), "cc": ["boss@example.com"]}
+
+    with patch.object(api, "s3_client", s3), patch.object(api, "RECIPIENT_INLINE_MAX", 5), patch.object(
+        api, "RECIPIENT_MANIFEST_CHUNK_SIZE", 3
+    ):
+        api.offload_recipient_lists("c1", item)
+        streamed = api.load_campaign_recipients(item, "target_contacts")
+
+    print(f"  Manifest: {item['recipient_manifest']}")
+    assert "target_contacts" not in item and item["cc"] == ["boss@example.com"]
+    assert item["target_contacts_count"] == 7 and item["cc_count"] == 1 and item["bcc_count"] == 0
+    entry = item["recipient_manifest"]["lists"]["target_contacts"]
+    assert entry["count"] == 7 and len(entry["chunks"]) == 3
+    first_chunk = gzip.decompress(s3.objects[(api.RECIPIENT_MANIFEST_BUCKET, entry["chunks"][0])])
+    assert first_chunk == b"u0@example.com\nu1@example.com\nu2@example.com\n"
+    assert streamed == targets
+    print("    ✅ PASS")
+
+
+def test_send_campaign_stores_pointer_and_counts():
+    """The stored campaign item carries the manifest pointer instead of the list"""
+    print("🧪 Testing Campaign Item Size...")
+
+    import bulk_email_api_lambda as api
+
+    s3 = FakeS3()
+    config_table = MagicMock()
+    config_table.get_item.return_value = {"Item": {"from_email": "sender@example.com"}}
+    campaigns_table = MagicMock()
+    sqs = _ok_sqs()
+    body = {
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "target_contacts": [f"u{i:03d}@example.com" for i in range(250)],
+        "bcc": ["audit@example.com"],
+    }
+
+    with patch.object(api, "s3_client", s3), patch.object(api, "email_config_table", config_table), patch.object(
+        api, "campaigns_table", campaigns_table
+    ), patch.object(api, "sqs_client", sqs), patch.dict(api.queue_url_cache, {"bulk-email-queue": "https://queue"}):
+        response = api.send_campaign(body, {}, {})
+
+    assert response["statusCode"] == 200
+    item = campaigns_table.put_item.call_args.kwargs["Item"]
+    assert "target_contacts" not in item and item["bcc"] == ["audit@example.com"]
+    assert item["target_contacts_count"] == 250
+    print(f"  Item size: {len(json.dumps(item, default=str))} bytes")
+    assert len(json.dumps(item, default=str)) < 2000
+    assert json.loads(response["body"])["queued_count"] == 251
+    print("    ✅ PASS")
+
+
+def test_recipients_endpoint_pages_chunks():
+    """GET /campaign/{id}/recipients returns one manifest chunk per request"""
+    print("🧪 Testing Recipients Endpoint...")
+
+    import bulk_email_api_lambda as api
+
+    s3 = FakeS3()
+    item = {"campaign_id": "c1", "target_contacts": [f"u{i}@example.com" for i in range(5)], "to": ["x@example.com"]}
+    with patch.object(api, "s3_client", s3), patch.object(api, "RECIPIENT_INLINE_MAX", 2), patch.object(
+        api, "RECIPIENT_MANIFEST_CHUNK_SIZE", 2
+    ):
+        api.offload_recipient_lists("c1", item)
+
+    table = MagicMock()
+    table.get_item.return_value = {"Item": item}
+
+    def call(list_name, chunk, status_code=200):
+        event = {
+            "resource": "/campaign/{campaign_id}/recipients",
+            "httpMethod": "GET",
+            "pathParameters": {"campaign_id": "c1"},
+            "queryStringParameters": {"list": list_name, "chunk": str(chunk)},
+        }
+        response = api.lambda_handler(event, None)
+        assert response["statusCode"] == status_code, response
+        return json.loads(response["body"])
+
+    with patch.object(api, "s3_client", s3), patch.object(api, "campaigns_table", table):
+        pages = [call("target_contacts", chunk) for chunk in range(3)]
+        inline = call("to", 0)
+
+        # Anything outside 0..chunks-1 is a client error, not an IndexError or an empty page
+        for bad_chunk in (3, -1, "abc"):
+            call("target_contacts", bad_chunk, status_code=400)
+        call("to", 1, status_code=400)
+
+    assert [p["emails"] for p in pages] == [
+        ["u0@example.com", "u1@example.com"],
+        ["u2@example.com", "u3@example.com"],
+        ["u4@example.com"],
+    ]
+    assert pages[0]["chunks"] == 3 and pages[0]["count"] == 5
+    assert inline["emails"] == ["x@example.com"] and inline["chunks"] == 1
+    assert table.get_item.call_args.kwargs["ExpressionAttributeNames"] == {"#list": "to"}
+    print("    ✅ PASS")
+
+
+def test_fanout_and_worker_read_manifests():
+    """The fan-out streams targets from S3; the worker hydrates an offloaded CC list"""
+    print("🧪 Testing Manifest Readers...")
+
+    import bulk_email_api_lambda as api
+    import email_worker_lambda as worker
+
+    s3 = FakeS3()
+    item = {
+        "campaign_id": "c1",
+        "status": "queued",
+        "target_contacts": [f"u{i}@example.com" for i in range(4)],
+        "cc": ["cc1@example.com", "cc2@example.com", "cc3@example.com"],
+        "enqueue_status": "pending",
+        "enqueue_checkpoint": 0,
+    }
+    with patch.object(api, "s3_client", s3), patch.object(api, "RECIPIENT_INLINE_MAX", 2):
+        api.offload_recipient_lists("c1", item)
+    assert "cc" not in item
+
+    sqs = _ok_sqs()
+    with patch.object(api, "s3_client", s3), patch.object(api, "campaigns_table", MagicMock()), patch.object(
+        api, "sqs_client", sqs
+    ), patch.dict(api.queue_url_cache, {"bulk-email-queue": "https://queue"}):
+        progress = api.run_campaign_fanout("c1", campaign=dict(item))
+
+    assert progress["enqueued_count"] == 7
+
+    table = MagicMock()
+    stored = dict(item)
+    table.get_item.return_value = {"Item": stored}
+    with patch.object(worker, "s3_client", s3), patch.object(worker, "campaigns_table", table):
+        campaign = worker.CampaignCache().get("c1")
+
+    assert campaign["cc"] == ["cc1@example.com", "cc2@example.com", "cc3@example.com"]
+    assert "target_contacts" not in campaign
+    # The cache holds a hydrated copy; the item read from DynamoDB is not modified
+    assert "cc" not in stored
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Recipient Manifest Test Suite")
+    print("=" * 50)
+
+    test_long_lists_offloaded_to_chunks()
+    test_send_campaign_stores_pointer_and_counts()
+    test_recipients_endpoint_pages_chunks()
+    test_fanout_and_worker_read_manifests()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
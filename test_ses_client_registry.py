@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled SES client registry in the email worker and API Lambda
+Tests client reuse, cached Secrets Manager credentials and proactive refresh
+"""
+
+import sys
+import os
+import json
+import time
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the lambdas
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SECRET = {"SecretString": json.dumps({"aws_access_key_id": "AKIA", "aws_secret_access_key": "shh"})}
+
+
+def test_clients_reused_per_region_and_secret():
+    """One client per (region, secret); the secret is read once"""
+    print("🧪 Testing Client Reuse...")
+
+    import email_worker_lambda as worker
+
+    registry = worker.SESClientRegistry()
+    secrets = MagicMock()
+    secrets.get_secret_value.return_value = SECRET
+
+    with patch.object(worker, "secrets_client", secrets), patch(
+        "email_worker_lambda.boto3.client", side_effect=lambda *a, **k: MagicMock()
+    ) as client_factory:
+        role_a = registry.get_client("us-gov-west-1")
+        role_b = registry.get_client("us-gov-west-1")
+        secret_a = registry.get_client("us-gov-west-1", "ses-creds")
+        secret_b = registry.get_client("us-gov-west-1", "ses-creds")
+
+    assert role_a is role_b and secret_a is secret_b and role_a is not secret_a
+    assert client_factory.call_count == 2
+    assert secrets.get_secret_value.call_count == 1
+    assert client_factory.call_args.kwargs["config"] is worker.boto_config
+    print(f"  Stats: {registry.stats()}")
+    print("    ✅ PASS")
+
+
+def test_refresh_before_expiry_and_after_ttl():
+    """Near expiry the old client keeps serving while a new one is built; past the TTL it is rebuilt inline"""
+    print("🧪 Testing Credential Refresh...")
+
+    import email_worker_lambda as worker
+
+    with patch.dict(os.environ, {"SES_CREDENTIAL_TTL_SECONDS": "100", "SES_CREDENTIAL_REFRESH_MARGIN_SECONDS": "20"}):
+        registry = worker.SESClientRegistry()
+    secrets = MagicMock()
+    secrets.get_secret_value.return_value = SECRET
+    started = []
+
+    with patch.object(worker, "secrets_client", secrets), patch(
+        "email_worker_lambda.boto3.client", side_effect=lambda *a, **k: MagicMock()
+    ), patch.object(worker.threading, "Thread") as thread:
+        thread.side_effect = lambda target, daemon: MagicMock(start=lambda: started.append(target))
+        first = registry.get_client("us-gov-west-1", "ses-creds")
+        key = ("us-gov-west-1", "ses-creds")
+
+        registry._clients[key]["created_at"] = time.time() - 90  # inside refresh margin
+        assert registry.get_client("us-gov-west-1", "ses-creds") is first
+        assert len(started) == 1
+        started[0]()  # run the background refresh
+        refreshed = registry.get_client("us-gov-west-1", "ses-creds")
+        assert refreshed is not first
+
+        registry._clients[key]["created_at"] = time.time() - 150  # past the TTL
+        assert registry.get_client("us-gov-west-1", "ses-creds") is not refreshed
+
+    assert secrets.get_secret_value.call_count == 3
+    print("    ✅ PASS")
+
+
+def test_api_send_ses_email_uses_registry():
+    """The API Lambda's send_ses_email builds its SES client once, with the Lambda role"""
+    print("🧪 Testing API Lambda Registry...")
+
+    import bulk_email_api_lambda as api
+
+    ses = MagicMock()
+    registry = api.SESClientRegistry()
+    config = {"aws_region": "us-gov-west-1", "from_email": "sender@example.com", "aws_secret_name": "ses-creds"}
+
+    with patch.object(api, "ses_client_registry", registry), patch(
+        "bulk_email_api_lambda.boto3.client", return_value=ses
+    ) as client_factory, patch.object(api, "get_aws_credentials_from_secrets_manager") as read_secret:
+        for name in ("a", "b", "c"):
+            assert api.send_ses_email(config, {"email": f"{name}@example.com"}, "Hi", "<p>Hi</p>")
+
+    assert client_factory.call_count == 1
+    assert "aws_access_key_id" not in client_factory.call_args.kwargs
+    read_secret.assert_not_called()
+    assert ses.send_email.call_count == 3
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 SES Client Registry Test Suite")
+    print("=" * 50)
+
+    test_clients_reused_per_region_and_secret()
+    test_refresh_before_expiry_and_after_ttl()
+    test_api_send_ses_email_uses_registry()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Test script for sharded campaign progress counters
+Tests shard writes in the worker and summed reads in the API and monitor
+"""
+
+import json
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the lambdas
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _batch_get(table_name, shards):
+    return {
+        "Responses": {
+            table_name: [
+                {"sent_count": Decimal(str(sent)), "failed_count": Decimal(str(failed))}
+                for sent, failed in shards
+            ]
+        }
+    }
+
+
+def test_worker_flush_writes_one_shard():
+    """Sharded campaigns increment a shard item and leave the campaign item's counters alone"""
+    print("🧪 Testing Sharded Counter Flush...")
+
+    import email_worker_lambda as worker
+
+    campaigns = MagicMock()
+    campaigns.get_item.return_value = {"Item": {"queued_count": Decimal("100")}}
+    counters = MagicMock()
+    dynamodb = MagicMock()
+    dynamodb.batch_get_item.return_value = _batch_get(
+        worker.CAMPAIGN_COUNTERS_TABLE, [(10, 1), (12, 0), (5, 2)]
+    )
+
+    with patch.object(worker, "campaigns_table", campaigns), patch.object(
+        worker, "counters_table", counters
+    ), patch.object(worker, "dynamodb", dynamodb), patch.object(
+        worker, "campaigns_marked_sending", set()
+    ):
+        worker.flush_campaign_counters({"c1": {"sent": 4, "failed": 1, "counter_shards": 3}})
+
+    shard_update = counters.update_item.call_args.kwargs
+    assert shard_update["Key"]["counter_id"].startswith("c1#shard-")
+    assert shard_update["ExpressionAttributeValues"][":sent"] == 4
+    keys = dynamodb.batch_get_item.call_args.kwargs["RequestItems"][worker.CAMPAIGN_COUNTERS_TABLE]["Keys"]
+    assert len(keys) == 3
+
+    # Only the one-time status update touches the campaign item; 30/100 is not complete
+    assert campaigns.update_item.call_count == 1
+    assert "sent_count" not in campaigns.update_item.call_args.kwargs["UpdateExpression"]
+    print("    ✅ PASS")
+
+
+def test_worker_flush_completes_from_shard_sums():
+    """Once shard totals reach queued_count the final totals are copied to the campaign"""
+    print("🧪 Testing Sharded Completion...")
+
+    import email_worker_lambda as worker
+
+    campaigns = MagicMock()
+    campaigns.get_item.return_value = {"Item": {"queued_count": Decimal("30")}}
+    dynamodb = MagicMock()
+    dynamodb.batch_get_item.return_value = _batch_get(
+        worker.CAMPAIGN_COUNTERS_TABLE, [(20, 1), (9, 0)]
+    )
+
+    with patch.object(worker, "campaigns_table", campaigns), patch.object(
+        worker, "counters_table", MagicMock()
+    ), patch.object(worker, "dynamodb", dynamodb), patch.object(
+        worker, "campaigns_marked_sending", {"c1"}
+    ), patch.object(worker.campaign_cache, "invalidate") as invalidate:
+        worker.flush_campaign_counters({"c1": {"sent": 0, "failed": 1, "counter_shards": 2}})
+
+    completion = campaigns.update_item.call_args.kwargs["ExpressionAttributeValues"]
+    assert completion[":completed_status"] == "completed"
+    assert completion[":sent_count"] == 29 and completion[":failed_count"] == 1
+    invalidate.assert_called_once_with("c1")
+    print("    ✅ PASS")
+
+
+def test_api_status_sums_shards():
+    """The status endpoint reports summed shard counts with a short-lived cache"""
+    print("🧪 Testing API Shard Reads...")
+
+    import json
+    import bulk_email_api_lambda as api
+
+    campaigns = MagicMock()
+    campaigns.get_item.return_value = {
+        "Item": {"campaign_id": "c2", "status": "sending", "counter_shards": Decimal("2"),
+                 "sent_count": Decimal("0"), "failed_count": Decimal("0")}
+    }
+    dynamodb = MagicMock()
+    dynamodb.batch_get_item.return_value = _batch_get(api.CAMPAIGN_COUNTERS_TABLE, [(7, 1), (3, 0)])
+
+    with patch.object(api, "campaigns_table", campaigns), patch.object(
+        api, "dynamodb", dynamodb
+    ), patch.dict(api.counter_totals_cache, clear=True):
+        first = json.loads(api.get_campaign_status("c2", {})["body"])
+        second = json.loads(api.get_campaign_status("c2", {})["body"])
+
+    assert first["sent_count"] == 10 and first["failed_count"] == 1
+    assert second == first
+    assert dynamodb.batch_get_item.call_count == 1
+    print("    ✅ PASS")
+
+
+def test_worker_skips_shard_sum_until_shard_quota_reached():
+    """Shards are only summed once the updated shard has caught up with its queued_count"""
+    print("🧪 Testing Shard Quota Gate...")
+
+    import email_worker_lambda as worker
+
+    campaigns = MagicMock()
+    counters = MagicMock()
+    counters.update_item.return_value = {
+        "Attributes": {"sent_count": Decimal("4"), "failed_count": Decimal("0"), "queued_count": Decimal("10")}
+    }
+    dynamodb = MagicMock()
+    results = {"campaign_deltas": {}}
+    for n in range(2):
+        worker.record_campaign_delta(results, "c3", sent=1, counter_shards=4, counter_shard=2)
+
+    with patch.object(worker, "campaigns_table", campaigns), patch.object(
+        worker, "counters_table", counters
+    ), patch.object(worker, "dynamodb", dynamodb), patch.object(
+        worker, "campaigns_marked_sending", {"c3"}
+    ):
+        unflushed = worker.flush_campaign_counters(results["campaign_deltas"])
+
+    assert unflushed == []
+    assert counters.update_item.call_args.kwargs["Key"]["counter_id"] == "c3#shard-2"
+    assert counters.update_item.call_args.kwargs["ExpressionAttributeValues"][":sent"] == 2
+    dynamodb.batch_get_item.assert_not_called()
+    campaigns.get_item.assert_not_called()
+    print("    ✅ PASS")
+
+
+def test_api_records_queued_count_per_shard():
+    """Queued messages carry a counter shard and each shard's queued recipients are recorded"""
+    print("🧪 Testing API Shard Quotas...")
+
+    import bulk_email_api_lambda as api
+
+    recipients = [f"user{n}@example.com" for n in range(25)]
+    with patch.object(api, "SQS_RECIPIENTS_PER_MESSAGE", 1):
+        messages = api.build_queue_messages("c4", recipients, counter_shards=2)
+    assert [body["counter_shard"] for body, _, _ in messages] == [0] * 10 + [1] * 10 + [0] * 5
+
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": entry["Id"]} for entry in Entries]
+    }
+    counters = MagicMock()
+    with patch.object(api, "sqs_client", sqs), patch.object(api, "counters_table", counters):
+        queued, failed, queued_by_shard = api.enqueue_messages("queue-url", messages)
+        api.record_shard_queued_counts("c4", queued_by_shard)
+
+    assert (queued, failed) == (25, 0)
+    assert queued_by_shard == {0: 15, 1: 10}
+    # Every batch call carries a single shard's messages
+    for call in sqs.send_message_batch.call_args_list:
+        shards = {json.loads(entry["MessageBody"])["counter_shard"] for entry in call.kwargs["Entries"]}
+        assert len(shards) == 1
+    quotas = {
+        call.kwargs["Key"]["counter_id"]: call.kwargs["ExpressionAttributeValues"][":queued"]
+        for call in counters.update_item.call_args_list
+    }
+    assert quotas == {"c4#shard-0": 15, "c4#shard-1": 10}
+
+    # Packed messages: queued_count is in recipients, which is what workers count
+    recipients = [f"user{n}@example.com" for n in range(60)]
+    with patch.object(api, "SQS_RECIPIENTS_PER_MESSAGE", 5):
+        messages = api.build_queue_messages("c5", recipients, counter_shards=2)
+    assert len(messages) == 12
+    with patch.object(api, "sqs_client", sqs):
+        queued, failed, queued_by_shard = api.enqueue_messages("queue-url", messages)
+    assert (queued, failed) == (60, 0)
+    assert queued_by_shard == {0: 50, 1: 10}
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Sharded Counter Test Suite")
+    print("=" * 50)
+
+    test_worker_flush_writes_one_shard()
+    test_worker_flush_completes_from_shard_sums()
+    test_api_status_sums_shards()
+    test_worker_skips_shard_sum_until_shard_quota_reached()
+    test_api_records_queued_count_per_shard()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled SMTP connections used by send_smtp_email
+Tests connection reuse, per-connection message caps, reconnects and parallel sends
+against a local SMTP sink
+"""
+
+import sys
+import os
+import socketserver
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server: accepts every command and stores each message"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+            sink.sockets.append(self.connection)
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 sink")
+            elif command == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    data.append(data_line)
+                with sink.lock:
+                    sink.messages.append(b"".join(data))
+                self.reply("250 queued")
+            elif command == "NOOP":
+                with sink.lock:
+                    sink.noops += 1
+                self.reply("250 ok")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.noops = 0
+        self.messages = []
+        self.sockets = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def drop_connections(self):
+        """Close every open session from the server side, like an idle-timeout on the relay"""
+        import socket
+
+        with self.lock:
+            for sock in self.sockets:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.sockets = []
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _pool(**settings):
+    from email_worker_lambda import SMTPConnectionPool
+
+    pool = SMTPConnectionPool()
+    for name, value in settings.items():
+        setattr(pool, name, value)
+    return pool
+
+
+def _send(pool, sink, n=1):
+    for i in range(n):
+        pool.send(
+            "127.0.0.1",
+            sink.port,
+            lambda server: server.sendmail("s@example.com", ["r@example.com"], f"Subject: {i}\r\n\r\nhi"),
+        )
+
+
+def test_connection_reused_across_messages():
+    """Several messages share one TCP connection"""
+    print("🧪 Testing Connection Reuse...")
+
+    sink = SMTPSink()
+    try:
+        pool = _pool()
+        _send(pool, sink, 3)
+        print(f"  Pool: {pool.stats()}")
+        assert sink.connections == 1 and len(sink.messages) == 3
+        assert pool.stats()["reuses"] == 2
+        pool.close_all()
+    finally:
+        sink.stop()
+    print("    ✅ PASS")
+
+
+def test_connection_retired_after_message_cap():
+    """A connection is closed with QUIT once it has carried the maximum messages"""
+    print("🧪 Testing Per-Connection Message Cap...")
+
+    sink = SMTPSink()
+    try:
+        pool = _pool(max_messages_per_connection=2)
+        _send(pool, sink, 5)
+        assert sink.connections == 3 and len(sink.messages) == 5
+        assert pool.stats()["retired"] == 2
+        pool.close_all()
+    finally:
+        sink.stop()
+    print("    ✅ PASS")
+
+
+def test_dropped_connection_replaced():
+    """A relay-side disconnect is detected (NOOP or send) and the message still goes out"""
+    print("🧪 Testing Reconnect After Disconnect...")
+
+    sink = SMTPSink()
+    try:
+        # Health check on every reuse
+        pool = _pool(noop_after_idle_seconds=0)
+        _send(pool, sink)
+        sink.drop_connections()
+        _send(pool, sink)
+        assert pool.stats()["noop_failures"] == 1
+
+        # No health check: the send itself hits SMTPServerDisconnected and is retried once
+        pool = _pool(noop_after_idle_seconds=3600)
+        _send(pool, sink)
+        sink.drop_connections()
+        _send(pool, sink)
+        assert pool.stats()["reconnects"] == 1
+
+        assert len(sink.messages) == 4
+        pool.close_all()
+    finally:
+        sink.stop()
+    print("    ✅ PASS")
+
+
+def test_parallel_sends_bounded_by_pool_size():
+    """Concurrent senders use separate connections, never more than max_connections"""
+    print("🧪 Testing Parallel Sends...")
+
+    sink = SMTPSink()
+    try:
+        pool = _pool(max_connections=2)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: _send(pool, sink, 5), range(6)))
+        print(f"  Pool: {pool.stats()}")
+        assert len(sink.messages) == 30
+        assert sink.connections <= 2
+        pool.close_all()
+    finally:
+        sink.stop()
+    print("    ✅ PASS")
+
+
+def test_send_smtp_email_uses_pool():
+    """send_smtp_email delivers through the pooled connection"""
+    print("🧪 Testing send_smtp_email Integration...")
+
+    import email_worker_lambda as worker
+
+    sink = SMTPSink()
+    try:
+        campaign = {"campaign_id": "c1", "smtp_server": "127.0.0.1", "smtp_port": sink.port}
+        with patch.object(worker, "smtp_pool", _pool()):
+            for email in ("a@example.com", "b@example.com"):
+                assert worker.send_smtp_email(
+                    campaign, {"email": email}, "s@example.com", "Hi", "<p>Hi</p>", bcc_list=["audit@example.com"]
+                )
+            worker.smtp_pool.close_all()
+        assert sink.connections == 1 and len(sink.messages) == 2
+        assert b"To: b@example.com" in sink.messages[1]
+    finally:
+        sink.stop()
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 SMTP Connection Pool Test Suite")
+    print("=" * 50)
+
+    test_connection_reused_across_messages()
+    test_connection_retired_after_message_cap()
+    test_dropped_connection_replaced()
+    test_parallel_sends_bounded_by_pool_size()
+    test_send_smtp_email_uses_pool()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
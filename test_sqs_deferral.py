@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test script for deferring paced/throttled messages back to SQS
+Tests backoff calculation, visibility vs. re-send deferral and handler integration
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the email worker
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUEUE_ARN = "arn:aws-us-gov:sqs:us-gov-west-1:123456789012:bulk-email-queue"
+
+
+def _record(message_id="m1", receive_count=1):
+    return {
+        "messageId": message_id,
+        "receiptHandle": f"handle-{message_id}",
+        "eventSourceARN": QUEUE_ARN,
+        "attributes": {"ApproximateReceiveCount": str(receive_count)},
+        "body": json.dumps({"campaign_id": "c1", "contact_email": "a@example.com"}),
+    }
+
+
+def test_backoff_grows_with_receive_count():
+    """Backoff doubles per delivery, honours the pacing delay and is capped"""
+    print("🧪 Testing Deferral Backoff...")
+
+    import email_worker_lambda as worker
+
+    with patch("email_worker_lambda.random.randint", return_value=0):
+        first = worker.compute_defer_backoff(_record(receive_count=1))
+        second = worker.compute_defer_backoff(_record(receive_count=2))
+        paced = worker.compute_defer_backoff(_record(receive_count=1), min_delay=95.2)
+        capped = worker.compute_defer_backoff(_record(receive_count=20))
+
+    print(f"  Backoffs: {first}, {second}, {paced}, {capped}")
+    assert second == 2 * first
+    assert paced == 96
+    assert capped == worker.DEFER_MAX_BACKOFF_SECONDS
+    print("    ✅ PASS")
+
+
+def test_defer_uses_visibility_then_resend():
+    """Early deliveries extend visibility; late ones are re-sent so they never hit the DLQ"""
+    print("🧪 Testing Deferral Modes...")
+
+    import email_worker_lambda as worker
+
+    sqs = MagicMock()
+    sqs.get_queue_url.return_value = {"QueueUrl": "https://queue"}
+
+    with patch.object(worker, "sqs_client", sqs), patch.dict(worker.queue_url_cache, clear=True):
+        assert worker.defer_message(_record(receive_count=1), 60, "test") is True
+        sqs.change_message_visibility.assert_called_once_with(
+            QueueUrl="https://queue", ReceiptHandle="handle-m1", VisibilityTimeout=60
+        )
+
+        assert worker.defer_message(_record(receive_count=5), 60, "test") is False
+        sent = sqs.send_message.call_args.kwargs
+        assert sent["DelaySeconds"] == 60
+        assert json.loads(sent["MessageBody"])["deferrals"] == 1
+
+    sqs.get_queue_url.assert_called_once_with(
+        QueueName="bulk-email-queue", QueueOwnerAWSAccountId="123456789012"
+    )
+    print("    ✅ PASS")
+
+
+def test_handler_defers_instead_of_sleeping():
+    """A long pacing delay is handed to SQS and reported as a batch item failure"""
+    print("🧪 Testing Handler Deferral...")
+
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    send = MagicMock(return_value=True)
+
+    with patch.object(worker, "DEFER_WITH_SQS_VISIBILITY", True), patch.object(
+        worker.campaign_cache, "get", return_value=campaign
+    ), patch.object(worker, "prefetch_contacts", return_value={}), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=30.0
+    ), patch.object(
+        worker, "defer_message", return_value=True
+    ), patch.object(
+        worker, "send_ses_email", send
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", MagicMock()
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ), patch(
+        "email_worker_lambda.time.sleep"
+    ) as sleep:
+        response = worker.lambda_handler({"Records": [_record()]}, context)
+
+    body = json.loads(response["body"])
+    assert response["batchItemFailures"] == [{"itemIdentifier": "m1"}]
+    assert body["deferred"] == 1 and body["failed"] == 0
+    send.assert_not_called()
+    sleep.assert_not_called()
+    print("    ✅ PASS")
+
+
+def test_deferrals_are_capped():
+    """A message re-sent DEFER_MAX_DEFERRALS times is counted as failed instead of re-sent again"""
+    print("🧪 Testing Deferral Cap...")
+
+    import email_worker_lambda as worker
+    from botocore.exceptions import ClientError
+
+    exhausted = _record(receive_count=2)
+    exhausted["body"] = json.dumps(
+        {"campaign_id": "c1", "contact_email": "a@example.com", "deferrals": worker.DEFER_MAX_DEFERRALS}
+    )
+    sqs = MagicMock()
+    with patch.object(worker, "sqs_client", sqs), patch.dict(
+        worker.queue_url_cache, {QUEUE_ARN: "https://queue"}
+    ):
+        try:
+            worker.defer_message(exhausted, 60, "test")
+            raise AssertionError("expected DeferralLimitExceeded")
+        except worker.DeferralLimitExceeded:
+            pass
+    sqs.send_message.assert_not_called()
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    throttle = ClientError({"Error": {"Code": "Throttling", "Message": "Maximum sending rate exceeded"}}, "SendRawEmail")
+    table = MagicMock()
+    table.update_item.return_value = {"Attributes": {}}
+    table.get_item.return_value = {}
+
+    with patch.object(worker, "DEFER_WITH_SQS_VISIBILITY", True), patch.object(
+        worker, "sqs_client", sqs
+    ), patch.dict(worker.queue_url_cache, {QUEUE_ARN: "https://queue"}), patch.object(
+        worker.campaign_cache, "get", return_value=campaign
+    ), patch.object(worker, "prefetch_contacts", return_value={}), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker, "send_ses_email", side_effect=throttle
+    ), patch.object(
+        worker.rate_control, "handle_throttle_detected"
+    ), patch.object(
+        worker, "campaigns_table", table
+    ), patch.object(
+        worker, "campaign_counts_table", table
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ):
+        response = worker.lambda_handler({"Records": [exhausted]}, context)
+
+    body = json.loads(response["body"])
+    assert response["batchItemFailures"] == []
+    assert body["failed"] == 1 and body["deferred"] == 0
+    assert table.update_item.call_args.kwargs["ExpressionAttributeValues"][":failed"] == 1
+    sqs.send_message.assert_not_called()
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 SQS Deferral Test Suite")
+    print("=" * 50)
+
+    test_backoff_grows_with_receive_count()
+    test_defer_uses_visibility_then_resend()
+    test_handler_defers_instead_of_sleeping()
+    test_deferrals_are_capped()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script for the worker's per-invocation time budget
+Tests that recipients beyond the remaining Lambda time are handed back to SQS unsent
+"""
+
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Add the current directory to the path so we can import the Lambda functions
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUEUE_ARN = "arn:aws-us-gov:sqs:us-gov-west-1:123456789012:bulk-email-queue"
+
+
+def _record(message_id, body):
+    return {
+        "messageId": message_id,
+        "receiptHandle": f"handle-{message_id}",
+        "eventSourceARN": QUEUE_ARN,
+        "attributes": {"ApproximateReceiveCount": "1"},
+        "body": json.dumps(body),
+    }
+
+
+def _run(event, remaining_ms, sqs, sent):
+    import email_worker_lambda as worker
+
+    campaign = {
+        "campaign_id": "c1",
+        "subject": "Hi",
+        "body": "<p>Hi</p>",
+        "from_email": "sender@example.com",
+        "status": "sending",
+    }
+    context = MagicMock(aws_request_id="req", function_name="worker", memory_limit_in_mb=512)
+    context.get_remaining_time_in_millis.return_value = remaining_ms
+
+    def fake_send(campaign, contact, *args, **kwargs):
+        sent.append(contact["email"])
+        return True
+
+    with patch.object(worker.campaign_cache, "get", return_value=campaign), patch.object(
+        worker, "prefetch_contacts", return_value={}
+    ), patch.object(worker, "lookup_contact", return_value=None), patch.object(
+        worker.rate_control, "get_delay_for_email", return_value=0
+    ), patch.object(
+        worker, "send_ses_email", side_effect=fake_send
+    ), patch.object(
+        worker, "campaigns_table", MagicMock()
+    ), patch.object(
+        worker, "campaign_counts_table", MagicMock()
+    ), patch.object(
+        worker, "sqs_client", sqs
+    ), patch.dict(
+        worker.queue_url_cache, {QUEUE_ARN: "https://queue"}
+    ), patch.object(
+        worker, "send_cloudwatch_metric"
+    ), patch.object(
+        worker, "TIME_BUDGET_MARGIN_MS", 30000
+    ), patch.object(
+        worker, "SECONDS_PER_RECIPIENT_ESTIMATE", 0.5
+    ):
+        return worker.lambda_handler(event, context)
+
+
+def test_packed_recipients_capped_to_remaining_time():
+    """Only the recipients that fit in the time left are sent; the rest are re-enqueued"""
+    print("🧪 Testing Recipient Cap From Remaining Time...")
+
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": entry["Id"]} for entry in Entries],
+        "Failed": [],
+    }
+    recipients = [f"user{n}@example.com" for n in range(6)]
+    event = {"Records": [_record("p1", {"campaign_id": "c1", "recipients": recipients})]}
+    sent = []
+
+    # 31.75s left - 30s margin = 1.75s at 0.5s per recipient -> 3 recipients
+    response = _run(event, 31750, sqs, sent)
+    body = json.loads(response["body"])
+
+    assert sent == recipients[:3]
+    assert body["successful"] == 3 and body["failed"] == 0
+    assert body["unprocessed"] == 3 and body["requeued"] == 3
+    assert response["batchItemFailures"] == []
+    entries = sqs.send_message_batch.call_args.kwargs["Entries"]
+    assert [json.loads(e["MessageBody"])["contact_email"] for e in entries] == recipients[3:]
+    print("    ✅ PASS")
+
+
+def test_unpacked_records_resent_when_out_of_time():
+    """With no time left nothing is sent and single-recipient records are re-sent as new messages"""
+    print("🧪 Testing Out Of Time Batch...")
+
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {"Successful": [{"Id": "0"}], "Failed": [{"Id": "1"}]}
+    event = {
+        "Records": [
+            _record("m1", {"campaign_id": "c1", "contact_email": "a@example.com"}),
+            _record("m2", {"campaign_id": "c1", "contact_email": "b@example.com"}),
+        ]
+    }
+    sent = []
+
+    response = _run(event, 20000, sqs, sent)
+    body = json.loads(response["body"])
+
+    assert sent == []
+    assert body["unprocessed"] == 2 and body["requeued"] == 1
+    # The record SQS would not take back is redelivered instead of dropped
+    assert response["batchItemFailures"] == [{"itemIdentifier": "m2"}]
+    print("    ✅ PASS")
+
+
+def test_no_time_limit_without_lambda_context():
+    """Contexts without a numeric remaining time (local runs) process the whole batch"""
+    print("🧪 Testing Local Context...")
+
+    import email_worker_lambda as worker
+
+    records = [{"messageId": str(n)} for n in range(5)]
+    assert worker.get_invocation_deadline(object()) is None
+    assert worker.cap_records_to_time_budget(records, None) == (records, [])
+    print("    ✅ PASS")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Worker Time Budget Test Suite")
+    print("=" * 50)
+
+    test_packed_recipients_capped_to_remaining_time()
+    test_unpacked_records_resent_when_out_of_time()
+    test_no_time_limit_without_lambda_context()
+
+    print("🎉 All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
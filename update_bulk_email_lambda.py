@@ -59,6 +59,8 @@ def update_bulk_email_lambda():
         print("✓ Creating zip file...")
         with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             zip_file.write('bulk_email_api_lambda.py', 'lambda_function.py')
+            zip_file.write('campaign_counters.py', 'campaign_counters.py')
+            zip_file.write('campaign_summary.py', 'campaign_summary.py')
         
         print(f"✓ Created {zip_filename}")
         
@@ -32,6 +32,7 @@ def update_email_worker():
     
     with zipfile.ZipFile('email_worker_lambda.zip', 'w') as zip_file:
         zip_file.write('email_worker_lambda.py', 'lambda_function.py')
+        zip_file.write('campaign_counters.py', 'campaign_counters.py')
     print("✓ Package created")
     
     # Update Lambda function code